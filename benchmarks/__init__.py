@@ -0,0 +1,14 @@
+"""
+Suite de benchmarks del pipeline de informes.
+
+Incluye un generador de exportaciones MYeBOX sintéticas (`sintetico`) y un
+ejecutor que mide cada etapa del pipeline (`ejecutar`).
+"""
+
+from .sintetico import columnas_myebox, generar_myebox, escribir_myebox
+
+__all__ = [
+    "columnas_myebox",
+    "generar_myebox",
+    "escribir_myebox",
+]
@@ -0,0 +1,292 @@
+"""
+Mide cada etapa del pipeline de informes sobre una exportación sintética.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.ejecutar --dias 7 --intervalo 60
+    python -m benchmarks.ejecutar --dias 30 --salida bench_30d.json --comparar bench_base.json
+
+El informe JSON incluye la configuración, el entorno (versiones, commit) y,
+por etapa, el mínimo, la mediana y el máximo de las repeticiones, de modo
+que dos informes con la misma configuración son comparables entre commits.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from functions import (  # noqa: E402
+    IndiceLagunas,
+    PiramideAgregados,
+    analisis_de_apagones,
+    analizar_demanda,
+    analizar_energia,
+    calcular_tarifa,
+    cargar_datos,
+    corriente,
+    desequilibrio,
+    dividir_dataframe,
+    eventos_de_tension,
+    facturar,
+    factor_potencia,
+    frecuencia,
+    graficar_consumo_por_bloque,
+    graficar_parametros,
+    liquidacion_neta,
+    potencia_activa,
+    potencia_aparente,
+    potencia_capacitiva,
+    potencia_inductiva,
+    potencia_reactiva,
+    procesar_demanda_maxima,
+    promediar_df_por_min,
+    simular_escenarios,
+    sub_dividir_dataframe,
+    voltaje,
+)
+
+from .sintetico import escribir_myebox  # noqa: E402
+
+DIR_DATOS = Path(__file__).parent / "datos"
+
+
+class _Cronometro:
+    """Acumula los tiempos de cada etapa a lo largo de las repeticiones."""
+
+    def __init__(self):
+        self.tiempos: dict[str, list[float]] = {}
+
+    def medir(self, nombre: str, funcion, *args, **kwargs):
+        t0 = time.perf_counter()
+        resultado = funcion(*args, **kwargs)
+        self.tiempos.setdefault(nombre, []).append(time.perf_counter() - t0)
+        return resultado
+
+
+def _ejecutar_pipeline(ruta: Path, crono: _Cronometro, *, intervalo_s: int, volt_linea: float, graficos: bool, dir_img: Path):
+    df = crono.medir("cargar_datos", cargar_datos, str(ruta))
+    df, _df_arm = crono.medir("dividir_dataframe", dividir_dataframe, df)
+    crono.medir("sub_dividir_dataframe", sub_dividir_dataframe, df, time_interval=3600 // intervalo_s)
+
+    volt_fase = round(volt_linea / np.sqrt(3), 0)
+    crono.medir("voltaje", voltaje, df, voltaje_referencia_ll=volt_linea, voltaje_referencia_ln=volt_fase)
+    crono.medir("corriente", corriente, df)
+    crono.medir("frecuencia", frecuencia, df)
+    fp = crono.medir("factor_potencia", factor_potencia, df)
+    crono.medir("indice_lagunas", IndiceLagunas.desde_fechas, df["Fecha/hora"])
+    df, _ = crono.medir("procesar_demanda_maxima", procesar_demanda_maxima, df)
+    for nombre, funcion in (
+        ("potencia_activa", potencia_activa),
+        ("potencia_reactiva", potencia_reactiva),
+        ("potencia_aparente", potencia_aparente),
+        ("potencia_inductiva", potencia_inductiva),
+        ("potencia_capacitiva", potencia_capacitiva),
+    ):
+        crono.medir(nombre, funcion, df)
+    crono.medir("analisis_de_apagones", analisis_de_apagones, df)
+    crono.medir("desequilibrio", desequilibrio, df)
+    crono.medir("eventos_de_tension", eventos_de_tension, df)
+    energia = crono.medir("analizar_energia", analizar_energia, df, "E.Activa III T")
+    demanda = crono.medir("analizar_demanda", analizar_demanda, df, "DMAX_15min")
+    crono.medir("promediar_df_por_min", promediar_df_por_min, df)
+    piramide = crono.medir("construir_piramide", PiramideAgregados.construir, df)
+    crono.medir("resumen_piramide", piramide.resumen, ["E.Activa III T", "P.Activa III T"])
+
+    consumo = energia["consumo_extrapolado_por_bloque"]
+    dmax_bloq = {k: v["valor"] for k, v in demanda["demanda_maxima_por_bloque"].items()}
+    fp_m = fp["fp_mensual_calculado"]
+
+    def tarifas():
+        periodo = "2025-JUL-DIC"
+        return [calcular_tarifa(t, consumo, dmax_bloq, fp_m, periodo) for t in ("BTD", "BTH", "MTD", "MTH")]
+
+    crono.medir("tarifas", tarifas)
+    crono.medir("facturar", facturar, df)
+    crono.medir("liquidacion_neta", liquidacion_neta, df)
+    crono.medir(
+        "simular_escenarios",
+        simular_escenarios,
+        df,
+        desplazar_kw=[0, 10, 20, 40],
+        limite_kw=[np.inf, 100, 150],
+        bateria_kwh=[0, 100, 200],
+        bateria_kw=[50, 100],
+        capacitor_kvar=[0, 20, 40],
+    )
+
+    if graficos:
+        def graficar():
+            graficar_parametros(
+                df, ["Tensión L1L2L3"], guardar=True, ruta=str(dir_img / "tension.png")
+            )
+            graficar_parametros(
+                df, ["P.Activa III T", "DMAX_15min"], guardar=True, ruta=str(dir_img / "demanda.png")
+            )
+            graficar_consumo_por_bloque(consumo, guardar=True, ruta=str(dir_img / "consumo.png"))
+            plt.close("all")
+
+        crono.medir("graficos", graficar)
+
+
+def _commit_actual() -> str | None:
+    try:
+        salida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return salida.stdout.strip() or None
+
+
+def ejecutar_benchmark(
+    *,
+    dias: float = 7,
+    intervalo_s: int = 60,
+    semilla: int = 0,
+    repeticiones: int = 3,
+    orden_max_armonico: int = 50,
+    solar_kwp: float = 0.0,
+    volt_linea: float = 480.0,
+    graficos: bool = True,
+    dir_datos: Path = DIR_DATOS,
+) -> dict:
+    """
+    Genera (o reutiliza) la exportación sintética y mide el pipeline
+    `repeticiones` veces. Devuelve el informe como diccionario.
+    """
+    nombre = f"myebox_{dias:g}d_{intervalo_s}s_s{semilla}_a{orden_max_armonico}_pv{solar_kwp:g}.txt"
+    ruta = Path(dir_datos) / nombre
+    if not ruta.exists():
+        t0 = time.perf_counter()
+        escribir_myebox(
+            ruta,
+            dias=dias,
+            intervalo_s=intervalo_s,
+            semilla=semilla,
+            orden_max_armonico=orden_max_armonico,
+            solar_kwp=solar_kwp,
+            volt_linea=volt_linea,
+        )
+        print(f"Generado {ruta} en {time.perf_counter() - t0:.1f} s")
+
+    crono = _Cronometro()
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(repeticiones):
+            _ejecutar_pipeline(
+                ruta,
+                crono,
+                intervalo_s=intervalo_s,
+                volt_linea=volt_linea,
+                graficos=graficos,
+                dir_img=Path(tmp),
+            )
+
+    etapas = {
+        nombre_etapa: {
+            "min_s": min(t),
+            "mediana_s": statistics.median(t),
+            "max_s": max(t),
+        }
+        for nombre_etapa, t in crono.tiempos.items()
+    }
+    return {
+        "configuracion": {
+            "dias": dias,
+            "intervalo_s": intervalo_s,
+            "semilla": semilla,
+            "repeticiones": repeticiones,
+            "orden_max_armonico": orden_max_armonico,
+            "solar_kwp": solar_kwp,
+            "volt_linea": volt_linea,
+            "graficos": graficos,
+            "filas": int(86400 * dias // intervalo_s),
+            "tamano_fichero_mb": round(ruta.stat().st_size / 2**20, 2),
+        },
+        "entorno": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "matplotlib": matplotlib.__version__,
+            "plataforma": platform.platform(),
+            "commit": _commit_actual(),
+        },
+        "etapas": etapas,
+        "total_mediana_s": sum(e["mediana_s"] for e in etapas.values()),
+    }
+
+
+def imprimir_informe(informe: dict, base: dict | None = None) -> None:
+    """Imprime la tabla de etapas; con `base`, añade la razón respecto a ella."""
+    cfg = informe["configuracion"]
+    print(
+        f"\n{cfg['filas']} filas ({cfg['dias']:g} días a {cfg['intervalo_s']} s), "
+        f"{cfg['repeticiones']} repeticiones"
+    )
+    cabecera = f"{'etapa':<26}{'mediana (s)':>12}{'mín (s)':>10}"
+    if base:
+        cabecera += f"{'base (s)':>10}{'razón':>8}"
+    print(cabecera)
+    for nombre, t in informe["etapas"].items():
+        linea = f"{nombre:<26}{t['mediana_s']:>12.4f}{t['min_s']:>10.4f}"
+        if base and nombre in base["etapas"]:
+            t_base = base["etapas"][nombre]["mediana_s"]
+            linea += f"{t_base:>10.4f}{t['mediana_s'] / t_base if t_base else float('nan'):>8.2f}"
+        print(linea)
+    print(f"{'TOTAL':<26}{informe['total_mediana_s']:>12.4f}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dias", type=float, default=7, help="Duración de la campaña (1 a 365)")
+    parser.add_argument("--intervalo", type=int, default=60, help="Periodo de registro en s (1 a 300)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--armonicos", type=int, default=50, help="Orden máximo de armónicos")
+    parser.add_argument("--solar-kwp", type=float, default=0.0)
+    parser.add_argument("--volt-linea", type=float, default=480.0)
+    parser.add_argument("--sin-graficos", action="store_true")
+    parser.add_argument("--salida", type=Path, help="Fichero JSON donde guardar el informe")
+    parser.add_argument("--comparar", type=Path, help="Informe JSON de referencia")
+    args = parser.parse_args(argv)
+
+    informe = ejecutar_benchmark(
+        dias=args.dias,
+        intervalo_s=args.intervalo,
+        semilla=args.semilla,
+        repeticiones=args.repeticiones,
+        orden_max_armonico=args.armonicos,
+        solar_kwp=args.solar_kwp,
+        volt_linea=args.volt_linea,
+        graficos=not args.sin_graficos,
+    )
+    base = json.loads(args.comparar.read_text(encoding="utf-8")) if args.comparar else None
+    imprimir_informe(informe, base)
+
+    if args.salida:
+        args.salida.write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nInforme guardado en '{args.salida}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+"""
+Generador de exportaciones MYeBOX sintéticas para benchmarks.
+
+Produce ficheros con las mismas columnas, formato de fecha y codificación
+que el analizador (`Fecha/hora` en `%d/%m/%y %H:%M:%S`, latin-1, separador
+`,`), con perfil de carga diario/semanal, apagones, excursiones de tensión,
+huecos de registro y, opcionalmente, exportación solar.
+
+Los datos se generan por días con una semilla derivada de `(semilla, día)`,
+de modo que `generar_myebox` y `escribir_myebox` producen exactamente las
+mismas filas para la misma configuración.
+"""
+
+from __future__ import annotations
+
+import inspect
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FORMATO_FECHA = "%d/%m/%y %H:%M:%S"
+INTERVALO_MIN_S = 1
+INTERVALO_MAX_S = 300
+
+_FASES = ("L1", "L2", "L3")
+_FASES_LL = ("L12", "L23", "L31")
+_CANALES_ARM = ("V1", "V2", "V3", "I1", "I2", "I3")
+
+
+def columnas_myebox(*, orden_max_armonico: int = 50) -> list[str]:
+    """
+    Devuelve la cabecera completa de una exportación MYeBOX en el orden del
+    analizador.
+    """
+    cols = ["Fecha/hora", "Período"]
+
+    # Tensión
+    cols += [f"Tensión {f}" for f in _FASES] + ["Tensión III"]
+    cols += [f"Tensión {f}" for f in _FASES_LL] + ["Tensión L1L2L3"]
+    for est in ("mín.", "máx."):
+        cols += [f"Tensión {est} {f}" for f in _FASES + _FASES_LL + ("L1L2L3",)]
+    cols += ["Tensión de neutro", "V neutro mín.", "V neutro máx."]
+
+    # Corriente y frecuencia
+    cols += [f"Corriente {f}" for f in _FASES] + ["Corriente III", "Corriente de neutro"]
+    for est in ("mín.", "máx."):
+        cols += [f"Corriente {est} {f}" for f in _FASES + ("III",)]
+    cols += ["Corriente de fuga", "Corriente de fuga mín", "Corriente de fuga máx"]
+    cols += ["Frecuencia", "Frecuencia mín.", "Frecuencia máx."]
+
+    # Potencias
+    for mag in ("P.Activa", "P.Inductiva", "P.Capacitiva", "P.Aparente"):
+        cols += [f"{mag} {f}" for f in _FASES] + [f"{mag} III"]
+        if mag != "P.Aparente":
+            cols += [f"{mag} III -"]
+        cols += [f"{mag} mín. III", f"{mag} máx. III"]
+    cols += [f"F.P. {f}" for f in _FASES] + ["F.P. III"]
+    cols += [f"Cos Phi {f}" for f in _FASES] + ["Cos Phi III"]
+
+    # Fasores
+    cols += [f"Fasores {c}" for c in _CANALES_ARM]
+
+    # Energía y coste
+    cols += ["E.Activa T1", "E.Activa T2", "E.Activa III -", "E.Inductiva III", "E.Capacitiva III"]
+    cols += ["Coste T1", "Coste T2"]
+
+    # Secundarios
+    for mag in ("Tensión", "Corriente"):
+        cols += [f"{mag} directa", f"{mag} inversa", f"{mag} homopolar"]
+    cols += [f"Factor cresta {c}" for c in _CANALES_ARM]
+    cols += [f"THD/d {c}" for c in _CANALES_ARM]
+    cols += [f"Distorsión {c}" for c in _CANALES_ARM[3:]]
+    cols += [f"Factor K {c}" for c in _CANALES_ARM[3:]]
+
+    # Armónicos
+    cols += [f"Fund. {c}" for c in _CANALES_ARM]
+    for n in range(2, orden_max_armonico + 1):
+        cols += [f"Arm. {n} {c}" for c in _CANALES_ARM]
+
+    return cols
+
+
+def _validar(dias: float, intervalo_s: int) -> None:
+    if dias <= 0:
+        raise ValueError("'dias' debe ser positivo")
+    if not INTERVALO_MIN_S <= intervalo_s <= INTERVALO_MAX_S:
+        raise ValueError(
+            f"'intervalo_s' debe estar entre {INTERVALO_MIN_S} y {INTERVALO_MAX_S} s"
+        )
+
+
+def _planificar_eventos(
+    rng: np.random.Generator,
+    n: int,
+    intervalo_s: int,
+    apagones: int,
+    excursiones: int,
+    huecos: int,
+) -> dict[str, list[tuple[int, int, float]]]:
+    """
+    Reparte eventos sobre las `n` muestras. Cada evento es
+    `(muestra_inicio, muestras, factor)`.
+    """
+    def muestras(min_s: float, max_s: float) -> int:
+        return max(1, int(rng.uniform(min_s, max_s) // intervalo_s))
+
+    plan: dict[str, list[tuple[int, int, float]]] = {"apagon": [], "excursion": [], "hueco": []}
+    for _ in range(apagones):
+        plan["apagon"].append((int(rng.integers(0, n)), muestras(4 * 60, 90 * 60), 0.0))
+    for _ in range(excursiones):
+        factor = float(rng.choice([1.08, 1.06, 0.93, 0.90]))
+        plan["excursion"].append((int(rng.integers(0, n)), muestras(2 * 60, 45 * 60), factor))
+    for _ in range(huecos):
+        plan["hueco"].append((int(rng.integers(0, n)), muestras(10 * 60, 6 * 3600), 0.0))
+    return plan
+
+
+def _mascara_eventos(eventos, i0: int, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Máscara y factor por muestra de los eventos que solapan `[i0, i0+n)`."""
+    mascara = np.zeros(n, dtype=bool)
+    factor = np.ones(n)
+    for ini, largo, f in eventos:
+        a, b = max(ini, i0) - i0, min(ini + largo, i0 + n) - i0
+        if a < b:
+            mascara[a:b] = True
+            factor[a:b] = f
+    return mascara, factor
+
+
+def _generar_dia(
+    tiempos: np.ndarray,
+    i0: int,
+    plan: dict,
+    *,
+    rng: np.random.Generator,
+    intervalo_s: int,
+    carga_kw: float,
+    solar_kwp: float,
+    volt_linea: float,
+    orden_max_armonico: int,
+) -> pd.DataFrame:
+    n = len(tiempos)
+    ts = pd.DatetimeIndex(tiempos)
+    hora = (ts.hour + ts.minute / 60 + ts.second / 3600).to_numpy()
+    dia_semana = ts.dayofweek.to_numpy()
+
+    # Perfil de carga: jornada laboral en L-V, media jornada el sábado.
+    jornada = np.clip(np.sin(np.pi * (hora - 6.5) / 12.0), 0.0, None)
+    escala = np.select([dia_semana < 5, dia_semana == 5], [1.0, 0.55], 0.15)
+    factor_carga = 0.30 + 0.70 * jornada * escala
+    factor_carga *= 1 + 0.05 * rng.standard_normal(n)
+    p_carga = carga_kw * np.clip(factor_carga, 0.05, None)
+
+    solar = solar_kwp * np.clip(np.sin(np.pi * (hora - 6.0) / 12.0), 0.0, None)
+    solar *= rng.uniform(0.6, 1.0, n)
+    p_neta = p_carga - solar
+
+    fp = np.clip(0.88 + 0.03 * rng.standard_normal(n), 0.70, 0.99)
+    q_ind = p_carga * np.tan(np.arccos(fp))
+    q_cap = np.where(factor_carga < 0.4, 0.04 * carga_kw, 0.0)
+
+    reparto = np.array([0.35, 0.33, 0.32])
+    p_fase = p_carga[:, None] * reparto * (1 + 0.02 * rng.standard_normal((n, 3)))
+    q_fase = q_ind[:, None] * reparto
+    s_fase = np.hypot(p_fase, q_fase)
+
+    v_fase_nom = volt_linea / np.sqrt(3)
+    v_fase = v_fase_nom * (
+        1
+        + 0.01 * np.sin(2 * np.pi * hora / 24.0)[:, None]
+        + np.array([0.004, -0.002, -0.006])
+        + 0.003 * rng.standard_normal((n, 3))
+    )
+
+    apagon, _ = _mascara_eventos(plan["apagon"], i0, n)
+    _, factor_v = _mascara_eventos(plan["excursion"], i0, n)
+    v_fase *= factor_v[:, None]
+
+    v_ll = np.sqrt(3) * (v_fase + np.roll(v_fase, -1, axis=1)) / 2
+    i_fase = s_fase * 1000 / v_fase
+    frec = 60 + 0.02 * rng.standard_normal(n)
+
+    datos: dict[str, np.ndarray] = {}
+    for k, f in enumerate(_FASES):
+        datos[f"Tensión {f}"] = v_fase[:, k]
+    datos["Tensión III"] = v_fase.mean(axis=1)
+    for k, f in enumerate(_FASES_LL):
+        datos[f"Tensión {f}"] = v_ll[:, k]
+    datos["Tensión L1L2L3"] = v_ll.mean(axis=1)
+    for f in _FASES + _FASES_LL + ("L1L2L3",):
+        base = datos[f"Tensión {f}"]
+        datos[f"Tensión mín. {f}"] = base * (1 - 0.004 * rng.random(n))
+        datos[f"Tensión máx. {f}"] = base * (1 + 0.004 * rng.random(n))
+    datos["Tensión de neutro"] = 0.5 + 0.2 * rng.random(n)
+    datos["V neutro mín."] = datos["Tensión de neutro"] * 0.8
+    datos["V neutro máx."] = datos["Tensión de neutro"] * 1.2
+
+    for k, f in enumerate(_FASES):
+        datos[f"Corriente {f}"] = i_fase[:, k]
+    datos["Corriente III"] = i_fase.mean(axis=1)
+    datos["Corriente de neutro"] = np.abs(i_fase[:, 0] - i_fase[:, 2]) * 0.5
+    for f in _FASES + ("III",):
+        base = datos[f"Corriente {f}"]
+        datos[f"Corriente mín. {f}"] = base * (1 - 0.05 * rng.random(n))
+        datos[f"Corriente máx. {f}"] = base * (1 + 0.08 * rng.random(n))
+    datos["Corriente de fuga"] = np.zeros(n)
+    datos["Corriente de fuga mín"] = np.zeros(n)
+    datos["Corriente de fuga máx"] = np.zeros(n)
+    datos["Frecuencia"] = frec
+    datos["Frecuencia mín."] = frec - 0.01
+    datos["Frecuencia máx."] = frec + 0.01
+
+    potencias = {
+        "P.Activa": (p_fase, np.clip(p_neta, 0, None), np.clip(-p_neta, 0, None)),
+        "P.Inductiva": (q_fase, q_ind, np.zeros(n)),
+        "P.Capacitiva": (q_cap[:, None] * reparto, q_cap, 0.01 * q_cap),
+        "P.Aparente": (s_fase, np.hypot(p_carga, q_ind), None),
+    }
+    for mag, (por_fase, total, negativo) in potencias.items():
+        for k, f in enumerate(_FASES):
+            datos[f"{mag} {f}"] = por_fase[:, k]
+        datos[f"{mag} III"] = total
+        if negativo is not None:
+            datos[f"{mag} III -"] = negativo
+        datos[f"{mag} mín. III"] = total * 0.95
+        datos[f"{mag} máx. III"] = total * 1.05
+
+    fp_fase = np.where(s_fase > 0, p_fase / np.where(s_fase > 0, s_fase, 1), 0)
+    for k, f in enumerate(_FASES):
+        datos[f"F.P. {f}"] = fp_fase[:, k]
+        datos[f"Cos Phi {f}"] = fp_fase[:, k]
+    datos["F.P. III"] = fp
+    datos["Cos Phi III"] = fp
+
+    phi = np.degrees(np.arccos(fp))
+    for k, c in enumerate(("V1", "V2", "V3")):
+        datos[f"Fasores {c}"] = np.full(n, (-120.0 * k) % 360)
+        datos[f"Fasores I{k + 1}"] = ((-120.0 * k) - phi) % 360
+
+    horas_intervalo = intervalo_s / 3600
+    datos["E.Activa T1"] = datos["P.Activa III"] * horas_intervalo
+    datos["E.Activa T2"] = np.zeros(n)
+    datos["E.Activa III -"] = datos["P.Activa III -"] * horas_intervalo
+    datos["E.Inductiva III"] = q_ind * horas_intervalo
+    datos["E.Capacitiva III"] = q_cap * horas_intervalo
+    datos["Coste T1"] = datos["E.Activa T1"] * 0.15
+    datos["Coste T2"] = np.zeros(n)
+
+    v_med = v_fase.mean(axis=1)
+    i_med = i_fase.mean(axis=1)
+    desbalance_v = np.abs(v_fase - v_med[:, None]).max(axis=1)
+    desbalance_i = np.abs(i_fase - i_med[:, None]).max(axis=1)
+    datos["Tensión directa"] = v_med
+    datos["Tensión inversa"] = desbalance_v
+    datos["Tensión homopolar"] = 0.3 * desbalance_v
+    datos["Corriente directa"] = i_med
+    datos["Corriente inversa"] = desbalance_i
+    datos["Corriente homopolar"] = 0.3 * desbalance_i
+
+    thd_v = 2.0 + 0.5 * rng.random((n, 3))
+    thd_i = 10.0 + 5.0 * rng.random((n, 3))
+    for k in range(3):
+        datos[f"Factor cresta V{k + 1}"] = 1.41 + 0.01 * rng.random(n)
+        datos[f"Factor cresta I{k + 1}"] = 1.6 + 0.2 * rng.random(n)
+    for k in range(3):
+        datos[f"THD/d V{k + 1}"] = thd_v[:, k]
+        datos[f"THD/d I{k + 1}"] = thd_i[:, k]
+    for k in range(3):
+        datos[f"Distorsión I{k + 1}"] = thd_i[:, k] * i_fase[:, k] / 100
+        datos[f"Factor K I{k + 1}"] = 1 + thd_i[:, k] / 10
+
+    for k in range(3):
+        datos[f"Fund. V{k + 1}"] = v_fase[:, k]
+        datos[f"Fund. I{k + 1}"] = i_fase[:, k]
+    for orden in range(2, orden_max_armonico + 1):
+        peso = (3.0 if orden % 2 else 0.2) / orden
+        for k in range(3):
+            datos[f"Arm. {orden} V{k + 1}"] = peso * thd_v[:, k] / 3
+            datos[f"Arm. {orden} I{k + 1}"] = peso * thd_i[:, k]
+
+    df = pd.DataFrame(datos)
+    if apagon.any():
+        # Sin suministro: el analizador sigue registrando con todo a cero.
+        df.loc[apagon, :] = 0.0
+
+    df.insert(0, "Período", intervalo_s)
+    df.insert(0, "Fecha/hora", ts.strftime(FORMATO_FECHA))
+
+    hueco, _ = _mascara_eventos(plan["hueco"], i0, n)
+    if hueco.any():
+        df = df.loc[~hueco]
+
+    return df[columnas_myebox(orden_max_armonico=orden_max_armonico)]
+
+
+def _iterar_dias(
+    *,
+    dias: float,
+    intervalo_s: int,
+    inicio: str,
+    semilla: int,
+    apagones: int,
+    excursiones: int,
+    huecos: int,
+    **kwargs,
+):
+    _validar(dias, intervalo_s)
+    t0 = np.datetime64(pd.Timestamp(inicio).floor("s"), "s")
+    n_total = int(dias * 86400 // intervalo_s)
+    por_dia = 86400 // intervalo_s
+
+    plan = _planificar_eventos(
+        np.random.default_rng([semilla, 0]), n_total, intervalo_s, apagones, excursiones, huecos
+    )
+    for num_dia, i0 in enumerate(range(0, n_total, por_dia)):
+        n = min(por_dia, n_total - i0)
+        tiempos = t0 + (i0 + np.arange(n)) * np.timedelta64(intervalo_s, "s")
+        rng = np.random.default_rng([semilla, num_dia + 1])
+        yield _generar_dia(tiempos, i0, plan, rng=rng, intervalo_s=intervalo_s, **kwargs)
+
+
+def generar_myebox(
+    *,
+    dias: float = 7,
+    intervalo_s: int = 60,
+    inicio: str = "2025-07-21 00:00:00",
+    semilla: int = 0,
+    apagones: int = 2,
+    excursiones: int = 4,
+    huecos: int = 0,
+    carga_kw: float = 150.0,
+    solar_kwp: float = 0.0,
+    volt_linea: float = 480.0,
+    orden_max_armonico: int = 50,
+) -> pd.DataFrame:
+    """
+    Genera en memoria una exportación MYeBOX sintética.
+
+    Parameters
+    ----------
+    dias : float, default 7
+        Duración de la campaña (1 día a 1 año).
+    intervalo_s : int, default 60
+        Periodo de registro en segundos (1 s a 5 min).
+    inicio : str
+        Fecha-hora de la primera muestra.
+    semilla : int
+        Semilla del generador; la misma configuración produce el mismo fichero.
+    apagones, excursiones, huecos : int
+        Número de apagones (registros a cero), excursiones de tensión
+        (±6-10 %) y huecos de registro (filas ausentes).
+    carga_kw, solar_kwp, volt_linea : float
+        Carga máxima, potencia solar instalada y tensión de línea nominal.
+    orden_max_armonico : int, default 50
+        Último orden de las columnas `Arm.`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Con `Fecha/hora` como texto, igual que en el fichero exportado.
+    """
+    return pd.concat(
+        list(
+            _iterar_dias(
+                dias=dias,
+                intervalo_s=intervalo_s,
+                inicio=inicio,
+                semilla=semilla,
+                apagones=apagones,
+                excursiones=excursiones,
+                huecos=huecos,
+                carga_kw=carga_kw,
+                solar_kwp=solar_kwp,
+                volt_linea=volt_linea,
+                orden_max_armonico=orden_max_armonico,
+            )
+        ),
+        ignore_index=True,
+    )
+
+
+def escribir_myebox(ruta: str | Path, **kwargs) -> Path:
+    """
+    Escribe una exportación sintética día a día, sin mantener la campaña
+    completa en memoria. Acepta los mismos argumentos que `generar_myebox`.
+    """
+    # Argumentos y valores por defecto de `generar_myebox`, que es la única
+    # fuente de ambos (un argumento desconocido da TypeError como allí).
+    argumentos = inspect.signature(generar_myebox).bind(**kwargs)
+    argumentos.apply_defaults()
+
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    with open(ruta, "w", encoding="latin-1", newline="") as fh:
+        for k, df_dia in enumerate(_iterar_dias(**argumentos.arguments)):
+            df_dia.to_csv(fh, index=False, header=(k == 0), float_format="%.3f")
+    return ruta
@@ -1,10 +1,33 @@
 # functions/__init__.py
 
 from .io import cargar_datos
+from .columnar import DescriptorCompartido, TablaColumnar
+from .columnas import (
+    POLITICAS_DTYPE,
+    InfoColumna,
+    RegistroColumnas,
+    clasificar_columna,
+    dtype_columna,
+    dtypes_columnas,
+    registro_de,
+    filtro_columnas,
+)
 from .preprocess import dividir_dataframe, sub_dividir_dataframe, promediar_df_por_min
+from .perfiles import perfil_por_minuto, codigos_tiempo
+from .calendario import Calendario, Temporada, Horario, calendario_desde_dict, feriados_panama
+from .distribuidoras import (
+    Distribuidora,
+    cargar_distribuidora,
+    distribuidora_activa,
+    distribuidoras_disponibles,
+    seleccionar_distribuidora,
+    usar_distribuidora,
+)
+from .blocks import clasificar_bloques, describir_bloques
 from .metrics import (
     voltaje,
     corriente,
+    sobrecarga_corriente,
     frecuencia,
     factor_potencia,
     potencia_activa,
@@ -28,7 +51,36 @@ from .tariffs import (
     calcular_BTH,
     calcular_MTD,
     calcular_MTH,
+    periodo_tarifario,
+    periodo_por_defecto,
+    calcular_tarifa,
+    calcular_tarifa_lote,
+    TARIFAS_SOPORTADAS,
+)
+from .facturacion import facturar
+from .simulador import simular_escenarios, demanda_15min
+from .capacitores import dimensionar_capacitores
+from .montecarlo import bandas_extrapolacion
+from .paralelo import Tarea, ejecutar_tareas, ordenar_tareas
+from .pipeline import Etapa, Pipeline, huella_fichero
+from .informe import ejecutar_informe, imprimir_informe, verificar_politica_dtype
+from .almacen import AlmacenResultados
+from .piramide import NivelAgregado, PiramideAgregados, construir_piramide
+from .campana import CampanaColumnas, abrir_campana, importar_campana
+from .desequilibrio import (
+    desequilibrio,
+    desequilibrio_lineas,
+    desequilibrio_nema,
+    desequilibrio_secuencia,
+    series_desequilibrio,
 )
+from .bidireccional import demanda_bidireccional, energia_bidireccional, facturar_importacion, liquidacion_neta
+from .histeresis import estado_histeresis, eventos_histeresis
+from .huecos import ITIC_INFERIOR, ITIC_SUPERIOR, clasificar_itic, eventos_de_tension
+from .lagunas import IndiceLagunas, indice_lagunas
+from .servicio import ServicioInformes
+from .vigilancia import VigilanteCarpeta, procesar_exportacion
+from .tablas_tarifas import TablaTarifas, PeriodoTarifario, TarifaInvalida, cargar_tarifas
 from .visualize import (
     graficar_parametros,
     graficar_consumo_por_bloque,
@@ -37,15 +89,27 @@ from .visualize import (
     graficar_demanda_maxima_anillo,
     graficar_consumo_polar,
     graficar_demanda_maxima_polar,
-    graficar_comparacion_tarifas
+    graficar_comparacion_tarifas,
+    graficar_itic,
 )
 
 __all__ = [
     "cargar_datos",
+    "TablaColumnar",
+    "DescriptorCompartido",
+    "InfoColumna",
+    "RegistroColumnas",
+    "clasificar_columna",
+    "registro_de",
+    "filtro_columnas",
+    "POLITICAS_DTYPE",
+    "dtype_columna",
+    "dtypes_columnas",
     "dividir_dataframe",
     "sub_dividir_dataframe",
     "voltaje",
     "corriente",
+    "sobrecarga_corriente",
     "frecuencia",
     "factor_potencia",
     "potencia_activa",
@@ -59,6 +123,21 @@ __all__ = [
     "analisis_de_apagones",
     "calcular_maxima_demanda_por_bloque",
     "promediar_df_por_min",
+    "perfil_por_minuto",
+    "codigos_tiempo",
+    "Calendario",
+    "Temporada",
+    "Horario",
+    "calendario_desde_dict",
+    "Distribuidora",
+    "cargar_distribuidora",
+    "distribuidora_activa",
+    "distribuidoras_disponibles",
+    "seleccionar_distribuidora",
+    "usar_distribuidora",
+    "feriados_panama",
+    "clasificar_bloques",
+    "describir_bloques",
     "analizar_demanda",
     "analizar_energia",
     "analizar_comparacion_tarifas",
@@ -68,6 +147,56 @@ __all__ = [
     "calcular_BTH",
     "calcular_MTD",
     "calcular_MTH",
+    "periodo_tarifario",
+    "periodo_por_defecto",
+    "calcular_tarifa",
+    "calcular_tarifa_lote",
+    "TARIFAS_SOPORTADAS",
+    "facturar",
+    "simular_escenarios",
+    "demanda_15min",
+    "dimensionar_capacitores",
+    "bandas_extrapolacion",
+    "Tarea",
+    "ejecutar_tareas",
+    "ordenar_tareas",
+    "Etapa",
+    "Pipeline",
+    "huella_fichero",
+    "ejecutar_informe",
+    "imprimir_informe",
+    "verificar_politica_dtype",
+    "AlmacenResultados",
+    "PiramideAgregados",
+    "NivelAgregado",
+    "construir_piramide",
+    "CampanaColumnas",
+    "abrir_campana",
+    "importar_campana",
+    "desequilibrio",
+    "desequilibrio_lineas",
+    "desequilibrio_nema",
+    "desequilibrio_secuencia",
+    "series_desequilibrio",
+    "energia_bidireccional",
+    "demanda_bidireccional",
+    "facturar_importacion",
+    "liquidacion_neta",
+    "estado_histeresis",
+    "eventos_histeresis",
+    "eventos_de_tension",
+    "clasificar_itic",
+    "ITIC_SUPERIOR",
+    "ITIC_INFERIOR",
+    "IndiceLagunas",
+    "indice_lagunas",
+    "ServicioInformes",
+    "VigilanteCarpeta",
+    "procesar_exportacion",
+    "TablaTarifas",
+    "PeriodoTarifario",
+    "TarifaInvalida",
+    "cargar_tarifas",
     "graficar_parametros",
     "graficar_consumo_por_bloque",
     "graficar_demanda_maxima_por_bloque",
@@ -76,4 +205,5 @@ __all__ = [
     "graficar_consumo_polar",
     "graficar_demanda_maxima_polar",
     "graficar_comparacion_tarifas",
+    "graficar_itic",
 ]
\ No newline at end of file
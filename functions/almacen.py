@@ -0,0 +1,318 @@
+"""
+Almacén local de resultados (SQLite, solo biblioteca estándar) para
+consultar el histórico de la flota sin volver a procesar campañas.
+
+Tablas: sitios, campañas (una medición de un sitio), energía y demanda por
+bloque, resultados de tarifas y eventos (voltaje, frecuencia, apagones).
+Cada campaña se escribe en una sola transacción con `executemany`; las
+fechas se guardan como texto ISO ('AAAA-MM-DD HH:MM:SS'), que ordena y
+compara igual que las fechas.
+
+    with AlmacenResultados("resultados.sqlite") as almacen:
+        almacen.guardar_informe("Hielería Azuero", informe, archivo="h azuero.txt")
+        almacen.sitios_con_eventos("voltaje", desde="2025-07-01", hasta="2025-09-30")
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import date, datetime
+from pathlib import Path
+
+import pandas as pd
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS sitios (
+    id            INTEGER PRIMARY KEY,
+    nombre        TEXT NOT NULL UNIQUE,
+    distribuidora TEXT
+);
+CREATE TABLE IF NOT EXISTS campanas (
+    id          INTEGER PRIMARY KEY,
+    sitio_id    INTEGER NOT NULL REFERENCES sitios(id) ON DELETE CASCADE,
+    archivo     TEXT NOT NULL,
+    inicio      TEXT NOT NULL,
+    fin         TEXT NOT NULL,
+    muestras    INTEGER,
+    fp_mensual  REAL,
+    energia_kwh REAL,
+    dmax_kw     REAL,
+    registrada  TEXT NOT NULL,
+    UNIQUE (sitio_id, archivo, inicio)
+);
+CREATE TABLE IF NOT EXISTS bloques (
+    campana_id  INTEGER NOT NULL REFERENCES campanas(id) ON DELETE CASCADE,
+    bloque      TEXT NOT NULL,
+    consumo_kwh REAL,
+    dmax_kw     REAL,
+    fecha_dmax  TEXT,
+    PRIMARY KEY (campana_id, bloque)
+);
+CREATE TABLE IF NOT EXISTS tarifas (
+    campana_id    INTEGER NOT NULL REFERENCES campanas(id) ON DELETE CASCADE,
+    periodo       TEXT NOT NULL,
+    tarifa        TEXT NOT NULL,
+    cargo_energia REAL,
+    cargo_demanda REAL,
+    cargo_fp      REAL,
+    total         REAL,
+    PRIMARY KEY (campana_id, periodo, tarifa)
+);
+CREATE TABLE IF NOT EXISTS eventos (
+    id         INTEGER PRIMARY KEY,
+    campana_id INTEGER NOT NULL REFERENCES campanas(id) ON DELETE CASCADE,
+    tipo       TEXT NOT NULL,
+    magnitud   TEXT NOT NULL,
+    inicio     TEXT NOT NULL,
+    fin        TEXT NOT NULL,
+    duracion_s REAL,
+    valor      REAL,
+    fecha_valor TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_campanas_sitio ON campanas (sitio_id, inicio);
+CREATE INDEX IF NOT EXISTS ix_campanas_inicio ON campanas (inicio, fin);
+CREATE INDEX IF NOT EXISTS ix_eventos_tipo ON eventos (tipo, inicio);
+CREATE INDEX IF NOT EXISTS ix_eventos_campana ON eventos (campana_id, inicio);
+CREATE INDEX IF NOT EXISTS ix_tarifas_tarifa ON tarifas (tarifa, periodo);
+"""
+
+# (clave del resultado, clave de los eventos, tipo, clave del valor extremo)
+_EVENTOS = (
+    ("voltaje", "eventos_de_voltaje_alto", "voltaje_alto", "valor_maximo"),
+    ("voltaje", "eventos_de_voltaje_bajo", "voltaje_bajo", "valor_minimo"),
+    ("frecuencia", "eventos_de_frecuencia_alta", "frecuencia_alta", "valor_maximo"),
+    ("frecuencia", "eventos_de_frecuencia_baja", "frecuencia_baja", "valor_minimo"),
+)
+
+
+def _texto(fecha) -> str | None:
+    if fecha is None or pd.isna(fecha):
+        return None
+    return pd.Timestamp(fecha).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _hasta(fecha) -> str | None:
+    """Límite superior inclusivo: una fecha sin hora abarca el día completo."""
+    texto = _texto(fecha)
+    solo_fecha = (isinstance(fecha, date) and not isinstance(fecha, datetime)) or (isinstance(fecha, str) and ":" not in fecha)
+    return f"{texto[:10]} 23:59:59" if texto and solo_fecha else texto
+
+
+def _numero(valor) -> float | None:
+    return None if valor is None or pd.isna(valor) else float(valor)
+
+
+def _segundos(duracion) -> float | None:
+    return None if duracion is None or pd.isna(duracion) else pd.Timedelta(duracion).total_seconds()
+
+
+def _filas_eventos(campana_id: int, metricas: dict) -> list[tuple]:
+    filas = []
+    for origen, clave, tipo, clave_valor in _EVENTOS:
+        resultado = metricas.get(origen) or {}
+        for magnitud, eventos in (resultado.get("analisis_de_eventos") or {}).items():
+            for ev in eventos.get(clave, []):
+                filas.append((
+                    campana_id, tipo, magnitud, _texto(ev["inicio"]), _texto(ev["fin"]),
+                    _segundos(ev.get("duracion")), _numero(ev.get(clave_valor)),
+                    _texto(ev.get(f"fecha_{clave_valor}")),
+                ))
+    for ev in (metricas.get("apagones") or {}).get("detalle_de_apagones", []):
+        filas.append((
+            campana_id, "apagon", "Tensión III", _texto(ev["inicio"]), _texto(ev["fin"]),
+            _segundos(ev.get("duracion")), None, None,
+        ))
+    return filas
+
+
+class AlmacenResultados:
+    """Conexión a un almacén SQLite de resultados (`ruta` o ':memory:')."""
+
+    def __init__(self, ruta: str | Path = "resultados.sqlite"):
+        self.ruta = str(ruta)
+        self.conexion = sqlite3.connect(self.ruta)
+        self.conexion.execute("PRAGMA foreign_keys = ON")
+        if self.ruta != ":memory:":
+            self.conexion.execute("PRAGMA journal_mode = WAL")
+        with self.conexion:
+            self.conexion.executescript(_ESQUEMA)
+
+    def __enter__(self) -> "AlmacenResultados":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+    def cerrar(self) -> None:
+        self.conexion.close()
+
+    # ---- escritura -------------------------------------------------------
+
+    def guardar_campana(
+        self,
+        sitio: str,
+        *,
+        archivo: str,
+        inicio,
+        fin,
+        metricas: dict,
+        resultados_tarifas: dict | None = None,
+        distribuidora: str | None = None,
+        muestras: int | None = None,
+    ) -> int:
+        """
+        Guarda una campaña: métricas de `ejecutar_tareas` (o de la etapa
+        'metricas' del informe) y resultados de tarifas {periodo: {tarifa:
+        cargos}}. Si ya existía la misma campaña (sitio, archivo, inicio) se
+        reemplaza. Todo en una transacción. Devuelve el id de la campaña.
+        """
+        energia = metricas.get("energia") or {}
+        demanda = metricas.get("demanda") or {}
+        fp = (metricas.get("factor_potencia") or {}).get("fp_mensual_calculado")
+        with self.conexion as c:
+            c.execute(
+                "INSERT INTO sitios (nombre, distribuidora) VALUES (?, ?) "
+                "ON CONFLICT (nombre) DO UPDATE SET distribuidora = COALESCE(excluded.distribuidora, distribuidora)",
+                (sitio, distribuidora),
+            )
+            (sitio_id,) = c.execute("SELECT id FROM sitios WHERE nombre = ?", (sitio,)).fetchone()
+            c.execute(
+                "DELETE FROM campanas WHERE sitio_id = ? AND archivo = ? AND inicio = ?",
+                (sitio_id, str(archivo), _texto(inicio)),
+            )
+            cursor = c.execute(
+                "INSERT INTO campanas (sitio_id, archivo, inicio, fin, muestras, fp_mensual, energia_kwh, dmax_kw, registrada) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    sitio_id, str(archivo), _texto(inicio), _texto(fin), muestras, _numero(fp),
+                    _numero(energia.get("energia_extrapolada_total")),
+                    _numero(demanda.get("demanda_maxima_total")),
+                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                ),
+            )
+            campana_id = cursor.lastrowid
+
+            consumo = energia.get("consumo_extrapolado_por_bloque") or {}
+            dmax = demanda.get("demanda_maxima_por_bloque") or {}
+            c.executemany(
+                "INSERT INTO bloques VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        campana_id, b, _numero(consumo.get(b)),
+                        _numero((dmax.get(b) or {}).get("valor")), _texto((dmax.get(b) or {}).get("fecha")),
+                    )
+                    for b in dict.fromkeys([*consumo, *dmax])
+                ],
+            )
+            c.executemany(
+                "INSERT INTO tarifas VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        campana_id, periodo, tarifa, _numero(v["cargo_energia"]), _numero(v["cargo_demanda"]),
+                        _numero(v["cargo_fp"]), _numero(v["total"]),
+                    )
+                    for periodo, por_tarifa in (resultados_tarifas or {}).items()
+                    for tarifa, v in por_tarifa.items()
+                ],
+            )
+            c.executemany(
+                "INSERT INTO eventos (campana_id, tipo, magnitud, inicio, fin, duracion_s, valor, fecha_valor) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                _filas_eventos(campana_id, metricas),
+            )
+        return campana_id
+
+    def guardar_informe(self, sitio: str, informe: dict, *, archivo: str, distribuidora: str | None = None) -> int:
+        """Guarda la salida de `ejecutar_informe` como campaña de `sitio`."""
+        metricas = informe["metricas"]
+        medicion = metricas["medicion"]
+        return self.guardar_campana(
+            sitio,
+            archivo=archivo,
+            inicio=medicion["inicio"],
+            fin=medicion["fin"],
+            muestras=medicion["muestras"],
+            metricas=metricas,
+            resultados_tarifas=informe["tarifas"]["resultados"],
+            distribuidora=distribuidora,
+        )
+
+    # ---- consultas -------------------------------------------------------
+
+    def consultar(self, sql: str, parametros: tuple | dict = ()) -> pd.DataFrame:
+        """Consulta SQL libre como DataFrame."""
+        cursor = self.conexion.execute(sql, parametros)
+        columnas = [d[0] for d in cursor.description]
+        return pd.DataFrame(cursor.fetchall(), columns=columnas)
+
+    @staticmethod
+    def _filtros(condiciones: list[tuple[str, object]]) -> tuple[str, list]:
+        activas = [(sql, v) for sql, v in condiciones if v is not None]
+        if not activas:
+            return "", []
+        valores = [x for _, v in activas for x in (v if isinstance(v, tuple) else (v,))]
+        return " WHERE " + " AND ".join(sql for sql, _ in activas), valores
+
+    def campanas(self, sitio: str | None = None, *, desde=None, hasta=None) -> pd.DataFrame:
+        """
+        Campañas (con su sitio) que se solapan con [desde, hasta]; un `hasta`
+        sin hora incluye todo ese día.
+        """
+        donde, valores = self._filtros([
+            ("s.nombre = ?", sitio),
+            ("c.fin >= ?", _texto(desde)),
+            ("c.inicio <= ?", _hasta(hasta)),
+        ])
+        return self.consultar(
+            "SELECT c.id, s.nombre AS sitio, c.archivo, c.inicio, c.fin, c.muestras, c.fp_mensual, "
+            "c.energia_kwh, c.dmax_kw FROM campanas c JOIN sitios s ON s.id = c.sitio_id"
+            f"{donde} ORDER BY s.nombre, c.inicio",
+            valores,
+        )
+
+    def eventos(self, sitio: str | None = None, tipo: str | None = None, *, desde=None, hasta=None) -> pd.DataFrame:
+        """
+        Eventos en [desde, hasta] (un `hasta` sin hora incluye todo ese día).
+        `tipo` es exacto ('voltaje_alto', 'apagon') o un prefijo ('voltaje',
+        'frecuencia').
+        """
+        donde, valores = self._filtros([
+            ("s.nombre = ?", sitio),
+            ("(e.tipo = ? OR e.tipo LIKE ? ESCAPE '\\')", None if tipo is None else (tipo, f"{tipo}\\_%")),
+            ("e.fin >= ?", _texto(desde)),
+            ("e.inicio <= ?", _hasta(hasta)),
+        ])
+        return self.consultar(
+            "SELECT s.nombre AS sitio, e.tipo, e.magnitud, e.inicio, e.fin, e.duracion_s, e.valor, e.fecha_valor "
+            "FROM eventos e JOIN campanas c ON c.id = e.campana_id JOIN sitios s ON s.id = c.sitio_id"
+            f"{donde} ORDER BY e.inicio",
+            valores,
+        )
+
+    def sitios_con_eventos(self, tipo: str | None = None, *, desde=None, hasta=None) -> pd.DataFrame:
+        """Sitios con eventos de `tipo` en [desde, hasta]: nº de eventos y duración total."""
+        eventos = self.eventos(tipo=tipo, desde=desde, hasta=hasta)
+        return (
+            eventos.groupby("sitio")
+            .agg(eventos=("tipo", "size"), duracion_total_s=("duracion_s", "sum"), primero=("inicio", "min"), ultimo=("fin", "max"))
+            .sort_values("eventos", ascending=False)
+        )
+
+    def historial_bloques(self, sitio: str) -> pd.DataFrame:
+        """Consumo y demanda por bloque de cada campaña del sitio."""
+        return self.consultar(
+            "SELECT c.inicio, c.fin, b.bloque, b.consumo_kwh, b.dmax_kw, b.fecha_dmax "
+            "FROM bloques b JOIN campanas c ON c.id = b.campana_id JOIN sitios s ON s.id = c.sitio_id "
+            "WHERE s.nombre = ? ORDER BY c.inicio, b.bloque",
+            (sitio,),
+        )
+
+    def tarifas(self, sitio: str | None = None, tarifa: str | None = None, periodo: str | None = None) -> pd.DataFrame:
+        """Resultados de tarifas por campaña."""
+        donde, valores = self._filtros([("s.nombre = ?", sitio), ("t.tarifa = ?", tarifa), ("t.periodo = ?", periodo)])
+        return self.consultar(
+            "SELECT s.nombre AS sitio, c.inicio, c.fin, t.periodo, t.tarifa, t.cargo_energia, t.cargo_demanda, "
+            "t.cargo_fp, t.total FROM tarifas t JOIN campanas c ON c.id = t.campana_id "
+            f"JOIN sitios s ON s.id = c.sitio_id{donde} ORDER BY s.nombre, c.inicio, t.periodo, t.tarifa",
+            valores,
+        )
@@ -0,0 +1,323 @@
+"""
+Energía en los dos sentidos para sitios con generación propia (p. ej.
+solar) que exportan a la red.
+
+`sub_dividir_dataframe` deriva 'P.Activa III T' como importación menos
+exportación y `procesar_demanda_maxima` recorta los valores negativos, así
+que la energía exportada no aparece en el informe. Aquí se parte de las
+columnas por sentido del MYeBOX ('P.Activa III' importada y
+'P.Activa III -' exportada):
+
+- `energia_bidireccional`: energía importada, exportada y neta por
+  intervalo y por bloque horario.
+- `demanda_bidireccional`: demanda de 15 min de la potencia importada (la
+  que factura la distribuidora, sin compensar con la exportación del mismo
+  intervalo) y de la exportada, con su máximo por bloque.
+- `facturar_importacion`: facturación por ciclo de la energía y la demanda
+  importadas, sin compensar la exportación.
+- `liquidacion_neta`: medición neta por tramo de facturación (ciclo ×
+  periodo tarifario, como `facturar`): la exportación compensa la
+  importación del tramo, primero en su mismo bloque, y el excedente pasa como crédito en kWh a los
+  tramos siguientes (o se paga a `precio_excedente`). Los cargos salen de
+  `calcular_tarifa_lote`, con y sin medición neta.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .distribuidoras import resolver_distribuidora
+from .facturacion import _NS_DIA, _periodo, _segmentar, facturar
+from .instrumentacion import instrumentar
+from .lagunas import indice_lagunas
+from .simulador import demanda_15min
+from .tablas_tarifas import cargar_tarifas
+from .tariffs import calcular_tarifa_lote
+
+COL_IMPORTADA = "P.Activa III"
+COL_EXPORTADA = "P.Activa III -"
+_CARGOS = ("cargo_energia", "cargo_demanda", "cargo_fp", "total")
+
+
+def _demanda_sin_lagunas(df: pd.DataFrame, fechas: pd.DatetimeIndex, potencia: np.ndarray) -> np.ndarray:
+    """`demanda_15min` con NaN en las ventanas que contienen una laguna de datos."""
+    demanda = demanda_15min(potencia)[0]
+    lagunas = indice_lagunas(df)
+    if len(lagunas):
+        demanda[lagunas.ventanas_demanda(fechas)] = np.nan
+    return demanda
+
+
+def _sentidos(df: pd.DataFrame) -> tuple[pd.DatetimeIndex, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fechas ordenadas, potencias importada y exportada (≥ 0, NaN → 0) y el
+    orden aplicado a las filas de `df`.
+    """
+    for col in ("Fecha/hora", COL_IMPORTADA, COL_EXPORTADA):
+        if col not in df.columns:
+            raise KeyError(f"{col} no existe")
+    fechas = pd.DatetimeIndex(pd.to_datetime(df["Fecha/hora"]), name="Fecha/hora")
+    importada = np.nan_to_num(df[COL_IMPORTADA].to_numpy(dtype=np.float64, na_value=np.nan)).clip(min=0)
+    exportada = np.nan_to_num(df[COL_EXPORTADA].to_numpy(dtype=np.float64, na_value=np.nan)).clip(min=0)
+    orden = np.arange(len(fechas))
+    if not fechas.is_monotonic_increasing:
+        orden = np.argsort(fechas.asi8, kind="stable")
+        fechas, importada, exportada = fechas[orden], importada[orden], exportada[orden]
+    return fechas, importada, exportada, orden
+
+
+@instrumentar
+def energia_bidireccional(df: pd.DataFrame, *, time_interval: int = 60, distribuidora=None) -> dict:
+    """
+    Energía importada, exportada y neta (kWh): por intervalo (DataFrame
+    indexado por 'Fecha/hora'), por bloque horario del calendario de la
+    distribuidora y en total, medida (sin extrapolar). `time_interval` es el
+    de `sub_dividir_dataframe` (60 → muestras de 1 min).
+    """
+    fechas, importada, exportada, _ = _sentidos(df)
+    intervalos = pd.DataFrame(
+        {"importada": importada / time_interval, "exportada": exportada / time_interval},
+        index=fechas,
+    )
+    intervalos["neta"] = intervalos["importada"] - intervalos["exportada"]
+
+    calendario = resolver_distribuidora(distribuidora).calendario
+    codigos = calendario.codigos(fechas.to_series())
+    usar = codigos >= 0
+    n_bloques = len(calendario.bloques)
+    por_bloque = pd.DataFrame(
+        {
+            col: np.bincount(codigos[usar], weights=intervalos[col].to_numpy()[usar], minlength=n_bloques)
+            for col in ("importada", "exportada", "neta")
+        },
+        index=pd.Index(calendario.bloques, name="bloque"),
+    )
+    totales = {col: float(intervalos[col].sum()) for col in ("importada", "exportada", "neta")}
+    return {"intervalos": intervalos, "por_bloque": por_bloque, "totales": totales}
+
+
+@instrumentar
+def demanda_bidireccional(df: pd.DataFrame, *, distribuidora=None) -> dict:
+    """
+    Demanda de 15 min importada y exportada por intervalo (columnas
+    'DMAX_importada' y 'DMAX_exportada') y, para cada sentido, la máxima
+    con su fecha, en general y por bloque horario.
+    """
+    fechas, importada, exportada, _ = _sentidos(df)
+    demandas = pd.DataFrame(
+        {
+            "DMAX_importada": _demanda_sin_lagunas(df, fechas, importada),
+            "DMAX_exportada": _demanda_sin_lagunas(df, fechas, exportada),
+        },
+        index=fechas,
+    )
+    calendario = resolver_distribuidora(distribuidora).calendario
+    codigos = calendario.codigos(fechas.to_series())
+
+    def maximo(valores: np.ndarray, sel: np.ndarray) -> dict:
+        sel = sel & ~np.isnan(valores)
+        if not sel.any():
+            return {"valor": 0.0, "fecha": None}
+        i = np.flatnonzero(sel)[np.argmax(valores[sel])]
+        return {"valor": float(valores[i]), "fecha": fechas[i]}
+
+    resultado = {"intervalos": demandas}
+    for sentido in ("importada", "exportada"):
+        valores = demandas[f"DMAX_{sentido}"].to_numpy()
+        resultado[sentido] = {
+            "maxima": maximo(valores, np.ones(len(valores), dtype=bool)),
+            "por_bloque": {b: maximo(valores, codigos == j) for j, b in enumerate(calendario.bloques)},
+        }
+    return resultado
+
+
+def _por_sentido(df: pd.DataFrame, time_interval: int, col_reactiva: str) -> pd.DataFrame:
+    """
+    Serie ordenada con energía importada y exportada por intervalo (kWh),
+    demanda de 15 min de la potencia importada y energía reactiva: la base
+    común de `liquidacion_neta` y `facturar_importacion`.
+    """
+    fechas, importada, exportada, orden = _sentidos(df)
+    return pd.DataFrame({
+        "Fecha/hora": fechas,
+        "importada": importada / time_interval,
+        "exportada": exportada / time_interval,
+        "demanda": _demanda_sin_lagunas(df, fechas, importada),
+        "reactiva": df[col_reactiva].to_numpy(dtype=np.float64, na_value=np.nan)[orden] if col_reactiva in df.columns else 0.0,
+    })
+
+
+@instrumentar
+def facturar_importacion(
+    df: pd.DataFrame,
+    tarifas=("BTD", "BTH", "MTD", "MTH"),
+    *,
+    time_interval: int = 60,
+    col_reactiva: str = "E.Reactiva III M",
+    dia_corte: int = 1,
+    distribuidora=None,
+) -> dict:
+    """
+    `facturar` de un sitio que exporta, sin medición neta: consumo de la
+    energía importada, demanda de 15 min de la potencia importada y FP de
+    la energía importada, por tramo (ciclo × periodo tarifario). Sus
+    totales por ciclo son los 'total_sin_medicion_neta' de
+    `liquidacion_neta`.
+    """
+    return facturar(
+        _por_sentido(df, time_interval, col_reactiva),
+        tarifas,
+        tipo_energia="importada",
+        tipo_demanda="demanda",
+        col_reactiva="reactiva",
+        dia_corte=dia_corte,
+        distribuidora=distribuidora,
+    )
+
+
+def _credito_acumulado(excedente: np.ndarray) -> np.ndarray:
+    """
+    Crédito en kWh al final de cada tramo: c_k = max(c_{k−1} + e_k, 0), con
+    `excedente` = exportación − importación de cada tramo (recursión de
+    Lindley, resuelta con una suma y un mínimo acumulados).
+    """
+    acumulado = np.cumsum(excedente)
+    return acumulado - np.minimum(np.minimum.accumulate(acumulado), 0.0)
+
+
+@instrumentar
+def liquidacion_neta(
+    df: pd.DataFrame,
+    tarifas=("BTD", "BTH", "MTD", "MTH"),
+    *,
+    time_interval: int = 60,
+    col_reactiva: str = "E.Reactiva III M",
+    dia_corte: int = 1,
+    arrastre: bool = True,
+    precio_excedente: float = 0.0,
+    distribuidora=None,
+) -> dict:
+    """
+    Medición neta por tramo (ciclo × periodo tarifario, como `facturar`).
+
+    En cada tramo la importación y la exportación por bloque se extrapolan
+    por cobertura; la exportación compensa primero la importación de su
+    bloque, y lo que sobra (más el crédito arrastrado, con `arrastre`)
+    reduce en la misma proporción la importación pendiente de los demás. El
+    excedente pasa como crédito al tramo siguiente o, sin `arrastre`, se
+    abona a `precio_excedente` por kWh. La demanda es la de 15 min de la
+    potencia importada y el FP, el de la energía importada.
+
+    Returns:
+        dict con:
+          • "tramos": DataFrame por tramo con importada, exportada,
+            facturable por bloque, crédito inicial/final y excedente.
+          • "cargos": DataFrame indexado por (ciclo, periodo, tarifa) con
+            los cargos con medición neta, el total sin ella y el ahorro.
+          • "por_ciclo": totales por (ciclo, tarifa).
+          • "sin_tarifa": tramos sin periodo tarifario vigente (no valorados).
+          • "credito_final": crédito en kWh al final de la medición.
+    """
+    if not 1 <= dia_corte <= 28:
+        raise ValueError("dia_corte debe estar entre 1 y 28")
+    dist = resolver_distribuidora(distribuidora)
+    tabla = cargar_tarifas(dist.tarifas)
+
+    auxiliar = _por_sentido(df, time_interval, col_reactiva)
+    seg = _segmentar(auxiliar, dia_corte, dist.calendario, tabla)
+    bloques, n_tramos = seg.bloques, seg.n_tramos
+
+    importada_tb = seg.por_bloque(np.nan_to_num(seg.columna(auxiliar, "importada"))) / seg.cobertura[:, None]
+    exportada_tb = seg.por_bloque(np.nan_to_num(seg.columna(auxiliar, "exportada"))) / seg.cobertura[:, None]
+    dmax_tb = seg.maximo_por_bloque(seg.columna(auxiliar, "demanda"))
+    kwh_t = np.bincount(seg.tramo_idx, weights=np.nan_to_num(seg.columna(auxiliar, "importada")), minlength=n_tramos)
+    kvarh_t = np.bincount(seg.tramo_idx, weights=np.nan_to_num(seg.columna(auxiliar, "reactiva")), minlength=n_tramos)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fp = np.where(kwh_t > 0, np.cos(np.arctan(kvarh_t / kwh_t)), 1.0)
+
+    # Compensación: crédito arrastrado entre tramos en orden cronológico.
+    importada_t, exportada_t = importada_tb.sum(axis=1), exportada_tb.sum(axis=1)
+    if arrastre:
+        credito_final = _credito_acumulado(exportada_t - importada_t)
+        credito_inicial = np.r_[0.0, credito_final[:-1]]
+    else:
+        credito_inicial = np.zeros(n_tramos)
+        credito_final = np.zeros(n_tramos)
+    # La exportación compensa primero la importación de su mismo bloque; el
+    # sobrante y el crédito, el resto de la importación a prorrata.
+    neta_tb = np.maximum(importada_tb - exportada_tb, 0.0)
+    sobrante = np.maximum(exportada_tb - importada_tb, 0.0).sum(axis=1) + credito_inicial
+    pendiente = neta_tb.sum(axis=1)
+    neta_t = np.maximum(pendiente - sobrante, 0.0)
+    excedente = np.maximum(sobrante - pendiente, 0.0) if not arrastre else np.zeros(n_tramos)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proporcion = np.where(pendiente > 0, neta_t / pendiente, 0.0)
+    facturable_tb = neta_tb * proporcion[:, None]
+
+    ciclos = pd.DatetimeIndex(seg.ciclos[seg.ciclo_idx]).date
+    inicios = pd.DatetimeIndex(seg.inicio_ns)
+    periodos = [_periodo(tabla, inicio) for inicio in inicios]
+    tramos = pd.DataFrame({
+        "ciclo": ciclos,
+        "periodo": [p.clave if p else None for p in periodos],
+        "inicio": inicios,
+        "fin": pd.DatetimeIndex(seg.fin_ns),
+        "dias": seg.duracion / _NS_DIA,
+        "fraccion_ciclo": seg.fraccion,
+        "cobertura": seg.cobertura,
+        "importada": importada_t,
+        "exportada": exportada_t,
+        "credito_inicial": credito_inicial,
+        "facturable": neta_t,
+        "credito_final": credito_final,
+        "excedente": excedente,
+        "fp": fp,
+    })
+    for j, b in enumerate(bloques):
+        tramos[f"importada_{b}"] = importada_tb[:, j]
+        tramos[f"exportada_{b}"] = exportada_tb[:, j]
+        tramos[f"facturable_{b}"] = facturable_tb[:, j]
+        tramos[f"dmax_{b}"] = dmax_tb[:, j]
+
+    # Cargos: una llamada vectorizada por (periodo, tarifa) sobre sus tramos,
+    # con y sin medición neta (consumo de ciclo completo equivalente,
+    # prorrateado por la fracción del ciclo).
+    claves = np.array([p.clave if p else "" for p in periodos], dtype=object)
+    cargos = []
+    for periodo in {p.clave: p for p in periodos if p}.values():
+        sel = np.flatnonzero(claves == periodo.clave)
+        fraccion = seg.fraccion[sel]
+        dmax = {b: dmax_tb[sel, j] for j, b in enumerate(bloques)}
+        for tarifa in tarifas:
+            neto, bruto = (
+                calcular_tarifa_lote(
+                    tarifa,
+                    {b: consumo[sel, j] / fraccion for j, b in enumerate(bloques)},
+                    dmax,
+                    fp[sel],
+                    periodo,
+                    dist,
+                )
+                for consumo in (facturable_tb, importada_tb)
+            )
+            for k, i in enumerate(sel):
+                fila = {"ciclo": ciclos[i], "periodo": periodo.clave, "tarifa": tarifa, "_orden": i}
+                fila.update({c: round(float(neto[c][k]) * fraccion[k], 2) for c in _CARGOS})
+                fila["abono_excedente"] = round(excedente[i] * precio_excedente, 2)
+                fila["total"] = round(fila["total"] - fila["abono_excedente"], 2)
+                fila["total_sin_medicion_neta"] = round(float(bruto["total"][k]) * fraccion[k], 2)
+                fila["ahorro"] = round(fila["total_sin_medicion_neta"] - fila["total"], 2)
+                cargos.append(fila)
+
+    columnas = [*_CARGOS, "abono_excedente", "total_sin_medicion_neta", "ahorro"]
+    tabla_cargos = pd.DataFrame(cargos, columns=["ciclo", "periodo", "tarifa", "_orden", *columnas])
+    tabla_cargos = tabla_cargos.sort_values("_orden", kind="stable").drop(columns="_orden")
+    por_ciclo = tabla_cargos.groupby(["ciclo", "tarifa"], sort=True)[columnas].sum()
+    return {
+        "tramos": tramos,
+        "cargos": tabla_cargos.set_index(["ciclo", "periodo", "tarifa"]),
+        "por_ciclo": por_ciclo,
+        "sin_tarifa": tramos[tramos["periodo"].isna()].reset_index(drop=True),
+        "credito_final": float(credito_final[-1]) if n_tramos and arrastre else 0.0,
+    }
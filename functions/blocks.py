@@ -1,39 +1,37 @@
 """
-Funciones de clasificación de bloques horarios de Edemet.
+Funciones de clasificación de bloques horarios.
+
+Los horarios y feriados vienen del calendario de la distribuidora activa
+(`functions.distribuidoras`, Edemet por defecto) o del que se indique.
 """
 
 from __future__ import annotations
 
 import pandas as pd
 
+from .calendario import Calendario
+from .distribuidoras import distribuidora_activa
+from .instrumentacion import instrumentar
+
 
-def _hora(dt) -> tuple[int, int, int]:
-    """Devuelve (HH,MM,SS) para evitar múltiples `pd.to_datetime`."""
-    t = dt.time()
-    return t.hour, t.minute, t.second
+def calendario_activo() -> Calendario:
+    return distribuidora_activa().calendario
 
 
-def clasificar_bloque(dt) -> str:
+def clasificar_bloque(dt, calendario: Calendario | None = None) -> str:
     """
     Asigna 'punta', 'fuera_punta_medio' o 'fuera_punta_bajo' según
-    día y hora (regla Edemet).
+    día, hora y feriados.
     """
-    h, m, _ = _hora(dt)
-    dia = dt.weekday()  # lunes = 0
-
-    def in_range(hh_mm, hh_mm2):
-        h1, m1 = hh_mm
-        h2, m2 = hh_mm2
-        return (h, m) >= (h1, m1) and (h, m) <= (h2, m2)
-
-    if dia < 5:  # L-V
-        if in_range((9, 0), (17, 0)):
-            return "punta"
-        if in_range((17, 1), (23, 59)):
-            return "fuera_punta_medio"
-        return "fuera_punta_bajo"
-    if dia == 5:  # sábado
-        if in_range((11, 0), (22, 59)):
-            return "fuera_punta_medio"
-        return "fuera_punta_bajo"
-    return "fuera_punta_bajo"
+    return (calendario or calendario_activo()).clasificar_instante(dt)
+
+
+@instrumentar
+def clasificar_bloques(fechas: pd.Series, calendario: Calendario | None = None) -> pd.Series:
+    """Bloque de cada fecha de la serie (vectorizado sobre la tabla del calendario)."""
+    return (calendario or calendario_activo()).clasificar(fechas)
+
+
+def describir_bloques(calendario: Calendario | None = None) -> dict[str, str]:
+    """Texto de los horarios de cada bloque, generado desde el calendario."""
+    return (calendario or calendario_activo()).describir()
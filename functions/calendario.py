@@ -0,0 +1,335 @@
+"""
+Calendario de bloques horarios: horario por tipo de día (lunes…domingo y
+feriado), temporadas con horarios distintos y feriados, compilados en una
+tabla por día (fecha → bloque de cada minuto del día). Clasificar una serie
+de fechas es entonces una indexación vectorizada sobre esa tabla.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from .perfiles import DIAS_SEMANA, MINUTOS_DIA, codigos_tiempo
+
+BLOQUES = ("punta", "fuera_punta_medio", "fuera_punta_bajo")
+FERIADO = 7  # tipo de día de los feriados (0 = lunes … 6 = domingo)
+
+_ABREVIATURAS = ("L", "M", "X", "J", "V", "Sáb", "Dom")
+_NOMBRES = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+
+
+def _minuto(hh_mm: str) -> int:
+    h, m = hh_mm.split(":")
+    return int(h) * 60 + int(m)
+
+
+def _hh_mm(minuto: int) -> str:
+    return f"{minuto // 60:02d}:{minuto % 60:02d}"
+
+
+@dataclass(frozen=True)
+class Horario:
+    """
+    Bloques de un tipo de día: tramos (bloque, "HH:MM" inicio, "HH:MM" fin),
+    ambos extremos incluidos; los minutos sin tramo van a `defecto`.
+    """
+
+    tramos: tuple[tuple[str, str, str], ...] = ()
+    defecto: str = "fuera_punta_bajo"
+
+    def minutos(self, bloques: tuple[str, ...] = BLOQUES) -> np.ndarray:
+        """Código de bloque (índice en `bloques`) de cada minuto del día."""
+        codigos = np.full(MINUTOS_DIA, bloques.index(self.defecto), dtype=np.int8)
+        for bloque, inicio, fin in self.tramos:
+            codigos[_minuto(inicio):_minuto(fin) + 1] = bloques.index(bloque)
+        return codigos
+
+
+@dataclass(frozen=True)
+class Temporada:
+    """
+    Horarios vigentes desde `desde` (incluida; None = siempre). `horarios`
+    asocia cada tipo de día (0 = lunes … 6 = domingo, 7 = feriado) a su
+    `Horario`; los feriados sin horario propio usan el del domingo.
+    """
+
+    horarios: dict[int, Horario]
+    desde: date | None = None
+
+    def horario(self, tipo_dia: int) -> Horario:
+        if tipo_dia in self.horarios:
+            return self.horarios[tipo_dia]
+        if tipo_dia == FERIADO and 6 in self.horarios:
+            return self.horarios[6]
+        return Horario()
+
+
+def domingo_de_pascua(anio: int) -> date:
+    """Domingo de Pascua (algoritmo gregoriano anónimo)."""
+    a, b, c = anio % 19, anio // 100, anio % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return date(anio, mes, dia)
+
+
+# Feriados nacionales de fecha fija en Panamá (mes, día).
+_FERIADOS_FIJOS_PANAMA = (
+    (1, 1),    # Año Nuevo
+    (1, 9),    # Día de los Mártires
+    (5, 1),    # Día del Trabajador
+    (11, 3),   # Separación de Panamá de Colombia
+    (11, 5),   # Día de Colón
+    (11, 10),  # Primer Grito de Independencia
+    (11, 28),  # Independencia de España
+    (12, 8),   # Día de las Madres
+    (12, 20),  # Día de Duelo Nacional (desde 2022)
+    (12, 25),  # Navidad
+)
+
+
+@lru_cache(maxsize=None)
+def feriados_panama(anio: int, *, trasladar_domingo: bool = True) -> frozenset[date]:
+    """
+    Feriados nacionales de Panamá en `anio`: fechas fijas, lunes y martes de
+    Carnaval y Viernes Santo. Con `trasladar_domingo`, el feriado que cae en
+    domingo se descansa el lunes siguiente.
+    """
+    fijos = [date(anio, m, d) for m, d in _FERIADOS_FIJOS_PANAMA if not (m == 12 and d == 20 and anio < 2022)]
+    if trasladar_domingo:
+        fijos += [f + timedelta(days=1) for f in fijos if f.weekday() == 6]
+    pascua = domingo_de_pascua(anio)
+    moviles = [pascua - timedelta(days=48), pascua - timedelta(days=47), pascua - timedelta(days=2)]
+    return frozenset(fijos + moviles)
+
+
+@dataclass
+class Calendario:
+    """
+    Definición de bloques de una distribuidora: temporadas (ordenadas por
+    `desde`) y feriados, por año (`feriados_por_anio`) y/o explícitos.
+    """
+
+    nombre: str
+    temporadas: list[Temporada]
+    feriados_por_anio: Callable[[int], Iterable[date]] | None = None
+    feriados: frozenset[date] = frozenset()
+    bloques: tuple[str, ...] = BLOQUES
+    _plantillas: np.ndarray | None = field(default=None, init=False, repr=False)
+    _tabla: tuple[np.datetime64, np.ndarray] | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.temporadas = sorted(self.temporadas, key=lambda t: t.desde or date.min)
+        self.feriados = frozenset(self.feriados)
+
+    # ---- compilación -----------------------------------------------------
+
+    def plantillas(self) -> np.ndarray:
+        """Códigos por (temporada, tipo de día 0–7, minuto del día)."""
+        if self._plantillas is None:
+            self._plantillas = np.stack(
+                [
+                    np.stack([t.horario(tipo).minutos(self.bloques) for tipo in range(8)])
+                    for t in self.temporadas
+                ]
+            )
+        return self._plantillas
+
+    def es_feriado(self, dia: date) -> bool:
+        if dia in self.feriados:
+            return True
+        return self.feriados_por_anio is not None and dia in self.feriados_por_anio(dia.year)
+
+    def tipos_dia(self, dias: np.ndarray) -> np.ndarray:
+        """Tipo de día (0–6, o 7 si es feriado) de un array datetime64[D]."""
+        tipos = ((dias.astype(np.int64) + 3) % 7).astype(np.int8)
+        feriados = set(self.feriados)
+        if self.feriados_por_anio is not None and len(dias):
+            anios = dias.astype("datetime64[Y]").astype(int) + 1970
+            for anio in range(int(anios.min()), int(anios.max()) + 1):
+                feriados |= set(self.feriados_por_anio(anio))
+        if feriados:
+            tipos[np.isin(dias, np.array(sorted(feriados), dtype="datetime64[D]"))] = FERIADO
+        return tipos
+
+    def compilar(self, desde, hasta) -> tuple[np.datetime64, np.ndarray]:
+        """
+        Tabla (n_días × 1440, int8) con el código de bloque de cada minuto de
+        cada día entre `desde` y `hasta` (incluidos). Devuelve (primer día, tabla).
+        """
+        dias = np.arange(np.datetime64(desde, "D"), np.datetime64(hasta, "D") + 1)
+        inicios = np.array(
+            [np.datetime64(t.desde, "D") if t.desde else np.datetime64("NaT", "D") for t in self.temporadas]
+        )
+        inicios = np.where(np.isnat(inicios), np.datetime64("1678-01-01", "D"), inicios)
+        temporada = np.searchsorted(inicios, dias, side="right") - 1
+        temporada = temporada.clip(min=0)
+        tabla = self.plantillas()[temporada, self.tipos_dia(dias)]
+        return (dias[0] if len(dias) else np.datetime64(desde, "D")), tabla
+
+    def _tabla_para(self, dia_min: np.datetime64, dia_max: np.datetime64) -> tuple[np.datetime64, np.ndarray]:
+        """Tabla que cubre [dia_min, dia_max], ampliando la cacheada si hace falta."""
+        if self._tabla is not None:
+            inicio, tabla = self._tabla
+            if inicio <= dia_min and dia_max < inicio + len(tabla):
+                return self._tabla
+            dia_min = min(dia_min, inicio)
+            dia_max = max(dia_max, inicio + len(tabla) - 1)
+        self._tabla = self.compilar(dia_min, dia_max)
+        return self._tabla
+
+    # ---- clasificación ---------------------------------------------------
+
+    def codigos(self, fechas) -> np.ndarray:
+        """Código de bloque (índice en `bloques`) de cada fecha; -1 en NaT."""
+        fechas = pd.to_datetime(pd.Series(fechas) if not isinstance(fechas, pd.Series) else fechas)
+        minuto, _, validas = codigos_tiempo(fechas)
+        salida = np.full(len(fechas), -1, dtype=np.int8)
+        if not validas.any():
+            return salida
+        valores = fechas.dt.tz_localize(None) if fechas.dt.tz is not None else fechas
+        dias = valores.to_numpy(dtype="datetime64[ns]")[validas].astype("datetime64[D]")
+        inicio, tabla = self._tabla_para(dias.min(), dias.max())
+        salida[validas] = tabla[(dias - inicio).astype(np.int64), minuto[validas]]
+        return salida
+
+    def clasificar(self, fechas) -> pd.Series:
+        """
+        Bloque de cada fecha (NaN en NaT), con el índice de `fechas`, como
+        categórica de códigos int8. Las categorías van en orden alfabético,
+        el mismo en que `groupby` ordenaba los nombres.
+        """
+        indice = fechas.index if isinstance(fechas, pd.Series) else None
+        categorias = sorted(self.bloques)
+        rango = np.array([categorias.index(b) for b in self.bloques] + [-1], dtype=np.int8)
+        codigos = rango[self.codigos(fechas)]
+        return pd.Series(
+            pd.Categorical.from_codes(codigos, categories=categorias), index=indice, name="bloque"
+        )
+
+    def clasificar_instante(self, dt) -> str:
+        dt = pd.Timestamp(dt)
+        return self.bloques[int(self.codigos(pd.Series([dt]))[0])]
+
+    # ---- descripción -----------------------------------------------------
+
+    def describir(self, fecha=None) -> dict[str, str]:
+        """
+        Texto de los horarios de cada bloque en la temporada vigente en
+        `fecha` (por defecto, la última), p. ej.
+        "17:01 - 23:59 (L-V) y 11:00 - 22:59 (Sáb)".
+        """
+        if fecha is None:
+            temporada = self.temporadas[-1]
+        else:
+            dia = pd.Timestamp(fecha).date()
+            vigentes = [t for t in self.temporadas if t.desde is None or t.desde <= dia]
+            temporada = vigentes[-1] if vigentes else self.temporadas[0]
+
+        plantilla = np.stack([temporada.horario(tipo).minutos(self.bloques) for tipo in range(8)])
+        hay_feriados = bool(self.feriados) or self.feriados_por_anio is not None
+
+        # Agrupar días consecutivos con el mismo horario.
+        grupos: list[list[int]] = []
+        for tipo in range(7):
+            if grupos and np.array_equal(plantilla[grupos[-1][-1]], plantilla[tipo]):
+                grupos[-1].append(tipo)
+            else:
+                grupos.append([tipo])
+
+        textos = {}
+        for codigo, bloque in enumerate(self.bloques):
+            partes = []
+            for grupo in grupos:
+                en_bloque = plantilla[grupo[0]] == codigo
+                if not en_bloque.any():
+                    continue
+                con_feriados = hay_feriados and np.array_equal(plantilla[FERIADO], plantilla[grupo[-1]])
+                if en_bloque.all():
+                    nombre = _NOMBRES[grupo[0]] if len(grupo) == 1 else f"{_ABREVIATURAS[grupo[0]]}-{_ABREVIATURAS[grupo[-1]]}"
+                    partes.append(f"todo el {nombre}" + (" y feriados" if con_feriados else ""))
+                    continue
+                bordes = np.flatnonzero(np.diff(np.r_[0, en_bloque.astype(np.int8), 0]))
+                rangos = [f"{_hh_mm(i)} - {_hh_mm(f - 1)}" for i, f in zip(bordes[::2], bordes[1::2])]
+                etiqueta = _ABREVIATURAS[grupo[0]] if len(grupo) == 1 else f"{_ABREVIATURAS[grupo[0]]}-{_ABREVIATURAS[grupo[-1]]}"
+                partes.append(" y ".join(rangos) + f" ({etiqueta})")
+            if not partes:
+                textos[bloque] = "Sin horario"
+            elif len(partes) == 1:
+                textos[bloque] = partes[0]
+            else:
+                textos[bloque] = ", ".join(partes[:-1]) + " y " + partes[-1]
+        return textos
+
+
+# Proveedores de feriados por año referenciables desde los ficheros de datos.
+FERIADOS_POR_PAIS = {"panama": feriados_panama}
+
+
+def _tipos_de_dia(clave: str) -> list[int]:
+    """'lunes' → [0]; 'lunes-viernes' → [0…4]; 'feriado' → [7]."""
+    nombres = list(DIAS_SEMANA) + ["feriado"]
+    partes = clave.lower().split("-")
+    try:
+        indices = [nombres.index(p.strip()) for p in partes]
+    except ValueError:
+        raise ValueError(f"Tipo de día desconocido en el calendario: {clave!r}") from None
+    if len(indices) == 1:
+        return indices
+    if len(indices) != 2 or indices[0] > indices[1]:
+        raise ValueError(f"Rango de días no válido en el calendario: {clave!r}")
+    return list(range(indices[0], indices[1] + 1))
+
+
+def calendario_desde_dict(datos: dict, nombre: str = "") -> Calendario:
+    """
+    Construye un `Calendario` desde su definición en datos, p. ej.:
+
+        {
+          "feriados": "panama",
+          "feriados_extra": ["2025-07-25"],
+          "temporadas": [
+            {"desde": null, "defecto": "fuera_punta_bajo",
+             "horarios": {"lunes-viernes": [["punta", "09:00", "17:00"]],
+                          "sábado": [], "domingo": []}}
+          ]
+        }
+
+    `feriados` es un país de `FERIADOS_POR_PAIS` o null.
+    """
+    bloques = tuple(datos.get("bloques", BLOQUES))
+    temporadas = []
+    for t in datos["temporadas"]:
+        defecto = t.get("defecto", bloques[-1])
+        horarios = {}
+        for clave, tramos in t["horarios"].items():
+            for tramo in tramos:
+                if tramo[0] not in bloques:
+                    raise ValueError(f"Bloque desconocido {tramo[0]!r} en el calendario {nombre!r}")
+            for tipo in _tipos_de_dia(clave):
+                horarios[tipo] = Horario(tuple(tuple(x) for x in tramos), defecto)
+        desde = date.fromisoformat(t["desde"]) if t.get("desde") else None
+        temporadas.append(Temporada(horarios, desde))
+
+    pais = datos.get("feriados")
+    if pais is not None and pais not in FERIADOS_POR_PAIS:
+        raise ValueError(f"Feriados desconocidos {pais!r}; disponibles: {sorted(FERIADOS_POR_PAIS)}")
+    return Calendario(
+        nombre,
+        temporadas,
+        feriados_por_anio=FERIADOS_POR_PAIS.get(pais),
+        feriados=frozenset(date.fromisoformat(d) for d in datos.get("feriados_extra", ())),
+        bloques=bloques,
+    )
@@ -0,0 +1,300 @@
+"""
+Almacén de campaña fuera de memoria: cada columna en su propio fichero
+`.npy` abierto con `np.memmap`, para campañas largas (p. ej. un año a 1 s)
+que no caben cómodamente en memoria junto a Matplotlib.
+
+La columna de fecha se guarda como int64 (ns desde la época; NaT es el
+mínimo de int64, igual que en NumPy). `importar_campana` lee el fichero por
+trozos, así que nunca tiene la campaña entera en memoria, y `abrir_campana`
+devuelve una `CampanaColumnas`: una fachada con la parte de la interfaz de
+DataFrame que usan las métricas (`columns`, `df[col]`, `df[[cols]]`,
+`len`, asignación de columnas), de modo que solo se leen del disco las
+columnas que se tocan.
+
+    importar_campana("anual.txt", "campanas/anual", columnas=filtro_columnas(armonicos=False))
+    df = abrir_campana("campanas/anual")
+    voltaje(df, voltaje_referencia_ll=480)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from .instrumentacion import instrumentar
+
+_META = "campana.json"
+_VERSION = 1
+
+
+def _nombre_fichero(columna: str, usados: set[str]) -> str:
+    """Nombre de fichero seguro y único para `columna`."""
+    base = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in columna).strip(".") or "columna"
+    nombre, n = base, 1
+    while nombre.lower() in usados:
+        n += 1
+        nombre = f"{base}_{n}"
+    usados.add(nombre.lower())
+    return f"{nombre}.npy"
+
+
+def _contar_filas(ruta: Path) -> int:
+    """Líneas no vacías tras la cabecera (cota superior de las filas)."""
+    with ruta.open("rb") as fh:
+        return max(sum(1 for linea in fh if linea.strip()) - 1, 0)
+
+
+@instrumentar
+def importar_campana(
+    nombre_archivo: str | Path,
+    directorio: str | Path,
+    *,
+    encoding: str = "latin-1",
+    sep: str = ",",
+    col_fecha: str = "Fecha/hora",
+    formato: str = "%d/%m/%y %H:%M:%S",
+    columnas: Callable[[str], bool] | list[str] | None = None,
+    dtype: str | np.dtype = np.float64,
+    filas_por_trozo: int = 50_000,
+) -> "CampanaColumnas":
+    """
+    Convierte un fichero de medición (los mismos parámetros que
+    `cargar_datos`) en un almacén de columnas `.npy` en `directorio`, leyendo
+    `filas_por_trozo` filas cada vez. Las columnas se guardan como `dtype`
+    (p. ej. float32 para reducir a la mitad disco y memoria); los valores no
+    numéricos quedan como NaN. Devuelve el almacén abierto.
+    """
+    ruta = Path(nombre_archivo)
+    if not ruta.exists():
+        raise FileNotFoundError(f"No se encontró el archivo: {nombre_archivo}")
+    directorio = Path(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    dtype = np.dtype(dtype)
+
+    usecols = None
+    if callable(columnas):
+        usecols = lambda c: c == col_fecha or columnas(c)
+    elif columnas is not None:
+        usecols = list(dict.fromkeys([col_fecha, *columnas]))
+
+    capacidad = _contar_filas(ruta)
+    ficheros: dict[str, str] = {}
+    tipos: dict[str, str] = {}
+    mapas: dict[str, np.memmap] = {}
+    usados: set[str] = set()
+    filas = 0
+    for trozo in pd.read_csv(ruta, encoding=encoding, sep=sep, usecols=usecols, chunksize=filas_por_trozo):
+        if not mapas:
+            for col in trozo.columns:
+                ficheros[col] = _nombre_fichero(col, usados)
+                tipos[col] = "datetime64[ns]" if col == col_fecha else dtype.str
+                mapas[col] = np.lib.format.open_memmap(
+                    directorio / ficheros[col], mode="w+",
+                    dtype=np.int64 if col == col_fecha else dtype, shape=(capacidad,),
+                )
+        n = len(trozo)
+        for col, mapa in mapas.items():
+            if col == col_fecha:
+                fechas = pd.to_datetime(trozo[col], format=formato, errors="coerce")
+                mapa[filas:filas + n] = fechas.to_numpy("datetime64[ns]").view(np.int64)
+            else:
+                mapa[filas:filas + n] = pd.to_numeric(trozo[col], errors="coerce").to_numpy(dtype, na_value=np.nan)
+        filas += n
+    for mapa in mapas.values():
+        mapa.flush()
+    del mapas
+
+    meta = {
+        "version": _VERSION,
+        "origen": str(ruta.resolve()),
+        "filas": filas,
+        "col_fecha": col_fecha,
+        "columnas": list(ficheros),
+        "ficheros": ficheros,
+        "tipos": tipos,
+    }
+    _escribir_meta(directorio, meta)
+    return CampanaColumnas(directorio)
+
+
+def _escribir_meta(directorio: Path, meta: dict) -> None:
+    temporal = directorio / f"{_META}.tmp"
+    temporal.write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(temporal, directorio / _META)
+
+
+def abrir_campana(directorio: str | Path, *, modo: str = "r") -> "CampanaColumnas":
+    """Abre un almacén creado con `importar_campana` (`modo` 'r' o 'r+')."""
+    return CampanaColumnas(directorio, modo=modo)
+
+
+class CampanaColumnas:
+    """
+    Fachada tipo DataFrame sobre un almacén de columnas `.npy`. Cada columna
+    se abre con `np.memmap` la primera vez que se pide y se devuelve como
+    Series sin copia (de solo lectura con `modo='r'`). Las columnas asignadas
+    (`df[col] = valores`) se escriben como nuevos `.npy` del almacén.
+    """
+
+    def __init__(self, directorio: str | Path, *, modo: str = "r"):
+        if modo not in ("r", "r+"):
+            raise ValueError(f"Modo no válido: {modo!r} (use 'r' o 'r+')")
+        self.directorio = Path(directorio)
+        ruta_meta = self.directorio / _META
+        if not ruta_meta.exists():
+            raise FileNotFoundError(f"No hay un almacén de campaña en {self.directorio}")
+        self._meta = json.loads(ruta_meta.read_text(encoding="utf-8"))
+        self.modo = modo
+        self.attrs: dict = {}
+        self._mapas: dict[str, np.ndarray] = {}
+        self._visibles: list[str] | None = None
+
+    def seleccionar(self, columnas: list[str]) -> "CampanaColumnas":
+        """
+        Fachada con solo `columnas` (y la fecha) del mismo almacén; comparte
+        los memmaps abiertos y ve las columnas que se añadan después.
+        """
+        vista = object.__new__(CampanaColumnas)
+        vista.__dict__.update(self.__dict__)
+        vista.attrs = {}
+        col_fecha = self._meta["col_fecha"]
+        vista._visibles = list(dict.fromkeys([col_fecha, *(c for c in columnas if c in self)]))
+        return vista
+
+    # ---- interfaz de DataFrame -------------------------------------------
+
+    @property
+    def columns(self) -> pd.Index:
+        if self._visibles is None:
+            return pd.Index(self._meta["columnas"])
+        return pd.Index(self._visibles)
+
+    @property
+    def index(self) -> pd.RangeIndex:
+        return pd.RangeIndex(self._meta["filas"])
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self._meta["filas"], len(self.columns)
+
+    @property
+    def dtypes(self) -> pd.Series:
+        return pd.Series({c: np.dtype(self._meta["tipos"][c]) for c in self.columns}, dtype=object)
+
+    def __len__(self) -> int:
+        return self._meta["filas"]
+
+    def __contains__(self, columna) -> bool:
+        if self._visibles is not None:
+            return columna in self._visibles
+        return columna in self._meta["ficheros"]
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __repr__(self) -> str:
+        filas, columnas = self.shape
+        return f"CampanaColumnas('{self.directorio}', {filas} filas × {columnas} columnas)"
+
+    def valores(self, columna: str) -> np.ndarray:
+        """Array (memmap) de la columna, sin copiar."""
+        if columna not in self._mapas:
+            if columna not in self or columna not in self._meta["ficheros"]:
+                raise KeyError(columna)
+            mapa = np.load(self.directorio / self._meta["ficheros"][columna], mmap_mode=self.modo)
+            mapa = mapa[: self._meta["filas"]]
+            if self._meta["tipos"][columna].startswith("datetime64"):
+                mapa = mapa.view("datetime64[ns]")
+            self._mapas[columna] = mapa
+        return self._mapas[columna]
+
+    def __getitem__(self, clave):
+        if isinstance(clave, str):
+            return pd.Series(np.asarray(self.valores(clave)), name=clave, copy=False)
+        if isinstance(clave, (list, tuple, pd.Index)):
+            return self.to_frame(list(clave))
+        raise TypeError(f"Clave no soportada: {clave!r}")
+
+    def get(self, columna: str, defecto=None):
+        return self[columna] if columna in self else defecto
+
+    def __setitem__(self, columna: str, valores) -> None:
+        if isinstance(valores, pd.Series):
+            valores = valores.reindex(self.index)
+        valores = np.asarray(valores)
+        if valores.ndim == 0:
+            valores = np.full(len(self), valores)
+        if len(valores) != len(self):
+            raise ValueError(f"La columna '{columna}' tiene {len(valores)} valores y la campaña {len(self)} filas")
+        if valores.dtype.kind == "M":
+            tipo, guardar = "datetime64[ns]", valores.astype("datetime64[ns]").view(np.int64)
+        else:
+            guardar = valores.astype(np.float64 if valores.dtype.kind not in "f" else valores.dtype)
+            tipo = guardar.dtype.str
+
+        ruta = self._registrar(columna, tipo)
+        temporal = ruta.with_suffix(".tmp.npy")
+        np.save(temporal, guardar)
+        self._mapas.pop(columna, None)
+        os.replace(temporal, ruta)
+        _escribir_meta(self.directorio, self._meta)
+
+    def _registrar(self, columna: str, tipo: str) -> Path:
+        """Da de alta (o actualiza el tipo de) `columna` y devuelve la ruta de su fichero."""
+        meta = self._meta
+        if columna not in meta["ficheros"]:
+            meta["ficheros"][columna] = _nombre_fichero(columna, {f[:-4].lower() for f in meta["ficheros"].values()})
+            meta["columnas"].append(columna)
+        if self._visibles is not None and columna not in self._visibles:
+            self._visibles.append(columna)
+        meta["tipos"][columna] = tipo
+        return self.directorio / meta["ficheros"][columna]
+
+    @instrumentar
+    def derivar(
+        self,
+        funcion: Callable[[Callable[[str], np.ndarray]], dict[str, np.ndarray]],
+        *,
+        filas_por_trozo: int = 1_000_000,
+    ) -> list[str]:
+        """
+        Añade las columnas que calcula `funcion(col)` (col(nombre) → array
+        float64 del trozo) recorriendo la campaña por trozos de filas, sin
+        tener ninguna columna entera en memoria. Devuelve sus nombres.
+        """
+        n = len(self)
+        mapas: dict[str, np.memmap] = {}
+        rutas: dict[str, Path] = {}
+        for ini in range(0, max(n, 1), filas_por_trozo):
+            trozo = slice(ini, min(ini + filas_por_trozo, n))
+            salida = funcion(lambda c: np.asarray(self.valores(c)[trozo], dtype=np.float64))
+            for nombre, valores in salida.items():
+                if nombre not in mapas:
+                    rutas[nombre] = self.directorio / f"{_nombre_fichero(nombre, set())[:-4]}.tmp.npy"
+                    mapas[nombre] = np.lib.format.open_memmap(rutas[nombre], mode="w+", dtype=np.float64, shape=(n,))
+                mapas[nombre][trozo] = valores
+        for nombre, mapa in mapas.items():
+            mapa.flush()
+            del mapa
+            self._mapas.pop(nombre, None)
+            os.replace(rutas[nombre], self._registrar(nombre, np.dtype(np.float64).str))
+        mapas.clear()
+        _escribir_meta(self.directorio, self._meta)
+        return list(rutas)
+
+    # ---- conversión ------------------------------------------------------
+
+    def to_frame(self, columnas: list[str] | None = None, *, filas: slice | None = None) -> pd.DataFrame:
+        """DataFrame en memoria con `columnas` (por defecto, todas) y `filas`."""
+        columnas = list(self.columns) if columnas is None else columnas
+        filas = filas or slice(None)
+        return pd.DataFrame({c: np.asarray(self.valores(c)[filas]) for c in columnas})
+
+    def cerrar(self) -> None:
+        """Suelta los memmaps abiertos (las columnas se reabren al pedirlas)."""
+        self._mapas.clear()
@@ -0,0 +1,199 @@
+"""
+Dimensionamiento de bancos de capacitores a partir del perfil reactivo
+medido ('P.Inductiva III T', 'P.Capacitiva III T', 'E.Reactiva III M').
+
+Para una rejilla de tamaños se calcula el FP mensual resultante, la
+penalización de cada tarifa y el riesgo de sobrecompensación en carga baja.
+Todas las sumas salen de la serie de potencia inductiva ordenada y sus
+sumas acumuladas, sin recorrer la medición por cada candidato:
+
+    Σ max(q − Q, 0) = Σ_{q > Q} q − Q · #{q > Q}
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .distribuidoras import resolver_distribuidora
+from .instrumentacion import instrumentar
+from .tablas_tarifas import cargar_tarifas
+from .tariffs import periodo_por_defecto
+
+_PASOS_KVAR = (2.5, 5.0, 10.0, 12.5, 15.0, 20.0, 25.0, 50.0)
+_N_PASOS = tuple(range(1, 13))
+
+
+class _PerfilReactivo:
+    """Potencia inductiva ordenada con sus sumas acumuladas."""
+
+    def __init__(self, q: np.ndarray):
+        self.q = np.sort(q)
+        self.acumulado = np.r_[0.0, np.cumsum(self.q)]
+        self.n = len(q)
+
+    def por_encima(self, umbral: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(nº de muestras con q > umbral, Σ de esas q) para cada umbral."""
+        i = np.searchsorted(self.q, umbral, side="right")
+        return self.n - i, self.acumulado[-1] - self.acumulado[i]
+
+    def exceso(self, kvar: np.ndarray) -> np.ndarray:
+        """Σ max(q − kvar, 0)."""
+        cuenta, suma = self.por_encima(kvar)
+        return suma - kvar * cuenta
+
+    def defecto(self, kvar: np.ndarray) -> np.ndarray:
+        """Σ max(kvar − q, 0) (sobrecompensación)."""
+        cuenta, suma = self.por_encima(kvar)
+        return kvar * (self.n - cuenta) - (self.acumulado[-1] - suma)
+
+
+def _penalizaciones(tabla: pd.DataFrame, fp: np.ndarray, kwh: float, tarifas, periodo, dist) -> None:
+    for tarifa in tarifas:
+        cargo_fp = cargar_tarifas(dist.tarifas).periodo(periodo)[tarifa]["cargo_fp"]
+        tabla[f"penalizacion_{tarifa}"] = dist.regla_fp.penalizacion_lote(cargo_fp, kwh, fp)
+
+
+@instrumentar
+def dimensionar_capacitores(
+    df: pd.DataFrame,
+    *,
+    tamanos_kvar=None,
+    pasos_kvar=_PASOS_KVAR,
+    n_pasos=_N_PASOS,
+    tarifas=("BTD", "BTH", "MTD", "MTH"),
+    periodo=None,
+    distribuidora=None,
+    col_inductiva: str = "P.Inductiva III T",
+    col_capacitiva: str = "P.Capacitiva III T",
+    col_reactiva: str = "E.Reactiva III M",
+    col_energia: str = "E.Activa III T",
+) -> dict:
+    """
+    Evalúa bancos fijos y escalonados sobre la medición de `df`.
+
+      • Banco fijo de Q kVAr: la inductiva de cada muestra pasa a
+        max(q − Q, 0) y lo que sobra (Q − q en carga baja) se inyecta como
+        reactiva capacitiva, que cuenta en el FP igual que la inductiva.
+      • Banco escalonado de n pasos de s kVAr con regulador automático:
+        conecta en cada muestra min(n, ⌊q / s⌋) pasos, es decir, no
+        sobrecompensa.
+
+    La energía reactiva facturable se calibra con `col_reactiva`, de modo que
+    sin banco el FP coincide con `factor_potencia`. La penalización usa la
+    regla de FP de la distribuidora, el `cargo_fp` de cada tarifa en
+    `periodo` (por defecto el vigente al final de la medición o, si las
+    tablas no lo cubren, el más cercano con aviso) y el consumo extrapolado
+    a 30 días.
+
+    Returns:
+        dict con:
+          • "fijo": DataFrame por tamaño (kvar) con kvarh inductiva y
+            capacitiva (30 días), FP, fracción del tiempo sobrecompensado,
+            kVAr capacitivos máximos, penalización y ahorro por tarifa.
+          • "escalonado": igual, por (paso_kvar, n_pasos), con kvar total.
+          • "base": FP y penalización por tarifa sin banco.
+          • "recomendado": menor banco fijo y escalonado (en kVAr totales)
+            que eliminan la penalización, o None si ninguno la elimina.
+          • "periodo" y "aviso_periodo" (None si el periodo está vigente).
+    """
+    for col in ("Fecha/hora", col_inductiva, col_reactiva, col_energia):
+        if col not in df.columns:
+            raise KeyError(f"{col} no existe")
+    dist = resolver_distribuidora(distribuidora)
+
+    fechas = pd.to_datetime(df["Fecha/hora"])
+    t = fechas.to_numpy(dtype="datetime64[ns]")
+    validas = ~np.isnat(t)
+    if validas.sum() < 2:
+        raise ValueError("Se necesitan al menos dos muestras con fecha válida")
+
+    def columna(nombre: str) -> np.ndarray:
+        return np.nan_to_num(df[nombre].to_numpy(dtype=np.float64, na_value=np.nan)[validas])
+
+    q = np.clip(columna(col_inductiva), 0, None)
+    cap = np.clip(columna(col_capacitiva), 0, None) if col_capacitiva in df.columns else np.zeros_like(q)
+    kvarh_medida = columna(col_reactiva).sum()
+    kwh_medida = columna(col_energia).sum()
+
+    t_ns = np.sort(t[validas].view(np.int64))
+    pasos = np.diff(t_ns)
+    dt_h = float(np.median(pasos[pasos > 0])) / 3.6e12 if (pasos > 0).any() else 1 / 60
+    dias = (t_ns[-1] - t_ns[0]) / (86400 * 10**9)
+    factor_30d = 30 / dias if dias > 0 else float("nan")
+    # Energía reactiva facturada por kVAr·muestra de potencia inductiva.
+    escala = kvarh_medida / q.sum() if q.sum() else dt_h
+    aviso_periodo = None
+    if periodo is None:
+        vigente, aviso_periodo = periodo_por_defecto(pd.Timestamp(t_ns[-1]), dist)
+        periodo = vigente.clave
+    kwh_30d = kwh_medida * factor_30d
+
+    perfil = _PerfilReactivo(q)
+    cap_base = cap.sum() * dt_h
+    cap_max, margen_max = cap.max(), (cap - q).max()
+
+    def fp_de(kvarh: np.ndarray) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(kwh_medida != 0, np.cos(np.arctan(kvarh / kwh_medida)), np.nan)
+
+    # Bancos fijos.
+    if tamanos_kvar is None:
+        tamanos_kvar = np.arange(0.0, np.ceil(perfil.q[-1] / 5) * 5 + 5, 5.0)
+    kvar = np.unique(np.asarray(tamanos_kvar, dtype=np.float64))
+    kvarh_ind = perfil.exceso(kvar) * escala
+    kvarh_inyectada = perfil.defecto(kvar) * dt_h
+    cuenta, _ = perfil.por_encima(kvar)
+    fijo = pd.DataFrame({"kvar": kvar})
+    fijo["kvarh_inductiva"] = kvarh_ind * factor_30d
+    fijo["kvarh_capacitiva"] = (cap_base + kvarh_inyectada) * factor_30d
+    # La reactiva que inyecta el banco sobrecompensado también se factura
+    # (como |r − Q·Δt| en `simular_escenarios`).
+    fijo["fp"] = fp_de(kvarh_ind + kvarh_inyectada)
+    fijo["fraccion_sobrecompensado"] = np.where(kvar > 0, 1 - cuenta / perfil.n, 0.0)
+    fijo["kvar_capacitivo_max"] = np.maximum(cap_max, kvar + margen_max)
+    _penalizaciones(fijo, fijo["fp"].to_numpy(), kwh_30d, tarifas, periodo, dist)
+
+    # Bancos escalonados: Σ pasos conectados = Σ_{j ≤ n} #{q ≥ j·s}.
+    pasos_kvar = np.asarray(pasos_kvar, dtype=np.float64)
+    n_pasos = np.asarray(n_pasos, dtype=np.int64)
+    j = np.arange(1, n_pasos.max() + 1)
+    umbrales = pasos_kvar[:, None] * j[None, :]
+    conectados = np.cumsum(perfil.n - np.searchsorted(perfil.q, umbrales, side="left"), axis=1)
+    s_grid, n_grid = np.meshgrid(pasos_kvar, n_pasos, indexing="ij")
+    compensado = s_grid * conectados[:, n_pasos - 1]
+    kvarh_ind = (perfil.acumulado[-1] - compensado).ravel() * escala
+    escalonado = pd.DataFrame({
+        "paso_kvar": s_grid.ravel(),
+        "n_pasos": n_grid.ravel(),
+        "kvar": (s_grid * n_grid).ravel(),
+    })
+    escalonado["kvarh_inductiva"] = kvarh_ind * factor_30d
+    escalonado["kvarh_capacitiva"] = cap_base * factor_30d
+    escalonado["fp"] = fp_de(kvarh_ind)
+    escalonado["fraccion_sobrecompensado"] = 0.0
+    escalonado["kvar_capacitivo_max"] = cap_max
+    _penalizaciones(escalonado, escalonado["fp"].to_numpy(), kwh_30d, tarifas, periodo, dist)
+
+    fp_base = float(fp_de(np.array(kvarh_medida)))
+    base = {"fp": fp_base, "kvarh_inductiva": kvarh_medida * factor_30d}
+    for tarifa in tarifas:
+        cargo_fp = cargar_tarifas(dist.tarifas).periodo(periodo)[tarifa]["cargo_fp"]
+        base[f"penalizacion_{tarifa}"] = dist.regla_fp.penalizacion(cargo_fp, kwh_30d, fp_base)
+        for tabla in (fijo, escalonado):
+            tabla[f"ahorro_{tarifa}"] = base[f"penalizacion_{tarifa}"] - tabla[f"penalizacion_{tarifa}"]
+
+    def minimo(tabla: pd.DataFrame) -> dict | None:
+        sin_penalizacion = tabla[tabla["fp"] >= dist.regla_fp.umbral]
+        if sin_penalizacion.empty:
+            return None
+        return sin_penalizacion.sort_values(["kvar", "n_pasos"] if "n_pasos" in tabla else "kvar").iloc[0].to_dict()
+
+    return {
+        "fijo": fijo,
+        "escalonado": escalonado.sort_values(["kvar", "n_pasos"], ignore_index=True),
+        "base": base,
+        "recomendado": {"fijo": minimo(fijo), "escalonado": minimo(escalonado)},
+        "periodo": periodo,
+        "aviso_periodo": aviso_periodo,
+    }
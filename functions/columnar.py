@@ -0,0 +1,310 @@
+"""
+Contenedor columnar: un bloque contiguo de columnas numéricas por tipo
+(float64 y, con la política de tipos compacta, float32) con vistas por grupo
+de columnas.
+
+Las columnas de cada grupo se colocan contiguas en su bloque (orden Fortran,
+cada columna contigua en memoria), de modo que `vista(grupo)` devuelve un
+DataFrame que comparte memoria con los bloques en lugar de copiarlos. Si un
+grupo no resulta contiguo, su vista reúne solo las columnas de ese grupo.
+
+Los bloques pueden vivir en memoria compartida (`compartir`) para que otros
+procesos los abran sin copiarlos (`adjuntar`).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class DescriptorCompartido:
+    """
+    Lo necesario para abrir en otro proceso una `TablaColumnar` en memoria
+    compartida: segmento y forma de cada bloque (por tipo) y metadatos de
+    columnas. Las fechas van en su propio segmento si son datetime64[ns] sin
+    zona; si no, viajan serializadas en `fechas`, igual que las columnas no
+    numéricas.
+    """
+
+    bloques: dict[str, tuple[str, tuple[int, int]]]
+    nombres: dict[str, tuple[str, ...]]
+    columnas_grupo: dict[str, list[str]]
+    col_fecha: str
+    segmento_fechas: str | None = None
+    fechas: pd.Series | None = None
+    extras: dict[str, np.ndarray] | None = None
+
+
+def _tipo_columna(df: pd.DataFrame, columna: str, dtypes: dict[str, np.dtype] | None) -> str:
+    """Tipo del bloque de `columna`: el de `dtypes`, float32 si ya lo es, o float64."""
+    if dtypes and columna in dtypes:
+        return np.dtype(dtypes[columna]).name
+    if columna in df.columns and df[columna].dtype == np.float32:
+        return "float32"
+    return "float64"
+
+
+class TablaColumnar:
+    """
+    Bloques `bloques[tipo]` (n_filas × n_columnas, orden Fortran) más la
+    columna de fechas y las columnas no numéricas, con grupos con nombre.
+
+    Las columnas de `disposicion` que no existen en el DataFrame de origen
+    se reservan (NaN) para rellenarlas después con `asignar`.
+    """
+
+    def __init__(
+        self,
+        datos: np.ndarray | dict[str, np.ndarray],
+        nombres: list[str] | dict[str, list[str]],
+        grupos: dict[str, list[str]],
+        *,
+        fechas: pd.Series | None = None,
+        col_fecha: str = "Fecha/hora",
+        extras: dict[str, np.ndarray] | None = None,
+    ):
+        if isinstance(datos, np.ndarray):
+            datos, nombres = {datos.dtype.name: datos}, {datos.dtype.name: list(nombres)}
+        self.bloques = dict(datos)
+        self.nombres_bloque = {tipo: list(cols) for tipo, cols in nombres.items()}
+        self.nombres = [c for cols in self.nombres_bloque.values() for c in cols]
+        self.ubicacion = {c: (tipo, j) for tipo, cols in self.nombres_bloque.items() for j, c in enumerate(cols)}
+        self.posiciones = {c: i for i, c in enumerate(self.nombres)}
+        self.fechas = fechas
+        self.col_fecha = col_fecha
+        self.extras = extras or {}
+        self.grupos: dict[str, list[tuple[str, slice | np.ndarray]]] = {}
+        self.columnas_grupo: dict[str, list[str]] = {}
+        self._segmentos: list[shared_memory.SharedMemory] = []
+        self._propietaria = False
+        for nombre, cols in grupos.items():
+            self.definir_grupo(nombre, cols)
+
+    @classmethod
+    def desde_dataframe(
+        cls,
+        df: pd.DataFrame,
+        disposicion: list[str],
+        grupos: dict[str, list[str]],
+        *,
+        col_fecha: str = "Fecha/hora",
+        dtypes: dict[str, np.dtype] | None = None,
+    ) -> "TablaColumnar":
+        """
+        Copia una sola vez las columnas numéricas de `disposicion` a los
+        bloques, en ese orden. Cada columna va al bloque de su tipo en
+        `dtypes`, o al float32 si ya lo es en `df`, o al float64. Las columnas
+        no numéricas se guardan aparte sin copiar.
+        """
+        por_tipo: dict[str, list[str]] = {}
+        extras = {}
+        for c in disposicion:
+            if c == col_fecha:
+                continue
+            if c in df.columns and not pd.api.types.is_numeric_dtype(df[c]):
+                extras[c] = df[c].to_numpy()
+            else:
+                por_tipo.setdefault(_tipo_columna(df, c, dtypes), []).append(c)
+        por_tipo = {t: por_tipo[t] for t in sorted(por_tipo, reverse=True)} or {"float64": []}
+
+        bloques = {}
+        for tipo, cols in por_tipo.items():
+            datos = np.empty((len(df), len(cols)), dtype=tipo, order="F")
+            for j, c in enumerate(cols):
+                if c in df.columns:
+                    datos[:, j] = df[c].to_numpy(dtype=tipo, na_value=np.nan)
+                else:
+                    datos[:, j] = np.nan
+            bloques[tipo] = datos
+
+        fechas = df[col_fecha].reset_index(drop=True) if col_fecha in df.columns else None
+        grupos = {g: [c for c in cols if c not in extras] for g, cols in grupos.items()}
+        return cls(bloques, por_tipo, grupos, fechas=fechas, col_fecha=col_fecha, extras=extras)
+
+    # Los bloques se comparten: pandas copia `attrs` con `deepcopy` al
+    # derivar DataFrames, y eso no debe duplicar los datos.
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __len__(self) -> int:
+        return next(iter(self.bloques.values())).shape[0]
+
+    def __contains__(self, columna: str) -> bool:
+        return columna in self.posiciones
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.nbytes for b in self.bloques.values())
+
+    @property
+    def datos(self) -> np.ndarray:
+        """El bloque, si la tabla tiene uno solo."""
+        if len(self.bloques) != 1:
+            raise AttributeError(f"La tabla tiene un bloque por tipo: {list(self.bloques)}")
+        return next(iter(self.bloques.values()))
+
+    def definir_grupo(self, nombre: str, columnas: list[str]) -> None:
+        """
+        Registra un grupo (conjunto de columnas, en el orden de la tabla);
+        en cada bloque se guarda como `slice` si es contiguo.
+        """
+        cols = sorted({c for c in columnas if c in self.posiciones}, key=self.posiciones.__getitem__)
+        partes = []
+        for tipo in self.bloques:
+            pos = np.array([self.ubicacion[c][1] for c in cols if self.ubicacion[c][0] == tipo], dtype=np.intp)
+            if not len(pos):
+                continue
+            if np.all(np.diff(pos) == 1):
+                partes.append((tipo, slice(int(pos[0]), int(pos[-1]) + 1)))
+            else:
+                partes.append((tipo, pos))
+        self.grupos[nombre] = partes
+        self.columnas_grupo[nombre] = cols
+
+    def es_contiguo(self, grupo: str) -> bool:
+        partes = self.grupos[grupo]
+        return len(partes) <= 1 and all(isinstance(sel, slice) for _, sel in partes)
+
+    def columna(self, nombre: str) -> np.ndarray:
+        """Vista 1-D de una columna de su bloque."""
+        tipo, j = self.ubicacion[nombre]
+        return self.bloques[tipo][:, j]
+
+    def asignar(self, nombre: str, valores) -> None:
+        """Escribe `valores` en la columna (reservada o existente), con el tipo de su bloque."""
+        tipo, j = self.ubicacion[nombre]
+        self.bloques[tipo][:, j] = valores
+
+    def respalda(self, df: pd.DataFrame) -> bool:
+        """Indica si `df` es una vista de esta tabla."""
+        if len(df) != len(self) or not self.nombres or self.nombres[0] not in df.columns:
+            return False
+        return np.shares_memory(df[self.nombres[0]].to_numpy(), self.columna(self.nombres[0]))
+
+    def vista(self, grupo: str, *, con_fecha: bool = False, con_extras: bool = False) -> pd.DataFrame:
+        """
+        DataFrame con las columnas del grupo (las de cada bloque juntas).
+        Comparte memoria con los bloques en sus partes contiguas; no debe
+        modificarse en el sitio.
+        """
+        partes = []
+        for tipo, sel in self.grupos[grupo]:
+            cols = self.nombres_bloque[tipo]
+            if isinstance(sel, slice):
+                partes.append(pd.DataFrame(self.bloques[tipo][:, sel], columns=cols[sel], copy=False))
+            else:
+                partes.append(pd.DataFrame(self.bloques[tipo][:, sel], columns=[cols[j] for j in sel]))
+        if not partes:
+            df = pd.DataFrame(index=pd.RangeIndex(len(self)))
+        elif len(partes) == 1:
+            df = partes[0]
+        else:
+            df = pd.concat(partes, axis=1, copy=False)
+        if con_extras:
+            for k, (c, valores) in enumerate(self.extras.items()):
+                df.insert(k, c, valores)
+        if con_fecha and self.fechas is not None:
+            df.insert(0, self.col_fecha, self.fechas)
+        df.attrs["tabla_columnar"] = self
+        return df
+
+    # ---- memoria compartida ----------------------------------------------
+
+    def compartir(self) -> tuple["TablaColumnar", DescriptorCompartido]:
+        """
+        Copia los bloques (y las fechas, si son datetime64[ns]) a memoria
+        compartida. Devuelve la tabla respaldada por esos segmentos, que los
+        libera con `liberar`, y el descriptor para `adjuntar` en otros procesos.
+        """
+        segmentos, bloques, descritos = [], {}, {}
+        for tipo, datos in self.bloques.items():
+            seg = shared_memory.SharedMemory(create=True, size=max(datos.nbytes, 1))
+            copia = np.ndarray(datos.shape, dtype=tipo, buffer=seg.buf, order="F")
+            copia[...] = datos
+            segmentos.append(seg)
+            bloques[tipo] = copia
+            descritos[tipo] = (seg.name, datos.shape)
+
+        fechas, seg_fechas, fechas_serie = self.fechas, None, None
+        if fechas is not None and fechas.dtype == "datetime64[ns]":
+            seg = shared_memory.SharedMemory(create=True, size=max(len(fechas) * 8, 1))
+            valores = np.ndarray(len(fechas), dtype="datetime64[ns]", buffer=seg.buf)
+            valores[...] = fechas.to_numpy()
+            fechas = pd.Series(valores, name=self.fechas.name, copy=False)
+            segmentos.append(seg)
+            seg_fechas = seg.name
+        else:
+            fechas_serie = fechas
+
+        tabla = TablaColumnar(
+            bloques, self.nombres_bloque, self.columnas_grupo, fechas=fechas, col_fecha=self.col_fecha, extras=self.extras
+        )
+        tabla._segmentos, tabla._propietaria = segmentos, True
+        descriptor = DescriptorCompartido(
+            bloques=descritos,
+            nombres={t: tuple(cols) for t, cols in self.nombres_bloque.items()},
+            columnas_grupo=self.columnas_grupo,
+            col_fecha=self.col_fecha,
+            segmento_fechas=seg_fechas,
+            fechas=fechas_serie,
+            extras=self.extras,
+        )
+        return tabla, descriptor
+
+    @classmethod
+    def adjuntar(cls, descriptor: DescriptorCompartido) -> "TablaColumnar":
+        """
+        Abre una tabla compartida por `compartir` sin copiar los bloques. Los
+        arrays son de solo lectura; `liberar` cierra los segmentos.
+        """
+        segmentos, bloques = [], {}
+        for tipo, (nombre, forma) in descriptor.bloques.items():
+            seg = shared_memory.SharedMemory(name=nombre)
+            datos = np.ndarray(forma, dtype=tipo, buffer=seg.buf, order="F")
+            datos.flags.writeable = False
+            segmentos.append(seg)
+            bloques[tipo] = datos
+        fechas = descriptor.fechas
+        if descriptor.segmento_fechas is not None:
+            seg = shared_memory.SharedMemory(name=descriptor.segmento_fechas)
+            n = next(iter(descriptor.bloques.values()))[1][0]
+            valores = np.ndarray(n, dtype="datetime64[ns]", buffer=seg.buf)
+            valores.flags.writeable = False
+            fechas = pd.Series(valores, name=descriptor.col_fecha, copy=False)
+            segmentos.append(seg)
+        tabla = cls(
+            bloques,
+            {t: list(cols) for t, cols in descriptor.nombres.items()},
+            descriptor.columnas_grupo,
+            fechas=fechas,
+            col_fecha=descriptor.col_fecha,
+            extras=descriptor.extras,
+        )
+        tabla._segmentos = segmentos
+        return tabla
+
+    def liberar(self) -> None:
+        """
+        Cierra los segmentos de memoria compartida (y los elimina si esta
+        tabla los creó). Las vistas derivadas dejan de ser válidas.
+        """
+        self.bloques = {
+            tipo: np.empty((0, len(self.nombres_bloque[tipo])), dtype=tipo, order="F") for tipo in self.bloques
+        }
+        self.fechas = None
+        for seg in self._segmentos:
+            try:
+                seg.close()
+            except BufferError:
+                pass  # Aún hay vistas vivas: el segmento se cierra al recogerlas.
+            if self._propietaria:
+                seg.unlink()
+        self._segmentos = []
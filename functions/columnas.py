@@ -0,0 +1,276 @@
+"""
+Registro de columnas MYeBOX: clasifica cada columna de la cabecera una sola
+vez (magnitud, fase, estadístico, orden armónico, unidad, categorías) y
+permite buscar columnas por atributos sin volver a recorrer `df.columns`.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable
+
+import numpy as np
+
+# Magnitudes reconocidas, de la más específica a la más general.
+_MAGNITUDES = (
+    ("Corriente de fuga", "A"),
+    ("Corriente", "A"),
+    ("Tensión", "V"),
+    ("V neutro", "V"),
+    ("Frecuencia", "Hz"),
+    ("P.Activa", "kW"),
+    ("P.Inductiva", "kVAr"),
+    ("P.Capacitiva", "kVAr"),
+    ("P.Reactiva", "kVAr"),
+    ("P.Aparente", "kVA"),
+    ("E.Activa", "kWh"),
+    ("E.Inductiva", "kVArh"),
+    ("E.Capacitiva", "kVArh"),
+    ("E.Reactiva", "kVArh"),
+    ("E.Aparente", "kVAh"),
+    ("F.P.", ""),
+    ("Cos Phi", ""),
+    ("P/S", ""),
+    ("Fasores", "°"),
+    ("Coste", "B/."),
+    ("Factor cresta", ""),
+    ("Factor K", ""),
+    ("THD/d", "%"),
+    ("Distorsión", "A"),
+    ("Fund.", None),
+    ("Arm.", "%"),
+    ("Ka", ""),
+    ("Kd", ""),
+    ("Período", "s"),
+)
+
+# Patrones de categoría de `sub_dividir_dataframe` (subcadenas del nombre).
+_PATRONES_CATEGORIA = {
+    "general": ("Tensión", "Corriente", "F.P.", "Cos Phi", "Frecuencia"),
+    "potencia": ("P.Activa", "P.Capacitiva", "P.Inductiva"),
+    "fasor": ("Fasores",),
+    "energia": ("E.",),
+    "coste": ("Coste",),
+    "secundario": (
+        "directa",
+        "homopolar",
+        "inversa",
+        "Factor cresta",
+        "THD/d",
+        "Distorsión",
+        "Ka ",
+        "Kd ",
+        "Factor K",
+    ),
+}
+# Columnas derivadas que pertenecen a una categoría aunque no casen su patrón.
+_CATEGORIA_EXPLICITA = {
+    "P/S": "general",
+    "P.Reactiva III T": "potencia",
+    "P.Aparente III T": "potencia",
+}
+
+# Magnitudes que se acumulan (sumas, sumas acumuladas): se guardan en float64
+# con cualquier política de tipos.
+_MAGNITUDES_ACUMULADAS = frozenset(
+    {"E.Activa", "E.Inductiva", "E.Capacitiva", "E.Reactiva", "E.Aparente", "Coste"}
+)
+
+# Política de tipos de las columnas numéricas al cargar y derivar:
+#   "exacta":   todo en float64.
+#   "compacta": magnitudes instantáneas en float32 (la mitad de memoria) y
+#               acumuladas en float64.
+POLITICAS_DTYPE = ("exacta", "compacta")
+
+_RE_EXTREMO = re.compile(r"\s*(mín|máx)\.?", re.IGNORECASE)
+_RE_ENTERO = re.compile(r"\b(\d+)\b")
+_FASES = ("L1L2L3", "L12", "L23", "L31", "L1", "L2", "L3", "III", "V1", "V2", "V3", "I1", "I2", "I3")
+_SECUENCIAS = ("directa", "inversa", "homopolar")
+
+
+@dataclass(frozen=True)
+class InfoColumna:
+    """Atributos de una columna MYeBOX deducidos de su nombre."""
+
+    nombre: str
+    magnitud: str | None
+    fase: str | None = None
+    estadistico: str = "avg"
+    variante: str | None = None
+    orden_armonico: int | None = None
+    unidad: str | None = None
+    categorias: tuple[str, ...] = ()
+
+
+@lru_cache(maxsize=4096)
+def clasificar_columna(nombre: str) -> InfoColumna:
+    """
+    Clasifica una columna por su nombre.
+
+    - `estadistico`: 'min', 'max' o 'avg'.
+    - `fase`: 'L1'…'L3', 'L12'…'L31', 'III', 'L1L2L3', canal armónico
+      ('V1'…'I3'), 'N' (neutro) o componente de secuencia
+      ('directa', 'inversa', 'homopolar').
+    - `variante`: sufijo tras la fase ('-', 'T', 'M', 'T1', …).
+    - `orden_armonico`: 1 para `Fund.`, n para `Arm. n`.
+    """
+    categorias = tuple(
+        cat for cat, patrones in _PATRONES_CATEGORIA.items() if any(p in nombre for p in patrones)
+    )
+    if nombre in _CATEGORIA_EXPLICITA and _CATEGORIA_EXPLICITA[nombre] not in categorias:
+        categorias += (_CATEGORIA_EXPLICITA[nombre],)
+    if nombre.startswith("Arm.") or "Fund." in nombre:
+        categorias = ("armonicos",)
+    if nombre == "Fecha/hora":
+        return InfoColumna(nombre, "Fecha/hora", categorias=("fecha",))
+
+    minusculas = nombre.lower()
+    estadistico = "min" if "mín" in minusculas else "max" if "máx" in minusculas else "avg"
+    resto = _RE_EXTREMO.sub("", nombre).strip()
+
+    magnitud, unidad = None, None
+    for mag, uni in _MAGNITUDES:
+        if resto.startswith(mag):
+            magnitud, unidad = mag, uni
+            resto = resto[len(mag):].strip()
+            break
+
+    orden = None
+    if magnitud == "Arm.":
+        m = _RE_ENTERO.search(resto)
+        if m:
+            orden = int(m.group(1))
+            resto = (resto[:m.start()] + resto[m.end():]).strip()
+    elif magnitud == "Fund.":
+        orden = 1
+
+    fase, variante = None, None
+    tokens = resto.split()
+    if tokens and tokens[0] in ("de", "neutro") and "neutro" in tokens:
+        fase, tokens = "N", []
+    elif magnitud == "V neutro":
+        fase = "N"
+    elif tokens and tokens[0] in _SECUENCIAS:
+        fase, tokens = tokens[0], tokens[1:]
+    elif tokens and tokens[0] in _FASES:
+        fase, tokens = tokens[0], tokens[1:]
+    if tokens:
+        variante = " ".join(tokens)
+
+    if magnitud == "Fund." and fase:
+        unidad = "V" if fase.startswith("V") else "A"
+
+    return InfoColumna(
+        nombre=nombre,
+        magnitud=magnitud,
+        fase=fase,
+        estadistico=estadistico,
+        variante=variante,
+        orden_armonico=orden,
+        unidad=unidad,
+        categorias=categorias,
+    )
+
+
+class RegistroColumnas:
+    """
+    Índice de las columnas de una cabecera por atributo. Las búsquedas
+    combinan índices por valor (intersección de conjuntos) y se memorizan.
+    """
+
+    _ATRIBUTOS = ("magnitud", "fase", "estadistico", "variante", "orden_armonico", "unidad")
+
+    def __init__(self, columnas: Iterable[str]):
+        self.columnas = list(columnas)
+        self.info = {c: clasificar_columna(c) for c in self.columnas}
+        self.posicion = {c: i for i, c in enumerate(self.columnas)}
+        self._indices: dict[str, dict[object, set[str]]] = {a: {} for a in self._ATRIBUTOS}
+        self._indices["categoria"] = {}
+        for c, info in self.info.items():
+            for atributo in self._ATRIBUTOS:
+                self._indices[atributo].setdefault(getattr(info, atributo), set()).add(c)
+            for cat in info.categorias:
+                self._indices["categoria"].setdefault(cat, set()).add(c)
+        self._cache: dict[tuple, list[str]] = {}
+
+    def __getitem__(self, nombre: str) -> InfoColumna:
+        return self.info[nombre]
+
+    def __contains__(self, nombre: str) -> bool:
+        return nombre in self.info
+
+    def buscar(self, **criterios) -> list[str]:
+        """
+        Columnas que cumplen todos los criterios, en el orden de la cabecera.
+        Cada criterio admite un valor o una tupla/lista/conjunto de valores:
+
+            registro.buscar(magnitud="Tensión", fase=("L1", "L2", "L3"), estadistico="avg")
+            registro.buscar(categoria="armonicos")
+        """
+        clave = tuple(
+            sorted(
+                (k, tuple(v) if isinstance(v, (list, tuple, set, frozenset)) else (v,))
+                for k, v in criterios.items()
+            )
+        )
+        if clave in self._cache:
+            return self._cache[clave]
+
+        seleccion: set[str] | None = None
+        for atributo, valores in clave:
+            if atributo not in self._indices:
+                raise KeyError(f"Atributo de columna desconocido: {atributo}")
+            indice = self._indices[atributo]
+            candidatas = set().union(*(indice.get(v, set()) for v in valores))
+            seleccion = candidatas if seleccion is None else seleccion & candidatas
+        if seleccion is None:
+            seleccion = set(self.columnas)
+
+        resultado = sorted(seleccion, key=self.posicion.__getitem__)
+        self._cache[clave] = resultado
+        return resultado
+
+
+def dtype_columna(nombre: str, politica: str = "exacta") -> np.dtype:
+    """Tipo de la columna numérica `nombre` según la `politica` de tipos."""
+    if politica not in POLITICAS_DTYPE:
+        raise ValueError(f"Política de tipos desconocida: {politica!r} (use {', '.join(POLITICAS_DTYPE)})")
+    if politica == "compacta":
+        magnitud = clasificar_columna(nombre).magnitud
+        # Las columnas no reconocidas se dejan en float64.
+        if magnitud is not None and magnitud not in _MAGNITUDES_ACUMULADAS:
+            return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+def dtypes_columnas(columnas: Iterable[str], politica: str = "exacta") -> dict[str, np.dtype]:
+    """{columna: tipo} de las columnas numéricas de una cabecera (sin la fecha)."""
+    return {c: dtype_columna(c, politica) for c in columnas if c != "Fecha/hora"}
+
+
+@lru_cache(maxsize=64)
+def _registro_cacheado(columnas: tuple[str, ...]) -> RegistroColumnas:
+    return RegistroColumnas(columnas)
+
+
+def registro_de(columnas: Iterable[str]) -> RegistroColumnas:
+    """Registro de una cabecera (p. ej. `df.columns`), construido una vez por cabecera."""
+    return _registro_cacheado(tuple(columnas))
+
+
+def filtro_columnas(*, armonicos: bool = True, extremos: bool = True):
+    """
+    Devuelve un filtro para `cargar_datos(columnas=...)` (`usecols` de
+    pandas) que descarta los armónicos y/o las columnas mín./máx. al leer.
+    """
+    def filtro(nombre: str) -> bool:
+        info = clasificar_columna(nombre)
+        if not armonicos and "armonicos" in info.categorias:
+            return False
+        if not extremos and info.estadistico != "avg":
+            return False
+        return True
+
+    return filtro
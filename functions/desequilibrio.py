@@ -0,0 +1,192 @@
+"""
+Desequilibrio trifásico de tensión y de corriente, sobre toda la serie a la
+vez (NumPy), con dos definiciones:
+
+- NEMA (MG 1): máxima desviación de las tres fases respecto a su media,
+  en % de la media.
+- Secuencias (IEC 61000-4-30 / EN 50160): componente inversa / directa, en
+  %, a partir de las columnas 'Tensión/Corriente directa|inversa' del
+  MYeBOX. Si faltan, el desequilibrio de tensión se obtiene de los módulos
+  de las tensiones de línea (fórmula exacta de IEC 61000-4-30):
+
+      β = (U12⁴ + U23⁴ + U31⁴) / (U12² + U23² + U31²)²
+      u2 = √((1 − √(3 − 6β)) / (1 + √(3 − 6β)))
+
+Se excluyen las muestras sin tensión o sin carga (la media de fases por
+debajo de `fraccion_tension` × la mediana, o de `carga_minima` × el
+percentil 95 de la corriente), donde el cociente no tiene sentido.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from . import visualize
+from .blocks import clasificar_bloques
+from .histeresis import eventos_histeresis
+from .instrumentacion import instrumentar
+from .metrics import _get_image_path, _marco_temporal
+
+_FASES = ("L1", "L2", "L3")
+_LINEAS = ("L12", "L23", "L31")
+_BLOQUES = ("punta", "fuera_punta_medio", "fuera_punta_bajo")
+
+
+def desequilibrio_nema(a, b, c) -> np.ndarray:
+    """Desequilibrio NEMA (%) de tres series de fase."""
+    fases = np.stack([np.asarray(a, dtype=float), np.asarray(b, dtype=float), np.asarray(c, dtype=float)])
+    media = fases.mean(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(media > 0, np.abs(fases - media).max(axis=0) / media * 100, np.nan)
+
+
+def desequilibrio_secuencia(directa, inversa) -> np.ndarray:
+    """Desequilibrio por secuencias (%): inversa / directa."""
+    directa = np.asarray(directa, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(directa > 0, np.asarray(inversa, dtype=float) / directa * 100, np.nan)
+
+
+def desequilibrio_lineas(u12, u23, u31) -> np.ndarray:
+    """Desequilibrio inverso/directo (%) a partir de los módulos de las tensiones de línea."""
+    cuadrados = np.stack([np.asarray(u, dtype=float) ** 2 for u in (u12, u23, u31)])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta = (cuadrados ** 2).sum(axis=0) / cuadrados.sum(axis=0) ** 2
+        raiz = np.sqrt(np.clip(3 - 6 * beta, 0, None))
+        return np.sqrt((1 - raiz) / (1 + raiz)) * 100
+
+
+def _columnas(df, magnitud: str, nombres) -> list[str] | None:
+    columnas = [f"{magnitud} {n}" for n in nombres]
+    return columnas if all(c in df.columns for c in columnas) else None
+
+
+@instrumentar
+def series_desequilibrio(
+    df: pd.DataFrame,
+    *,
+    fraccion_tension: float = 0.5,
+    carga_minima: float = 0.05,
+) -> pd.DataFrame:
+    """
+    Series de desequilibrio (%) indexadas por 'Fecha/hora': `tension_nema`,
+    `tension_secuencia`, `tension_homopolar`, `corriente_nema`,
+    `corriente_secuencia` y `corriente_homopolar` (las que permitan las
+    columnas de `df`). NaN sin tensión o sin carga.
+    """
+    disponibles = [
+        f"{m} {s}" for m in ("Tensión", "Corriente")
+        for s in (*_FASES, *_LINEAS, "directa", "inversa", "homopolar")
+    ]
+    marco = _marco_temporal(df, disponibles)
+    series = {}
+
+    for magnitud, prefijo in (("Tensión", "tension"), ("Corriente", "corriente")):
+        fases = _columnas(marco, magnitud, _FASES)
+        secuencias = _columnas(marco, magnitud, ("directa", "inversa", "homopolar"))
+        lineas = _columnas(marco, magnitud, _LINEAS) if magnitud == "Tensión" else None
+        if fases is None and secuencias is None:
+            continue
+
+        referencia = marco[fases].mean(axis=1).to_numpy(dtype=float) if fases else marco[f"{magnitud} directa"].to_numpy(dtype=float)
+        if magnitud == "Tensión":
+            umbral = fraccion_tension * np.nanmedian(referencia) if np.isfinite(referencia).any() else np.inf
+        else:
+            umbral = carga_minima * np.nanpercentile(referencia, 95) if np.isfinite(referencia).any() else np.inf
+        valida = referencia >= umbral
+
+        if fases:
+            series[f"{prefijo}_nema"] = desequilibrio_nema(*(marco[c] for c in fases))
+        if secuencias:
+            directa = marco[secuencias[0]]
+            series[f"{prefijo}_secuencia"] = desequilibrio_secuencia(directa, marco[secuencias[1]])
+            series[f"{prefijo}_homopolar"] = desequilibrio_secuencia(directa, marco[secuencias[2]])
+        elif lineas:
+            series[f"{prefijo}_secuencia"] = desequilibrio_lineas(*(marco[c] for c in lineas))
+
+        for nombre in [s for s in series if s.startswith(prefijo)]:
+            series[nombre] = np.where(valida, series[nombre], np.nan)
+
+    return pd.DataFrame(series, index=marco.index)
+
+
+def _estadisticas(serie: pd.Series, bloques: pd.Series) -> dict:
+    """Promedio, máximo, mínimo y percentil 95, en general y por bloque horario."""
+    general = {
+        "promedio": serie.mean(),
+        "maximo": serie.max(),
+        "minimo": serie.min(),
+        "p95": serie.quantile(0.95),
+    }
+    agrupado = serie.groupby(bloques, observed=True)
+    tabla = agrupado.agg(["mean", "max", "min"])
+    tabla["p95"] = agrupado.quantile(0.95)
+    por_bloque = {b: {"promedio": np.nan, "maximo": np.nan, "minimo": np.nan, "p95": np.nan} for b in _BLOQUES}
+    for bloque, fila in tabla.iterrows():
+        por_bloque[bloque] = {"promedio": fila["mean"], "maximo": fila["max"], "minimo": fila["min"], "p95": fila["p95"]}
+    return {"general": general, "por_bloque": por_bloque}
+
+
+def _eventos(serie: pd.Series, limite: float, histeresis: float, max_diff: pd.Timedelta) -> list[dict]:
+    """Periodos por encima de `limite` (salen al bajar de `limite − histeresis`), fusionados."""
+    return eventos_histeresis(serie.index, serie.to_numpy(dtype=float), limite, limite - histeresis, max_diff=max_diff)[0]
+
+
+@instrumentar
+def desequilibrio(
+    df: pd.DataFrame,
+    *,
+    limite_tension: float = 2.0,
+    limite_corriente: float = 10.0,
+    histeresis: float = 0.1,
+    fraccion_tension: float = 0.5,
+    carga_minima: float = 0.05,
+    graficar: bool = False,
+) -> dict:
+    """
+    Desequilibrio de tensión y de corriente: estadísticas de cada definición
+    (general y por bloque horario, con percentil 95) y eventos por encima
+    del límite con histéresis (`histeresis` × límite) y fusión de eventos
+    separados menos de 10 min, sobre la definición por secuencias (o NEMA
+    si no hay secuencias).
+
+    `limite_tension` es el de EN 50160 (2 % del desequilibrio inverso en
+    el 95 % del tiempo): `cumple` compara con él el percentil 95. Para la
+    corriente no hay límite normativo; `limite_corriente` es orientativo.
+    """
+    series = series_desequilibrio(df, fraccion_tension=fraccion_tension, carga_minima=carga_minima)
+    bloques = clasificar_bloques(series.index.to_series(index=series.index))
+    max_diff = pd.Timedelta(minutes=10)
+
+    resultado = {"graficos_paths": {}}
+    for prefijo, limite in (("tension", limite_tension), ("corriente", limite_corriente)):
+        columnas = [c for c in series.columns if c.startswith(prefijo)]
+        if not columnas:
+            continue
+        definiciones = {c[len(prefijo) + 1:]: _estadisticas(series[c], bloques) for c in columnas}
+        principal = f"{prefijo}_secuencia" if f"{prefijo}_secuencia" in series.columns else f"{prefijo}_nema"
+        eventos = _eventos(series[principal], limite, histeresis * limite, max_diff) if principal in series.columns else []
+        p95 = definiciones[principal[len(prefijo) + 1:]]["general"]["p95"] if principal in series.columns else np.nan
+        resultado[prefijo] = {
+            "definiciones": definiciones,
+            "definicion_eventos": principal[len(prefijo) + 1:],
+            "limite": limite,
+            "cumple": bool(p95 <= limite) if pd.notna(p95) else None,
+            "eventos": eventos,
+            "tiempo_total_fuera_de_limite": sum((e["duracion"] for e in eventos), pd.Timedelta(0)),
+        }
+
+        if graficar:
+            ruta = _get_image_path(f"desequilibrio_de_{prefijo}")
+            visualize.graficar_parametros(
+                series,
+                parametros=columnas,
+                lineas_horizontales=[(limite, "red")],
+                titulo=f"Desequilibrio de {'Tensión' if prefijo == 'tension' else 'Corriente'} (%)",
+                guardar=True,
+                ruta=ruta,
+            )
+            resultado["graficos_paths"][prefijo] = ruta
+
+    return resultado
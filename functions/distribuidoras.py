@@ -0,0 +1,152 @@
+"""
+Distribuidoras eléctricas como datos: cada una se define en un fichero JSON
+(`functions/datos/distribuidoras/<nombre>.json`) con su calendario de
+bloques, su regla de penalización por factor de potencia y la referencia a
+sus tablas de tarifas. Se cargan y compilan una sola vez por fichero.
+
+Añadir una distribuidora no requiere código: basta su JSON y un directorio
+con un JSON por periodo tarifario (ver `tablas_tarifas`). En un JSON fuera
+del paquete, `"tarifas"` puede ser una ruta relativa a ese fichero, p. ej.
+`"tarifas": "tarifas_ensa"`. Solo se incluye Edemet; ENSA y Edechi se
+definen así con sus pliegos vigentes.
+
+La distribuidora activa (Edemet por defecto) es la que usan
+`blocks.clasificar_bloques` y las funciones de `tariffs`; para procesar
+sitios de distintas distribuidoras en un mismo lote:
+
+    for sitio in sitios:
+        with usar_distribuidora(sitio.distribuidora):
+            ...
+"""
+
+from __future__ import annotations
+
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from .calendario import Calendario, calendario_desde_dict
+
+DIR_DISTRIBUIDORAS = Path(__file__).parent / "datos" / "distribuidoras"
+DISTRIBUIDORA_POR_DEFECTO = "edemet"
+
+
+@dataclass(frozen=True)
+class ReglaFP:
+    """
+    Penalización por factor de potencia bajo:
+    factor × (umbral − fp redondeado) × consumo × cargo_fp, si fp < umbral.
+    Un consumo neto negativo (sitio exportador) no genera penalización.
+    """
+
+    umbral: float = 0.9
+    factor: float = 2.0
+    decimales_fp: int = 2
+
+    def penalizacion(self, cargo_fp: float, consumo: float, fp_m: float) -> float:
+        if fp_m >= self.umbral or consumo <= 0:
+            return 0.0
+        return round(self.factor * (self.umbral - round(fp_m, self.decimales_fp)) * consumo * cargo_fp, 2)
+
+    def penalizacion_lote(self, cargo_fp: float, consumo: np.ndarray, fp_m: np.ndarray) -> np.ndarray:
+        """`penalizacion` sobre arrays de consumo y FP (un valor por escenario)."""
+        fp_m = np.asarray(fp_m, dtype=np.float64)
+        consumo = np.maximum(np.asarray(consumo, dtype=np.float64), 0.0)
+        cargo = self.factor * (self.umbral - np.round(fp_m, self.decimales_fp)) * consumo * cargo_fp
+        return np.where(fp_m >= self.umbral, 0.0, np.round(cargo, 2))
+
+
+@dataclass(frozen=True)
+class Distribuidora:
+    """Definición compilada de una distribuidora (`origen`: ruta de su JSON)."""
+
+    clave: str
+    nombre: str
+    calendario: Calendario
+    regla_fp: ReglaFP
+    tarifas: str
+    origen: str = ""
+
+    @property
+    def bloques(self) -> tuple[str, ...]:
+        return self.calendario.bloques
+
+
+def distribuidoras_disponibles() -> list[str]:
+    """Claves de las distribuidoras con fichero de definición."""
+    return sorted(p.stem for p in DIR_DISTRIBUIDORAS.glob("*.json"))
+
+
+@lru_cache(maxsize=None)
+def _cargar(ruta: Path, _mtime: float) -> Distribuidora:
+    datos = json.loads(ruta.read_text(encoding="utf-8"))
+    for campo in ("nombre", "calendario", "tarifas"):
+        if campo not in datos:
+            raise ValueError(f"Falta '{campo}' en la definición de distribuidora {ruta}")
+    nombre = datos["nombre"]
+    tarifas = datos["tarifas"]
+    if (ruta.parent / tarifas).is_dir():
+        tarifas = str((ruta.parent / tarifas).resolve())
+    return Distribuidora(
+        clave=ruta.stem,
+        nombre=nombre,
+        calendario=calendario_desde_dict(datos["calendario"], nombre),
+        regla_fp=ReglaFP(**datos.get("regla_fp", {})),
+        tarifas=tarifas,
+        origen=str(ruta),
+    )
+
+
+def cargar_distribuidora(nombre_o_ruta: str | Path) -> Distribuidora:
+    """
+    Carga una distribuidora por clave ('edemet') o por ruta a su JSON. Se
+    reutiliza la versión compilada mientras el fichero no cambie.
+    """
+    ruta = Path(nombre_o_ruta)
+    if ruta.suffix != ".json":
+        ruta = DIR_DISTRIBUIDORAS / f"{str(nombre_o_ruta).lower()}.json"
+    if not ruta.exists():
+        raise FileNotFoundError(
+            f"No hay definición para la distribuidora {nombre_o_ruta!r}; "
+            f"disponibles: {distribuidoras_disponibles()}"
+        )
+    return _cargar(ruta.resolve(), ruta.stat().st_mtime)
+
+
+_activa: ContextVar[Distribuidora | None] = ContextVar("distribuidora_activa", default=None)
+
+
+def distribuidora_activa() -> Distribuidora:
+    return _activa.get() or cargar_distribuidora(DISTRIBUIDORA_POR_DEFECTO)
+
+
+def resolver_distribuidora(distribuidora: str | Path | Distribuidora | None) -> Distribuidora:
+    """Distribuidora indicada (clave, ruta u objeto) o la activa si es None."""
+    if distribuidora is None:
+        return distribuidora_activa()
+    if isinstance(distribuidora, Distribuidora):
+        return distribuidora
+    return cargar_distribuidora(distribuidora)
+
+
+def seleccionar_distribuidora(distribuidora: str | Path | Distribuidora) -> Distribuidora:
+    """Fija la distribuidora activa para el resto del contexto actual."""
+    distribuidora = resolver_distribuidora(distribuidora)
+    _activa.set(distribuidora)
+    return distribuidora
+
+
+@contextmanager
+def usar_distribuidora(distribuidora: str | Path | Distribuidora):
+    """Activa una distribuidora dentro del bloque `with`."""
+    distribuidora = resolver_distribuidora(distribuidora)
+    token = _activa.set(distribuidora)
+    try:
+        yield distribuidora
+    finally:
+        _activa.reset(token)
@@ -0,0 +1,235 @@
+"""
+Facturación por ciclos: divide la serie medida por ciclo de facturación y
+por periodo tarifario, calcula consumo y demanda máxima por bloque de cada
+tramo con los códigos de bloque vectorizados y valora cada tramo con las
+tarifas de su propio periodo.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .distribuidoras import resolver_distribuidora
+from .instrumentacion import instrumentar
+from .tablas_tarifas import cargar_tarifas
+from .tariffs import calcular_tarifa
+
+_NS_DIA = 86400 * 10**9
+
+
+def _inicios_de_ciclo(t0: pd.Timestamp, t1: pd.Timestamp, dia_corte: int) -> pd.DatetimeIndex:
+    """Inicios de ciclo (día `dia_corte` de cada mes, 00:00) que cubren [t0, t1]."""
+    primero = (t0.normalize() - pd.offsets.MonthBegin(2))
+    ultimo = (t1.normalize() + pd.offsets.MonthBegin(2))
+    return pd.date_range(primero, ultimo, freq="MS") + pd.Timedelta(days=dia_corte - 1)
+
+
+@dataclass(frozen=True)
+class _Tramos:
+    """
+    Tramo (ciclo × periodo tarifario) y bloque horario de cada muestra
+    usada, con la geometría de cada tramo presente en la medición.
+    """
+
+    bloques: tuple[str, ...]
+    usar: np.ndarray        # muestras con fecha y bloque válidos
+    tramo_idx: np.ndarray   # tramo de cada muestra usada (0..n_tramos-1)
+    clave: np.ndarray       # tramo × n_bloques + bloque de cada muestra usada
+    ciclos: np.ndarray      # inicios de ciclo (ns)
+    ciclo_idx: np.ndarray   # ciclo de cada tramo
+    inicio_ns: np.ndarray
+    fin_ns: np.ndarray
+    duracion: np.ndarray    # ns
+    fraccion: np.ndarray    # fracción del ciclo que ocupa cada tramo
+    cobertura: np.ndarray   # fracción del tramo cubierta por muestras
+    muestras: np.ndarray
+
+    @property
+    def n_tramos(self) -> int:
+        return len(self.inicio_ns)
+
+    def columna(self, df: pd.DataFrame, nombre: str) -> np.ndarray:
+        return df[nombre].to_numpy(dtype=np.float64, na_value=np.nan)[self.usar]
+
+    def por_bloque(self, valores: np.ndarray) -> np.ndarray:
+        """Suma (n_tramos × n_bloques) de `valores` (uno por muestra usada)."""
+        n = self.n_tramos * len(self.bloques)
+        return np.bincount(self.clave, weights=valores, minlength=n).reshape(self.n_tramos, len(self.bloques))
+
+    def maximo_por_bloque(self, valores: np.ndarray) -> np.ndarray:
+        """Máximo (n_tramos × n_bloques) de `valores`, 0 donde no hay datos."""
+        maximo = np.full(self.n_tramos * len(self.bloques), -np.inf)
+        np.maximum.at(maximo, self.clave, np.where(np.isnan(valores), -np.inf, valores))
+        return np.where(np.isinf(maximo), 0.0, maximo).reshape(self.n_tramos, len(self.bloques))
+
+
+def _segmentar(df: pd.DataFrame, dia_corte: int, calendario, tabla) -> _Tramos:
+    """Una pasada: tramo y bloque de cada muestra de `df`."""
+    fechas = pd.to_datetime(df["Fecha/hora"])
+    t = fechas.to_numpy(dtype="datetime64[ns]")
+    validas = ~np.isnat(t)
+    if not validas.any():
+        raise ValueError("No hay fechas válidas para facturar")
+    t_ns = t.view(np.int64)
+
+    pasos = np.diff(np.sort(t_ns[validas]))
+    pasos = pasos[pasos > 0]
+    paso = float(np.median(pasos)) if len(pasos) else 60e9
+
+    # Límites de tramo: inicios de ciclo y cambios de periodo tarifario.
+    t0, t1 = pd.Timestamp(t[validas].min()), pd.Timestamp(t[validas].max())
+    ciclos = _inicios_de_ciclo(t0, t1, dia_corte).asi8
+    cambios = [pd.Timestamp(p.desde).value for p in tabla.periodos]
+    cambios += [(pd.Timestamp(p.hasta) + pd.Timedelta(days=1)).value for p in tabla.periodos]
+    limites = np.unique(np.concatenate([ciclos, np.array(cambios, dtype=np.int64)]))
+    limites = limites[(limites >= ciclos[0]) & (limites <= ciclos[-1])]
+
+    codigos = calendario.codigos(fechas)
+    tramo = np.searchsorted(limites, t_ns, side="right") - 1
+    usar = validas & (codigos >= 0)
+    presentes, tramo_idx = np.unique(tramo[usar], return_inverse=True)
+    n_bloques = len(calendario.bloques)
+    muestras = np.bincount(tramo_idx, minlength=len(presentes))
+
+    inicio_ns, fin_ns = limites[presentes], limites[presentes + 1]
+    duracion = (fin_ns - inicio_ns).astype(np.float64)
+    ciclo_idx = np.searchsorted(ciclos, inicio_ns, side="right") - 1
+    duracion_ciclo = (ciclos[ciclo_idx + 1] - ciclos[ciclo_idx]).astype(np.float64)
+    return _Tramos(
+        bloques=tuple(calendario.bloques),
+        usar=usar,
+        tramo_idx=tramo_idx,
+        clave=tramo_idx * n_bloques + codigos[usar],
+        ciclos=ciclos,
+        ciclo_idx=ciclo_idx,
+        inicio_ns=inicio_ns,
+        fin_ns=fin_ns,
+        duracion=duracion,
+        fraccion=duracion / duracion_ciclo,
+        cobertura=np.minimum(muestras * paso / duracion, 1.0),
+        muestras=muestras,
+    )
+
+
+def _periodo(tabla, fecha):
+    """Periodo tarifario vigente en `fecha`, o None."""
+    try:
+        return tabla.por_fecha(fecha)
+    except KeyError:
+        return None
+
+
+@instrumentar
+def facturar(
+    df: pd.DataFrame,
+    tarifas=("BTD", "BTH", "MTD", "MTH"),
+    *,
+    tipo_energia: str = "E.Activa III T",
+    tipo_demanda: str = "DMAX_15min",
+    col_reactiva: str = "E.Reactiva III M",
+    dia_corte: int = 1,
+    distribuidora=None,
+) -> dict:
+    """
+    Factura la medición por tramos (ciclo de facturación × periodo tarifario).
+
+    Cada tramo es la parte de un ciclo (del día `dia_corte` de un mes al del
+    siguiente) vigente bajo un mismo periodo tarifario. Para cada tramo con
+    datos:
+      • el consumo por bloque medido (0 si el saldo del bloque es
+        exportador) se extrapola a toda la duración del tramo según su
+        cobertura (muestras × paso / duración);
+      • la demanda máxima por bloque es la máxima medida en el tramo (0 si
+        solo hay exportación);
+      • el FP es cos(atan(kVArh / kWh)) del tramo.
+    Cada tramo se valora como un ciclo completo equivalente (consumo /
+    fracción del ciclo, para aplicar bien los escalones) y los cargos se
+    prorratean por la fracción del ciclo que ocupa.
+
+    Returns:
+        dict con:
+          • "tramos": DataFrame con una fila por tramo (ciclo, periodo,
+            inicio, fin, días, fracción del ciclo, cobertura, consumo y
+            demanda máxima por bloque, FP).
+          • "cargos": DataFrame indexado por (ciclo, periodo, tarifa) con
+            cargo_energia, cargo_demanda, cargo_fp y total.
+          • "por_ciclo": totales por (ciclo, tarifa).
+          • "sin_tarifa": tramos sin periodo tarifario vigente (no valorados).
+    """
+    if not 1 <= dia_corte <= 28:
+        raise ValueError("dia_corte debe estar entre 1 y 28")
+    for col in ("Fecha/hora", tipo_energia, tipo_demanda, col_reactiva):
+        if col not in df.columns:
+            raise KeyError(f"{col} no existe")
+
+    dist = resolver_distribuidora(distribuidora)
+    tabla = cargar_tarifas(dist.tarifas)
+    seg = _segmentar(df, dia_corte, dist.calendario, tabla)
+    bloques, n_tramos, tramo_idx = seg.bloques, seg.n_tramos, seg.tramo_idx
+    ciclos, ciclo_idx, inicio_ns, fin_ns = seg.ciclos, seg.ciclo_idx, seg.inicio_ns, seg.fin_ns
+    duracion, fraccion, cobertura, muestras = seg.duracion, seg.fraccion, seg.cobertura, seg.muestras
+
+    energia = np.nan_to_num(seg.columna(df, tipo_energia))
+    reactiva = np.nan_to_num(seg.columna(df, col_reactiva))
+    demanda = seg.columna(df, tipo_demanda)
+
+    # Energía neta: un bloque donde el sitio exporta más de lo que importa
+    # no factura consumo (ni cargos negativos); la exportación se liquida
+    # aparte (`bidireccional.liquidacion_neta`).
+    energia_tb = np.maximum(seg.por_bloque(energia), 0.0)
+    dmax_tb = np.maximum(seg.maximo_por_bloque(demanda), 0.0)
+    kwh_t = energia_tb.sum(axis=1)
+    kvarh_t = np.bincount(tramo_idx, weights=reactiva, minlength=n_tramos)
+    consumo_tb = energia_tb / cobertura[:, None]
+
+    filas, cargos, sin_tarifa = [], [], []
+    for i in range(n_tramos):
+        ciclo = pd.Timestamp(ciclos[ciclo_idx[i]]).date()
+        inicio = pd.Timestamp(inicio_ns[i])
+        periodo = _periodo(tabla, inicio)
+        fp = math.cos(math.atan(kvarh_t[i] / kwh_t[i])) if kwh_t[i] else float("nan")
+        fila = {
+            "ciclo": ciclo,
+            "periodo": periodo.clave if periodo else None,
+            "inicio": inicio,
+            "fin": pd.Timestamp(fin_ns[i]),
+            "dias": duracion[i] / _NS_DIA,
+            "fraccion_ciclo": fraccion[i],
+            "cobertura": cobertura[i],
+            "muestras": int(muestras[i]),
+            "fp": fp,
+        }
+        fila.update({f"consumo_{b}": consumo_tb[i, j] for j, b in enumerate(bloques)})
+        fila.update({f"dmax_{b}": dmax_tb[i, j] for j, b in enumerate(bloques)})
+        filas.append(fila)
+
+        if periodo is None:
+            sin_tarifa.append(fila)
+            continue
+        consumo_ciclo = {b: consumo_tb[i, j] / fraccion[i] for j, b in enumerate(bloques)}
+        dmax_bloq = {b: dmax_tb[i, j] for j, b in enumerate(bloques)}
+        fp_cargo = fp if not math.isnan(fp) else 1.0
+        for tarifa in tarifas:
+            res = calcular_tarifa(tarifa, consumo_ciclo, dmax_bloq, fp_cargo, periodo, dist)
+            cargos.append(
+                {
+                    "ciclo": ciclo,
+                    "periodo": periodo.clave,
+                    "tarifa": tarifa,
+                    **{k: round(v * fraccion[i], 2) for k, v in res.items()},
+                }
+            )
+
+    columnas_cargo = ["cargo_energia", "cargo_demanda", "cargo_fp", "total"]
+    tabla_cargos = pd.DataFrame(cargos, columns=["ciclo", "periodo", "tarifa", *columnas_cargo])
+    por_ciclo = tabla_cargos.groupby(["ciclo", "tarifa"], sort=True)[columnas_cargo].sum()
+    return {
+        "tramos": pd.DataFrame(filas),
+        "cargos": tabla_cargos.set_index(["ciclo", "periodo", "tarifa"]),
+        "por_ciclo": por_ciclo,
+        "sin_tarifa": pd.DataFrame(sin_tarifa),
+    }
@@ -0,0 +1,145 @@
+"""
+Comparador con histéresis sobre varias columnas a la vez (fases de tensión,
+corrientes, frecuencia...): una sola pasada NumPy sobre un array (n × k)
+con umbrales de activación y desactivación por columna, en lugar de un
+bucle de Python y dos Series booleanas por columna y umbral.
+
+Para cada columna, el estado pasa a activo al superar `activar` ('alto') o
+bajar de él ('bajo') y vuelve a inactivo al cruzar `desactivar`; entre
+ambos se mantiene el último (empezando inactivo). Los eventos siguen el
+formato de `metrics._fusionar_eventos`: fin en la primera muestra
+inactiva (o la última de la serie si sigue activo), fusión de eventos
+separados como mucho `max_diff` y valor extremo en [inicio, fin].
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+_SENTIDOS = ("alto", "bajo")
+
+
+def _por_columna(valor, k: int, nombre: str) -> np.ndarray:
+    try:
+        return np.broadcast_to(np.asarray(valor), (k,))
+    except ValueError:
+        raise ValueError(f"`{nombre}` debe ser un valor o uno por columna ({k})") from None
+
+
+def biestable(enciende: np.ndarray, apaga: np.ndarray) -> np.ndarray:
+    """
+    Biestable vectorizado (por columnas si son 2-D): True desde cada
+    `enciende` hasta el siguiente `apaga`; cada muestra toma el estado del
+    último cambio (inactivo antes del primero).
+    """
+    indices = np.arange(len(enciende)).reshape((-1,) + (1,) * (enciende.ndim - 1))
+    ultimo = np.where(enciende | apaga, indices, -1)
+    np.maximum.accumulate(ultimo, axis=0, out=ultimo)
+    return np.take_along_axis(enciende, ultimo.clip(min=0), axis=0) & (ultimo >= 0)
+
+
+def estado_histeresis(valores, activar, desactivar, *, sentido="alto") -> np.ndarray:
+    """
+    Estado (n × k, bool) del comparador con histéresis de cada columna de
+    `valores`. `activar`, `desactivar` y `sentido` ('alto' o 'bajo') son
+    un valor común o uno por columna. Los NaN mantienen el estado.
+    """
+    valores = np.asarray(valores, dtype=float)
+    if valores.ndim == 1:
+        valores = valores[:, None]
+    n, k = valores.shape
+    activar = _por_columna(activar, k, "activar").astype(float)
+    desactivar = _por_columna(desactivar, k, "desactivar").astype(float)
+    sentido = _por_columna(sentido, k, "sentido")
+    if not np.isin(sentido, _SENTIDOS).all():
+        raise ValueError(f"`sentido` debe ser uno de {_SENTIDOS}")
+
+    alto = sentido == "alto"
+    with np.errstate(invalid="ignore"):
+        enciende = np.where(alto, valores > activar, valores < activar)
+        apaga = np.where(alto, valores < desactivar, valores > desactivar)
+
+    return biestable(enciende, apaga)
+
+
+def eventos_histeresis(
+    indice: pd.DatetimeIndex,
+    valores,
+    activar,
+    desactivar,
+    *,
+    sentido="alto",
+    max_diff: pd.Timedelta | None = None,
+    valido=None,
+) -> list[list[dict]]:
+    """
+    Eventos de cada columna de `valores` (n × k) indexada por `indice`
+    (ordenado): una lista por columna de dicts con inicio, fin, duracion y
+    valor_maximo/fecha_valor_maximo ('alto') o valor_minimo/
+    fecha_valor_minimo ('bajo'). `valido` (n × k o n, bool) anula el estado
+    donde es False, después del comparador.
+
+    Una misma serie puede aparecer en varias columnas (p. ej. con sentido
+    'alto' y 'bajo') para evaluarlas todas en la misma pasada.
+    """
+    valores = np.asarray(valores, dtype=float)
+    if valores.ndim == 1:
+        valores = valores[:, None]
+    n, k = valores.shape
+    if n == 0:
+        return [[] for _ in range(k)]
+    sentido = _por_columna(sentido, k, "sentido")
+    estado = estado_histeresis(valores, activar, desactivar, sentido=sentido)
+    if valido is not None:
+        valido = np.asarray(valido, dtype=bool)
+        estado &= valido if valido.ndim == 2 else valido[:, None]
+
+    # Flancos por columna (ordenados por columna y luego por muestra).
+    bordes = np.zeros((k, n + 2), dtype=np.int8)
+    bordes[:, 1:-1] = estado.T
+    cambios = np.diff(bordes, axis=1)
+    columna, inicio = np.nonzero(cambios == 1)
+    _, fin = np.nonzero(cambios == -1)
+    fin = np.minimum(fin, n - 1)
+
+    # Fusión de eventos de la misma columna separados como mucho max_diff.
+    tiempos = indice.to_numpy()
+    nuevo = np.ones(len(inicio), dtype=bool)
+    if max_diff is not None and len(inicio) > 1:
+        hueco = tiempos[inicio[1:]] - tiempos[fin[:-1]]
+        nuevo[1:] = (columna[1:] != columna[:-1]) | (hueco > np.timedelta64(pd.Timedelta(max_diff)))
+    ultimo = np.r_[nuevo[1:], True] if len(nuevo) else nuevo
+    columna, inicio, fin = columna[nuevo], inicio[nuevo], fin[ultimo]
+
+    # Extremo de cada evento en [inicio, fin] sobre los valores aplanados
+    # por columna (ignorando NaN, como Series.max/min).
+    plano = np.r_[valores.T.ravel(), np.nan]
+    desde, hasta = inicio + columna * n, fin + columna * n + 1
+    alto = sentido[columna] == "alto"
+    extremo = np.empty(len(inicio))
+    if len(inicio):
+        tramos = np.column_stack([desde, hasta]).ravel()
+        with np.errstate(invalid="ignore"):
+            extremo = np.where(alto, np.fmax.reduceat(plano, tramos)[::2], np.fmin.reduceat(plano, tramos)[::2])
+
+    # Primera muestra de cada evento con el valor extremo.
+    comienzos = np.bincount(desde, minlength=len(plano))
+    dentro = np.cumsum(comienzos - np.bincount(hasta, minlength=len(plano) + 1)[:-1]) > 0
+    evento = np.cumsum(comienzos) - 1
+    coincide = (dentro & (plano == extremo[evento.clip(min=0)])) if len(inicio) else dentro
+    encontrados, primera = np.unique(evento[coincide], return_index=True)
+    posicion = np.full(len(inicio), -1)
+    posicion[encontrados] = np.flatnonzero(coincide)[primera] - columna[encontrados] * n
+
+    inicios, fines = indice[inicio], indice[fin]
+    eventos = [[] for _ in range(k)]
+    for c, a, b, d, alto_i, valor, p, fecha in zip(
+        columna, inicios, fines, fines - inicios, alto, extremo, posicion, indice[posicion.clip(min=0)]
+    ):
+        clave = "maximo" if alto_i else "minimo"
+        eventos[c].append({
+            "inicio": a, "fin": b, "duracion": d,
+            f"valor_{clave}": valor, f"fecha_valor_{clave}": fecha if p >= 0 else None,
+        })
+    return eventos
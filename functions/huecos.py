@@ -0,0 +1,256 @@
+"""
+Huecos de tensión, sobretensiones e interrupciones en las tres tensiones de
+fase, con su tensión residual y duración, clasificados según la curva
+ITIC (CBEMA) y las tablas de EN 50160.
+
+Detección polifásica (IEC 61000-4-30): un hueco empieza cuando alguna fase
+baja de `umbral_hueco` (% de la tensión de referencia) y termina cuando
+todas superan el umbral más la histéresis; es una interrupción si en algún
+momento todas las fases están por debajo de `umbral_interrupcion`. Las
+sobretensiones, igual por encima de `umbral_sobretension`.
+
+El MYeBOX registra valores agregados por intervalo, así que se usan sus
+columnas mín./máx. por fase si están (y si no, las medias). La duración de
+un evento más corto que el intervalo se estima con la media cuadrática del
+intervalo, suponiendo un evento rectangular a la tensión extrema sobre la
+tensión previa al evento:
+
+    d = T · (U_previa² − U_media²) / (U_previa² − U_min²)
+
+Todo se calcula con codificación por tramos (run-length) sobre arrays
+NumPy, sin recorrer muestras ni eventos en Python.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from . import visualize
+from .histeresis import biestable
+from .instrumentacion import instrumentar
+from .metrics import _get_image_path, _marco_temporal
+
+_FASES = ("L1", "L2", "L3")
+
+# Curva ITIC (CBEMA): (duración máxima en s, tensión en % de la nominal) de
+# cada tramo. Por encima de la superior, región prohibida; por debajo de la
+# inferior, región sin daños (el equipo puede dejar de funcionar).
+ITIC_SUPERIOR = ((0.001, 200.0), (0.003, 140.0), (0.5, 120.0), (np.inf, 110.0))
+ITIC_INFERIOR = ((0.02, 0.0), (0.5, 70.0), (10.0, 80.0), (np.inf, 90.0))
+
+# Tablas de EN 50160 (clasificación de huecos y sobretensiones por tensión
+# residual y duración), con una columna más para eventos de más de 1 min.
+_DURACIONES_HUECO = [0.0, 0.2, 0.5, 1.0, 5.0, 60.0, np.inf]
+_ETIQUETAS_DURACION_HUECO = ["10–200 ms", "200–500 ms", "0,5–1 s", "1–5 s", "5–60 s", "> 60 s"]
+_RESIDUALES_HUECO = [0.0, 5.0, 40.0, 70.0, 80.0, 90.0]
+_ETIQUETAS_RESIDUAL_HUECO = ["< 5 %", "5–40 %", "40–70 %", "70–80 %", "80–90 %"]
+_DURACIONES_SOBRE = [0.0, 0.5, 5.0, 60.0, np.inf]
+_ETIQUETAS_DURACION_SOBRE = ["10–500 ms", "0,5–5 s", "5–60 s", "> 60 s"]
+_TENSIONES_SOBRE = [0.0, 120.0, np.inf]
+_ETIQUETAS_TENSION_SOBRE = ["110–120 %", "≥ 120 %"]
+
+
+def _limite_itic(curva, duracion: np.ndarray) -> np.ndarray:
+    """Tensión (%) de la curva para cada duración (s)."""
+    maximos = np.array([t for t, _ in curva])
+    tensiones = np.array([u for _, u in curva])
+    return tensiones[np.searchsorted(maximos, duracion, side="left").clip(max=len(curva) - 1)]
+
+
+def clasificar_itic(tension: np.ndarray, duracion: np.ndarray) -> np.ndarray:
+    """
+    Región ITIC de cada evento según su tensión extrema (% de la nominal)
+    y duración (s): 'prohibida', 'sin_danos' o 'aceptable'.
+    """
+    tension = np.asarray(tension, dtype=float)
+    duracion = np.asarray(duracion, dtype=float)
+    return np.select(
+        [tension > _limite_itic(ITIC_SUPERIOR, duracion), tension < _limite_itic(ITIC_INFERIOR, duracion)],
+        ["prohibida", "sin_danos"],
+        "aceptable",
+    )
+
+
+def _tramos(estado: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Inicios y fines (exclusivos) de los tramos True."""
+    cambios = np.diff(np.concatenate(([0], estado.view(np.int8), [0])))
+    return np.flatnonzero(cambios == 1), np.flatnonzero(cambios == -1)
+
+
+def _por_evento(ufunc, valores: np.ndarray, estado: np.ndarray, inicios: np.ndarray, neutro) -> np.ndarray:
+    """`ufunc.reduceat` de `valores` sobre las muestras de cada evento."""
+    if not len(inicios):
+        return np.empty(0, dtype=np.result_type(valores, type(neutro)))
+    return ufunc.reduceat(np.where(estado, valores, neutro), inicios)
+
+
+def _detectar(
+    tipo: str,
+    extremo: np.ndarray,
+    media: np.ndarray,
+    afectada: np.ndarray,
+    sale: np.ndarray,
+    intervalo_s: float,
+    fechas: np.ndarray,
+) -> tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Eventos de un tipo: `extremo` y `media` son (n × 3) en % de la
+    referencia; `afectada` (n × 3), las fases fuera de umbral, y `sale`,
+    la condición de fin por muestra.
+    Devuelve también el estado por muestra y los inicios de los eventos.
+    """
+    hueco = tipo == "hueco"
+    estado = biestable(afectada.any(axis=1), sale)
+    inicios, fines = _tramos(estado)
+    evento = np.cumsum(np.isin(np.arange(len(estado)), inicios)) - 1
+
+    # Tensión extrema del evento, muestra y fase en que se da.
+    signo = 1.0 if hueco else -1.0
+    relleno = np.where(np.isnan(extremo), np.inf, signo * extremo)
+    peor = relleno.min(axis=1)
+    por_muestra = signo * peor
+    valor = np.where(estado, peor, np.inf)
+    muestras = np.flatnonzero(estado)
+    orden = muestras[np.lexsort((valor[muestras], evento[muestras]))]
+    muestra_extremo = orden[np.r_[0, np.flatnonzero(np.diff(evento[orden])) + 1]] if len(orden) else orden
+    tension = por_muestra[muestra_extremo]
+    fase = np.array(_FASES)[relleno[muestra_extremo].argmin(axis=1)]
+
+    # Duración: fracción de cada intervalo en evento (la mayor de las
+    # fases fuera de umbral), con la tensión previa al evento como referencia.
+    previa = media[(inicios - 1).clip(min=0)]
+    previa = np.where((inicios > 0)[:, None] & ~np.isnan(previa), previa, 100.0)
+    previa = previa[evento.clip(min=0)] ** 2 if len(inicios) else np.full_like(media, 1e4)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraccion = (previa - media ** 2) / (previa - extremo ** 2)
+    fraccion = np.where(afectada, np.where(np.isfinite(fraccion), fraccion, 1.0).clip(0, 1), 0.0).max(axis=1)
+    duracion = _por_evento(np.add, fraccion * intervalo_s, estado, inicios, 0.0).clip(min=0.01)
+
+    paso = np.timedelta64(int(round(intervalo_s * 1e9)), "ns")
+    eventos = pd.DataFrame({
+        "tipo": tipo,
+        "inicio": pd.DatetimeIndex(fechas[inicios]),
+        "fin": pd.DatetimeIndex(fechas[fines - 1] + paso),
+        "duracion_s": duracion,
+        "tension_pct": tension,
+        "fase": fase.astype(object),
+        "fecha_extremo": pd.DatetimeIndex(fechas[muestra_extremo]),
+    })
+    return eventos, estado, inicios
+
+
+def _tabla(eventos: pd.DataFrame, bordes_tension, filas, bordes_duracion, columnas) -> pd.DataFrame:
+    """
+    Número de eventos por intervalo de tensión ([a, b)) y de duración
+    ((a, b]), con las tensiones de mayor a menor.
+    """
+    i = np.digitize(eventos["tension_pct"].to_numpy(), bordes_tension[1:-1])
+    j = np.digitize(eventos["duracion_s"].to_numpy(), bordes_duracion[1:-1], right=True)
+    conteo = np.zeros((len(filas), len(columnas)), dtype=np.int64)
+    np.add.at(conteo, (i, j), 1)
+    return pd.DataFrame(
+        conteo[::-1],
+        index=pd.Index(filas[::-1], name="tension"),
+        columns=pd.Index(columnas, name="duracion"),
+    )
+
+
+@instrumentar
+def eventos_de_tension(
+    df: pd.DataFrame,
+    tension_referencia: float | None = None,
+    *,
+    umbral_hueco: float = 90.0,
+    umbral_sobretension: float = 110.0,
+    umbral_interrupcion: float = 5.0,
+    histeresis: float = 2.0,
+    graficar: bool = False,
+) -> dict:
+    """
+    Huecos, interrupciones y sobretensiones en 'Tensión L1/L2/L3'.
+
+    `tension_referencia` es la tensión fase-neutro declarada (por defecto,
+    la mediana de las medias de fase); umbrales e histéresis van en % de
+    ella. Devuelve:
+
+    - eventos: DataFrame con tipo ('hueco', 'interrupcion' o
+      'sobretension'), inicio, fin, duracion_s (estimada), tension_pct
+      (residual en huecos, máxima en sobretensiones), fase, fecha_extremo
+      e itic (región de la curva ITIC).
+    - resumen: número de eventos de cada tipo y por región ITIC.
+    - tabla_huecos / tabla_sobretensiones: número de eventos por tensión y
+      duración según las tablas de EN 50160.
+    """
+    medias = [f"Tensión {f}" for f in _FASES]
+    minimos = [f"Tensión mín. {f}" for f in _FASES]
+    maximos = [f"Tensión máx. {f}" for f in _FASES]
+    marco = _marco_temporal(df, medias + minimos + maximos)
+    if not all(c in marco.columns for c in medias):
+        raise KeyError(f"Faltan columnas de tensión de fase: {[c for c in medias if c not in marco.columns]}")
+
+    media = marco[medias].to_numpy(dtype=float)
+    if tension_referencia is None:
+        tension_referencia = float(np.nanmedian(media))
+    con_extremos = all(c in marco.columns for c in minimos + maximos)
+    escala = 100.0 / tension_referencia
+    media = media * escala
+    minimo = marco[minimos].to_numpy(dtype=float) * escala if con_extremos else media
+    maximo = marco[maximos].to_numpy(dtype=float) * escala if con_extremos else media
+
+    fechas = marco.index.to_numpy()
+    pasos = np.diff(fechas).astype("timedelta64[ns]").astype(np.int64)
+    intervalo_s = float(np.median(pasos)) / 1e9 if len(pasos) else 60.0
+
+    with np.errstate(invalid="ignore"):
+        huecos, estado, inicios = _detectar(
+            "hueco", minimo, media,
+            afectada=minimo < umbral_hueco,
+            sale=(minimo >= umbral_hueco + histeresis).all(axis=1),
+            intervalo_s=intervalo_s, fechas=fechas,
+        )
+        sobre, _, _ = _detectar(
+            "sobretension", maximo, media,
+            afectada=maximo > umbral_sobretension,
+            sale=(maximo <= umbral_sobretension - histeresis).all(axis=1),
+            intervalo_s=intervalo_s, fechas=fechas,
+        )
+        # Interrupción: en algún momento del hueco, todas las fases bajo el umbral.
+        todas_bajo = (minimo < umbral_interrupcion).all(axis=1)
+    interrumpe = _por_evento(np.logical_or, todas_bajo, estado, inicios, False)
+    huecos.loc[interrumpe, "tipo"] = "interrupcion"
+
+    eventos = pd.concat([huecos, sobre], ignore_index=True).sort_values("inicio", kind="stable").reset_index(drop=True)
+    eventos["itic"] = clasificar_itic(eventos["tension_pct"].to_numpy(), eventos["duracion_s"].to_numpy())
+
+    bajos = eventos[eventos["tipo"] != "sobretension"]
+    altos = eventos[eventos["tipo"] == "sobretension"]
+    tabla_huecos = _tabla(
+        bajos, _RESIDUALES_HUECO, _ETIQUETAS_RESIDUAL_HUECO, _DURACIONES_HUECO, _ETIQUETAS_DURACION_HUECO
+    )
+    tabla_sobre = _tabla(
+        altos, _TENSIONES_SOBRE, _ETIQUETAS_TENSION_SOBRE, _DURACIONES_SOBRE, _ETIQUETAS_DURACION_SOBRE
+    )
+
+    resultado = {
+        "tension_referencia": tension_referencia,
+        "intervalo": pd.Timedelta(seconds=intervalo_s),
+        "con_extremos": con_extremos,
+        "eventos": eventos,
+        "resumen": {
+            "huecos": int((eventos["tipo"] == "hueco").sum()),
+            "interrupciones": int((eventos["tipo"] == "interrupcion").sum()),
+            "sobretensiones": int((eventos["tipo"] == "sobretension").sum()),
+            "itic": {r: int((eventos["itic"] == r).sum()) for r in ("aceptable", "sin_danos", "prohibida")},
+        },
+        "tabla_huecos": tabla_huecos,
+        "tabla_sobretensiones": tabla_sobre,
+        "graficos_paths": {},
+    }
+
+    if graficar:
+        ruta = _get_image_path("curva_itic")
+        visualize.graficar_itic(eventos, ITIC_SUPERIOR, ITIC_INFERIOR, guardar=True, ruta=ruta)
+        resultado["graficos_paths"]["itic"] = ruta
+
+    return resultado
@@ -0,0 +1,618 @@
+"""
+Informe eléctrico como pipeline de etapas con caché (`functions.pipeline`):
+
+    carga → division → derivadas → demanda → metricas → tarifas → graficos → impresion
+                                       └→ piramide
+
+Cada etapa declara los parámetros de configuración que usa, así que al
+repetir el informe cambiando, p. ej., las tarifas solo se recalculan las
+etapas de tarifas en adelante; cambiar `extended_report` recalcula desde la
+carga (cambian las columnas leídas). Las métricas y las tarifas incluyen en
+su clave la huella del JSON de la distribuidora (y las tarifas, la de sus
+tablas), así que editarlos también las recalcula. La etapa `piramide` deja en la caché
+los agregados por 1 min/15 min/1 h/1 día de la campaña (`PiramideAgregados`)
+para gráficos y consultas posteriores sin releer las muestras.
+
+Con `politica_dtype='compacta'` las magnitudes instantáneas se cargan en
+float32 (la mitad de memoria); `verificar_politica_dtype` comprueba que las
+cifras del informe no se desvían de las de float64 más de una tolerancia.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .bidireccional import COL_EXPORTADA, COL_IMPORTADA, demanda_bidireccional, facturar_importacion, liquidacion_neta
+from .columnas import filtro_columnas
+from .distribuidoras import resolver_distribuidora, seleccionar_distribuidora
+from .facturacion import facturar
+from .io import cargar_datos
+from .lagunas import indice_lagunas
+from .metrics import (
+    analisis_de_apagones,
+    analizar_comparacion_tarifas,
+    analizar_demanda,
+    analizar_energia,
+    calcular_sumatoria_energia,
+    corriente,
+    factor_potencia,
+    frecuencia,
+    potencia_activa,
+    potencia_aparente,
+    potencia_capacitiva,
+    potencia_inductiva,
+    potencia_reactiva,
+    procesar_demanda_maxima,
+    voltaje,
+)
+from .paralelo import Tarea, ejecutar_tareas
+from .pipeline import Etapa, Pipeline, huella_fichero
+from .piramide import PiramideAgregados
+from .preprocess import dividir_dataframe, sub_dividir_dataframe
+from .tablas_tarifas import directorio_tarifas
+from .tariffs import calcular_tarifa, periodo_por_defecto
+
+
+# ---- etapas -----------------------------------------------------------------
+
+
+def _carga(*, archivo, extended_report, politica_dtype):
+    # Sin informe extendido no se usan armónicos ni columnas mín./máx.: no se leen.
+    columnas = None if extended_report else filtro_columnas(armonicos=False, extremos=False)
+    return cargar_datos(archivo, columnas=columnas, politica_dtype=politica_dtype)
+
+
+def _division(carga, *, politica_dtype):
+    df, df_arm = dividir_dataframe(carga, politica_dtype=politica_dtype)
+    return {"df": df, "df_arm": df_arm}
+
+
+def _derivadas(division):
+    df = division["df"]
+    sub_dividir_dataframe(df)
+    return df
+
+
+def _demanda(derivadas, *, graficar):
+    df, dmax_fila = procesar_demanda_maxima(derivadas, graficar=graficar)
+    return {"df": df, "dmax_fila": dmax_fila}
+
+
+def _piramide(demanda):
+    return PiramideAgregados.construir(demanda["df"])
+
+
+def _metricas(demanda, *, extended_report, volt_linea, volt_fase, tipo_energia, tipo_demanda, distribuidora, graficar, procesos):
+    # Análisis independientes entre sí: se reparten en un pool de procesos que
+    # comparten las columnas de `df` en memoria compartida.
+    extendido = {"extended_report": extended_report}
+    df = demanda["df"]
+    # Índice de lagunas calculado una vez (o el que dejó `procesar_demanda_maxima`
+    # en `df.attrs`) y compartido con las tareas que lo usan.
+    lagunas = indice_lagunas(df)
+    metricas = ejecutar_tareas(df, [
+        Tarea("voltaje", voltaje, {"voltaje_referencia_ll": volt_linea, "voltaje_referencia_ln": volt_fase, **extendido, "graficar": graficar}),
+        Tarea("corriente", corriente, {**extendido, "graficar": graficar}),
+        Tarea("frecuencia", frecuencia, {"graficar": graficar}),
+        Tarea("factor_potencia", factor_potencia, {"graficar": graficar}),
+        Tarea("potencia_activa", potencia_activa, {**extendido, "graficar": graficar}),
+        Tarea("potencia_reactiva", potencia_reactiva, {**extendido, "graficar": graficar}),
+        Tarea("potencia_aparente", potencia_aparente, {**extendido, "graficar": False}),
+        Tarea("potencia_inductiva", potencia_inductiva, {**extendido, "graficar": graficar}),
+        Tarea("potencia_capacitiva", potencia_capacitiva, {**extendido, "graficar": graficar}),
+        Tarea("apagones", analisis_de_apagones, {"graficar": graficar, "lagunas": lagunas}),
+        Tarea("energia", analizar_energia, {"tipo_energia": tipo_energia, "graficar": graficar, "lagunas": lagunas}),
+        Tarea("demanda", analizar_demanda, {"tipo_demanda": tipo_demanda, "graficar": graficar}),
+    ], procesos=procesos)
+    # Intervalo medido, para identificar la campaña (p. ej. en `AlmacenResultados`).
+    metricas["medicion"] = {"inicio": df["Fecha/hora"].min(), "fin": df["Fecha/hora"].max(), "muestras": len(df)}
+    # Cobertura de datos: lagunas sin registros y fracción con datos por día.
+    metricas["continuidad"] = lagunas.resumen()
+    return metricas
+
+
+def _tarifas(demanda, metricas, *, tarifas, periodos, dia_corte, tipo_energia, tipo_demanda, distribuidora):
+    df = demanda["df"]
+    dist = resolver_distribuidora(distribuidora)
+    aviso_periodo = None
+    if periodos is None:
+        # Periodo vigente al final de la medición; si las tablas aún no lo
+        # cubren, el más cercano, con aviso en el informe.
+        periodo, aviso_periodo = periodo_por_defecto(df["Fecha/hora"].max(), dist)
+        periodos = [periodo.clave]
+
+    fp_mensual = metricas["factor_potencia"]["fp_mensual_calculado"]
+    consumo_bloques = metricas["energia"]["consumo_extrapolado_por_bloque"]
+    dmax_bloques = {k: v["valor"] for k, v in metricas["demanda"]["demanda_maxima_por_bloque"].items()}
+    # Si el sitio exporta energía a la red, la distribuidora factura la
+    # energía y la demanda importadas, no el saldo neto (que puede ser
+    # negativo): así coinciden la comparación, la facturación por ciclo y el
+    # 'sin medición neta' de la liquidación neta.
+    exporta = COL_EXPORTADA in df.columns and bool((df[COL_EXPORTADA] > 0).any())
+    if exporta:
+        importada = pd.DataFrame({
+            "Fecha/hora": df["Fecha/hora"],
+            "importada": df[COL_IMPORTADA].clip(lower=0).fillna(0) / 60,
+        })
+        _, _, _, consumo_bloques = calcular_sumatoria_energia(importada, "importada", lagunas=indice_lagunas(df))
+        demanda_importada = demanda_bidireccional(df, distribuidora=dist)["importada"]["por_bloque"]
+        dmax_bloques = {k: v["valor"] for k, v in demanda_importada.items()}
+    resultados = {
+        periodo: {
+            tarifa: calcular_tarifa(tarifa, consumo_bloques, dmax_bloques, fp_mensual, periodo, dist)
+            for tarifa in tarifas
+        }
+        for periodo in periodos
+    }
+    # Facturación por ciclo y periodo tarifario vigente en cada tramo de la
+    # medición; medición neta solo si el sitio exporta.
+    if exporta:
+        facturacion = facturar_importacion(df, tarifas, dia_corte=dia_corte, distribuidora=dist)
+        medicion_neta = liquidacion_neta(df, tarifas, dia_corte=dia_corte, distribuidora=dist)
+    else:
+        facturacion = facturar(
+            df, tarifas, tipo_energia=tipo_energia, tipo_demanda=tipo_demanda, dia_corte=dia_corte, distribuidora=dist
+        )
+        medicion_neta = None
+    return {
+        "resultados": resultados,
+        "facturacion": facturacion,
+        "medicion_neta": medicion_neta,
+        "aviso_periodo": aviso_periodo,
+    }
+
+
+def _graficos(tarifas):
+    return analizar_comparacion_tarifas(tarifas["resultados"], graficar=True)
+
+
+def _impresion(metricas, tarifas, graficos, *, titulo):
+    imprimir_informe(
+        titulo,
+        metricas,
+        tarifas["resultados"],
+        tarifas["facturacion"],
+        tarifas.get("medicion_neta"),
+        aviso_periodo=tarifas.get("aviso_periodo"),
+    )
+
+
+def _huella_datos(parametros: dict) -> str:
+    return huella_fichero(parametros["archivo"])
+
+
+def _huella_distribuidora(parametros: dict) -> str:
+    dist = resolver_distribuidora(parametros["distribuidora"])
+    return huella_fichero(dist.origen) if dist.origen else dist.clave
+
+
+def _huella_tarifas(parametros: dict) -> str:
+    dist = resolver_distribuidora(parametros["distribuidora"])
+    ficheros = sorted(directorio_tarifas(dist.tarifas).glob("*.json"))
+    return "|".join([_huella_distribuidora(parametros), *(huella_fichero(f) for f in ficheros)])
+
+
+ETAPAS_INFORME = [
+    Etapa("carga", _carga, parametros=("archivo", "extended_report", "politica_dtype"), huella=_huella_datos),
+    Etapa("division", _division, entradas=("carga",), parametros=("politica_dtype",)),
+    Etapa("derivadas", _derivadas, entradas=("division",)),
+    Etapa("demanda", _demanda, entradas=("derivadas",), parametros=("graficar",)),
+    Etapa("piramide", _piramide, entradas=("demanda",)),
+    Etapa(
+        "metricas",
+        _metricas,
+        entradas=("demanda",),
+        parametros=("extended_report", "volt_linea", "volt_fase", "tipo_energia", "tipo_demanda", "distribuidora", "graficar"),
+        opciones=("procesos",),
+        huella=_huella_distribuidora,
+    ),
+    Etapa(
+        "tarifas",
+        _tarifas,
+        entradas=("demanda", "metricas"),
+        parametros=("tarifas", "periodos", "dia_corte", "tipo_energia", "tipo_demanda", "distribuidora"),
+        huella=_huella_tarifas,
+    ),
+    Etapa("graficos", _graficos, entradas=("tarifas",)),
+    Etapa("impresion", _impresion, entradas=("metricas", "tarifas", "graficos"), parametros=("titulo",), cache=False),
+]
+
+
+def ejecutar_informe(
+    archivo: str,
+    *,
+    titulo: str,
+    distribuidora: str = "edemet",
+    extended_report: bool = False,
+    tipo_energia: str = "E.Activa III T",
+    tipo_demanda: str = "DMAX_15min",
+    tarifas=("BTD", "BTH", "MTD", "MTH"),
+    periodos=None,
+    dia_corte: int = 1,
+    volt_linea: float = 480,
+    volt_fase: float | None = None,
+    politica_dtype: str = "exacta",
+    procesos: int | None = None,
+    dir_cache: str | Path | None = ".cache_informe",
+) -> dict:
+    """
+    Genera el informe de `archivo` (gráficos en `images/` y texto por
+    pantalla) reutilizando las etapas en caché cuyos parámetros y entradas
+    no han cambiado. Con `dir_cache=None` se calcula todo sin caché.
+    `politica_dtype` es la de `cargar_datos` ('exacta' o 'compacta').
+
+    Returns:
+        dict con la salida de cada etapa resuelta y, en "_estado", si cada
+        una salió de la caché o se calculó.
+    """
+    seleccionar_distribuidora(distribuidora)
+    parametros = _parametros(
+        archivo,
+        titulo=titulo,
+        distribuidora=distribuidora,
+        extended_report=extended_report,
+        tipo_energia=tipo_energia,
+        tipo_demanda=tipo_demanda,
+        tarifas=tarifas,
+        periodos=periodos,
+        dia_corte=dia_corte,
+        volt_linea=volt_linea,
+        volt_fase=volt_fase,
+        politica_dtype=politica_dtype,
+        graficar=True,
+    )
+    pipeline = Pipeline(ETAPAS_INFORME, dir_cache=dir_cache)
+    salidas = pipeline.ejecutar(parametros, opciones={"procesos": procesos})
+    salidas["_estado"] = pipeline.estado
+    return salidas
+
+
+def _parametros(archivo, *, tarifas, periodos, volt_linea, volt_fase, **resto) -> dict:
+    return {
+        "archivo": archivo,
+        "tarifas": list(tarifas),
+        "periodos": list(periodos) if periodos is not None else None,
+        "volt_linea": volt_linea,
+        "volt_fase": volt_fase if volt_fase is not None else round(volt_linea / 3 ** 0.5, 0),
+        **resto,
+    }
+
+
+# ---- verificación de la política de tipos -------------------------------------
+
+
+def _cifras(valor, ruta: str = ""):
+    """(ruta, número) de cada cifra de un resultado anidado; fechas y textos se omiten."""
+    if isinstance(valor, dict):
+        for k, v in valor.items():
+            yield from _cifras(v, f"{ruta}/{k}")
+    elif isinstance(valor, (list, tuple)):
+        for i, v in enumerate(valor):
+            yield from _cifras(v, f"{ruta}/{i}")
+    elif isinstance(valor, pd.DataFrame):
+        for k, fila in valor.iterrows():
+            yield from _cifras(fila.to_dict(), f"{ruta}/{k}")
+    elif isinstance(valor, pd.Timedelta):
+        yield ruta, valor.total_seconds()
+    elif isinstance(valor, (int, float, np.number)) and not isinstance(valor, (bool, np.bool_)):
+        yield ruta, float(valor)
+
+
+def verificar_politica_dtype(
+    archivo: str,
+    politica_dtype: str = "compacta",
+    *,
+    tolerancia: float = 1e-3,
+    distribuidora: str = "edemet",
+    extended_report: bool = False,
+    tipo_energia: str = "E.Activa III T",
+    tipo_demanda: str = "DMAX_15min",
+    tarifas=("BTD", "BTH", "MTD", "MTH"),
+    periodos=None,
+    dia_corte: int = 1,
+    volt_linea: float = 480,
+    volt_fase: float | None = None,
+    procesos: int | None = None,
+    dir_cache: str | Path | None = None,
+) -> dict:
+    """
+    Calcula las métricas y las tarifas del informe (sin gráficos) con la
+    política 'exacta' y con `politica_dtype`, y compara cada cifra.
+
+    La desviación de una cifra es |valor − exacto| / max(|exacto|, 1): relativa
+    para cifras grandes (kWh, B/.) y absoluta para las menores que 1 (FP).
+    Una cifra que solo aparece con una de las políticas (p. ej. un evento
+    de voltaje más o menos) cuenta como desviación infinita.
+
+    Returns:
+        dict con "valida" (todas las desviaciones ≤ `tolerancia`),
+        "desviacion_maxima" y "comparacion", un DataFrame indexado por la
+        ruta de cada cifra con las columnas exacta, valor y desviacion,
+        ordenado de mayor a menor desviación.
+    """
+    seleccionar_distribuidora(distribuidora)
+    comunes = dict(
+        titulo="",
+        distribuidora=distribuidora,
+        extended_report=extended_report,
+        tipo_energia=tipo_energia,
+        tipo_demanda=tipo_demanda,
+        tarifas=tarifas,
+        periodos=periodos,
+        dia_corte=dia_corte,
+        volt_linea=volt_linea,
+        volt_fase=volt_fase,
+        graficar=False,
+    )
+    pipeline = Pipeline(ETAPAS_INFORME, dir_cache=dir_cache, dir_archivos=None)
+    cifras = []
+    for politica in ("exacta", politica_dtype):
+        salidas = pipeline.ejecutar(
+            _parametros(archivo, politica_dtype=politica, **comunes),
+            objetivos=["metricas", "tarifas"],
+            opciones={"procesos": procesos},
+        )
+        resultado = {
+            "metricas": salidas["metricas"],
+            "tarifas": salidas["tarifas"]["resultados"],
+            "facturacion": salidas["tarifas"]["facturacion"]["por_ciclo"],
+        }
+        cifras.append(dict(_cifras(resultado)))
+
+    exactas, valores = cifras
+    comparacion = pd.DataFrame(
+        {"exacta": pd.Series(exactas, dtype=float), "valor": pd.Series(valores, dtype=float)}
+    )
+    with np.errstate(invalid="ignore"):
+        desviacion = (comparacion["valor"] - comparacion["exacta"]).abs() / comparacion["exacta"].abs().clip(lower=1)
+    # Igualdad (también NaN con NaN) → 0; cifra ausente en una de las dos → inf.
+    iguales = (comparacion["valor"] == comparacion["exacta"]) | (comparacion["valor"].isna() & comparacion["exacta"].isna())
+    ausentes = ~comparacion.index.isin(list(exactas)) | ~comparacion.index.isin(list(valores))
+    comparacion["desviacion"] = desviacion.where(~iguales, 0.0).fillna(np.inf).where(~ausentes, np.inf)
+    comparacion = comparacion.sort_values("desviacion", ascending=False, kind="stable")
+
+    maxima = float(comparacion["desviacion"].max()) if len(comparacion) else 0.0
+    return {"valida": maxima <= tolerancia, "desviacion_maxima": maxima, "comparacion": comparacion}
+
+
+# ---- impresión --------------------------------------------------------------
+
+
+def _imprimir_potencia(title, analysis_result, unit="kW"):
+    print(f"\n--- {title} ---")
+    for col, data in analysis_result.items():
+        print(f"  Análisis para: {col}")
+        # General
+        print(f"    General:")
+        print(f"      Promedio: {data['general']['promedio']:.2f} {unit}")
+        print(f"      Máximo:   {data['general']['maximo']:.2f} {unit}")
+        print(f"      Mínimo:   {data['general']['minimo']:.2f} {unit}")
+        # Por Bloque
+        print(f"    Por Bloque:")
+        for bloque, stats in data['por_bloque'].items():
+            print(f"      {bloque.title()}:")
+            print(f"        Promedio: {stats['promedio']:.2f} {unit}")
+            print(f"        Máximo:   {stats['maximo']:.2f} {unit}")
+            print(f"        Mínimo:   {stats['minimo']:.2f} {unit}")
+
+
+def imprimir_informe(
+    titulo: str,
+    metricas: dict,
+    resultados_tarifas: dict,
+    facturacion: dict,
+    medicion_neta: dict | None = None,
+    *,
+    aviso_periodo: str | None = None,
+) -> None:
+    """Imprime el informe a partir de los resultados de las etapas."""
+    analisis_voltaje = metricas["voltaje"]
+    analisis_corriente = metricas["corriente"]
+    analisis_frecuencia = metricas["frecuencia"]
+    analisis_factor_potencia = metricas["factor_potencia"]
+    analisis_potencia_activa = metricas["potencia_activa"]
+    analisis_potencia_reactiva = metricas["potencia_reactiva"]
+    analisis_potencia_aparente = metricas["potencia_aparente"]
+    analisis_potencia_inductiva = metricas["potencia_inductiva"]
+    analisis_potencia_capacitiva = metricas["potencia_capacitiva"]
+    analisis_apagones = metricas["apagones"]
+    analisis_energia_resultados = metricas["energia"]
+    analisis_demanda_resultados = metricas["demanda"]
+
+    print(f"\n===== INFORME DE ANÁLISIS ELÉCTRICO PARA: {titulo} =====")
+
+    # --- Resumen de Consumo y Demanda ---
+    print("\n\n===== ANÁLISIS DE ENERGÍA ====")
+    print(f"\nEnergía mensual extrapolada: {analisis_energia_resultados['energia_extrapolada_total']:.2f} kWh")
+    print("\nConsumo por bloques (kWh, extrapolado):")
+    for bloque, val in analisis_energia_resultados['consumo_extrapolado_por_bloque'].items():
+        horario = analisis_energia_resultados['horarios_bloques'].get(bloque, "Horario no definido")
+        print(f"  {bloque.title()}: {val:.2f} kWh")
+    if analisis_energia_resultados['grafico_path']:
+        print(f"\nGráfico de consumo de energía por bloque guardado en '{analisis_energia_resultados['grafico_path']}'")
+
+    print("\n\n===== ANÁLISIS DE DEMANDA ====")
+    print(f"\nDemanda máxima mensual (promedio 15 min): {analisis_demanda_resultados['demanda_maxima_total']:.2f} kW, registrada el {analisis_demanda_resultados['fecha_demanda_maxima_total']}")
+    print("\nDemanda máxima por bloque (kW):")
+    for bloque, data in analisis_demanda_resultados['demanda_maxima_por_bloque'].items():
+        print(f"  {bloque.title()}: {data['valor']:.2f} kW, registrada el {data['fecha']}")
+    if analisis_demanda_resultados['grafico_path']:
+        print(f"\nGráfico de demanda máxima por bloque guardado en '{analisis_demanda_resultados['grafico_path']}'")
+
+
+    # --- Análisis de Calidad de Energía ---
+    print("\n\n===== ANÁLISIS DE CALIDAD DE ENERGÍA ====")
+
+    # Sección de Voltaje
+    print("\n--- ANÁLISIS DE VOLTAJE ---")
+    for nombre, stats in analisis_voltaje["estadisticas"].items():
+        print(f"  {nombre}:")
+        print(f"    Promedio: {stats['promedio']:.2f} V")
+        print(f"    Máximo:   {stats['maximo']:.2f} V")
+        print(f"    Mínimo:   {stats['minimo']:.2f} V")
+
+    if 'linea_linea' in analisis_voltaje['limites']:
+        print("\n  Límites de Voltaje (Línea-Línea):")
+        limites_ll = analisis_voltaje['limites']['linea_linea']
+        print(f"    Referencia:    {limites_ll['referencia']:.2f} V")
+        print(f"    Máx. Permitido: {limites_ll['max_permitido']:.2f} V")
+        print(f"    Mín. Permitido: {limites_ll['min_permitido']:.2f} V")
+
+    if 'linea_neutro' in analisis_voltaje['limites']:
+        print("\n  Límites de Voltaje (Línea-Neutro):")
+        limites_ln = analisis_voltaje['limites']['linea_neutro']
+        print(f"    Referencia:    {limites_ln['referencia']:.2f} V")
+        print(f"    Máx. Permitido: {limites_ln['max_permitido']:.2f} V")
+        print(f"    Mín. Permitido: {limites_ln['min_permitido']:.2f} V")
+
+    if analisis_voltaje["analisis_de_eventos"]:
+        print("\n--- EVENTOS DE VOLTAJE FUERA DE RANGO ---")
+        for col, eventos in analisis_voltaje["analisis_de_eventos"].items():
+            print(f"  Análisis para: {col}")
+            print(f"    Tiempo total fuera de rango: {eventos['tiempo_total_fuera_de_rango']}")
+            if eventos['eventos_de_voltaje_alto']:
+                print("    Eventos de Voltaje Alto:")
+                for ev in eventos['eventos_de_voltaje_alto']:
+                    print(f"      - De {ev['inicio']} a {ev['fin']} (Duración: {ev['duracion']})")
+                    print(f"        Valor Máximo: {ev['valor_maximo']:.2f} V en {ev['fecha_valor_maximo']}")
+            if eventos['eventos_de_voltaje_bajo']:
+                print("    Eventos de Voltaje Bajo:")
+                for ev in eventos['eventos_de_voltaje_bajo']:
+                    print(f"      - De {ev['inicio']} a {ev['fin']} (Duración: {ev['duracion']})")
+                    print(f"        Valor Mínimo: {ev['valor_minimo']:.2f} V en {ev['fecha_valor_minimo']}")
+    if analisis_voltaje["graficos_paths"]:
+        print("\n  Gráficos de Voltaje:")
+        for tipo, path in analisis_voltaje["graficos_paths"].items():
+            print(f"    - {tipo.replace('_', ' ').title()}: {path}")
+
+    # Sección de Corriente
+    print("\n--- ANÁLISIS DE CORRIENTE ---")
+    for nombre, stats in analisis_corriente.items():
+        print(f"  {nombre}:")
+        print(f"    Promedio: {stats['promedio']:.2f} A")
+        print(f"    Máximo:   {stats['maximo']:.2f} A")
+        print(f"    Mínimo:   {stats['minimo']:.2f} A")
+
+    # Sección de Frecuencia
+    if analisis_frecuencia:
+        print("\n--- ANÁLISIS DE FRECUENCIA ---")
+        stats_frec = analisis_frecuencia['estadisticas']
+        print(f"  Frecuencia:")
+        print(f"    Promedio: {stats_frec['promedio']:.3f} Hz")
+        print(f"    Máximo:   {stats_frec['maximo']:.3f} Hz")
+        print(f"    Mínimo:   {stats_frec['minimo']:.3f} Hz")
+
+        if 'permanente' in analisis_frecuencia['limites']:
+            print("\n  Límites de Frecuencia (Permanente):")
+            limites_perm = analisis_frecuencia['limites']['permanente']
+            print(f"    Referencia:    {limites_perm['nominal']:.2f} Hz")
+            print(f"    Máx. Permitido: {limites_perm['max_permitido']:.2f} Hz")
+            print(f"    Mín. Permitido: {limites_perm['min_permitido']:.2f} Hz")
+
+        if analisis_frecuencia.get("analisis_de_eventos"):
+            print("\n--- EVENTOS DE FRECUENCIA FUERA DE RANGO ---")
+            for col, eventos in analisis_frecuencia["analisis_de_eventos"].items():
+                print(f"  Análisis para: {col}")
+                print(f"    Tiempo total fuera de rango: {eventos['tiempo_total_fuera_de_rango']}")
+                if eventos.get('eventos_de_frecuencia_alta'):
+                    print("    Eventos de Frecuencia Alta:")
+                    for ev in eventos['eventos_de_frecuencia_alta']:
+                        print(f"      - De {ev['inicio']} a {ev['fin']} (Duración: {ev['duracion']})")
+                        if 'valor_maximo' in ev:
+                            print(f"        Valor Máximo: {ev['valor_maximo']:.3f} Hz en {ev['fecha_valor_maximo']}")
+                if eventos.get('eventos_de_frecuencia_baja'):
+                    print("    Eventos de Frecuencia Baja:")
+                    for ev in eventos['eventos_de_frecuencia_baja']:
+                        print(f"      - De {ev['inicio']} a {ev['fin']} (Duración: {ev['duracion']})")
+                        if 'valor_minimo' in ev:
+                            print(f"        Valor Mínimo: {ev['valor_minimo']:.3f} Hz en {ev['fecha_valor_minimo']}")
+        if analisis_frecuencia['grafico_path']:
+            print(f"\n  Gráfico de Frecuencia guardado en: {analisis_frecuencia['grafico_path']}")
+
+    # Sección de Factor de Potencia
+    print("\n--- ANÁLISIS DE FACTOR DE POTENCIA ---")
+    print(f"  FP Mensual Calculado: {analisis_factor_potencia['fp_mensual_calculado']:.4f}")
+    stats_fp_inst = analisis_factor_potencia['fp_instantaneo_stats']
+    if stats_fp_inst:
+        print("  Estadísticas del FP Instantáneo (P/S):")
+        print(f"    Promedio: {stats_fp_inst['promedio']:.4f}")
+        print(f"    Máximo:   {stats_fp_inst['maximo']:.4f}")
+        print(f"    Mínimo:   {stats_fp_inst['minimo']:.4f}")
+    limites_fp = analisis_factor_potencia['limites']
+    print(f"  Límite Superior: {limites_fp['superior']}")
+    print(f"  Límite Inferior: {limites_fp['inferior']}")
+
+    # --- ANÁLISIS DE POTENCIA ---
+    print("\n\n===== ANÁLISIS DE POTENCIA ====")
+
+
+    _imprimir_potencia("Potencia Activa", analisis_potencia_activa)
+    _imprimir_potencia("Potencia Reactiva", analisis_potencia_reactiva, unit="kVAr")
+    _imprimir_potencia("Potencia Aparente", analisis_potencia_aparente, unit="kVA")
+    _imprimir_potencia("Potencia Inductiva", analisis_potencia_inductiva, unit="kVAr")
+    _imprimir_potencia("Potencia Capacitiva", analisis_potencia_capacitiva, unit="kVAr")
+
+    # --- Análisis de Apagones ---
+    print("\n\n===== ANÁLISIS DE APAGONES ====")
+    if analisis_apagones['numero_total_de_apagones'] > 0:
+        print(f"  Número total de apagones: {analisis_apagones['numero_total_de_apagones']}")
+        print(f"  Tiempo total sin suministro: {analisis_apagones['tiempo_total_sin_suministro']}")
+        print("  Detalle de apagones:")
+        for i, apagon in enumerate(analisis_apagones['detalle_de_apagones']):
+            sin_datos = apagon.get('tiempo_sin_datos', pd.Timedelta(0))
+            detalle = f", sin registros: {sin_datos}" if sin_datos > pd.Timedelta(0) else ""
+            print(f"    - Apagón {i+1}: De {apagon['inicio']} a {apagon['fin']} (Duración: {apagon['duracion']}{detalle})")
+    else:
+        print("  No se detectaron apagones en el periodo analizado.")
+    if analisis_apagones['grafico_path']:
+        print(f"\n  Gráfico de Apagones guardado en: {analisis_apagones['grafico_path']}")
+
+    # --- Continuidad de los datos (solo si faltan registros) ---
+    continuidad = metricas.get("continuidad")
+    if continuidad and continuidad["numero_de_lagunas"] > 0:
+        print("\n\n===== CONTINUIDAD DE LOS DATOS ====")
+        print(f"  Lagunas sin registros: {continuidad['numero_de_lagunas']} (paso nominal {continuidad['paso']})")
+        print(f"  Tiempo sin datos: {continuidad['tiempo_sin_datos']} (cobertura {continuidad['cobertura']:.2%})")
+        print("  Cobertura por día:")
+        for dia, fila in continuidad["cobertura_diaria"].iterrows():
+            if fila["sin_datos"] > pd.Timedelta(0):
+                print(f"    {dia}: {fila['cobertura']:.2%} (sin datos: {fila['sin_datos']})")
+
+    # --- Comparación de Tarifas ---
+    print("\n\n===== COMPARACIÓN DE TARIFAS ====")
+    if aviso_periodo:
+        print(f"  AVISO: {aviso_periodo}")
+    for periodo, tarifas in resultados_tarifas.items():
+        print(f"\nPERIODO {periodo}:")
+        for tarifa, valores in tarifas.items():
+            print(f"  TARIFA {tarifa}:")
+            print(f"    Cargo por energía:   B/. {valores['cargo_energia']:.2f}")
+            print(f"    Cargo por demanda:   B/. {valores['cargo_demanda']:.2f}")
+            print(f"    Penalización FP:     B/. {valores['cargo_fp']:.2f}")
+            print(f"    TOTAL A PAGAR:       B/. {valores['total']:.2f}")
+
+    print("\n\n===== FACTURACIÓN POR CICLO ====")
+    for _, tramo in facturacion["tramos"].iterrows():
+        print(
+            f"\nCICLO {tramo['ciclo']} | PERIODO {tramo['periodo'] or 'sin tarifa'} | "
+            f"desde {tramo['inicio']:%Y-%m-%d}, {tramo['dias']:.0f} días "
+            f"({tramo['fraccion_ciclo']:.0%} del ciclo, cobertura de la medición {tramo['cobertura']:.0%})"
+        )
+    for (ciclo, tarifa), valores in facturacion["por_ciclo"].iterrows():
+        print(f"  {ciclo} TARIFA {tarifa}: B/. {valores['total']:.2f} (energía {valores['cargo_energia']:.2f}, demanda {valores['cargo_demanda']:.2f}, FP {valores['cargo_fp']:.2f})")
+
+    if medicion_neta is not None:
+        print("\n\n===== MEDICIÓN NETA (ENERGÍA EXPORTADA) ====")
+        for _, tramo in medicion_neta["tramos"].iterrows():
+            print(
+                f"\nCICLO {tramo['ciclo']} | PERIODO {tramo['periodo'] or 'sin tarifa'}: "
+                f"importada {tramo['importada']:.2f} kWh, exportada {tramo['exportada']:.2f} kWh, "
+                f"facturable {tramo['facturable']:.2f} kWh (crédito {tramo['credito_inicial']:.2f} → {tramo['credito_final']:.2f} kWh)"
+            )
+        for (ciclo, tarifa), valores in medicion_neta["por_ciclo"].iterrows():
+            print(f"  {ciclo} TARIFA {tarifa}: B/. {valores['total']:.2f} (sin medición neta B/. {valores['total_sin_medicion_neta']:.2f}, ahorro B/. {valores['ahorro']:.2f})")
+
+    print("\n===== FIN DEL INFORME ====")
@@ -0,0 +1,192 @@
+"""
+Instrumentación opcional del pipeline: tiempo de pared, tiempo de CPU,
+pico de memoria (tracemalloc) y filas procesadas por función o etapa.
+
+Desactivada por defecto; se activa con `activar()` o con la variable de
+entorno `CIRCUTOR_INSTRUMENTAR=1`. Desactivada, el decorador solo añade
+una comprobación de bandera por llamada.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+_estado = {
+    "activa": os.environ.get("CIRCUTOR_INSTRUMENTAR", "") not in ("", "0"),
+    "t0": time.perf_counter(),
+}
+_registros: list[dict] = []
+_pila: list[dict] = []
+
+
+def activar(activa: bool = True) -> None:
+    """Activa o desactiva la instrumentación (y tracemalloc)."""
+    _estado["activa"] = activa
+    if activa and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not activa and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def activa() -> bool:
+    return _estado["activa"]
+
+
+def reiniciar() -> None:
+    """Descarta los registros acumulados."""
+    _registros.clear()
+    _pila.clear()
+    _estado["t0"] = time.perf_counter()
+
+
+def registros() -> list[dict]:
+    return list(_registros)
+
+
+def incorporar(externos: list[dict]) -> None:
+    """Añade registros medidos en otro proceso (p. ej. un proceso de trabajo)."""
+    _registros.extend(externos)
+
+
+def _contar_filas(*objetos) -> int | None:
+    for obj in objetos:
+        if isinstance(obj, (pd.DataFrame, pd.Series)):
+            return len(obj)
+        if isinstance(obj, tuple) and obj and isinstance(obj[0], (pd.DataFrame, pd.Series)):
+            return len(obj[0])
+    return None
+
+
+@contextmanager
+def etapa(nombre: str, filas: int | None = None):
+    """
+    Mide el bloque `with` como una etapa. Las etapas y funciones anidadas se
+    registran con su nivel de anidamiento; el pico de memoria de cada una es
+    relativo a la memoria en uso al entrar.
+    """
+    if not _estado["activa"]:
+        yield {}
+        return
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    mem_ini, pico_previo = tracemalloc.get_traced_memory()
+    if _pila:
+        _pila[-1]["pico_hijos"] = max(_pila[-1]["pico_hijos"], pico_previo)
+    tracemalloc.reset_peak()
+
+    marco = {"nombre": nombre, "filas": filas, "pico_hijos": 0}
+    _pila.append(marco)
+    t_ini = time.perf_counter()
+    cpu_ini = time.process_time()
+    try:
+        yield marco
+    finally:
+        t_fin = time.perf_counter()
+        cpu_fin = time.process_time()
+        _pila.pop()
+        pico = max(tracemalloc.get_traced_memory()[1], marco["pico_hijos"])
+        if _pila:
+            _pila[-1]["pico_hijos"] = max(_pila[-1]["pico_hijos"], pico)
+        _registros.append(
+            {
+                "nombre": nombre,
+                "nivel": len(_pila),
+                "inicio_s": t_ini - _estado["t0"],
+                "tiempo_s": t_fin - t_ini,
+                "cpu_s": cpu_fin - cpu_ini,
+                "memoria_pico_mb": max(pico - mem_ini, 0) / 2**20,
+                "filas": marco["filas"],
+            }
+        )
+
+
+def instrumentar(funcion):
+    """
+    Decorador: registra cada llamada a `funcion` como una etapa con su
+    nombre cualificado. Las filas se toman del primer DataFrame/Series de
+    los argumentos o, si no hay, del resultado.
+    """
+    nombre = f"{funcion.__module__.rsplit('.', 1)[-1]}.{funcion.__name__}"
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        if not _estado["activa"]:
+            return funcion(*args, **kwargs)
+        with etapa(nombre, _contar_filas(*args, *kwargs.values())) as marco:
+            resultado = funcion(*args, **kwargs)
+            if marco["filas"] is None:
+                marco["filas"] = _contar_filas(resultado)
+            return resultado
+
+    return envoltura
+
+
+def resumen() -> pd.DataFrame:
+    """Agrega los registros por nombre: llamadas, tiempos, pico de memoria y filas."""
+    if not _registros:
+        return pd.DataFrame(
+            columns=["llamadas", "tiempo_s", "cpu_s", "memoria_pico_mb", "filas"]
+        )
+    df = pd.DataFrame(_registros)
+    tabla = df.groupby("nombre", sort=False).agg(
+        llamadas=("tiempo_s", "size"),
+        tiempo_s=("tiempo_s", "sum"),
+        cpu_s=("cpu_s", "sum"),
+        memoria_pico_mb=("memoria_pico_mb", "max"),
+        filas=("filas", "max"),
+    )
+    return tabla.sort_values("tiempo_s", ascending=False)
+
+
+def imprimir_resumen() -> None:
+    tabla = resumen()
+    print("\n===== INSTRUMENTACIÓN ====")
+    if tabla.empty:
+        print("  Sin registros (¿instrumentación desactivada?)")
+        return
+    print(f"  {'función/etapa':<46}{'llamadas':>9}{'pared (s)':>11}{'CPU (s)':>10}{'pico (MB)':>11}{'filas':>10}")
+    for nombre, fila in tabla.iterrows():
+        filas = "" if pd.isna(fila["filas"]) else f"{int(fila['filas'])}"
+        print(
+            f"  {nombre:<46}{int(fila['llamadas']):>9}{fila['tiempo_s']:>11.3f}"
+            f"{fila['cpu_s']:>10.3f}{fila['memoria_pico_mb']:>11.1f}{filas:>10}"
+        )
+
+
+def guardar_traza(ruta: str | Path) -> Path:
+    """
+    Guarda los registros en formato Chrome Trace (visible en Perfetto o
+    chrome://tracing) junto con el resumen agregado.
+    """
+    eventos = [
+        {
+            "name": r["nombre"],
+            "ph": "X",
+            "ts": r["inicio_s"] * 1e6,
+            "dur": r["tiempo_s"] * 1e6,
+            "pid": os.getpid(),
+            "tid": 0,
+            "args": {
+                "cpu_s": r["cpu_s"],
+                "memoria_pico_mb": r["memoria_pico_mb"],
+                "filas": r["filas"],
+                "nivel": r["nivel"],
+            },
+        }
+        for r in _registros
+    ]
+    tabla = resumen().reset_index()
+    tabla["filas"] = tabla["filas"].astype(object).where(tabla["filas"].notna(), None)
+    contenido = {"traceEvents": eventos, "resumen": tabla.to_dict(orient="records")}
+    ruta = Path(ruta)
+    ruta.write_text(json.dumps(contenido, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+    return ruta
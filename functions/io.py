@@ -2,9 +2,16 @@ from pathlib import Path
 import pandas as pd
 
 from pathlib import Path
+from typing import Callable
+
+import numpy as np
 import pandas as pd
 
+from .columnas import dtypes_columnas
+from .instrumentacion import instrumentar
+
 
+@instrumentar
 def cargar_datos(
     nombre_archivo: str | None = None,
     *,
@@ -12,6 +19,8 @@ def cargar_datos(
     sep: str = ",",
     col_fecha: str = "Fecha/hora",
     formato: str = "%d/%m/%y %H:%M:%S",
+    columnas: Callable[[str], bool] | list[str] | None = None,
+    politica_dtype: str = "exacta",
 ) -> pd.DataFrame:
     """
     Carga un CSV/TXT y convierte in-place la columna `Fecha/hora` a datetime
@@ -29,6 +38,14 @@ def cargar_datos(
         Columna que contiene la fecha-hora.
     formato : str, default '%d/%m/%y %H:%M:%S'
         Formato exacto de la cadena de fecha-hora.
+    columnas : callable | list[str] | None, default None
+        Columnas a leer (`usecols` de pandas), p. ej.
+        `functions.columnas.filtro_columnas(armonicos=False)`. La columna de
+        fecha se lee siempre. None lee todas.
+    politica_dtype : {'exacta', 'compacta'}, default 'exacta'
+        Tipo de las columnas numéricas (`functions.columnas.dtype_columna`):
+        'compacta' guarda las magnitudes instantáneas en float32 y las
+        energías y costes en float64.
 
     Returns
     -------
@@ -42,12 +59,23 @@ def cargar_datos(
         raise FileNotFoundError(f"No se encontró el archivo: {nombre_archivo}")
 
     # Leer el fichero con el separador indicado
-    df = pd.read_csv(ruta, encoding=encoding, sep=sep)
+    usecols = None
+    if callable(columnas):
+        usecols = lambda c: c == col_fecha or columnas(c)
+    elif columnas is not None:
+        usecols = list(dict.fromkeys([col_fecha, *columnas]))
+    df = pd.read_csv(ruta, encoding=encoding, sep=sep, usecols=usecols)
 
     # Parsear la fecha EN LA MISMA COLUMNA, sin renombrarla
     if col_fecha in df.columns:
         df[col_fecha] = pd.to_datetime(df[col_fecha], format=formato, errors="coerce")
 
+    # Política de tipos: solo cambia las columnas float64 leídas.
+    tipos = dtypes_columnas(df.columns, politica_dtype)
+    reducir = {c: t for c, t in tipos.items() if df[c].dtype == np.float64 and t != np.float64}
+    if reducir:
+        df = df.astype(reducir, copy=False)
+
     # # Vista rápida
     # print(df.head())
     return df
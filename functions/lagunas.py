@@ -0,0 +1,192 @@
+"""
+Índice de lagunas de datos: tramos sin registros en la serie de fechas.
+
+Cuando el MYeBOX se queda sin alimentación deja de registrar, así que un
+corte no aparece como filas con tensión cero sino como un salto en
+'Fecha/hora'. El índice se calcula una vez (diferencias entre fechas
+consecutivas, vectorizado) y se guarda en `df.attrs["indice_lagunas"]`
+para que lo usen la detección de apagones, la extrapolación de energía,
+las ventanas de demanda y la cobertura diaria del informe.
+
+Hay laguna entre dos muestras consecutivas cuando las separa más de
+`tolerancia` × el paso nominal (la mediana de las diferencias); el tiempo
+sin datos va de la muestra anterior más un paso hasta la siguiente.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+_NS_DIA = 86400 * 10**9
+
+
+@dataclass(frozen=True)
+class IndiceLagunas:
+    """
+    Lagunas de una serie de fechas. Los tiempos van en ns desde la época:
+    `sin_datos_desde`/`sin_datos_hasta` delimitan el tiempo sin registros
+    de cada laguna (ordenadas y sin solaparse) y `acumulado` es el tiempo
+    sin datos acumulado antes de cada una.
+    """
+
+    paso: int
+    inicio: int
+    fin: int
+    muestras: int
+    sin_datos_desde: np.ndarray
+    sin_datos_hasta: np.ndarray
+    muestras_faltantes: np.ndarray
+    acumulado: np.ndarray
+
+    # Se guarda en `attrs`, que pandas copia con `deepcopy` al derivar
+    # DataFrames; el índice es inmutable y no debe duplicarse.
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    @classmethod
+    def desde_fechas(cls, fechas, *, tolerancia: float = 1.5) -> "IndiceLagunas":
+        t = pd.to_datetime(pd.Series(fechas), dayfirst=True, errors="coerce").to_numpy(dtype="datetime64[ns]")
+        t = np.sort(t[~np.isnat(t)]).view(np.int64)
+        pasos = np.diff(t)
+        positivos = pasos[pasos > 0]
+        paso = int(np.median(positivos)) if len(positivos) else 60 * 10**9
+        salto = np.flatnonzero(pasos > tolerancia * paso)
+        desde, hasta = t[salto] + paso, t[salto + 1]
+        return cls(
+            paso=paso,
+            inicio=int(t[0]) if len(t) else 0,
+            fin=int(t[-1]) if len(t) else 0,
+            muestras=len(t),
+            sin_datos_desde=desde,
+            sin_datos_hasta=hasta,
+            muestras_faltantes=np.rint((hasta - desde) / paso).astype(np.int64),
+            acumulado=np.concatenate([[0], np.cumsum(hasta - desde)]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.sin_datos_desde)
+
+    @property
+    def lagunas(self) -> pd.DataFrame:
+        """Una fila por laguna: inicio y fin del tiempo sin datos, duración y muestras que faltan."""
+        inicio = pd.to_datetime(self.sin_datos_desde)
+        fin = pd.to_datetime(self.sin_datos_hasta)
+        return pd.DataFrame({
+            "inicio": inicio,
+            "fin": fin,
+            "duracion": fin - inicio,
+            "muestras_faltantes": self.muestras_faltantes,
+        })
+
+    @property
+    def tiempo_sin_datos_total(self) -> pd.Timedelta:
+        return pd.Timedelta(int(self.acumulado[-1]), "ns")
+
+    def _sin_datos_antes(self, t: np.ndarray) -> np.ndarray:
+        """Tiempo sin datos (ns) antes de cada instante `t` (ns)."""
+        completas = np.searchsorted(self.sin_datos_hasta, t, side="right")
+        total = self.acumulado[completas]
+        # Laguna en curso en `t` (empezada y sin terminar): la parte ya transcurrida.
+        en_curso = np.searchsorted(self.sin_datos_desde, t, side="right") - 1
+        parcial = (en_curso == completas) & (en_curso >= 0)
+        desde = self.sin_datos_desde[np.where(parcial, en_curso, 0)] if len(self) else np.zeros_like(t)
+        return total + np.where(parcial, t - desde, 0)
+
+    def tiempo_sin_datos(self, desde, hasta):
+        """
+        Tiempo sin datos entre `desde` y `hasta` (escalares o arrays de
+        fechas): Timedelta o TimedeltaIndex.
+        """
+        a = pd.to_datetime(desde)
+        b = pd.to_datetime(hasta)
+        escalar = np.ndim(a) == 0
+        a_ns = np.atleast_1d(np.asarray(a, dtype="datetime64[ns]")).view(np.int64)
+        b_ns = np.atleast_1d(np.asarray(b, dtype="datetime64[ns]")).view(np.int64)
+        ns = np.maximum(self._sin_datos_antes(b_ns) - self._sin_datos_antes(a_ns), 0)
+        return pd.Timedelta(int(ns[0]), "ns") if escalar else pd.to_timedelta(ns, unit="ns")
+
+    def cruza_laguna(self, desde, hasta) -> np.ndarray:
+        """Indica, para cada ventana [desde, hasta] (arrays de fechas), si contiene alguna laguna."""
+        a = np.asarray(desde, dtype="datetime64[ns]").view(np.int64)
+        b = np.asarray(hasta, dtype="datetime64[ns]").view(np.int64)
+        # Lagunas que empiezan después de `a` (tras su muestra previa) y acaban antes de `b`.
+        primeras = np.searchsorted(self.sin_datos_desde - self.paso, a, side="left")
+        ultimas = np.searchsorted(self.sin_datos_hasta, b, side="right")
+        return ultimas > primeras
+
+    def ventanas_demanda(self, fechas) -> np.ndarray:
+        """
+        Indica, para cada muestra de `fechas` (ordenadas), si la ventana de
+        la demanda de 15 min (las muestras que combina el método SDATA de
+        `procesar_demanda_maxima`: de 5·⌊(i−14)/5⌋ a 5·⌊i/5⌋+4) contiene
+        una laguna; ahí la media mezclaría muestras separadas por el corte.
+        """
+        t = np.asarray(fechas, dtype="datetime64[ns]")
+        n = len(t)
+        if n == 0 or not len(self):
+            return np.zeros(n, dtype=bool)
+        i = np.arange(n)
+        desde = (5 * ((i - 14) // 5)).clip(min=0)
+        hasta = np.minimum(5 * (i // 5) + 4, n - 1)
+        return self.cruza_laguna(t[desde], t[hasta])
+
+    def cobertura_diaria(self) -> pd.DataFrame:
+        """
+        Por día medido: tiempo esperado (la parte del día dentro de la
+        medición), tiempo sin datos y cobertura (fracción con datos).
+        """
+        if not self.muestras:
+            return pd.DataFrame(columns=["esperado", "sin_datos", "cobertura"])
+        fin = self.fin + self.paso
+        primero = self.inicio - self.inicio % _NS_DIA
+        limites = np.arange(primero, fin + _NS_DIA, _NS_DIA)
+        limites = np.clip(limites, self.inicio, fin)
+        limites = limites[np.r_[True, np.diff(limites) > 0]]
+        esperado = np.diff(limites)
+        sin_datos = np.diff(self._sin_datos_antes(limites))
+        dias = pd.to_datetime(limites[:-1]).normalize()
+        return pd.DataFrame(
+            {
+                "esperado": pd.to_timedelta(esperado, unit="ns"),
+                "sin_datos": pd.to_timedelta(sin_datos, unit="ns"),
+                "cobertura": 1 - sin_datos / esperado,
+            },
+            index=pd.Index(dias.date, name="dia"),
+        )
+
+    def resumen(self) -> dict:
+        """Paso nominal, lagunas, tiempo sin datos, cobertura total y cobertura por día."""
+        duracion = self.fin + self.paso - self.inicio if self.muestras else 0
+        return {
+            "paso": pd.Timedelta(self.paso, "ns"),
+            "numero_de_lagunas": len(self),
+            "tiempo_sin_datos": self.tiempo_sin_datos_total,
+            "cobertura": 1 - self.acumulado[-1] / duracion if duracion else float("nan"),
+            "lagunas": self.lagunas,
+            "cobertura_diaria": self.cobertura_diaria(),
+        }
+
+
+def indice_lagunas(df: pd.DataFrame, *, tolerancia: float = 1.5) -> IndiceLagunas:
+    """
+    Índice de lagunas de 'Fecha/hora' de `df` (o de su índice de fechas),
+    calculado una vez y guardado en `df.attrs["indice_lagunas"]`. Se
+    recalcula si no corresponde a `df` (otro número de muestras o de
+    extremos, p. ej. tras filtrar filas).
+    """
+    fechas = df["Fecha/hora"] if "Fecha/hora" in df.columns else df.index.to_series()
+    guardado = df.attrs.get("indice_lagunas")
+    if isinstance(guardado, IndiceLagunas) and guardado.muestras == len(fechas) and len(fechas):
+        extremos = pd.to_datetime(fechas.iloc[[0, -1]], dayfirst=True, errors="coerce")
+        extremos = extremos.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        if {guardado.inicio, guardado.fin} == set(extremos.tolist()):
+            return guardado
+    indice = IndiceLagunas.desde_fechas(fechas, tolerancia=tolerancia)
+    df.attrs["indice_lagunas"] = indice
+    return indice
@@ -8,17 +8,46 @@ import numpy as np
 import pandas as pd
 
 from . import visualize
-from .blocks import clasificar_bloque
+from .blocks import clasificar_bloques, describir_bloques
+from .columnas import registro_de
+from .histeresis import eventos_histeresis
+from .instrumentacion import instrumentar
+from .lagunas import IndiceLagunas, indice_lagunas
+from .piramide import PiramideAgregados
 
 
 def _get_image_path(name: str) -> str:
     """Crea el directorio de imágenes si no existe y devuelve la ruta completa."""
     dir_path = "images"
-    if not os.path.exists(dir_path):
-        os.makedirs(dir_path)
+    os.makedirs(dir_path, exist_ok=True)
     return os.path.join(dir_path, f"{name}.png")
 
 
+def _marco_temporal(df: pd.DataFrame, columnas: list[str]) -> pd.DataFrame:
+    """
+    DataFrame indexado y ordenado por 'Fecha/hora' con solo las `columnas`
+    existentes de `df`. Copia únicamente esas columnas; `df` no se modifica.
+    """
+    if 'Fecha/hora' not in df.columns:
+        raise ValueError("El DataFrame debe tener una columna 'Fecha/hora'.")
+    marco = pd.DataFrame({col: df[col].to_numpy() for col in columnas if col in df.columns})
+    marco.index = pd.DatetimeIndex(pd.to_datetime(df['Fecha/hora']), name='Fecha/hora')
+    if not marco.index.is_monotonic_increasing:
+        marco = marco.sort_index(kind='stable')
+    return marco
+
+
+def _fechas(df: pd.DataFrame, mensaje: str = "No se encontró columna de fecha/hora válida") -> pd.Series:
+    """Serie datetime a partir de 'Fecha/hora' (o de 'Fecha' + 'Hora')."""
+    if "Fecha/hora" in df.columns:
+        return pd.to_datetime(df["Fecha/hora"], dayfirst=True, errors="coerce")
+    if {"Fecha", "Hora"} <= set(df.columns):
+        return pd.to_datetime(
+            df["Fecha"].astype(str) + " " + df["Hora"].astype(str), dayfirst=True, errors="coerce"
+        )
+    raise ValueError(mensaje)
+
+
 def _fusionar_eventos(eventos: list[dict], max_diff: pd.Timedelta, df_col: pd.Series, tipo_evento: str) -> list[dict]:
     """
     Fusiona eventos consecutivos si el tiempo entre ellos es menor a max_diff.
@@ -101,21 +130,19 @@ def _detectar_eventos_con_estado(estado: pd.Series) -> list[dict]:
     return eventos
 
 
-def voltaje(df: pd.DataFrame, voltaje_referencia_ll: float | None = None, voltaje_referencia_ln: float | None = None, extended_report: bool = False, graficar: bool = False) -> dict:
+@instrumentar
+def voltaje(df: pd.DataFrame, voltaje_referencia_ll: float | None = None, voltaje_referencia_ln: float | None = None, extended_report: bool = False, graficar: bool = False, eventos_por_fase: bool = False) -> dict:
     """
     Calcula estadísticas de voltaje, los compara con límites permitidos y analiza
     los periodos fuera de rango con histéresis y fusión de eventos.
-    El análisis de eventos se realiza únicamente sobre la columna 'Tensión L1L2L3'.
+    El análisis de eventos se realiza sobre la columna 'Tensión L1L2L3' y, con
+    `eventos_por_fase` (y `voltaje_referencia_ln`), también sobre cada tensión
+    de fase.
     """
-    df_copy = df.copy()
-    if 'Fecha/hora' not in df_copy.columns:
-        raise ValueError("El DataFrame debe tener una columna 'Fecha/hora'.")
-    df_copy['Fecha/hora'] = pd.to_datetime(df_copy['Fecha/hora'])
-    df_copy = df_copy.sort_values(by='Fecha/hora').set_index('Fecha/hora')
-
     # Columnas a analizar y reportar
     cols_ll = ['Tensión L1L2L3']
     cols_ln = ['Tensión L1', 'Tensión L2', 'Tensión L3']
+    df_copy = _marco_temporal(df, cols_ll + cols_ln)
     cols_reporte = [col for col in cols_ll + cols_ln if col in df_copy.columns]
 
     limites = {}
@@ -137,42 +164,36 @@ def voltaje(df: pd.DataFrame, voltaje_referencia_ll: float | None = None, voltaj
     stats_voltaje = {col: {'promedio': df_copy[col].mean(), 'maximo': df_copy[col].max(), 'minimo': df_copy[col].min()} for col in cols_reporte}
 
     analisis_eventos = {}
-    # --- Análisis de eventos solo para Tensión L1L2L3 ---
+    # --- Análisis de eventos: Tensión L1L2L3 y, con eventos_por_fase, cada fase ---
+    # Todas las columnas y ambos sentidos se evalúan en una sola pasada.
     col_analisis = 'Tensión L1L2L3'
+    analizadas = []
     if col_analisis in df_copy.columns and "linea_linea" in limites:
-        limite_actual = limites["linea_linea"]
-        v = df_copy[col_analisis]
-        histeresis = limite_actual['histeresis']
-        
-        # Alto voltaje
-        umbral_alto_inicio = limite_actual['max_permitido']
-        umbral_alto_fin = umbral_alto_inicio - histeresis
-        estado_alto = pd.Series(pd.NA, index=v.index, dtype='boolean')
-        estado_alto[v > umbral_alto_inicio] = True
-        estado_alto[v < umbral_alto_fin] = False
-        estado_alto = estado_alto.ffill().fillna(False)
-        eventos_alto_raw = _detectar_eventos_con_estado(estado_alto)
-
-        # Bajo voltaje
-        umbral_bajo_inicio = limite_actual['min_permitido']
-        umbral_bajo_fin = umbral_bajo_inicio + histeresis
-        estado_bajo = pd.Series(pd.NA, index=v.index, dtype='boolean')
-        estado_bajo[v < umbral_bajo_inicio] = True
-        estado_bajo[v > umbral_bajo_fin] = False
-        estado_bajo = estado_bajo.ffill().fillna(False)
-        estado_bajo &= (v != 0)
-        eventos_bajo_raw = _detectar_eventos_con_estado(estado_bajo)
-
-        max_diff = pd.Timedelta(minutes=10)
-        eventos_alto_final = _fusionar_eventos(eventos_alto_raw, max_diff, v, 'alto')
-        eventos_bajo_final = _fusionar_eventos(eventos_bajo_raw, max_diff, v, 'bajo')
-
-        if eventos_alto_final or eventos_bajo_final:
-            analisis_eventos[col_analisis] = {
-                'tiempo_total_fuera_de_rango': sum([e['duracion'] for e in eventos_alto_final], pd.Timedelta(0)) + sum([e['duracion'] for e in eventos_bajo_final], pd.Timedelta(0)),
-                'eventos_de_voltaje_alto': eventos_alto_final,
-                'eventos_de_voltaje_bajo': eventos_bajo_final
-            }
+        analizadas.append((col_analisis, limites["linea_linea"]))
+    if eventos_por_fase and "linea_neutro" in limites:
+        analizadas += [(col, limites["linea_neutro"]) for col in cols_ln if col in df_copy.columns]
+    if analizadas:
+        v = df_copy[[col for col, _ in analizadas]].to_numpy(dtype=float)
+        maximos = [lim['max_permitido'] for _, lim in analizadas]
+        minimos = [lim['min_permitido'] for _, lim in analizadas]
+        histeresis = np.array([lim['histeresis'] for _, lim in analizadas])
+        eventos = eventos_histeresis(
+            df_copy.index,
+            np.hstack([v, v]),
+            activar=maximos + minimos,
+            desactivar=np.r_[np.array(maximos) - histeresis, np.array(minimos) + histeresis],
+            sentido=["alto"] * len(analizadas) + ["bajo"] * len(analizadas),
+            max_diff=pd.Timedelta(minutes=10),
+            valido=np.hstack([np.ones_like(v, dtype=bool), v != 0]),
+        )
+        for i, (col, _) in enumerate(analizadas):
+            eventos_alto_final, eventos_bajo_final = eventos[i], eventos[len(analizadas) + i]
+            if eventos_alto_final or eventos_bajo_final:
+                analisis_eventos[col] = {
+                    'tiempo_total_fuera_de_rango': sum([e['duracion'] for e in eventos_alto_final], pd.Timedelta(0)) + sum([e['duracion'] for e in eventos_bajo_final], pd.Timedelta(0)),
+                    'eventos_de_voltaje_alto': eventos_alto_final,
+                    'eventos_de_voltaje_bajo': eventos_bajo_final
+                }
 
     resultado = {
         "estadisticas": stats_voltaje,
@@ -246,28 +267,50 @@ def voltaje(df: pd.DataFrame, voltaje_referencia_ll: float | None = None, voltaj
     return resultado
 
 
-def analisis_de_apagones(df: pd.DataFrame, graficar: bool = False) -> dict:
+@instrumentar
+def analisis_de_apagones(df: pd.DataFrame, graficar: bool = False, lagunas: IndiceLagunas | None = None) -> dict:
     """
     Analiza los apagones en el suministro eléctrico, fusionando eventos cercanos y filtrando por duración mínima.
+
+    Además de las muestras con tensión y frecuencia nulas, cuenta como
+    apagón el tiempo sin registros (`lagunas`, por defecto el índice de
+    lagunas de `df`): sin alimentación el equipo deja de registrar. Cada
+    apagón indica en 'tiempo_sin_datos' cuánto de su duración no tiene
+    muestras.
     """
-    df_copy = df.copy()
-    if 'Fecha/hora' not in df_copy.columns:
-        raise ValueError("El DataFrame debe tener una columna 'Fecha/hora'.")
-    df_copy['Fecha/hora'] = pd.to_datetime(df_copy['Fecha/hora'])
-    df_copy = df_copy.sort_values(by='Fecha/hora').set_index('Fecha/hora')
+    df_copy = _marco_temporal(df, ['Tensión III', 'Frecuencia'])
+    lagunas = indice_lagunas(df) if lagunas is None else lagunas
 
     condicion_apagon = ((df_copy['Tensión III'] == 0) | (df_copy['Tensión III'].isna())) & ((df_copy['Frecuencia'] == 0) | (df_copy['Frecuencia'].isna()))
     
-    if not condicion_apagon.any():
+    if not condicion_apagon.any() and not len(lagunas):
         return {'numero_total_de_apagones': 0, 'tiempo_total_sin_suministro': pd.Timedelta(0), 'detalle_de_apagones': [], 'grafico_path': None}
 
-    apagones_raw = _detectar_eventos_con_estado(condicion_apagon)
+    apagones_raw = _detectar_eventos_con_estado(condicion_apagon) if condicion_apagon.any() else []
+    if len(lagunas):
+        sin_datos = lagunas.lagunas
+        apagones_raw = sorted(
+            apagones_raw + [{'inicio': a, 'fin': b} for a, b in zip(sin_datos['inicio'], sin_datos['fin'])],
+            key=lambda e: e['inicio'],
+        )
+        # Una laguna puede solaparse con un evento de muestras nulas: se unen antes de fusionar.
+        solapados = []
+        for evento in apagones_raw:
+            if solapados and evento['inicio'] <= solapados[-1]['fin']:
+                solapados[-1]['fin'] = max(solapados[-1]['fin'], evento['fin'])
+            else:
+                solapados.append(evento)
+        apagones_raw = solapados
     
     apagones_fusionados = _fusionar_eventos(apagones_raw, pd.Timedelta(minutes=10), df_copy['Tensión III'], 'apagon')
 
     # Filtrar por duración mínima
     min_duration = pd.Timedelta(minutes=3)
     apagones_filtrados = [e for e in apagones_fusionados if e['duracion'] >= min_duration]
+    if apagones_filtrados:
+        sin_registros = lagunas.tiempo_sin_datos([e['inicio'] for e in apagones_filtrados], [e['fin'] for e in apagones_filtrados])
+        for evento, tiempo in zip(apagones_filtrados, sin_registros):
+            evento['tiempo_sin_datos'] = tiempo
 
     total_tiempo_sin_suministro = sum([a['duracion'] for a in apagones_filtrados], pd.Timedelta(0))
     
@@ -298,6 +341,7 @@ def analisis_de_apagones(df: pd.DataFrame, graficar: bool = False) -> dict:
     return resultado
 
 
+@instrumentar
 def corriente(df: pd.DataFrame, extended_report: bool = False, graficar: bool = False) -> dict:
     """
     Calcula estadísticas de corriente (promedio, máximo, mínimo).
@@ -328,18 +372,76 @@ def corriente(df: pd.DataFrame, extended_report: bool = False, graficar: bool =
     return stats_corriente    
 
 
+@instrumentar
+def sobrecarga_corriente(
+    df: pd.DataFrame,
+    corriente_nominal,
+    *,
+    umbral: float = 1.0,
+    histeresis: float = 0.05,
+    columnas: list[str] | None = None,
+    graficar: bool = False,
+) -> dict:
+    """
+    Eventos de sobrecarga por fase: la corriente de cada columna supera
+    `umbral` × `corriente_nominal` (un valor o uno por columna) y el evento
+    termina al bajar de (`umbral` − `histeresis`) × nominal. Todas las fases
+    se evalúan en una sola pasada; se fusionan eventos separados menos de
+    10 minutos.
+    """
+    columnas = columnas or ['Corriente L1', 'Corriente L2', 'Corriente L3']
+    df_copy = _marco_temporal(df, columnas)
+    columnas = [col for col in columnas if col in df_copy.columns]
+    nominal = np.broadcast_to(np.asarray(corriente_nominal, dtype=float), (len(columnas),))
+
+    limites = {
+        col: {"nominal": n, "max_permitido": n * umbral, "fin_evento": n * (umbral - histeresis)}
+        for col, n in zip(columnas, nominal)
+    }
+    eventos = eventos_histeresis(
+        df_copy.index,
+        df_copy[columnas].to_numpy(dtype=float),
+        activar=[lim["max_permitido"] for lim in limites.values()],
+        desactivar=[lim["fin_evento"] for lim in limites.values()],
+        max_diff=pd.Timedelta(minutes=10),
+    ) if columnas else []
+
+    analisis_eventos = {
+        col: {
+            'tiempo_total_fuera_de_rango': sum([e['duracion'] for e in eventos_col], pd.Timedelta(0)),
+            'eventos_de_sobrecarga': eventos_col,
+        }
+        for col, eventos_col in zip(columnas, eventos) if eventos_col
+    }
+    resultado = {"limites": limites, "analisis_de_eventos": analisis_eventos, "graficos_paths": {}}
+
+    if graficar and columnas:
+        ruta = _get_image_path("sobrecarga_de_corriente")
+        visualize.graficar_parametros(
+            df=df_copy,
+            parametros=columnas,
+            lineas_horizontales=[(lim["max_permitido"], "red") for lim in limites.values()],
+            lineas_verticales=[
+                (e[extremo], 'orange') for ev in analisis_eventos.values()
+                for e in ev['eventos_de_sobrecarga'] for extremo in ('inicio', 'fin')
+            ],
+            titulo="Sobrecarga de Corriente por Fase",
+            guardar=True,
+            ruta=ruta,
+        )
+        resultado["graficos_paths"]["sobrecarga"] = ruta
+
+    return resultado
+
+
+@instrumentar
 def frecuencia(df: pd.DataFrame, frec_nominal: float = 60.0, graficar: bool = False) -> dict:
     """
     Calcula estadísticas de frecuencia, los compara con límites permitidos y analiza
     los periodos fuera de rango con histéresis y fusión de eventos.
     """
-    df_copy = df.copy()
-    if 'Fecha/hora' not in df_copy.columns:
-        raise ValueError("El DataFrame debe tener una columna 'Fecha/hora'.")
-    df_copy['Fecha/hora'] = pd.to_datetime(df_copy['Fecha/hora'])
-    df_copy = df_copy.sort_values(by='Fecha/hora').set_index('Fecha/hora')
-
     frec_col = 'Frecuencia'
+    df_copy = _marco_temporal(df, [frec_col])
     if frec_col not in df_copy.columns:
         return {}
 
@@ -376,27 +478,15 @@ def frecuencia(df: pd.DataFrame, frec_nominal: float = 60.0, graficar: bool = Fa
     v = frec_series
     histeresis = limite_actual['histeresis']
 
-    # Alta frecuencia
-    umbral_alto_inicio = limite_actual['max_permitido']
-    umbral_alto_fin = umbral_alto_inicio - histeresis
-    estado_alto = pd.Series(pd.NA, index=v.index, dtype='boolean')
-    estado_alto[v > umbral_alto_inicio] = True
-    estado_alto[v < umbral_alto_fin] = False
-    estado_alto = estado_alto.ffill().fillna(False)
-    eventos_alto_raw = _detectar_eventos_con_estado(estado_alto)
-
-    # Baja frecuencia
-    umbral_bajo_inicio = limite_actual['min_permitido']
-    umbral_bajo_fin = umbral_bajo_inicio + histeresis
-    estado_bajo = pd.Series(pd.NA, index=v.index, dtype='boolean')
-    estado_bajo[v < umbral_bajo_inicio] = True
-    estado_bajo[v > umbral_bajo_fin] = False
-    estado_bajo = estado_bajo.ffill().fillna(False)
-    eventos_bajo_raw = _detectar_eventos_con_estado(estado_bajo)
-
-    max_diff = pd.Timedelta(minutes=5)
-    eventos_alto_final = _fusionar_eventos(eventos_alto_raw, max_diff, v, 'alto')
-    eventos_bajo_final = _fusionar_eventos(eventos_bajo_raw, max_diff, v, 'bajo')
+    # Alta y baja frecuencia, en una sola pasada
+    eventos_alto_final, eventos_bajo_final = eventos_histeresis(
+        v.index,
+        np.column_stack([v.to_numpy(dtype=float)] * 2),
+        activar=[limite_actual['max_permitido'], limite_actual['min_permitido']],
+        desactivar=[limite_actual['max_permitido'] - histeresis, limite_actual['min_permitido'] + histeresis],
+        sentido=["alto", "bajo"],
+        max_diff=pd.Timedelta(minutes=5),
+    )
 
     if eventos_alto_final or eventos_bajo_final:
         analisis_eventos[frec_col] = {
@@ -459,11 +549,12 @@ def frecuencia(df: pd.DataFrame, frec_nominal: float = 60.0, graficar: bool = Fa
     return resultado
 
 
+@instrumentar
 def factor_potencia(df: pd.DataFrame, graficar: bool = False) -> dict:
     """
     Calcula y analiza el factor de potencia desde múltiples fuentes.
     """
-    _, fp_mensual = agregar_factor_potencia_mensual(df.copy())
+    fp_mensual = _fp_mensual(df)
     stats_instantaneo = {}
     if 'P/S' in df.columns:
         stats_instantaneo = {
@@ -495,24 +586,25 @@ def _calculate_power_stats_with_blocks(df: pd.DataFrame, power_cols: list[str],
     """
     Helper para calcular estadísticas de potencia, general y por bloque horario.
     """
-    df_copy = df.copy()
-    if 'FechaHora' not in df_copy.columns:
-        if 'Fecha/hora' in df_copy.columns:
-            df_copy['FechaHora'] = pd.to_datetime(df_copy['Fecha/hora'], dayfirst=True, errors='coerce')
-        else:
-            raise ValueError("DataFrame must have a datetime column named 'FechaHora' or 'Fecha/hora'")
-    df_copy['bloque'] = df_copy['FechaHora'].apply(clasificar_bloque)
+    if 'FechaHora' in df.columns:
+        fechas = df['FechaHora']
+    elif 'Fecha/hora' in df.columns:
+        fechas = pd.to_datetime(df['Fecha/hora'], dayfirst=True, errors='coerce')
+    else:
+        raise ValueError("DataFrame must have a datetime column named 'FechaHora' or 'Fecha/hora'")
+    bloques = clasificar_bloques(fechas)
 
     stats = {}
-    cols_existentes = [col for col in power_cols if col in df_copy.columns]
+    cols_existentes = [col for col in power_cols if col in df.columns]
 
     for col in cols_existentes:
+        serie = df[col]
         overall_stats = {
-            'promedio': df_copy[col].mean(),
-            'maximo': df_copy[col].max(),
-            'minimo': df_copy[col].min()
+            'promedio': serie.mean(),
+            'maximo': serie.max(),
+            'minimo': serie.min()
         }
-        agg_stats = df_copy.groupby('bloque')[col].agg(['mean', 'max', 'min'])
+        agg_stats = serie.groupby(bloques, observed=True).agg(['mean', 'max', 'min'])
         block_stats = {block: {'promedio': 0.0, 'maximo': 0.0, 'minimo': 0.0} for block in ['punta', 'fuera_punta_medio', 'fuera_punta_bajo']}
         for block_name, row in agg_stats.iterrows():
             block_stats[block_name] = {'promedio': row['mean'], 'maximo': row['max'], 'minimo': row['min']}
@@ -531,41 +623,57 @@ def _calculate_power_stats_with_blocks(df: pd.DataFrame, power_cols: list[str],
     return stats
 
 
+@instrumentar
 def potencia_activa(df: pd.DataFrame, extended_report: bool = False, graficar: bool = False) -> dict:
-    cols = ['P.Activa III', 'P.Activa III -', 'P.Activa III T'] if not extended_report else [col for col in df.columns if 'P.Activa' in col]
+    cols = ['P.Activa III', 'P.Activa III -', 'P.Activa III T'] if not extended_report else registro_de(df.columns).buscar(magnitud="P.Activa")
     return _calculate_power_stats_with_blocks(df, ['P.Activa III T'], graficar, "Análisis de Potencia Activa Total")
 
 
+@instrumentar
 def potencia_reactiva(df: pd.DataFrame, extended_report: bool = False, graficar: bool = False) -> dict:
-    cols = ['P.Reactiva III T'] if not extended_report else [col for col in df.columns if 'P.Reactiva' in col]
+    cols = ['P.Reactiva III T'] if not extended_report else registro_de(df.columns).buscar(magnitud="P.Reactiva")
     return _calculate_power_stats_with_blocks(df, cols, graficar, "Análisis de Potencia Reactiva Total", "kVAr")
 
 
+@instrumentar
 def potencia_aparente(df: pd.DataFrame, extended_report: bool = False, graficar: bool = False) -> dict:
-    cols = ['P.Aparente III T'] if not extended_report else [col for col in df.columns if 'P.Aparente' in col]
+    cols = ['P.Aparente III T'] if not extended_report else registro_de(df.columns).buscar(magnitud="P.Aparente")
     return _calculate_power_stats_with_blocks(df, cols, graficar, "Análisis de Potencia Aparente Total", "kVA")
 
 
+@instrumentar
 def potencia_inductiva(df: pd.DataFrame, extended_report: bool = False, graficar: bool = False) -> dict:
-    cols = ['P.Inductiva III T'] if not extended_report else [col for col in df.columns if 'P.Inductiva' in col]
+    cols = ['P.Inductiva III T'] if not extended_report else registro_de(df.columns).buscar(magnitud="P.Inductiva")
     return _calculate_power_stats_with_blocks(df, cols, graficar, "Análisis de Potencia Inductiva Total", "kVAr")
 
 
+@instrumentar
 def potencia_capacitiva(df: pd.DataFrame, extended_report: bool = False, graficar: bool = False) -> dict:
-    cols = ['P.Capacitiva III T'] if not extended_report else [col for col in df.columns if 'P.Capacitiva' in col]
+    cols = ['P.Capacitiva III T'] if not extended_report else registro_de(df.columns).buscar(magnitud="P.Capacitiva")
     return _calculate_power_stats_with_blocks(df, cols, graficar, "Análisis de Potencia Capacitiva Total", "kVAr")
 
 
+@instrumentar
 def procesar_demanda_maxima(df_original, graficar: bool = False):
     """
     Procesa la demanda máxima y opcionalmente la grafica.
+
+    Las ventanas de 15 min que contienen una laguna de datos (índice de
+    lagunas de `df_original`) quedan en NaN: su media uniría muestras de
+    antes y después del corte.
     """
     try:
-        df = df_original.copy()
-        if 'Fecha/hora' in df.columns:
-            df['Fecha/hora'] = pd.to_datetime(df['Fecha/hora'], dayfirst=True, errors='coerce')
-        elif isinstance(df.index, pd.DatetimeIndex):
-            df = df.reset_index().rename(columns={'index': 'Fecha/hora'})
+        # Solo se copian la fecha y la potencia activa; el resto de columnas no se toca.
+        if 'Fecha/hora' in df_original.columns:
+            df = pd.DataFrame({
+                'Fecha/hora': pd.to_datetime(df_original['Fecha/hora'], dayfirst=True, errors='coerce'),
+                'P.Activa III T': df_original['P.Activa III T'],
+            })
+        elif isinstance(df_original.index, pd.DatetimeIndex):
+            df = pd.DataFrame({
+                'Fecha/hora': df_original.index,
+                'P.Activa III T': df_original['P.Activa III T'].to_numpy(),
+            })
         else:
             raise KeyError("El DataFrame no tiene columna o índice 'Fecha/hora' válido.")
 
@@ -586,6 +694,9 @@ def procesar_demanda_maxima(df_original, graficar: bool = False):
 
         df_max15['SDATA_PROM'] = df_max15[sdata_cols].mean(axis=1)
         df['DMAX_15min'] = df_max15['SDATA_PROM'].values
+        lagunas = indice_lagunas(df_original)
+        if len(lagunas):
+            df.loc[lagunas.ventanas_demanda(df['Fecha/hora']), 'DMAX_15min'] = np.nan
         df_original['DMAX_15min'] = df['DMAX_15min']
 
         df_max = df.dropna(subset=['DMAX_15min'])
@@ -611,6 +722,7 @@ def procesar_demanda_maxima(df_original, graficar: bool = False):
         return df_original, None
 
 
+@instrumentar
 def calcular_sumatoria_energia(
     df: pd.DataFrame,
     tipo_energia: str,
@@ -619,6 +731,8 @@ def calcular_sumatoria_energia(
     fecha_fin: str | None = None,
     hora_inicio: str = "00:00",
     hora_fin: str = "23:59",
+    piramide: PiramideAgregados | None = None,
+    lagunas: IndiceLagunas | None = None,
 ) -> tuple[float, dict[str, float], float, dict[str, float]]:
     """
     Devuelve:
@@ -626,32 +740,42 @@ def calcular_sumatoria_energia(
       energia_actual_por_bloque,
       energia_extrap_30d_total,
       energia_extrap_30d_por_bloque
+
+    Con `piramide` suma los intervalos de su nivel más fino (un bloque
+    horario por minuto) en lugar de recorrer las muestras de `df`.
+
+    La extrapolación a 30 días se hace sobre el tiempo con datos: se
+    descuenta del intervalo el tiempo sin registros de `lagunas` (por
+    defecto el índice de lagunas de `df`).
     """
-    df = df.copy()
-    if "Fecha/hora" in df.columns:
-        df["FechaHora"] = pd.to_datetime(df["Fecha/hora"], dayfirst=True, errors="coerce")
-    elif {"Fecha", "Hora"} <= set(df.columns):
-        df["FechaHora"] = pd.to_datetime(
-            df["Fecha"].astype(str) + " " + df["Hora"].astype(str), dayfirst=True, errors="coerce"
-        )
+    if piramide is not None:
+        ini = pd.to_datetime(f"{fecha_inicio} {hora_inicio}") if fecha_inicio else piramide.inicio
+        fin = pd.to_datetime(f"{fecha_fin} {hora_fin}") if fecha_fin else piramide.fin
+        if tipo_energia not in piramide.columnas:
+            raise KeyError(f"{tipo_energia} no existe")
+        fina = piramide.serie_fina([tipo_energia], ini, fin)
+        energia = fina[(tipo_energia, "suma")].reset_index(drop=True)
+        bloques = clasificar_bloques(fina.index.to_series(index=energia.index))
     else:
-        raise ValueError("No se encontró columna de fecha/hora válida")
-
-    df = df.dropna(subset=["FechaHora"])
+        fechas = _fechas(df)
 
-    ini = pd.to_datetime(f"{fecha_inicio} {hora_inicio}") if fecha_inicio else df["FechaHora"].min()
-    fin = pd.to_datetime(f"{fecha_fin} {hora_fin}") if fecha_fin else df["FechaHora"].max()
-    df = df[(df["FechaHora"] >= ini) & (df["FechaHora"] <= fin)]
+        ini = pd.to_datetime(f"{fecha_inicio} {hora_inicio}") if fecha_inicio else fechas.min()
+        fin = pd.to_datetime(f"{fecha_fin} {hora_fin}") if fecha_fin else fechas.max()
+        mascara = (fechas >= ini) & (fechas <= fin)
 
-    if tipo_energia not in df.columns:
-        raise KeyError(f"{tipo_energia} no existe")
+        if tipo_energia not in df.columns:
+            raise KeyError(f"{tipo_energia} no existe")
 
-    df["bloque"] = df["FechaHora"].apply(clasificar_bloque)
+        energia = df[tipo_energia][mascara]
+        bloques = clasificar_bloques(fechas[mascara])
 
-    energia_total = df[tipo_energia].sum()
-    energia_bloq = df.groupby("bloque")[tipo_energia].sum().to_dict()
+    energia_total = energia.sum()
+    energia_bloq = energia.groupby(bloques, observed=True).sum().to_dict()
 
-    dias = (fin - ini).total_seconds() / 86400
+    if lagunas is None and df is not None:
+        lagunas = indice_lagunas(df)
+    sin_datos = lagunas.tiempo_sin_datos(ini, fin) if lagunas is not None else pd.Timedelta(0)
+    dias = (fin - ini - sin_datos).total_seconds() / 86400
     factor = 30 / dias if dias > 0 else float("nan")
     energia_total_ext = energia_total * factor
     energia_bloq_ext = {k: v * factor for k, v in energia_bloq.items()}
@@ -659,40 +783,48 @@ def calcular_sumatoria_energia(
     return energia_total, energia_bloq, energia_total_ext, energia_bloq_ext
 
 
+@instrumentar
 def agregar_factor_potencia_mensual(
     df: pd.DataFrame,
 ) -> tuple[pd.DataFrame, float]:
     """
     Añade columna 'F.P. M' acumulada y devuelve el FP mensual medido/extrapolado.
+    El DataFrame devuelto es nuevo; `df` no se modifica.
     """
-    df = df.copy()
-    if "Fecha/hora" in df.columns:
-        df["FechaHora"] = pd.to_datetime(df["Fecha/hora"], dayfirst=True, errors="coerce")
-    elif {"Fecha", "Hora"} <= set(df.columns):
-        df["FechaHora"] = pd.to_datetime(
-            df["Fecha"].astype(str) + " " + df["Hora"].astype(str), dayfirst=True, errors="coerce"
-        )
-    else:
-        raise ValueError("Fecha/hora no encontrada")
-
+    df = df.assign(FechaHora=_fechas(df, "Fecha/hora no encontrada"))
     df = df.dropna(subset=["FechaHora"]).sort_values("FechaHora").reset_index(drop=True)
     df = df.dropna(subset=['E.Reactiva III M', 'E.Activa III T'])
 
-    acum_kvarh = df['E.Reactiva III M'].cumsum()
-    acum_kwh = df['E.Activa III T'].cumsum()
+    # Acumulados siempre en float64, aunque las columnas vengan en float32.
+    acum_kvarh = df['E.Reactiva III M'].astype(np.float64).cumsum()
+    acum_kwh = df['E.Activa III T'].astype(np.float64).cumsum()
     with np.errstate(divide="ignore", invalid="ignore"):
         ratio = np.where(acum_kwh != 0, acum_kvarh / acum_kwh, np.nan)
         df['F.P. M'] = np.cos(np.arctan(ratio))
 
-    dias = (df["FechaHora"].max() - df["FechaHora"].min()).total_seconds() / 86400
+    return df, _fp_mensual(df)
+
+
+def _fp_mensual(df: pd.DataFrame) -> float:
+    """
+    FP mensual medido/extrapolado a partir de 'E.Reactiva III M' y
+    'E.Activa III T', leyendo solo esas columnas y la fecha.
+    """
+    fechas = _fechas(df, "Fecha/hora no encontrada")
+    kvarh = df['E.Reactiva III M'].astype(np.float64)
+    kwh = df['E.Activa III T'].astype(np.float64)
+    validas = fechas.notna() & kvarh.notna() & kwh.notna()
+    fechas = fechas[validas]
+
+    dias = (fechas.max() - fechas.min()).total_seconds() / 86400
     factor_ext = 30 / dias if dias and dias < 30 else 1
-    kvarh_m = df['E.Reactiva III M'].sum() * factor_ext
-    kwh_m = df['E.Activa III T'].sum() * factor_ext
+    kvarh_m = kvarh[validas].sum() * factor_ext
+    kwh_m = kwh[validas].sum() * factor_ext
 
-    fp_m = math.cos(math.atan(kvarh_m / kwh_m)) if kwh_m else float("nan")
-    return df, fp_m
+    return math.cos(math.atan(kvarh_m / kwh_m)) if kwh_m else float("nan")
 
 
+@instrumentar
 def calcular_maxima_demanda_por_bloque(
     df: pd.DataFrame,
     tipo_demanda: str,
@@ -701,57 +833,70 @@ def calcular_maxima_demanda_por_bloque(
     fecha_fin: str | None = None,
     hora_inicio: str = "00:00",
     hora_fin: str = "23:59",
+    piramide: PiramideAgregados | None = None,
 ) -> tuple[float, Any, dict[str, dict[str, Any]]]:
     """
     Devuelve demanda máxima total, instante y máxima por bloque con su fecha.
+    Con `piramide` usa el máximo (y su instante) de cada intervalo de su
+    nivel más fino en lugar de las muestras de `df`.
     """
-    if tipo_demanda not in df.columns:
-        raise KeyError(tipo_demanda)
-
-    df_copy = df.copy()
-    if "Fecha/hora" in df_copy.columns:
-        df_copy["FechaHora"] = pd.to_datetime(df_copy["Fecha/hora"], dayfirst=True, errors="coerce")
+    if piramide is not None:
+        if tipo_demanda not in piramide.columnas:
+            raise KeyError(tipo_demanda)
+        ini = pd.to_datetime(f"{fecha_inicio} {hora_inicio}") if fecha_inicio else piramide.inicio
+        fin = pd.to_datetime(f"{fecha_fin} {hora_fin}") if fecha_fin else piramide.fin
+        fina = piramide.serie_fina([tipo_demanda], ini, fin)
+        demanda = fina[(tipo_demanda, "maximo")].reset_index(drop=True)
+        fechas = fina[(tipo_demanda, "fecha_maximo")].reset_index(drop=True)
+        bloques = clasificar_bloques(fina.index.to_series(index=demanda.index))
     else:
-        raise ValueError("Fecha/hora no encontrada")
+        if tipo_demanda not in df.columns:
+            raise KeyError(tipo_demanda)
+
+        if "Fecha/hora" not in df.columns:
+            raise ValueError("Fecha/hora no encontrada")
+        fechas = pd.to_datetime(df["Fecha/hora"], dayfirst=True, errors="coerce")
 
-    ini = pd.to_datetime(f"{fecha_inicio} {hora_inicio}") if fecha_inicio else df_copy["FechaHora"].min()
-    fin = pd.to_datetime(f"{fecha_fin} {hora_fin}") if fecha_fin else df_copy["FechaHora"].max()
-    df_copy = df_copy[(df_copy["FechaHora"] >= ini) & (df_copy["FechaHora"] <= fin)]
+        ini = pd.to_datetime(f"{fecha_inicio} {hora_inicio}") if fecha_inicio else fechas.min()
+        fin = pd.to_datetime(f"{fecha_fin} {hora_fin}") if fecha_fin else fechas.max()
+        mascara = (fechas >= ini) & (fechas <= fin)
+        demanda = df[tipo_demanda][mascara]
+        fechas = fechas[mascara]
+        bloques = None
 
-    if df_copy.empty or df_copy[tipo_demanda].isnull().all():
+    if demanda.empty or demanda.isnull().all():
         return 0.0, None, {}
 
-    fila = df_copy.loc[df_copy[tipo_demanda].idxmax()]
-    dmax_total = fila[tipo_demanda]
-    dmax_instant = fila["FechaHora"]
+    pos = int(np.nanargmax(demanda.to_numpy(dtype=float)))
+    dmax_total = demanda.iloc[pos]
+    dmax_instant = fechas.iloc[pos]
+
+    if bloques is None:
+        bloques = clasificar_bloques(fechas)
 
-    df_copy["bloque"] = df_copy["FechaHora"].apply(clasificar_bloque)
-    
     dmax_bloq_con_fecha = {}
     for bloque in ["punta", "fuera_punta_medio", "fuera_punta_bajo"]:
-        df_bloque = df_copy[df_copy['bloque'] == bloque]
-        if not df_bloque.empty and not df_bloque[tipo_demanda].isnull().all():
-            fila_bloque = df_bloque.loc[df_bloque[tipo_demanda].idxmax()]
+        en_bloque = (bloques == bloque).to_numpy()
+        demanda_bloque = demanda[en_bloque]
+        if not demanda_bloque.empty and not demanda_bloque.isnull().all():
+            pos = int(np.nanargmax(demanda_bloque.to_numpy(dtype=float)))
             dmax_bloq_con_fecha[bloque] = {
-                'valor': fila_bloque[tipo_demanda],
-                'fecha': fila_bloque['FechaHora']
+                'valor': demanda_bloque.iloc[pos],
+                'fecha': fechas[en_bloque].iloc[pos]
             }
         else:
             dmax_bloq_con_fecha[bloque] = {'valor': 0.0, 'fecha': None}
 
     return dmax_total, dmax_instant, dmax_bloq_con_fecha
 
-def analizar_energia(df: pd.DataFrame, tipo_energia: str, graficar: bool = False) -> dict:
+@instrumentar
+def analizar_energia(df: pd.DataFrame, tipo_energia: str, graficar: bool = False, lagunas: IndiceLagunas | None = None) -> dict:
     """
     Analiza la energía, calcula la extrapolación y genera gráficos.
     """
-    _, _, energia_extrapolada, consumo_bloques_extrapolado = calcular_sumatoria_energia(df, tipo_energia)
+    _, _, energia_extrapolada, consumo_bloques_extrapolado = calcular_sumatoria_energia(df, tipo_energia, lagunas=lagunas)
 
-    bloques_horarios = {
-        "punta": "09:00 - 17:00 (L-V)",
-        "fuera_punta_medio": "17:01 - 23:59 (L-V) y 11:00 - 22:59 (Sáb)",
-        "fuera_punta_bajo": "00:00 - 08:59 (L-V), 00:00 - 10:59 y 23:00 - 23:59 (Sáb) y todo el Domingo"
-    }
+    bloques_horarios = describir_bloques()
 
     resultado = {
         "energia_extrapolada_total": energia_extrapolada,
@@ -772,6 +917,7 @@ def analizar_energia(df: pd.DataFrame, tipo_energia: str, graficar: bool = False
     
     return resultado
 
+@instrumentar
 def analizar_demanda(df: pd.DataFrame, tipo_demanda: str, graficar: bool = False) -> dict:
     """
     Analiza la demanda máxima, calcula por bloques y genera gráficos.
@@ -799,6 +945,7 @@ def analizar_demanda(df: pd.DataFrame, tipo_demanda: str, graficar: bool = False
         
     return resultado
 
+@instrumentar
 def analizar_comparacion_tarifas(resultados_tarifas: dict, graficar: bool = False) -> dict:
     """
     Prepara los datos y genera gráficos de comparación de tarifas para cada periodo.
@@ -0,0 +1,215 @@
+"""
+Bandas de incertidumbre de la extrapolación a 30 días por remuestreo
+(bootstrap) de días medidos.
+
+En lugar de multiplicar unos pocos días por 30 / días, se sintetizan muchos
+meses de 30 días: cada día del mes se rellena con un día medido del mismo
+tipo (laborable, sábado, domingo o feriado). De cada mes se obtiene el
+consumo y la demanda máxima por bloque, el FP y el total de cada tarifa, y
+con todos ellos los intervalos de confianza. Los meses se evalúan en lotes
+vectorizados (meses × días) que pueden repartirse entre procesos.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .distribuidoras import resolver_distribuidora
+from .instrumentacion import instrumentar
+from .tariffs import calcular_tarifa_lote, periodo_por_defecto
+
+GRUPOS_DIA = ("laborable", "sábado", "domingo/feriado")
+# Grupo de cada tipo de día (0 = lunes … 6 = domingo, 7 = feriado).
+_GRUPO_DE_TIPO = np.array([0, 0, 0, 0, 0, 1, 2, 2])
+# Grupos a los que se recurre, en orden, si no hay días medidos de un grupo.
+_SUSTITUTOS = {0: (1, 2), 1: (0, 2), 2: (1, 0)}
+_MESES_POR_LOTE = 2000
+
+
+def _dias_medidos(df, tipo_energia, tipo_demanda, col_reactiva, calendario, cobertura_minima):
+    """Agregados por día completo: energía y demanda por bloque, kWh y kVArh."""
+    fechas = pd.to_datetime(df["Fecha/hora"])
+    t = fechas.to_numpy(dtype="datetime64[ns]")
+    codigos = calendario.codigos(fechas)
+    usar = ~np.isnat(t) & (codigos >= 0)
+    t, codigos = t[usar], codigos[usar].astype(np.int64)
+
+    def columna(nombre):
+        return df[nombre].to_numpy(dtype=np.float64, na_value=np.nan)[usar]
+
+    energia = np.nan_to_num(columna(tipo_energia))
+    reactiva = np.nan_to_num(columna(col_reactiva))
+    demanda = columna(tipo_demanda)
+
+    dia = t.astype("datetime64[D]")
+    dias, idx = np.unique(dia, return_inverse=True)
+    n_dias, n_bloques = len(dias), len(calendario.bloques)
+    clave = idx * n_bloques + codigos
+
+    pasos = np.diff(np.sort(t.view(np.int64)))
+    paso = float(np.median(pasos[pasos > 0])) if (pasos > 0).any() else 60e9
+    muestras = np.bincount(idx, minlength=n_dias)
+    cobertura = np.minimum(muestras * paso / (86400 * 1e9), 1.0)
+
+    energia_db = np.bincount(clave, weights=energia, minlength=n_dias * n_bloques).reshape(n_dias, n_bloques)
+    dmax_db = np.full(n_dias * n_bloques, -np.inf)
+    np.maximum.at(dmax_db, clave, np.where(np.isnan(demanda), -np.inf, demanda))
+    dmax_db = np.where(np.isinf(dmax_db), 0.0, dmax_db).reshape(n_dias, n_bloques)
+    kvarh = np.bincount(idx, weights=reactiva, minlength=n_dias)
+
+    completos = cobertura >= cobertura_minima
+    c = cobertura[completos]
+    return {
+        "dias": dias[completos],
+        "energia": energia_db[completos] / c[:, None],
+        "dmax": dmax_db[completos],
+        "kvarh": kvarh[completos] / c,
+    }
+
+
+def _simular_lote(dias: dict, ranuras: list[tuple[np.ndarray, np.ndarray]], n_dias_mes: int,
+                  n_meses: int, semilla) -> dict[str, np.ndarray]:
+    """
+    Sintetiza `n_meses` meses: para cada grupo de ranuras (días del mes) con
+    su conjunto de días medidos, elige días al azar con reposición.
+    """
+    rng = np.random.default_rng(semilla)
+    eleccion = np.empty((n_meses, n_dias_mes), dtype=np.int64)
+    for posiciones, candidatos in ranuras:
+        eleccion[:, posiciones] = candidatos[rng.integers(len(candidatos), size=(n_meses, len(posiciones)))]
+    energia = dias["energia"][eleccion]  # meses × días × bloques
+    return {
+        "consumo": energia.sum(axis=1),
+        "dmax": dias["dmax"][eleccion].max(axis=1),
+        "kvarh": dias["kvarh"][eleccion].sum(axis=1),
+    }
+
+
+@instrumentar
+def bandas_extrapolacion(
+    df: pd.DataFrame,
+    tarifas=("BTD", "BTH", "MTD", "MTH"),
+    *,
+    n_meses: int = 10_000,
+    confianza: float = 0.9,
+    inicio=None,
+    dias_mes: int = 30,
+    tipo_energia: str = "E.Activa III T",
+    tipo_demanda: str = "DMAX_15min",
+    col_reactiva: str = "E.Reactiva III M",
+    cobertura_minima: float = 0.9,
+    periodo=None,
+    distribuidora=None,
+    semilla: int | None = 0,
+    procesos: int | None = None,
+) -> dict:
+    """
+    Intervalos de confianza del mes extrapolado por bootstrap de días.
+
+    Solo se remuestrean días con al menos `cobertura_minima` de muestras (su
+    energía se escala a día completo). El mes sintético tiene `dias_mes`
+    días a partir de `inicio` (por defecto el primer día medido), con el
+    tipo de día de cada fecha según el calendario de la distribuidora; si no
+    hay días medidos de un grupo se usan los de otro (ver "sustituciones").
+
+    Los meses se generan en lotes con semillas independientes derivadas de
+    `semilla`, así que el resultado no depende de `procesos` (nº de procesos
+    de trabajo; None o 1 = en este proceso).
+
+    Returns:
+        dict con:
+          • "intervalos": DataFrame por métrica (energía total, consumo y
+            demanda por bloque, FP, total por tarifa) con media, límite
+            inferior, mediana y límite superior.
+          • "meses": DataFrame con una fila por mes sintético.
+          • "dias_por_grupo": días medidos usados por grupo.
+          • "sustituciones": {grupo sin datos: grupo usado}.
+          • "periodo": periodo tarifario aplicado y "aviso_periodo" si las
+            tablas no cubren la medición y se usa el más cercano (o None).
+    """
+    if not 0 < confianza < 1:
+        raise ValueError("confianza debe estar entre 0 y 1")
+    for col in ("Fecha/hora", tipo_energia, tipo_demanda, col_reactiva):
+        if col not in df.columns:
+            raise KeyError(f"{col} no existe")
+    dist = resolver_distribuidora(distribuidora)
+    calendario = dist.calendario
+    bloques = calendario.bloques
+
+    dias = _dias_medidos(df, tipo_energia, tipo_demanda, col_reactiva, calendario, cobertura_minima)
+    if not len(dias["dias"]):
+        raise ValueError("No hay días con cobertura suficiente para remuestrear")
+    grupo_medido = _GRUPO_DE_TIPO[calendario.tipos_dia(dias["dias"])]
+
+    inicio = np.datetime64(pd.Timestamp(inicio).date() if inicio is not None else dias["dias"][0], "D")
+    fechas_mes = inicio + np.arange(dias_mes)
+    grupo_mes = _GRUPO_DE_TIPO[calendario.tipos_dia(fechas_mes)]
+
+    ranuras, sustituciones = [], {}
+    for g in np.unique(grupo_mes):
+        origen = g
+        candidatos = np.flatnonzero(grupo_medido == g)
+        for alternativa in _SUSTITUTOS[g]:
+            if len(candidatos):
+                break
+            origen, candidatos = alternativa, np.flatnonzero(grupo_medido == alternativa)
+        if origen != g:
+            sustituciones[GRUPOS_DIA[g]] = GRUPOS_DIA[origen]
+        ranuras.append((np.flatnonzero(grupo_mes == g), candidatos))
+
+    tamanos = [min(_MESES_POR_LOTE, n_meses - i) for i in range(0, n_meses, _MESES_POR_LOTE)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    argumentos = [(dias, ranuras, dias_mes, n, s) for n, s in zip(tamanos, semillas)]
+    if procesos and procesos > 1 and len(argumentos) > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            lotes = list(pool.map(_simular_lote, *zip(*argumentos)))
+    else:
+        lotes = [_simular_lote(*a) for a in argumentos]
+    # Como en `facturar`: un bloque con saldo exportador se factura con consumo 0.
+    consumo = np.maximum(np.concatenate([lote["consumo"] for lote in lotes]), 0.0)
+    dmax = np.concatenate([lote["dmax"] for lote in lotes])
+    kvarh = np.concatenate([lote["kvarh"] for lote in lotes])
+
+    kwh = consumo.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fp = np.where(kwh != 0, np.cos(np.arctan(kvarh / kwh)), np.nan)
+    aviso_periodo = None
+    if periodo is None:
+        vigente, aviso_periodo = periodo_por_defecto(pd.Timestamp(dias["dias"][-1]), dist)
+        periodo = vigente.clave
+    consumo_bloq = {b: consumo[:, j] for j, b in enumerate(bloques)}
+    dmax_bloq = {b: dmax[:, j] for j, b in enumerate(bloques)}
+
+    meses = pd.DataFrame({"energia_total": kwh})
+    for b in bloques:
+        meses[f"consumo_{b}"] = consumo_bloq[b]
+    for b in bloques:
+        meses[f"dmax_{b}"] = dmax_bloq[b]
+    meses["fp"] = fp
+    fp_cargo = np.nan_to_num(fp, nan=1.0)
+    for tarifa in tarifas:
+        meses[f"total_{tarifa}"] = calcular_tarifa_lote(tarifa, consumo_bloq, dmax_bloq, fp_cargo, periodo, dist)["total"]
+
+    cola = (1 - confianza) / 2
+    cuantiles = meses.quantile([cola, 0.5, 1 - cola]).T
+    intervalos = pd.DataFrame(
+        {
+            "media": meses.mean(),
+            "inferior": cuantiles[cola],
+            "mediana": cuantiles[0.5],
+            "superior": cuantiles[1 - cola],
+        }
+    )
+    intervalos.attrs["confianza"] = confianza
+
+    return {
+        "intervalos": intervalos,
+        "meses": meses,
+        "dias_por_grupo": {GRUPOS_DIA[g]: int((grupo_medido == g).sum()) for g in range(len(GRUPOS_DIA))},
+        "sustituciones": sustituciones,
+        "periodo": periodo,
+        "aviso_periodo": aviso_periodo,
+    }
@@ -0,0 +1,154 @@
+"""
+Ejecución de análisis independientes como un grafo de tareas sobre un pool
+de procesos.
+
+Las columnas numéricas (y las fechas) del DataFrame se copian una sola vez a
+memoria compartida (`TablaColumnar.compartir`); cada proceso de trabajo las
+abre al arrancar y reconstruye el DataFrame como vista, sin recibirlo
+serializado. A cada tarea solo se le envían su función, sus argumentos y los
+resultados de las tareas de las que depende.
+
+    tareas = [
+        Tarea("voltaje", voltaje, {"graficar": True}),
+        Tarea("energia", analizar_energia, {"tipo_energia": "E.Activa III T"}),
+        Tarea("resumen", resumir, entradas={"energia": "energia"}),
+    ]
+    resultados = ejecutar_tareas(df, tareas, procesos=4)
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import pandas as pd
+
+from . import instrumentacion
+from .columnar import DescriptorCompartido, TablaColumnar
+from .distribuidoras import Distribuidora, distribuidora_activa, seleccionar_distribuidora
+from .instrumentacion import instrumentar
+
+
+@dataclass(frozen=True)
+class Tarea:
+    """
+    Una llamada `funcion(df, **kwargs, **entradas)` del grafo. `entradas`
+    asigna a argumentos de la función los resultados de otras tareas
+    (argumento → nombre de tarea); `depende` añade dependencias sin pasar su
+    resultado. `funcion` debe poder importarse por nombre (nivel de módulo).
+    """
+
+    nombre: str
+    funcion: Callable[..., Any]
+    kwargs: dict[str, Any] = field(default_factory=dict)
+    entradas: dict[str, str] = field(default_factory=dict)
+    depende: tuple[str, ...] = ()
+
+    @property
+    def dependencias(self) -> set[str]:
+        return set(self.depende) | set(self.entradas.values())
+
+
+def ordenar_tareas(tareas: list[Tarea]) -> list[Tarea]:
+    """Orden topológico estable; error si hay nombres repetidos, dependencias desconocidas o ciclos."""
+    por_nombre = {t.nombre: t for t in tareas}
+    if len(por_nombre) != len(tareas):
+        raise ValueError("Hay tareas con el mismo nombre")
+    for t in tareas:
+        faltan = t.dependencias - por_nombre.keys()
+        if faltan:
+            raise ValueError(f"La tarea '{t.nombre}' depende de tareas inexistentes: {sorted(faltan)}")
+
+    orden, hechas = [], set()
+    pendientes = list(tareas)
+    while pendientes:
+        listas = [t for t in pendientes if t.dependencias <= hechas]
+        if not listas:
+            raise ValueError(f"Dependencias circulares entre: {[t.nombre for t in pendientes]}")
+        orden += listas
+        hechas |= {t.nombre for t in listas}
+        pendientes = [t for t in pendientes if t.nombre not in hechas]
+    return orden
+
+
+# ---- proceso de trabajo -----------------------------------------------------
+
+_trabajo: dict[str, Any] = {}
+
+
+def _iniciar_trabajo(descriptor: DescriptorCompartido, distribuidora: Distribuidora, instrumentar_: bool) -> None:
+    _trabajo["tabla"] = TablaColumnar.adjuntar(descriptor)
+    # Se pasa la distribuidora compilada (no su clave): así llega también
+    # una cargada desde un JSON fuera de `datos/distribuidoras`.
+    seleccionar_distribuidora(distribuidora)
+    instrumentacion.activar(instrumentar_)
+
+
+def _ejecutar_en_trabajo(funcion, kwargs: dict) -> tuple[Any, list[dict]]:
+    tabla = _trabajo["tabla"]
+    df = tabla.vista("todas", con_fecha=True, con_extras=True)
+    previos = len(instrumentacion.registros())
+    resultado = funcion(df, **kwargs)
+    return resultado, instrumentacion.registros()[previos:]
+
+
+# ---- planificador -----------------------------------------------------------
+
+
+def _kwargs(tarea: Tarea, resultados: dict[str, Any]) -> dict[str, Any]:
+    return {**tarea.kwargs, **{arg: resultados[origen] for arg, origen in tarea.entradas.items()}}
+
+
+@instrumentar
+def ejecutar_tareas(
+    df: pd.DataFrame,
+    tareas: list[Tarea],
+    *,
+    procesos: int | None = None,
+) -> dict[str, Any]:
+    """
+    Ejecuta el grafo de `tareas` sobre `df` y devuelve {nombre: resultado}.
+
+    Con `procesos` > 1 (por defecto, los núcleos disponibles) cada tarea se
+    lanza en el pool en cuanto terminan sus dependencias; con `procesos=1`
+    se ejecutan en orden en este proceso, sobre el propio `df`. En los
+    procesos de trabajo el DataFrame es de solo lectura y la distribuidora
+    activa es la de este proceso. Un error en una tarea se propaga.
+    """
+    orden = ordenar_tareas(tareas)
+    procesos = procesos or os.cpu_count() or 1
+    resultados: dict[str, Any] = {}
+    if procesos <= 1 or len(orden) <= 1:
+        for tarea in orden:
+            resultados[tarea.nombre] = tarea.funcion(df, **_kwargs(tarea, resultados))
+        return resultados
+
+    col_fecha = "Fecha/hora"
+    columnas = [c for c in df.columns if c != col_fecha]
+    local = TablaColumnar.desde_dataframe(df, columnas, {"todas": columnas}, col_fecha=col_fecha)
+    tabla, descriptor = local.compartir()
+    del local
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(procesos, len(orden)),
+            initializer=_iniciar_trabajo,
+            initargs=(descriptor, distribuidora_activa(), instrumentacion.activa()),
+        ) as pool:
+            pendientes = list(orden)
+            en_curso = {}
+            while pendientes or en_curso:
+                for tarea in [t for t in pendientes if t.dependencias <= resultados.keys()]:
+                    futuro = pool.submit(_ejecutar_en_trabajo, tarea.funcion, _kwargs(tarea, resultados))
+                    en_curso[futuro] = tarea
+                    pendientes.remove(tarea)
+                hechos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    tarea = en_curso.pop(futuro)
+                    resultado, registros = futuro.result()
+                    instrumentacion.incorporar(registros)
+                    resultados[tarea.nombre] = resultado
+    finally:
+        tabla.liberar()
+    return {t.nombre: resultados[t.nombre] for t in orden}
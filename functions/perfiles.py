@@ -0,0 +1,167 @@
+"""
+Perfiles por minuto del día: códigos enteros de minuto y día de la semana
+calculados con aritmética sobre datetime64 y agregación de todas las
+columnas numéricas en una sola pasada (orden estable + `np.add.reduceat`).
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from .instrumentacion import instrumentar
+
+DIAS_SEMANA = ("lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo")
+MINUTOS_DIA = 1440
+_NS_MINUTO = 60 * 10**9
+_FECHA_FICTICIA = np.datetime64("1900-01-01T00:00", "m")
+
+
+def codigos_tiempo(fechas) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Códigos enteros de cada instante:
+      • minuto del día (0–1439)
+      • día de la semana (0 = lunes … 6 = domingo)
+      • máscara de fechas válidas (False en NaT)
+
+    Las fechas con zona horaria se toman en su hora local.
+    """
+    fechas = pd.to_datetime(pd.Series(fechas) if not isinstance(fechas, pd.Series) else fechas)
+    if fechas.dt.tz is not None:
+        fechas = fechas.dt.tz_localize(None)
+    valores = fechas.to_numpy(dtype="datetime64[ns]")
+    validas = ~np.isnat(valores)
+    minutos = np.where(validas, valores.view(np.int64), 0) // _NS_MINUTO
+    minuto_dia = (minutos % MINUTOS_DIA).astype(np.int16)
+    # 1970-01-01 fue jueves (3 con lunes = 0).
+    dia_semana = ((minutos // MINUTOS_DIA + 3) % 7).astype(np.int8)
+    return minuto_dia, dia_semana, validas
+
+
+def _codigos_dias(dias_semana: Iterable[str]) -> list[int]:
+    codigos = []
+    for dia in dias_semana:
+        try:
+            codigos.append(DIAS_SEMANA.index(dia.lower()))
+        except ValueError:
+            raise ValueError(f"Día de la semana desconocido: {dia!r}. Usa uno de {DIAS_SEMANA}.") from None
+    return codigos
+
+
+def _percentiles_por_grupo(
+    clave: np.ndarray, valores: np.ndarray, inicios: np.ndarray, q: float
+) -> np.ndarray:
+    """
+    Percentil `q` (0–100, interpolación lineal como `np.nanpercentile`) de
+    cada grupo consecutivo de `clave` ya ordenada, columna a columna.
+    """
+    n_grupos = len(inicios)
+    fin = np.append(inicios[1:], len(clave))
+    salida = np.full((n_grupos, valores.shape[1]), np.nan)
+    for j in range(valores.shape[1]):
+        col = valores[:, j]
+        # Dentro de cada grupo, valores ascendentes con NaN al final.
+        orden = np.lexsort((col, clave))
+        ordenados = col[orden]
+        conteo = np.add.reduceat(~np.isnan(col), inicios) if len(col) else np.zeros(0, int)
+        hay = conteo > 0
+        pos = (conteo - 1).clip(min=0) * (q / 100.0)
+        bajo = np.floor(pos).astype(np.intp)
+        alto = np.minimum(bajo + 1, (conteo - 1).clip(min=0))
+        frac = pos - bajo
+        v_bajo = ordenados[np.minimum(inicios + bajo, fin - 1)]
+        v_alto = ordenados[np.minimum(inicios + alto, fin - 1)]
+        salida[hay, j] = (v_bajo + (v_alto - v_bajo) * frac)[hay]
+    return salida
+
+
+@instrumentar
+def perfil_por_minuto(
+    df: pd.DataFrame,
+    *,
+    col_fecha: str = "Fecha/hora",
+    columnas: list[str] | None = None,
+    dias_semana: list[str] | None = None,
+    por_dia_semana: bool = False,
+    percentiles: Iterable[float] | None = None,
+) -> dict:
+    """
+    Perfil de cada columna numérica por minuto del día.
+
+    Args:
+        df: DataFrame con la columna de fechas `col_fecha`.
+        columnas: columnas a agregar (por defecto, todas las numéricas).
+        dias_semana: días en español a incluir (ej. ['lunes', 'martes']).
+        por_dia_semana: si True, agrega por (día de la semana × minuto) y
+            devuelve además el cubo completo 7 × 1440 × columnas.
+        percentiles: percentiles (0–100) a calcular además de la media.
+
+    Returns:
+        dict con:
+          • "media", "conteo": DataFrames indexados por 'Fecha/hora' con la
+            fecha ficticia 1900-01-01 HH:MM (y 'dia_semana' delante si
+            `por_dia_semana`); solo aparecen los minutos con datos.
+          • "percentiles": {q: DataFrame} con el mismo índice.
+          • "cubo": ndarray (7, 1440, n_columnas) de medias, NaN sin datos
+            (solo si `por_dia_semana`).
+    """
+    if col_fecha not in df.columns:
+        raise ValueError(f"El DataFrame debe tener una columna '{col_fecha}'.")
+    if columnas is None:
+        columnas = [c for c in df.columns if c != col_fecha and pd.api.types.is_numeric_dtype(df[c])
+                    and not pd.api.types.is_bool_dtype(df[c])]
+
+    minuto, dia, validas = codigos_tiempo(df[col_fecha])
+    if dias_semana:
+        validas &= np.isin(dia, _codigos_dias(dias_semana))
+
+    clave = minuto.astype(np.int64)
+    if por_dia_semana:
+        clave = dia.astype(np.int64) * MINUTOS_DIA + clave
+    clave = clave[validas]
+    valores = np.column_stack(
+        [df[c].to_numpy(dtype=np.float64, na_value=np.nan)[validas] for c in columnas]
+    ) if columnas else np.empty((int(validas.sum()), 0))
+
+    orden = np.argsort(clave, kind="stable")
+    clave, valores = clave[orden], valores[orden]
+    if len(clave):
+        inicios = np.flatnonzero(np.r_[True, clave[1:] != clave[:-1]])
+        presentes = clave[inicios]
+        nulos = np.isnan(valores)
+        sumas = np.add.reduceat(np.where(nulos, 0.0, valores), inicios, axis=0)
+        conteo = np.add.reduceat(~nulos, inicios, axis=0)
+    else:
+        inicios = presentes = np.zeros(0, dtype=np.int64)
+        sumas = np.zeros((0, len(columnas)))
+        conteo = np.zeros((0, len(columnas)), dtype=np.int64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        medias = sumas / conteo
+
+    horas = pd.DatetimeIndex(
+        (_FECHA_FICTICIA + (presentes % MINUTOS_DIA).astype("timedelta64[m]")).astype("datetime64[ns]"),
+        name=col_fecha,
+    )
+    if por_dia_semana:
+        indice = pd.MultiIndex.from_arrays(
+            [pd.Categorical.from_codes(presentes // MINUTOS_DIA, categories=list(DIAS_SEMANA)), horas],
+            names=["dia_semana", col_fecha],
+        )
+    else:
+        indice = horas
+
+    resultado = {
+        "media": pd.DataFrame(medias, index=indice, columns=columnas),
+        "conteo": pd.DataFrame(conteo, index=indice, columns=columnas),
+        "percentiles": {
+            q: pd.DataFrame(_percentiles_por_grupo(clave, valores, inicios, q), index=indice, columns=columnas)
+            for q in (percentiles or ())
+        },
+    }
+    if por_dia_semana:
+        cubo = np.full((7 * MINUTOS_DIA, len(columnas)), np.nan)
+        cubo[presentes] = medias
+        resultado["cubo"] = cubo.reshape(7, MINUTOS_DIA, len(columnas))
+    return resultado
@@ -0,0 +1,241 @@
+"""
+Pipeline de etapas con nombre y caché en disco.
+
+Cada `Etapa` declara las etapas de las que toma su entrada y los parámetros
+de configuración que usa. Su clave es un hash de su nombre, de esos
+parámetros, de las claves de sus entradas y de la versión del código del
+paquete, de modo que al cambiar un parámetro solo se recalculan las etapas
+que dependen de él (directa o indirectamente). Las salidas se guardan con
+pickle en `dir_cache/<etapa>-<clave>.pickle`.
+
+Las etapas que escriben ficheros (gráficos) en `dir_archivos` registran
+cuáles crearon; si alguno falta, la entrada de caché no se usa.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import warnings
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from .instrumentacion import etapa as medir_etapa
+
+_VERSION_CACHE = 1
+
+
+@dataclass(frozen=True)
+class Etapa:
+    """
+    `funcion(**entradas, **parametros, **opciones)`: recibe la salida de
+    cada etapa de `entradas` y los valores de `parametros` (que forman parte
+    de la clave) y `opciones` (que no la afectan, p. ej. nº de procesos).
+    `huella` añade a la clave datos externos (p. ej. fecha de modificación
+    del fichero de entrada). Con `cache=False` se ejecuta siempre.
+    """
+
+    nombre: str
+    funcion: Callable[..., Any]
+    entradas: tuple[str, ...] = ()
+    parametros: tuple[str, ...] = ()
+    opciones: tuple[str, ...] = ()
+    huella: Callable[[dict[str, Any]], str] | None = None
+    cache: bool = True
+
+
+@lru_cache(maxsize=1)
+def _version_codigo() -> str:
+    """Huella de los módulos del paquete (nombre, tamaño y fecha de modificación)."""
+    h = hashlib.sha256(str(_VERSION_CACHE).encode())
+    for ruta in sorted(Path(__file__).parent.rglob("*.py")):
+        st = ruta.stat()
+        h.update(f"{ruta.name}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def huella_fichero(ruta: str | Path) -> str:
+    """Huella de un fichero de entrada por ruta, tamaño y fecha de modificación."""
+    ruta = Path(ruta)
+    st = ruta.stat()
+    return f"{ruta.resolve()}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def _canonico(valor):
+    """Valor con representación estable para la clave (escalares NumPy → Python)."""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (list, tuple)):
+        return [_canonico(v) for v in valor]
+    if isinstance(valor, dict):
+        return {k: _canonico(v) for k, v in sorted(valor.items())}
+    return valor
+
+
+def _archivos(directorio: Path | None) -> dict[str, int]:
+    if directorio is None or not directorio.is_dir():
+        return {}
+    return {str(p): p.stat().st_mtime_ns for p in directorio.iterdir() if p.is_file()}
+
+
+class Pipeline:
+    """Conjunto de etapas que se resuelven bajo demanda, con caché en disco."""
+
+    def __init__(
+        self,
+        etapas: list[Etapa],
+        *,
+        dir_cache: str | Path | None = ".cache_informe",
+        dir_archivos: str | Path | None = "images",
+    ):
+        self.etapas = {e.nombre: e for e in etapas}
+        if len(self.etapas) != len(etapas):
+            raise ValueError("Hay etapas con el mismo nombre")
+        for e in etapas:
+            faltan = [x for x in e.entradas if x not in self.etapas]
+            if faltan:
+                raise ValueError(f"La etapa '{e.nombre}' usa etapas inexistentes: {faltan}")
+        self.dir_cache = Path(dir_cache) if dir_cache is not None else None
+        self.dir_archivos = Path(dir_archivos) if dir_archivos is not None else None
+        self.estado: dict[str, str] = {}
+
+    def finales(self) -> list[str]:
+        """Etapas que no son entrada de ninguna otra."""
+        usadas = {x for e in self.etapas.values() for x in e.entradas}
+        return [n for n in self.etapas if n not in usadas]
+
+    # ---- claves ----------------------------------------------------------
+
+    def claves(self, parametros: dict[str, Any]) -> dict[str, str]:
+        """Clave de cada etapa para `parametros` (sin ejecutar nada)."""
+        claves: dict[str, str] = {}
+
+        def clave(nombre: str, visitando: tuple[str, ...] = ()) -> str:
+            if nombre in claves:
+                return claves[nombre]
+            if nombre in visitando:
+                raise ValueError(f"Dependencias circulares: {' → '.join(visitando + (nombre,))}")
+            e = self.etapas[nombre]
+            h = hashlib.sha256(f"{nombre}|{_version_codigo()}".encode())
+            for p in e.parametros:
+                h.update(f"|{p}={_canonico(parametros[p])!r}".encode())
+            for entrada in e.entradas:
+                h.update(f"|{entrada}:{clave(entrada, visitando + (nombre,))}".encode())
+            if e.huella is not None:
+                h.update(f"|{e.huella(parametros)}".encode())
+            claves[nombre] = h.hexdigest()[:20]
+            return claves[nombre]
+
+        for nombre in self.etapas:
+            clave(nombre)
+        return claves
+
+    # ---- caché -----------------------------------------------------------
+
+    def _ruta(self, nombre: str, clave: str) -> Path:
+        return self.dir_cache / f"{nombre}-{clave}.pickle"
+
+    # Cada fichero de caché guarda dos objetos pickle: la lista de ficheros
+    # generados por la etapa y su resultado, para poder comprobar los
+    # primeros sin cargar el segundo.
+
+    def _leer(self, nombre: str, clave: str, *, resultado: bool = True):
+        """
+        (archivos, resultado) de la caché, o None si no hay entrada válida o
+        falta alguno de sus ficheros. Con `resultado=False` no lo carga.
+        """
+        if self.dir_cache is None or not self.etapas[nombre].cache:
+            return None
+        ruta = self._ruta(nombre, clave)
+        if not ruta.exists():
+            return None
+        try:
+            with ruta.open("rb") as fh:
+                archivos = pickle.load(fh)
+                if not all(Path(a).exists() for a in archivos):
+                    return None
+                return archivos, (pickle.load(fh) if resultado else None)
+        except Exception:
+            return None
+
+    def _guardar(self, nombre: str, clave: str, resultado, archivos: list[str]) -> None:
+        if self.dir_cache is None or not self.etapas[nombre].cache:
+            return
+        ruta = self._ruta(nombre, clave)
+        temporal = ruta.with_suffix(".tmp")
+        try:
+            self.dir_cache.mkdir(parents=True, exist_ok=True)
+            with temporal.open("wb") as fh:
+                pickle.dump(archivos, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(resultado, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, ruta)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            temporal.unlink(missing_ok=True)
+            warnings.warn(f"No se pudo guardar en caché la etapa '{nombre}': {e}")
+
+    # ---- ejecución -------------------------------------------------------
+
+    def ejecutar(
+        self,
+        parametros: dict[str, Any],
+        objetivos: list[str] | None = None,
+        *,
+        opciones: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Resuelve `objetivos` (por defecto, las etapas finales) y devuelve la
+        salida de cada etapa resuelta. Una etapa con caché válida no necesita
+        sus entradas, que solo se resuelven si hay que recalcularla.
+        `self.estado` indica para cada etapa si salió de la caché o se calculó.
+        """
+        opciones = opciones or {}
+        claves = self.claves(parametros)
+        salidas: dict[str, Any] = {}
+        self.estado = {}
+
+        def resolver(nombre: str):
+            if nombre in salidas:
+                return salidas[nombre]
+            e = self.etapas[nombre]
+            entrada = self._leer(nombre, claves[nombre])
+            if entrada is not None:
+                self.estado[nombre] = "cache"
+                salidas[nombre] = entrada[1]
+                return salidas[nombre]
+
+            argumentos = {x: resolver(x) for x in e.entradas}
+            argumentos.update({p: parametros[p] for p in e.parametros})
+            argumentos.update({o: opciones.get(o) for o in e.opciones})
+            antes = _archivos(self.dir_archivos)
+            with medir_etapa(f"pipeline.{nombre}"):
+                resultado = e.funcion(**argumentos)
+            despues = _archivos(self.dir_archivos)
+            nuevos = sorted(a for a, t in despues.items() if antes.get(a) != t)
+            self._guardar(nombre, claves[nombre], resultado, nuevos)
+            self.estado[nombre] = "calculada"
+            salidas[nombre] = resultado
+            return resultado
+
+        objetivos = objetivos or self.finales()
+        for nombre in objetivos:
+            resolver(nombre)
+
+        # Etapas previas no resueltas (su salida no hacía falta) cuyos ficheros
+        # se han borrado: se recalculan para regenerarlos.
+        previas, pila = set(), list(objetivos)
+        while pila:
+            for x in self.etapas[pila.pop()].entradas:
+                if x not in previas:
+                    previas.add(x)
+                    pila.append(x)
+        for nombre in self.etapas:
+            if nombre in previas and nombre not in salidas and self.etapas[nombre].cache:
+                ruta = self._ruta(nombre, claves[nombre]) if self.dir_cache is not None else None
+                if ruta is not None and ruta.exists() and self._leer(nombre, claves[nombre], resultado=False) is None:
+                    resolver(nombre)
+        return salidas
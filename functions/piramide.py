@@ -0,0 +1,405 @@
+"""
+Pirámide de agregados multirresolución (1 min, 15 min, 1 h, 1 día).
+
+Cada nivel guarda, por intervalo y columna, nº de muestras válidas, suma,
+mínimo, máximo e instante del máximo, además del instante de la primera y
+la última muestra del intervalo. El nivel más fino se calcula en una sola
+pasada sobre las muestras y cada nivel superior a partir del anterior.
+
+Los gráficos de un rango de fechas usan el nivel más grueso que aún da
+suficiente detalle (`serie`), y las estadísticas de una ventana arbitraria
+(`resumen`) se componen con los intervalos más gruesos contenidos en ella,
+bajando de nivel solo en los bordes. La ventana [inicio, fin] incluye ambos
+extremos, como `calcular_sumatoria_energia`.
+
+    piramide = PiramideAgregados.construir(df)
+    piramide.resumen(["P.Activa III T"], "2025-07-21 09:00", "2025-07-22 17:00")
+    graficar_parametros(piramide, ["Tensión L1"], fecha_inicio="2025-07-21")
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .instrumentacion import instrumentar
+
+NIVELES = {"1min": "1min", "15min": "15min", "1h": "1h", "1D": "1D"}
+ESTADISTICAS = ("conteo", "suma", "media", "minimo", "maximo", "fecha_maximo")
+
+_NAT = np.iinfo(np.int64).min
+
+
+def _tramos(ids: np.ndarray) -> np.ndarray:
+    """Posición de inicio de cada tramo de valores iguales consecutivos."""
+    return np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+
+
+def _instante_maximo(valores: np.ndarray, maximo: np.ndarray, inicios: np.ndarray, instantes: np.ndarray) -> np.ndarray:
+    """
+    Instante del primer valor igual al máximo de cada tramo, por columna.
+    `instantes` es (n,) o (n, columnas); los tramos sin valores dan NaT.
+    """
+    n = len(valores)
+    es_maximo = valores == np.repeat(maximo, np.diff(np.r_[inicios, n]), axis=0)
+    posicion = np.where(es_maximo, np.arange(n)[:, None], n)
+    primera = np.minimum.reduceat(posicion, inicios, axis=0)
+    if instantes.ndim == 1:
+        instantes = np.broadcast_to(instantes[:, None], valores.shape)
+    instantes = np.vstack([instantes, np.full((1, valores.shape[1]), _NAT)])
+    return np.take_along_axis(instantes, primera, axis=0)
+
+
+@dataclass
+class NivelAgregado:
+    """Un nivel de la pirámide; los instantes en ns desde la época (int64)."""
+
+    nombre: str
+    ancho: int
+    inicio: np.ndarray
+    primera: np.ndarray
+    ultima: np.ndarray
+    conteo: np.ndarray
+    suma: np.ndarray
+    minimo: np.ndarray
+    maximo: np.ndarray
+    t_maximo: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.inicio)
+
+    # Si cada intervalo tiene una sola muestra (p. ej. el nivel de 1 min con
+    # registros por minuto) mínimo, máximo e instante del máximo se deducen
+    # de la suma y no se serializan.
+
+    def __getstate__(self):
+        estado = dict(self.__dict__)
+        if np.array_equal(self.primera, self.ultima):
+            estado.update(conteo=self.conteo.astype(np.int8), minimo=None, maximo=None, t_maximo=None)
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        if self.maximo is None:
+            valida = self.conteo.astype(bool)
+            self.conteo = self.conteo.astype(np.int64)
+            self.minimo = self.maximo = np.where(valida, self.suma, np.nan)
+            self.t_maximo = np.where(valida, self.primera[:, None], _NAT)
+
+    def agrupar(self, nombre: str, ancho: int) -> "NivelAgregado":
+        """Nivel superior de intervalos de `ancho` ns, a partir de este."""
+        ids = self.inicio // ancho
+        s = _tramos(ids)
+        maximo = np.fmax.reduceat(self.maximo, s, axis=0)
+        return NivelAgregado(
+            nombre=nombre,
+            ancho=ancho,
+            inicio=ids[s] * ancho,
+            primera=self.primera[s],
+            ultima=self.ultima[np.r_[s[1:], len(self)] - 1],
+            conteo=np.add.reduceat(self.conteo, s, axis=0),
+            suma=np.add.reduceat(self.suma, s, axis=0),
+            minimo=np.fmin.reduceat(self.minimo, s, axis=0),
+            maximo=maximo,
+            t_maximo=_instante_maximo(self.maximo, maximo, s, self.t_maximo),
+        )
+
+
+class PiramideAgregados:
+    """
+    Agregados de `columnas` por niveles, del más fino al más grueso. Con
+    `construir` conserva además las muestras originales (no se guardan al
+    serializar), que solo hacen falta si el borde de una ventana parte un
+    intervalo del nivel más fino; sin ellas, esos bordes se ajustan a los
+    intervalos del nivel más fino que empiezan dentro de la ventana.
+    """
+
+    def __init__(self, columnas: list[str], niveles: list[NivelAgregado], muestras=None):
+        self.columnas = list(columnas)
+        self.niveles = niveles
+        self._indice = {c: i for i, c in enumerate(self.columnas)}
+        self._muestras = muestras
+
+    def __getstate__(self):
+        return {**self.__dict__, "_muestras": None}
+
+    @classmethod
+    def construir(
+        cls,
+        df: pd.DataFrame,
+        columnas: list[str] | None = None,
+        *,
+        niveles: dict[str, str] = NIVELES,
+        col_fecha: str = "Fecha/hora",
+    ) -> "PiramideAgregados":
+        """
+        Pirámide de `columnas` (por defecto, todas las numéricas) con
+        `niveles` {nombre: frecuencia pandas}, de más fino a más grueso; cada
+        ancho debe ser múltiplo del anterior.
+        """
+        anchos = [pd.Timedelta(f).value for f in niveles.values()]
+        if any(b % a for a, b in zip(anchos, anchos[1:])):
+            raise ValueError(f"Cada nivel debe ser múltiplo del anterior: {list(niveles.values())}")
+        if columnas is None:
+            columnas = [
+                c for c, tipo in df.dtypes.items()
+                if c != col_fecha and pd.api.types.is_numeric_dtype(tipo) and not pd.api.types.is_bool_dtype(tipo)
+            ]
+
+        fechas = pd.to_datetime(df[col_fecha], dayfirst=True, errors="coerce").to_numpy("datetime64[ns]")
+        validas = ~np.isnat(fechas)
+        t = fechas[validas].view(np.int64)
+        valores = np.column_stack([df[c].to_numpy(dtype=float, na_value=np.nan)[validas] for c in columnas])
+        if len(t) and (np.diff(t) < 0).any():
+            orden = np.argsort(t, kind="stable")
+            t, valores = t[orden], valores[orden]
+        if not len(t):
+            raise ValueError("No hay muestras con fecha válida")
+
+        # Nivel más fino: una pasada sobre las muestras.
+        nombres = list(niveles)
+        ids = t // anchos[0]
+        s = _tramos(ids)
+        maximo = np.fmax.reduceat(valores, s, axis=0)
+        nivel = NivelAgregado(
+            nombre=nombres[0],
+            ancho=anchos[0],
+            inicio=ids[s] * anchos[0],
+            primera=t[s],
+            ultima=t[np.r_[s[1:], len(t)] - 1],
+            conteo=np.add.reduceat(~np.isnan(valores), s, axis=0).astype(np.int64),
+            suma=np.add.reduceat(np.where(np.isnan(valores), 0.0, valores), s, axis=0),
+            minimo=np.fmin.reduceat(valores, s, axis=0),
+            maximo=maximo,
+            t_maximo=_instante_maximo(valores, maximo, s, t),
+        )
+        construidos = [nivel]
+        for nombre, ancho in zip(nombres[1:], anchos[1:]):
+            construidos.append(construidos[-1].agrupar(nombre, ancho))
+        return cls(columnas, construidos, muestras=(t, valores))
+
+    # ---- selección -------------------------------------------------------
+
+    @property
+    def inicio(self) -> pd.Timestamp:
+        return pd.Timestamp(self.niveles[0].primera[0])
+
+    @property
+    def fin(self) -> pd.Timestamp:
+        return pd.Timestamp(self.niveles[0].ultima[-1])
+
+    def _limites(self, inicio, fin) -> tuple[int, int]:
+        ini = pd.Timestamp(inicio).value if inicio is not None else self.niveles[0].primera[0]
+        fin = pd.Timestamp(fin).value if fin is not None else self.niveles[0].ultima[-1]
+        return int(ini), int(fin)
+
+    def _ventana(self, inicio, fin) -> tuple[int, int]:
+        """
+        Límites de una ventana exacta. Sin las muestras originales, un
+        intervalo del nivel más fino partido por un borde se toma entero si
+        empieza dentro de la ventana (p. ej. el de las 23:59 con `hora_fin`
+        "23:59") y se descarta si no.
+        """
+        ini, fin = self._limites(inicio, fin)
+        if self._muestras is None:
+            fino = self.niveles[0]
+            i = int(np.searchsorted(fino.ultima, ini, "left"))
+            j = int(np.searchsorted(fino.primera, fin, "right")) - 1
+            if j >= 0 and fino.ultima[j] > fin:
+                fin = int(fino.ultima[j]) if fino.inicio[j] >= ini else int(fino.primera[j]) - 1
+            if i < len(fino) and fino.primera[i] < ini:
+                ini = int(fino.primera[i]) if fino.inicio[i] >= ini else int(fino.ultima[i]) + 1
+        return ini, fin
+
+    def _posiciones(self, columnas: list[str] | None) -> tuple[list[str], list[int]]:
+        columnas = self.columnas if columnas is None else list(columnas)
+        faltan = [c for c in columnas if c not in self._indice]
+        if faltan:
+            raise KeyError(f"Columnas fuera de la pirámide: {faltan}")
+        return columnas, [self._indice[c] for c in columnas]
+
+    def nivel_para(self, inicio=None, fin=None, *, max_puntos: int = 2000) -> NivelAgregado:
+        """
+        Nivel más grueso adecuado para graficar [inicio, fin]: el más fino
+        que no pasa de `max_puntos` intervalos (o el más grueso si ninguno).
+        """
+        ini, fin = self._limites(inicio, fin)
+        for nivel in self.niveles:
+            n = np.searchsorted(nivel.primera, fin, "right") - np.searchsorted(nivel.ultima, ini, "left")
+            if n <= max_puntos:
+                return nivel
+        return self.niveles[-1]
+
+    def _marco(self, nivel: NivelAgregado, filas, columnas: list[str], posiciones: list[int]) -> pd.DataFrame:
+        conteo = nivel.conteo[filas][:, posiciones]
+        suma = nivel.suma[filas][:, posiciones]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media = suma / conteo
+        datos = {
+            "conteo": conteo,
+            "suma": suma,
+            "media": media,
+            "minimo": nivel.minimo[filas][:, posiciones],
+            "maximo": nivel.maximo[filas][:, posiciones],
+            "fecha_maximo": nivel.t_maximo[filas][:, posiciones].view("datetime64[ns]"),
+        }
+        marco = pd.DataFrame(
+            {(c, e): datos[e][:, j] for j, c in enumerate(columnas) for e in ESTADISTICAS},
+            index=pd.DatetimeIndex(nivel.inicio[filas].view("datetime64[ns]"), name="FechaHora"),
+        )
+        marco.attrs["nivel"] = nivel.nombre
+        return marco
+
+    @instrumentar
+    def serie(
+        self,
+        columnas: list[str] | None = None,
+        inicio=None,
+        fin=None,
+        *,
+        max_puntos: int = 2000,
+        nivel: str | None = None,
+    ) -> pd.DataFrame:
+        """
+        Intervalos del nivel `nivel` (por defecto, `nivel_para`) que tocan
+        [inicio, fin], con columnas (columna, estadística) e índice el
+        comienzo de cada intervalo. El nivel usado queda en `attrs["nivel"]`.
+        """
+        columnas, posiciones = self._posiciones(columnas)
+        if nivel is None:
+            elegido = self.nivel_para(inicio, fin, max_puntos=max_puntos)
+        else:
+            elegido = next((n for n in self.niveles if n.nombre == nivel), None)
+            if elegido is None:
+                raise KeyError(f"Nivel inexistente: {nivel}")
+        ini, fin = self._limites(inicio, fin)
+        filas = slice(np.searchsorted(elegido.ultima, ini, "left"), np.searchsorted(elegido.primera, fin, "right"))
+        return self._marco(elegido, filas, columnas, posiciones)
+
+    # ---- ventanas exactas ------------------------------------------------
+
+    def _cubrir(self, ini: int, fin: int, niveles: list[NivelAgregado]):
+        """
+        Intervalos (nivel, desde, hasta) cuyas muestras caen todas en
+        [ini, fin], tomando primero los de los niveles más gruesos, y tramos
+        de la ventana que quedan sin cubrir.
+        """
+        tomados, pendientes = [], [(ini, fin)]
+        for nivel in reversed(niveles):
+            restantes = []
+            for a, b in pendientes:
+                i0 = int(np.searchsorted(nivel.primera, a, "left"))
+                i1 = int(np.searchsorted(nivel.ultima, b, "right"))
+                if i0 >= i1:
+                    restantes.append((a, b))
+                    continue
+                tomados.append((nivel, i0, i1))
+                if a < nivel.primera[i0]:
+                    restantes.append((a, int(nivel.primera[i0]) - 1))
+                if nivel.ultima[i1 - 1] < b:
+                    restantes.append((int(nivel.ultima[i1 - 1]) + 1, b))
+            pendientes = restantes
+        return tomados, pendientes
+
+    def _muestras_en(self, tramos: list[tuple[int, int]]) -> np.ndarray:
+        """
+        Índices de las muestras originales en `tramos` (ninguno si no se
+        conservan: `_ventana` ya ajustó la ventana a los intervalos).
+        """
+        if self._muestras is None:
+            return np.array([], dtype=np.int64)
+        t = self._muestras[0]
+        return np.concatenate(
+            [np.arange(np.searchsorted(t, a, "left"), np.searchsorted(t, b, "right")) for a, b in tramos]
+            or [np.array([], dtype=np.int64)]
+        )
+
+    @instrumentar
+    def serie_fina(self, columnas: list[str] | None = None, inicio=None, fin=None) -> pd.DataFrame:
+        """
+        La ventana [inicio, fin] exacta al nivel más fino: sus intervalos
+        contenidos en la ventana y, en los bordes que los parten, las
+        muestras originales (como intervalos de una muestra).
+        """
+        columnas, posiciones = self._posiciones(columnas)
+        ini, fin = self._ventana(inicio, fin)
+        tomados, pendientes = self._cubrir(ini, fin, self.niveles[:1])
+        fino = self.niveles[0]
+        partes = [self._marco(fino, slice(i0, i1), columnas, posiciones) for _, i0, i1 in tomados]
+        filas = self._muestras_en(pendientes)
+        if len(filas):
+            t, valores = self._muestras
+            v = valores[filas][:, posiciones]
+            crudo = NivelAgregado(
+                nombre="muestras", ancho=0, inicio=t[filas], primera=t[filas], ultima=t[filas],
+                conteo=(~np.isnan(v)).astype(np.int64), suma=np.where(np.isnan(v), 0.0, v),
+                minimo=v, maximo=v, t_maximo=np.where(np.isnan(v), _NAT, t[filas][:, None]),
+            )
+            partes.append(self._marco(crudo, slice(None), columnas, list(range(len(columnas)))))
+        if not partes:
+            return self._marco(fino, slice(0, 0), columnas, posiciones)
+        marco = pd.concat(partes).sort_index(kind="stable")
+        marco.attrs["nivel"] = fino.nombre
+        return marco
+
+    @instrumentar
+    def resumen(self, columnas: list[str] | None = None, inicio=None, fin=None) -> pd.DataFrame:
+        """
+        Estadísticas de cada columna en [inicio, fin] (conteo, suma, media,
+        mínimo, máximo y su instante), componiendo los intervalos más gruesos
+        contenidos en la ventana.
+        """
+        columnas, posiciones = self._posiciones(columnas)
+        ini, fin = self._ventana(inicio, fin)
+        tomados, pendientes = self._cubrir(ini, fin, self.niveles)
+
+        trozos = [
+            (n.conteo[i0:i1][:, posiciones], n.suma[i0:i1][:, posiciones], n.minimo[i0:i1][:, posiciones],
+             n.maximo[i0:i1][:, posiciones], n.t_maximo[i0:i1][:, posiciones], n.primera[i0])
+            for n, i0, i1 in tomados
+        ]
+        filas = self._muestras_en(pendientes)
+        if len(filas):
+            t, valores = self._muestras
+            v = valores[filas][:, posiciones]
+            trozos.append((
+                (~np.isnan(v)).astype(np.int64), np.where(np.isnan(v), 0.0, v), v, v,
+                np.where(np.isnan(v), _NAT, t[filas][:, None]), t[filas][0],
+            ))
+        # En orden cronológico, para que el instante del máximo sea el primero en caso de empate.
+        trozos.sort(key=lambda x: x[-1])
+
+        k = len(columnas)
+        vacio = np.full((1, k), np.nan)
+        conteo = np.concatenate([x[0] for x in trozos] or [np.zeros((1, k), np.int64)])
+        suma = np.concatenate([x[1] for x in trozos] or [np.zeros((1, k))])
+        minimo = np.concatenate([x[2] for x in trozos] or [vacio])
+        maximo = np.concatenate([x[3] for x in trozos] or [vacio])
+        t_maximo = np.concatenate([x[4] for x in trozos] or [np.full((1, k), _NAT)])
+
+        n_total = conteo.sum(axis=0)
+        s_total = suma.sum(axis=0)
+        hay = n_total > 0
+        maximo_total = np.where(hay, np.fmax.reduce(maximo, axis=0), np.nan)
+        t_max = _instante_maximo(maximo, maximo_total[None, :], np.array([0]), t_maximo)[0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media = s_total / n_total
+        return pd.DataFrame(
+            {
+                "conteo": n_total,
+                "suma": s_total,
+                "media": media,
+                "minimo": np.where(hay, np.fmin.reduce(minimo, axis=0), np.nan),
+                "maximo": maximo_total,
+                "fecha_maximo": t_max.view("datetime64[ns]"),
+            },
+            index=pd.Index(columnas, name="columna"),
+        )
+
+
+@instrumentar
+def construir_piramide(df: pd.DataFrame, columnas: list[str] | None = None, **kwargs) -> PiramideAgregados:
+    """Atajo de `PiramideAgregados.construir`."""
+    return PiramideAgregados.construir(df, columnas, **kwargs)
@@ -3,27 +3,135 @@ from __future__ import annotations
 import numpy as np
 import pandas as pd
 
+from .campana import CampanaColumnas
+from .columnar import TablaColumnar
+from .columnas import dtypes_columnas, registro_de
+from .instrumentacion import instrumentar
+from .perfiles import perfil_por_minuto
+
+
+# Columnas que `sub_dividir_dataframe` deriva de las potencias medidas.
+_COLUMNAS_POTENCIA_DERIVADAS = [
+    "P.Activa III T",
+    "P.Inductiva III T",
+    "P.Capacitiva III T",
+    "P.Reactiva III T",
+    "P.Aparente III T",
+]
+_COLUMNAS_ENERGIA_DERIVADAS = [
+    "E.Reactiva III M",
+    "E.Activa III T",
+    "E.Reactiva III T",
+    "E.Aparente III T",
+]
+_COLUMNAS_DERIVADAS = _COLUMNAS_POTENCIA_DERIVADAS + _COLUMNAS_ENERGIA_DERIVADAS + ["P/S"]
+
+_CATEGORIAS = ("general", "potencia", "fasor", "energia", "coste", "secundario")
+
+
+def _sin_repetir(columnas: list[str]) -> list[str]:
+    return list(dict.fromkeys(columnas))
+
+
+def _columnas_por_categoria(columnas: list[str]) -> dict[str, list[str]]:
+    """Columnas de cada categoría de `sub_dividir_dataframe`, en el orden de `columnas`."""
+    registro = registro_de(columnas)
+    cats = {cat: list(registro.buscar(categoria=cat)) for cat in _CATEGORIAS}
+    cats["general"] = _sin_repetir(cats["general"] + ["P/S"])
+    cats["potencia"] = _sin_repetir(
+        [c for mag in ("P.Activa", "P.Capacitiva", "P.Inductiva") for c in registro.buscar(categoria="potencia", magnitud=mag)]
+        + _COLUMNAS_POTENCIA_DERIVADAS
+    )
+    return cats
+
+
+def _disposicion(columnas_principales: list[str], columnas_arm: list[str]) -> tuple[list[str], dict[str, list[str]]]:
+    """
+    Orden de las columnas en el bloque columnar y grupos resultantes. Las
+    columnas compartidas por `general` y `secundario` van entre ambos para
+    que los dos grupos queden contiguos.
+    """
+    columnas = _sin_repetir(columnas_principales + _COLUMNAS_DERIVADAS)
+    cats = _columnas_por_categoria(columnas)
+    general, secundario = cats["general"], set(cats["secundario"])
+
+    orden = [c for c in general if c not in secundario]
+    orden += [c for c in general if c in secundario]
+    orden += cats["secundario"]
+    for cat in ("potencia", "energia", "fasor", "coste"):
+        orden += cats[cat]
+    orden += columnas
+    orden = _sin_repetir(orden)
+
+    grupos = {cat: cats[cat] for cat in _CATEGORIAS}
+    grupos["principal"] = orden
+    grupos["armonicos"] = list(columnas_arm)
+    return orden + list(columnas_arm), grupos
 
-def dividir_dataframe(df: pd.DataFrame, *, ver_df: bool = False) -> tuple[pd.DataFrame, pd.DataFrame]:
+
+def _columnas_derivadas(col, time_interval: int) -> dict[str, np.ndarray]:
+    """Columnas derivadas de las potencias medidas; `col(nombre)` da cada columna como float64."""
+    derivadas = {}
+
+    # POTENCIAS
+    p_activa = col("P.Activa III") - col("P.Activa III -")
+    p_inductiva = col("P.Inductiva III") - col("P.Inductiva III -")
+    p_capacitiva = col("P.Capacitiva III") - col("P.Capacitiva III -")
+    p_reactiva = p_inductiva + p_capacitiva
+    p_aparente = np.sqrt(p_activa ** 2 + p_reactiva ** 2)
+    for nombre, valores in zip(
+        _COLUMNAS_POTENCIA_DERIVADAS, (p_activa, p_inductiva, p_capacitiva, p_reactiva, p_aparente)
+    ):
+        derivadas[nombre] = valores
+
+    # ENERGÍA derivada de potencia
+    derivadas["E.Reactiva III M"] = (col("P.Inductiva III") + col("P.Capacitiva III -")) * (1/time_interval)
+    for col_p, valores in zip(["P.Activa III T", "P.Reactiva III T", "P.Aparente III T"], (p_activa, p_reactiva, p_aparente)):
+        derivadas[f"E{col_p[1:]}"] = valores * (1 / time_interval)  # 1 min → kWh
+
+    # GENERAL
+    with np.errstate(divide="ignore", invalid="ignore"):
+        derivadas["P/S"] = np.where(p_aparente == 0, 0, p_activa / p_aparente)
+    return derivadas
+
+
+@instrumentar
+def dividir_dataframe(
+    df: pd.DataFrame,
+    *,
+    ver_df: bool = False,
+    politica_dtype: str | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     Separa el DataFrame original en:
       • df       → mediciones eléctricas generales
       • df_arm   → armónicos (`Arm.` o `Fund.`)
-    """
-    mask_arm = (
-        df.columns.str.startswith("Arm.")
-        | df.columns.str.contains("Fund.")
-        | df.columns.str.contains("Fecha/hora")
-    )
-    df_arm = df.loc[:, mask_arm].copy()
 
-    mask_drop = (
-        df.columns.str.startswith("Arm.")
-        | df.columns.str.contains("Fund.")
-        | df.columns.str.contains("mín", case=False)
-        | df.columns.str.contains("máx", case=False)
+    Ambos son vistas de un único bloque columnar (`functions.columnar`),
+    que reserva además las columnas que derivará `sub_dividir_dataframe`
+    (NaN hasta entonces). Las vistas no deben modificarse en el sitio.
+
+    `politica_dtype` ('exacta' o 'compacta', ver
+    `functions.columnas.dtype_columna`) fija el tipo de cada columna del
+    bloque; None la deduce de `df` ('compacta' si tiene columnas float32).
+    """
+    registro = registro_de(df.columns)
+    columnas_arm = registro.buscar(categoria="armonicos")
+    descartadas = set(columnas_arm) | set(registro.buscar(estadistico=("min", "max"))) | {"Fecha/hora"}
+    disposicion, grupos = _disposicion(
+        [c for c in df.columns if c not in descartadas], columnas_arm
     )
-    df_main = df.drop(columns=df.columns[mask_drop])
+    if isinstance(df, CampanaColumnas):
+        # Almacén en disco: las partes son selecciones de columnas, sin copia.
+        df_main, df_arm = df.seleccionar(grupos["principal"]), df.seleccionar(grupos["armonicos"])
+    else:
+        if politica_dtype is None:
+            politica_dtype = "compacta" if (df.dtypes == np.float32).any() else "exacta"
+        tabla = TablaColumnar.desde_dataframe(
+            df, disposicion, grupos, dtypes=dtypes_columnas(disposicion, politica_dtype)
+        )
+        df_main = tabla.vista("principal", con_fecha=True, con_extras=True)
+        df_arm = tabla.vista("armonicos", con_fecha=True)
 
     if ver_df:
         print("df_arm →", list(df_arm.columns))
@@ -32,70 +140,51 @@ def dividir_dataframe(df: pd.DataFrame, *, ver_df: bool = False) -> tuple[pd.Dat
     return df_main, df_arm
 
 
+@instrumentar
 def sub_dividir_dataframe(df: pd.DataFrame, *, time_interval: int = 60, ver_cols: bool = False):
     """
     Crea subconjuntos de columnas por categoría:
       general, potencia, fasor, energía, coste, secundario
+
+    Si `df` viene de `dividir_dataframe`, las columnas derivadas se escriben
+    en el bloque columnar y los subconjuntos son vistas sin copia. En otro
+    caso se añaden a `df` y los subconjuntos salen de un bloque nuevo. Sobre
+    un almacén en disco (`CampanaColumnas`) se calculan por trozos de filas y
+    los subconjuntos son selecciones de columnas del almacén.
     """
-    def select_cols(patterns: list[str]) -> list[str]:
-        return [c for c in df.columns if any(pat in c for pat in patterns)]
+    if isinstance(df, CampanaColumnas):
+        df.derivar(lambda col: _columnas_derivadas(col, time_interval))
+        cats = _columnas_por_categoria(list(df.columns))
+        subconjuntos = tuple(df.seleccionar(cats[cat]) for cat in _CATEGORIAS)
+        if ver_cols:
+            for cat, d in zip(_CATEGORIAS, subconjuntos):
+                print(f"\nColumnas {cat}:")
+                print(list(d.columns))
+        return subconjuntos
+
+    tabla = df.attrs.get("tabla_columnar")
+    en_bloque = (
+        tabla is not None
+        and all(c in tabla and c in df.columns for c in _COLUMNAS_DERIVADAS)
+        and tabla.respalda(df)
+    )
 
-    # POTENCIAS
-    df["P.Activa III T"] = df["P.Activa III"] - df["P.Activa III -"]
-    df["P.Inductiva III T"] = df["P.Inductiva III"] - df["P.Inductiva III -"]
-    df["P.Capacitiva III T"] = df["P.Capacitiva III"] - df["P.Capacitiva III -"]
-    df["P.Reactiva III T"] = df["P.Inductiva III T"] + df["P.Capacitiva III T"]
-    df["P.Aparente III T"] = np.sqrt(df["P.Activa III T"] ** 2 + df["P.Reactiva III T"] ** 2)
-
-    pactiva = select_cols(["P.Activa"])
-    pcap = select_cols(["P.Capacitiva"])
-    pind = select_cols(["P.Inductiva"])
-    potencia_cols = pactiva + pcap + pind + [
-        "P.Activa III T",
-        "P.Inductiva III T",
-        "P.Capacitiva III T",
-        "P.Reactiva III T",
-        "P.Aparente III T",
-    ]
-    df_potencia = df[potencia_cols]
+    def col(nombre: str) -> np.ndarray:
+        return df[nombre].to_numpy(dtype=np.float64)
 
-    # ENERGÍA derivada de potencia
-    df["E.Reactiva III M"] = (df["P.Inductiva III"] + df["P.Capacitiva III -"]) * (1/time_interval)
-    for col_p in ["P.Activa III T", "P.Reactiva III T", "P.Aparente III T"]:
-        df[f"E{col_p[1:]}"] = df[col_p] * (1 / time_interval)  # 1 min → kWh
+    for nombre, valores in _columnas_derivadas(col, time_interval).items():
+        if en_bloque:
+            tabla.asignar(nombre, valores)
+        else:
+            df[nombre] = valores
 
-    # GENERAL
-    general_cols = select_cols(
-        [
-            "Tensión",
-            "Corriente",
-            "F.P.",
-            "Cos Phi",
-            "Frecuencia",
-        ]
-    ) + ["P/S"]
-    df["P/S"] = np.where(df["P.Aparente III T"] == 0, 0, df["P.Activa III T"] / df["P.Aparente III T"])
-    df_general = df[general_cols].copy()
-
-    df_fasor = df[[c for c in df.columns if "Fasores" in c]]
-    energia_cols = [c for c in df.columns if "E." in c]
-    df_energia = df[energia_cols]
-    df_coste = df[[c for c in df.columns if "Coste" in c]]
-
-    secundario_cols = select_cols(
-        [
-            "directa",
-            "homopolar",
-            "inversa",
-            "Factor cresta",
-            "THD/d",
-            "Distorsión",
-            "Ka ",
-            "Kd ",
-            "Factor K",
-        ]
+    if not en_bloque:
+        disposicion, grupos = _disposicion(list(df.columns), [])
+        tabla = TablaColumnar.desde_dataframe(df, disposicion, grupos)
+
+    df_general, df_potencia, df_fasor, df_energia, df_coste, df_secundario = (
+        tabla.vista(cat) for cat in _CATEGORIAS
     )
-    df_secundario = df[secundario_cols]
 
     if ver_cols:
         for nombre, d in [
@@ -119,6 +208,7 @@ def sub_dividir_dataframe(df: pd.DataFrame, *, time_interval: int = 60, ver_cols
     )
 
 
+@instrumentar
 def promediar_df_por_min(df, dias_semana=None):
     """
     Calcula el promedio de cada columna numérica para cada minuto del día,
@@ -132,42 +222,9 @@ def promediar_df_por_min(df, dias_semana=None):
 
     Returns:
         pd.DataFrame: DataFrame con promedio para cada minuto del día
-                      con índice 'Fecha/hora' (1000-01-01 HH:MM).
-    """
-    # Copia para no modificar el original
-    df_copy = df.copy()
-
-    # Asegurar datetime
-    df_copy['Fecha/hora'] = pd.to_datetime(df_copy['Fecha/hora'])
-
-    # Crear columna de nombre de día en inglés
-    df_copy['day_name_en'] = df_copy['Fecha/hora'].dt.day_name()
-
-    # Mapeo de días inglés -> español
-    day_map = {
-        'Monday': 'lunes',
-        'Tuesday': 'martes',
-        'Wednesday': 'miércoles',
-        'Thursday': 'jueves',
-        'Friday': 'viernes',
-        'Saturday': 'sábado',
-        'Sunday': 'domingo'
-    }
-    df_copy['dia_nombre'] = df_copy['day_name_en'].map(day_map)
-
-    # Filtrar por días si se indica
-    if dias_semana:
-        dias_semana = [d.lower() for d in dias_semana]
-        df_copy = df_copy[df_copy['dia_nombre'].isin(dias_semana)]
-
-    # Extraer hora y minuto y asignarle directamente la fecha ficticia 1000-01-01
-    df_copy['Fecha/hora'] = pd.to_datetime(
-        '1900-01-01 ' + df_copy['Fecha/hora'].dt.strftime('%H:%M'),
-        format='%Y-%m-%d %H:%M'
-    )
-
-    # Promediar columnas numéricas por cada minuto del día
-    numeric_cols = df_copy.select_dtypes(include=np.number).columns.tolist()
-    df_promedio = df_copy.groupby('Fecha/hora')[numeric_cols].mean().sort_index()
+                      con índice 'Fecha/hora' (1900-01-01 HH:MM).
 
-    return df_promedio
+    Ver `functions.perfiles.perfil_por_minuto` para conteos, percentiles y
+    el cubo (día de la semana × minuto).
+    """
+    return perfil_por_minuto(df, dias_semana=dias_semana)["media"]
@@ -0,0 +1,452 @@
+"""
+Servicio HTTP local de informes: recibe una exportación del analizador,
+la pone en cola y genera el informe (`ejecutar_informe`) en un pool de
+procesos precalentado, de modo que la importación de pandas/Matplotlib y la
+compilación de calendarios y tarifas se pagan una vez por proceso.
+
+    python -m functions.servicio --puerto 8000 --procesos 2
+
+    POST /informes?sitio=Planta%20Norte&volt_linea=480   (cuerpo: el fichero)
+        → 202 {"id": ..., "estado": "en_cola"}  (200 si ya estaba calculado)
+    GET  /informes/<id>                     → estado y, al terminar, resultado
+    GET  /informes/<id>/imagenes/<nombre>   → gráfico PNG
+    GET  /salud                             → procesos, cola y caché
+
+El id de un informe es un hash del fichero y de sus parámetros: repetir el
+envío devuelve el mismo trabajo, y los resultados recientes se sirven desde
+una caché LRU en memoria sin volver a calcularlos.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import math
+import os
+import shutil
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from .columnas import POLITICAS_DTYPE
+from .distribuidoras import cargar_distribuidora, distribuidoras_disponibles
+from .tablas_tarifas import cargar_tarifas
+
+_TROZO = 1 << 20
+
+# Parámetros de `ejecutar_informe` que se aceptan en la consulta del POST.
+_PARAMETROS = {
+    "sitio": str,
+    "distribuidora": str,
+    "extended_report": bool,
+    "tipo_energia": str,
+    "tipo_demanda": str,
+    "tarifas": list,
+    "periodos": list,
+    "dia_corte": int,
+    "volt_linea": float,
+    "volt_fase": float,
+    "politica_dtype": str,
+}
+
+
+class ErrorPeticion(ValueError):
+    """Petición no válida; `estado` es el código HTTP de la respuesta."""
+
+    def __init__(self, mensaje: str, estado: HTTPStatus = HTTPStatus.BAD_REQUEST):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _a_json(valor) -> Any:
+    """Convierte un resultado del informe en algo serializable en JSON."""
+    if isinstance(valor, dict):
+        return {str(k): _a_json(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_a_json(v) for v in valor]
+    if isinstance(valor, pd.DataFrame):
+        return _a_json(valor.reset_index().to_dict(orient="records"))
+    if isinstance(valor, pd.Series):
+        return _a_json(valor.to_dict())
+    if isinstance(valor, np.datetime64):
+        valor = pd.Timestamp(valor)
+    elif isinstance(valor, np.timedelta64):
+        valor = pd.Timedelta(valor)
+    elif isinstance(valor, np.generic):
+        valor = valor.item()
+    if valor is None or valor is pd.NaT:
+        return None
+    if isinstance(valor, float):
+        return valor if math.isfinite(valor) else None
+    if isinstance(valor, (bool, int, str)):
+        return valor
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, timedelta):
+        return str(pd.Timedelta(valor))
+    return str(valor)
+
+
+def _leer_parametros(consulta: str) -> dict:
+    """Parámetros de `ejecutar_informe` a partir de la cadena de consulta."""
+    valores = parse_qs(consulta, keep_blank_values=True)
+    desconocidos = sorted(set(valores) - set(_PARAMETROS))
+    if desconocidos:
+        raise ErrorPeticion(f"Parámetros desconocidos: {desconocidos}; admitidos: {sorted(_PARAMETROS)}")
+
+    parametros: dict[str, Any] = {}
+    for nombre, texto in ((k, v[-1]) for k, v in valores.items()):
+        tipo = _PARAMETROS[nombre]
+        try:
+            if tipo is bool:
+                if texto.lower() not in ("1", "0", "true", "false", "si", "no"):
+                    raise ValueError(texto)
+                parametros[nombre] = texto.lower() in ("1", "true", "si")
+            elif tipo is list:
+                parametros[nombre] = [x.strip() for x in texto.split(",") if x.strip()]
+            else:
+                parametros[nombre] = tipo(texto)
+        except ValueError:
+            raise ErrorPeticion(f"Valor no válido para '{nombre}': {texto!r}") from None
+
+    distribuidora = parametros.get("distribuidora")
+    if distribuidora is not None and distribuidora not in distribuidoras_disponibles():
+        raise ErrorPeticion(f"Distribuidora desconocida: {distribuidora!r}")
+    politica = parametros.get("politica_dtype")
+    if politica is not None and politica not in POLITICAS_DTYPE:
+        raise ErrorPeticion(f"Política de tipos desconocida: {politica!r}")
+    return parametros
+
+
+# ---- proceso de trabajo -----------------------------------------------------
+
+
+def preparar_proceso(distribuidoras: list[str]) -> None:
+    """
+    Inicializador de un proceso de trabajo: importa el paquete y Matplotlib
+    (sin pantalla) y compila las tarifas y el calendario de los últimos años
+    de cada distribuidora, que quedan en memoria para todos sus informes.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+
+    from . import informe  # noqa: F401
+
+    hoy = pd.Timestamp.today().normalize()
+    for nombre in distribuidoras:
+        distribuidora = cargar_distribuidora(nombre)
+        cargar_tarifas(distribuidora.tarifas)
+        distribuidora.calendario.codigos(pd.Series([hoy - pd.DateOffset(years=2), hoy]))
+
+
+def _listo() -> int:
+    return os.getpid()
+
+
+def ejecutar_en_directorio(archivo: str | Path, directorio: str | Path, *, sitio: str | None = None, **parametros) -> tuple[dict, str]:
+    """
+    `ejecutar_informe` de `archivo` (título `sitio`, por defecto el nombre
+    del fichero) con `directorio` como directorio de trabajo, de modo que
+    los gráficos quedan en `directorio/images`. Devuelve las salidas de las
+    etapas y el texto impreso. Cambia el directorio del proceso mientras
+    dura: es para procesos de trabajo que ejecutan un informe cada vez.
+    """
+    from .informe import ejecutar_informe
+
+    archivo = Path(archivo).resolve()
+    anterior = os.getcwd()
+    texto = io.StringIO()
+    os.chdir(directorio)
+    try:
+        with contextlib.redirect_stdout(texto):
+            salidas = ejecutar_informe(
+                str(archivo), titulo=sitio or archivo.stem, procesos=1, dir_cache=None, **parametros
+            )
+    finally:
+        os.chdir(anterior)
+        # El proceso atiende muchos informes: no deben acumularse figuras abiertas.
+        import matplotlib.pyplot as plt
+
+        plt.close("all")
+    return salidas, texto.getvalue()
+
+
+def resultado_json(sitio: str, salidas: dict, texto: str, directorio: str | Path) -> dict:
+    """Resultado de un informe en JSON: métricas, tarifas, facturación, gráficos y texto."""
+    imagenes = Path(directorio) / "images"
+    return {
+        "sitio": sitio,
+        "metricas": _a_json(salidas["metricas"]),
+        "tarifas": _a_json(salidas["tarifas"]["resultados"]),
+        "facturacion": _a_json(salidas["tarifas"]["facturacion"]),
+        "imagenes": sorted(p.name for p in imagenes.glob("*.png")) if imagenes.is_dir() else [],
+        "texto": texto,
+    }
+
+
+def _generar_informe(archivo: str, directorio: str, parametros: dict) -> dict:
+    salidas, texto = ejecutar_en_directorio(archivo, directorio, **parametros)
+    return resultado_json(parametros.get("sitio") or Path(archivo).stem, salidas, texto, directorio)
+
+
+# ---- servicio ---------------------------------------------------------------
+
+
+class ServicioInformes:
+    """
+    Cola de informes sobre un pool de `procesos` procesos precalentados,
+    con los ficheros de trabajo en `directorio` y los `capacidad_cache`
+    resultados más recientes en memoria (al salir de la caché se borran
+    también sus gráficos).
+    """
+
+    def __init__(
+        self,
+        directorio: str | Path = "servicio_informes",
+        *,
+        procesos: int = 2,
+        capacidad_cache: int = 32,
+        max_bytes: int = 1 << 30,
+    ):
+        self.directorio = Path(directorio).resolve()
+        (self.directorio / "subidas").mkdir(parents=True, exist_ok=True)
+        (self.directorio / "trabajos").mkdir(parents=True, exist_ok=True)
+        self.capacidad_cache = capacidad_cache
+        self.max_bytes = max_bytes
+        self.procesos = procesos
+        self._cache: OrderedDict[str, dict] = OrderedDict()
+        self._trabajos: dict[str, Future] = {}
+        self._errores: dict[str, str] = {}
+        self._cerrojo = threading.Lock()
+        # El pool se crea (y arranca sus procesos) antes de que haya hilos del
+        # servidor HTTP.
+        self._pool = ProcessPoolExecutor(
+            max_workers=procesos, initializer=preparar_proceso, initargs=(distribuidoras_disponibles(),)
+        )
+        for futuro in [self._pool.submit(_listo) for _ in range(procesos)]:
+            futuro.result()
+
+    def __enter__(self) -> "ServicioInformes":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+    def cerrar(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    # ---- trabajos --------------------------------------------------------
+
+    def enviar(self, contenido: io.BufferedIOBase | bytes, parametros: dict, *, tamano: int | None = None) -> dict:
+        """
+        Guarda la exportación `contenido` (bytes o un flujo del que se leen
+        `tamano` bytes), la pone en cola con `parametros` si no está ya
+        calculada o en curso, y devuelve el estado del trabajo.
+        """
+        if isinstance(contenido, (bytes, bytearray)):
+            contenido, tamano = io.BytesIO(contenido), len(contenido)
+        if tamano is None:
+            raise ErrorPeticion("Falta el tamaño del fichero", HTTPStatus.LENGTH_REQUIRED)
+        if tamano <= 0:
+            raise ErrorPeticion("El fichero está vacío")
+        if tamano > self.max_bytes:
+            raise ErrorPeticion(f"El fichero supera {self.max_bytes} bytes", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+
+        temporal = self.directorio / "subidas" / f"{uuid.uuid4().hex}.tmp"
+        h = hashlib.sha256()
+        try:
+            with temporal.open("wb") as fh:
+                restante = tamano
+                while restante:
+                    trozo = contenido.read(min(_TROZO, restante))
+                    if not trozo:
+                        raise ErrorPeticion("El fichero llegó incompleto")
+                    h.update(trozo)
+                    fh.write(trozo)
+                    restante -= len(trozo)
+        except BaseException:
+            temporal.unlink(missing_ok=True)
+            raise
+
+        h.update(json.dumps(parametros, sort_keys=True).encode())
+        ident = h.hexdigest()[:20]
+        with self._cerrojo:
+            if ident in self._cache or ident in self._trabajos:
+                temporal.unlink()
+                return self._estado(ident)
+            archivo = self.directorio / "subidas" / f"{ident}.txt"
+            os.replace(temporal, archivo)
+            trabajo = self.directorio / "trabajos" / ident
+            shutil.rmtree(trabajo, ignore_errors=True)
+            trabajo.mkdir(parents=True)
+            self._errores.pop(ident, None)
+            futuro = self._pool.submit(_generar_informe, str(archivo), str(trabajo), parametros)
+            self._trabajos[ident] = futuro
+        futuro.add_done_callback(lambda f, ident=ident: self._terminar(ident, f))
+        return self.estado(ident)
+
+    def _terminar(self, ident: str, futuro: Future) -> None:
+        (self.directorio / "subidas" / f"{ident}.txt").unlink(missing_ok=True)
+        with self._cerrojo:
+            self._trabajos.pop(ident, None)
+            if futuro.cancelled():
+                return
+            error = futuro.exception()
+            if error is not None:
+                self._errores[ident] = f"{type(error).__name__}: {error}"
+                return
+            self._cache[ident] = futuro.result()
+            while len(self._cache) > self.capacidad_cache:
+                viejo, _ = self._cache.popitem(last=False)
+                shutil.rmtree(self.directorio / "trabajos" / viejo, ignore_errors=True)
+
+    def _estado(self, ident: str) -> dict:
+        if ident in self._cache:
+            self._cache.move_to_end(ident)
+            return {"id": ident, "estado": "terminado", "resultado": self._cache[ident]}
+        if ident in self._trabajos:
+            return {"id": ident, "estado": "en_curso" if self._trabajos[ident].running() else "en_cola"}
+        if ident in self._errores:
+            return {"id": ident, "estado": "error", "error": self._errores[ident]}
+        raise ErrorPeticion(f"Informe desconocido o ya fuera de la caché: {ident}", HTTPStatus.NOT_FOUND)
+
+    def estado(self, ident: str) -> dict:
+        """Estado del trabajo `ident` (en_cola, en_curso, terminado con su resultado, o error)."""
+        with self._cerrojo:
+            return self._estado(ident)
+
+    def imagen(self, ident: str, nombre: str) -> Path:
+        """Ruta del gráfico `nombre` de un informe terminado."""
+        with self._cerrojo:
+            resultado = self._cache.get(ident)
+        if resultado is None or nombre not in resultado["imagenes"]:
+            raise ErrorPeticion(f"No existe la imagen '{nombre}' del informe {ident}", HTTPStatus.NOT_FOUND)
+        return self.directorio / "trabajos" / ident / "images" / nombre
+
+    def salud(self) -> dict:
+        with self._cerrojo:
+            curso = sum(f.running() for f in self._trabajos.values())
+            return {
+                "procesos": self.procesos,
+                "en_cola": len(self._trabajos) - curso,
+                "en_curso": curso,
+                "en_cache": len(self._cache),
+            }
+
+    # ---- HTTP ------------------------------------------------------------
+
+    def servidor(self, host: str = "127.0.0.1", puerto: int = 8000) -> ThreadingHTTPServer:
+        """Servidor HTTP (sin arrancar) que atiende las peticiones con este servicio."""
+        manejador = type("Manejador", (_Manejador,), {"servicio": self})
+        return ThreadingHTTPServer((host, puerto), manejador)
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    servicio: ServicioInformes
+    server_version = "ServicioInformes/1"
+
+    def _json(self, contenido: dict, estado: HTTPStatus = HTTPStatus.OK) -> None:
+        cuerpo = json.dumps(contenido, ensure_ascii=False).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _descartar(self, tamano: int) -> None:
+        """Lee y descarta el cuerpo para poder responder con un error sin cortar el envío."""
+        if tamano > self.servicio.max_bytes:
+            self.close_connection = True
+            return
+        while tamano > 0:
+            leido = len(self.rfile.read(min(_TROZO, tamano)))
+            if not leido:
+                break
+            tamano -= leido
+
+    def _ruta(self) -> list[str]:
+        return [unquote(p) for p in urlsplit(self.path).path.split("/") if p]
+
+    def _atender(self, accion) -> None:
+        try:
+            accion()
+        except ErrorPeticion as e:
+            self._json({"error": str(e)}, e.estado)
+        except Exception as e:  # el servicio sigue atendiendo
+            self._json({"error": f"{type(e).__name__}: {e}"}, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def do_GET(self) -> None:
+        self._atender(self._get)
+
+    def do_POST(self) -> None:
+        self._atender(self._post)
+
+    def _get(self) -> None:
+        ruta = self._ruta()
+        if ruta == ["salud"]:
+            return self._json(self.servicio.salud())
+        if len(ruta) == 2 and ruta[0] == "informes":
+            return self._json(self.servicio.estado(ruta[1]))
+        if len(ruta) == 4 and ruta[0] == "informes" and ruta[2] == "imagenes":
+            datos = self.servicio.imagen(ruta[1], ruta[3]).read_bytes()
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+            return
+        raise ErrorPeticion(f"Ruta desconocida: {self.path}", HTTPStatus.NOT_FOUND)
+
+    def _post(self) -> None:
+        partes = urlsplit(self.path)
+        if self._ruta() != ["informes"]:
+            raise ErrorPeticion(f"Ruta desconocida: {self.path}", HTTPStatus.NOT_FOUND)
+        tamano = self.headers.get("Content-Length")
+        try:
+            parametros = _leer_parametros(partes.query)
+        except ErrorPeticion:
+            self._descartar(int(tamano or 0))
+            raise
+        estado = self.servicio.enviar(self.rfile, parametros, tamano=int(tamano) if tamano else None)
+        self._json(estado, HTTPStatus.OK if estado["estado"] == "terminado" else HTTPStatus.ACCEPTED)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--procesos", type=int, default=2, help="Procesos de trabajo precalentados")
+    parser.add_argument("--cache", type=int, default=32, help="Resultados recientes en memoria")
+    parser.add_argument("--directorio", type=Path, default=Path("servicio_informes"))
+    args = parser.parse_args(argv)
+
+    with ServicioInformes(args.directorio, procesos=args.procesos, capacidad_cache=args.cache) as servicio:
+        servidor = servicio.servidor(args.host, args.puerto)
+        print(f"Servicio de informes en http://{args.host}:{args.puerto} ({args.procesos} procesos)")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            servidor.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Simulador de escenarios "qué pasaría si" sobre el perfil medido:
+desplazamiento de carga de punta a fuera de punta bajo, recorte de demanda
+con batería y bancos de capacitores. Recalcula energía por bloque,
+DMAX_15min y FP de cada escenario y valora todas las tarifas, con todos los
+escenarios de un lote en arrays (escenarios × muestras).
+"""
+
+from __future__ import annotations
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from .distribuidoras import resolver_distribuidora
+from .instrumentacion import instrumentar
+from .tariffs import calcular_tarifa_lote, periodo_por_defecto
+
+_NS_DIA = 86400 * 10**9
+# Tope de elementos (escenarios × muestras) por lote para acotar memoria.
+_MAX_ELEMENTOS_LOTE = 10_000_000
+
+
+def demanda_15min(p: np.ndarray) -> np.ndarray:
+    """
+    DMAX_15min de `procesar_demanda_maxima` para una o varias series (última
+    dimensión = muestras de 1 min): media de cada grupo de 5 muestras de
+    potencia no negativa y media móvil de 15 muestras sobre esa serie
+    escalonada. Las 14 primeras muestras quedan en NaN. Devuelve siempre
+    un array 2-D (series × muestras).
+    """
+    p = np.clip(np.atleast_2d(p), 0, None)
+    s, n = p.shape
+    grupos = -(-n // 5)
+    relleno = np.full((s, grupos * 5), np.nan)
+    relleno[:, :n] = p
+    with np.errstate(invalid="ignore"):
+        medias = np.nanmean(relleno.reshape(s, grupos, 5), axis=2)
+    escalon = np.repeat(medias, 5, axis=1)[:, :n]
+    acumulado = np.cumsum(escalon, axis=1)
+    salida = np.full((s, n), np.nan)
+    if n >= 15:
+        salida[:, 14] = acumulado[:, 14] / 15
+        salida[:, 15:] = (acumulado[:, 15:] - acumulado[:, :-15]) / 15
+        # Último grupo incompleto (r < 5 muestras): el método SDATA solo
+        # promedia las r series submuestreadas que llegan a él, también en
+        # los grupos anteriores de la ventana.
+        r = n % 5
+        for i in range(n - r, n):
+            j = np.arange(i - 14, i + 1)
+            posiciones = np.arange(r)[:, None] + 5 * (j // 5)
+            with np.errstate(invalid="ignore"):
+                salida[:, i] = np.nanmean(p[:, posiciones].reshape(s, -1), axis=1)
+    return salida
+
+
+def _rejilla(parametros: dict[str, object], combinar: bool) -> pd.DataFrame:
+    valores = {k: np.atleast_1d(np.asarray(v, dtype=np.float64)) for k, v in parametros.items()}
+    if combinar:
+        filas = list(itertools.product(*valores.values()))
+        return pd.DataFrame(filas, columns=list(valores))
+    n = max(len(v) for v in valores.values())
+    return pd.DataFrame({k: np.broadcast_to(v, (n,)) for k, v in valores.items()})
+
+
+def _bateria(p: np.ndarray, puede_cargar: np.ndarray, limite: np.ndarray, kwh: np.ndarray,
+             kw: np.ndarray, eficiencia: float, dt_h: float) -> np.ndarray:
+    """
+    Despacho de batería para recortar la demanda a `limite` (kW), vectorizado
+    sobre escenarios y secuencial en el tiempo. Descarga cuando la carga
+    supera el límite; carga (con `eficiencia`) cuando `puede_cargar` y queda
+    margen bajo el límite. Parte llena.
+    """
+    p = p.copy()
+    soc = kwh.copy()
+    for i in range(p.shape[1]):
+        exceso = p[:, i] - limite
+        descarga = np.clip(np.minimum(exceso, np.minimum(kw, soc / dt_h)), 0, None)
+        carga = np.zeros_like(descarga)
+        if puede_cargar[i]:
+            carga = np.clip(np.minimum(-exceso, np.minimum(kw, (kwh - soc) / (dt_h * eficiencia))), 0, None)
+        soc += (carga * eficiencia - descarga) * dt_h
+        p[:, i] += carga - descarga
+    return p
+
+
+@instrumentar
+def simular_escenarios(
+    df: pd.DataFrame,
+    *,
+    desplazar_kw=0.0,
+    limite_kw=np.inf,
+    bateria_kwh=0.0,
+    bateria_kw=0.0,
+    capacitor_kvar=0.0,
+    eficiencia: float = 0.9,
+    combinar: bool = True,
+    tarifas=("BTD", "BTH", "MTD", "MTH"),
+    periodo=None,
+    distribuidora=None,
+    col_potencia: str = "P.Activa III T",
+    col_energia: str = "E.Activa III T",
+    col_reactiva: str = "E.Reactiva III M",
+) -> pd.DataFrame:
+    """
+    Evalúa escenarios sobre la medición de `df` (tras `sub_dividir_dataframe`).
+
+    Parámetros (escalares o listas; con `combinar` se evalúa el producto
+    cartesiano, si no se emparejan elemento a elemento):
+      • desplazar_kw: kW de carga que se retiran de cada muestra de punta
+        (sin pasar de la carga medida); la energía retirada cada día se
+        reparte por igual entre las muestras de fuera_punta_bajo de ese día.
+      • limite_kw, bateria_kwh, bateria_kw: batería que descarga para no
+        superar `limite_kw` y recarga fuera de punta sin superarlo.
+      • capacitor_kvar: banco fijo que resta su potencia a la reactiva
+        medida; la sobrecompensación cuenta como reactiva capacitiva.
+
+    La energía parte de `col_energia` medida más la variación de potencia
+    de cada escenario; energía, consumo por bloque y FP se extrapolan a 30
+    días como en `analizar_energia`; la demanda es la DMAX_15min máxima por
+    bloque.
+    El periodo tarifario por defecto es el vigente al final de la medición
+    (o el más cercano, con el aviso en `attrs["aviso_periodo"]`); los
+    bloques con saldo exportador se facturan con consumo 0.
+
+    Returns:
+        DataFrame con una fila por escenario: parámetros, energía y demanda
+        por bloque, FP, total por tarifa y ahorro frente al perfil medido.
+    """
+    dist = resolver_distribuidora(distribuidora)
+    bloques = dist.bloques
+
+    fechas = pd.to_datetime(df["Fecha/hora"])
+    orden = np.argsort(fechas.to_numpy(dtype="datetime64[ns]"), kind="stable")
+    t = fechas.to_numpy(dtype="datetime64[ns]")[orden]
+    validas = ~np.isnat(t)
+    t = t[validas]
+    sel = orden[validas]
+    p_base = np.nan_to_num(df[col_potencia].to_numpy(dtype=np.float64, na_value=np.nan)[sel])
+    e_base = np.nan_to_num(df[col_energia].to_numpy(dtype=np.float64, na_value=np.nan)[sel])
+    r_base = np.nan_to_num(df[col_reactiva].to_numpy(dtype=np.float64, na_value=np.nan)[sel])
+    n = len(t)
+    if n < 15:
+        raise ValueError("Se necesitan al menos 15 muestras para simular la demanda de 15 min")
+
+    t_ns = t.view(np.int64)
+    pasos = np.diff(t_ns)
+    dt_h = float(np.median(pasos[pasos > 0])) / 3.6e12 if (pasos > 0).any() else 1 / 60
+    dias = (t_ns[-1] - t_ns[0]) / _NS_DIA
+    factor_30d = 30 / dias if dias > 0 else float("nan")
+    aviso_periodo = None
+    if periodo is None:
+        vigente, aviso_periodo = periodo_por_defecto(pd.Timestamp(t[-1]), dist)
+        periodo = vigente.clave
+
+    codigos = dist.calendario.codigos(pd.Series(t))
+    mascaras = {b: codigos == j for j, b in enumerate(bloques)}
+    punta, bajo = mascaras["punta"], mascaras["fuera_punta_bajo"]
+    dia = (t_ns // _NS_DIA).astype(np.int64)
+    inicios_dia = np.flatnonzero(np.r_[True, dia[1:] != dia[:-1]])
+    bajo_por_dia = np.add.reduceat(bajo.astype(np.float64), inicios_dia)
+    reparto = np.where(bajo, 1.0 / np.repeat(np.maximum(bajo_por_dia, 1), np.diff(np.r_[inicios_dia, n])), 0.0)
+
+    escenarios = _rejilla(
+        {
+            "desplazar_kw": desplazar_kw,
+            "limite_kw": limite_kw,
+            "bateria_kwh": bateria_kwh,
+            "bateria_kw": bateria_kw,
+            "capacitor_kvar": capacitor_kvar,
+        },
+        combinar,
+    )
+    base = pd.DataFrame([{c: (np.inf if c == "limite_kw" else 0.0) for c in escenarios.columns}])
+    todos = pd.concat([base, escenarios], ignore_index=True)
+
+    tam_lote = max(1, _MAX_ELEMENTOS_LOTE // n)
+    resultados = []
+    for ini in range(0, len(todos), tam_lote):
+        lote = todos.iloc[ini:ini + tam_lote]
+        s = len(lote)
+        p = np.broadcast_to(p_base, (s, n)).copy()
+
+        # Desplazamiento de punta a fuera_punta_bajo del mismo día.
+        x = lote["desplazar_kw"].to_numpy()[:, None]
+        if (x > 0).any():
+            retirado = np.minimum(x, np.clip(p, 0, None)) * punta
+            energia_dia = np.add.reduceat(retirado, inicios_dia, axis=1)
+            p += -retirado + np.repeat(energia_dia, np.diff(np.r_[inicios_dia, n]), axis=1) * reparto
+
+        # Batería para recortar demanda.
+        kwh = lote["bateria_kwh"].to_numpy()
+        kw = lote["bateria_kw"].to_numpy()
+        limite = lote["limite_kw"].to_numpy()
+        if ((kwh > 0) & (kw > 0) & np.isfinite(limite)).any():
+            p = _bateria(p, ~punta, np.where(np.isfinite(limite), limite, np.inf), kwh, kw, eficiencia, dt_h)
+
+        # Energía medida más la variación de potencia de cada escenario.
+        energia = e_base + (p - p_base) * dt_h
+        dmax = demanda_15min(p)
+        qc = lote["capacitor_kvar"].to_numpy()[:, None]
+        kvarh = np.abs(r_base[None, :] - qc * dt_h).sum(axis=1)
+        # Como en `facturar`: un bloque con saldo exportador no se factura
+        # como consumo negativo.
+        energia_bloque = {b: np.maximum(energia[:, m].sum(axis=1), 0.0) for b, m in mascaras.items()}
+        kwh_total = sum(energia_bloque.values())
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fp = np.where(kwh_total != 0, np.cos(np.arctan(kvarh / kwh_total)), np.nan)
+
+        consumo = {b: e * factor_30d for b, e in energia_bloque.items()}
+        demanda = {
+            b: np.nan_to_num(np.nanmax(np.where(m, dmax, np.nan), axis=1, initial=-np.inf), neginf=0.0)
+            for b, m in mascaras.items()
+        }
+        salida = lote.reset_index(drop=True).copy()
+        salida["energia_total"] = kwh_total * factor_30d
+        for b in bloques:
+            salida[f"consumo_{b}"] = consumo[b]
+        for b in bloques:
+            salida[f"dmax_{b}"] = demanda[b]
+        salida["fp"] = fp
+        fp_cargo = np.nan_to_num(fp, nan=1.0)
+        for tarifa in tarifas:
+            salida[f"total_{tarifa}"] = calcular_tarifa_lote(tarifa, consumo, demanda, fp_cargo, periodo, dist)["total"]
+        resultados.append(salida)
+
+    tabla = pd.concat(resultados, ignore_index=True)
+    referencia = tabla.iloc[0]
+    tabla = tabla.iloc[1:].reset_index(drop=True)
+    for tarifa in tarifas:
+        tabla[f"ahorro_{tarifa}"] = referencia[f"total_{tarifa}"] - tabla[f"total_{tarifa}"]
+    tabla.attrs["periodo"] = periodo
+    tabla.attrs["aviso_periodo"] = aviso_periodo
+    tabla.attrs["referencia"] = referencia.to_dict()
+    return tabla
@@ -0,0 +1,341 @@
+"""
+Tablas de tarifas como datos: un JSON por periodo tarifario en
+`functions/datos/tarifas/<distribuidora>/` (o en cualquier directorio,
+para distribuidoras definidas fuera del paquete), validado al cargarse y
+compilado a una caché binaria (pickle) que se reutiliza mientras los
+ficheros no cambien. La caché se escribe en el directorio de caché del
+usuario (`$CIRCUTOR_CACHE`, o `$XDG_CACHE_HOME/circutor`, o
+`~/.cache/circutor`), nunca dentro del paquete; si no se puede escribir
+se trabaja sin ella.
+
+Formato de cada fichero:
+
+    {
+      "distribuidora": "Edemet",
+      "periodo": "2025-JUL-DIC",
+      "vigencia": {"desde": "2025-07-01", "hasta": "2025-12-31"},
+      "tarifas": {
+        "BTD": {"tipo": "...", "cargo_fijo": 5.64, "conexion": 71.58,
+                "bloques": {"0-10000": 0.15634, "10001-30000": 0.16309, ...},
+                "cargo_fp": [0.00809, 0.00977, 0.00134],
+                "cargo_demanda_maxima": 18.62},
+        ...
+      }
+    }
+
+`cargo_fp` puede ser un número o la lista de sus componentes (se suman y
+redondean a 5 decimales). Los periodos se buscan por clave o por fecha de
+facturación.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DIR_TARIFAS = Path(__file__).parent / "datos" / "tarifas"
+_VERSION_CACHE = 1
+
+_BLOQUES_HORARIOS = ("punta", "fuera_punta_medio", "fuera_punta_bajo")
+_CAMPOS_COMUNES = ("tipo", "cargo_fijo", "bloques", "conexion", "cargo_fp")
+# Tarifas cuyo precio de energía es por bloque horario y cuyas demandas
+# (si las hay) se cobran por bloque.
+_TARIFAS_HORARIAS = {"BTSH", "BTH", "MTH"}
+_TARIFAS_CON_DEMANDA = {"BTD", "MTD", "BTH", "MTH"}
+
+
+class TarifaInvalida(ValueError):
+    """Fichero de tarifas con estructura o valores no válidos."""
+
+
+@dataclass(frozen=True)
+class PeriodoTarifario:
+    """
+    Tarifas vigentes entre `desde` y `hasta` (incluidos). `tarifas` conserva
+    la estructura de los ficheros con `cargo_fp` ya sumado; `escalones`
+    guarda los tramos de consumo de cada tarifa escalonada como
+    (desde_kwh, hasta_kwh | None, precio).
+    """
+
+    clave: str
+    desde: date
+    hasta: date
+    tarifas: dict[str, dict]
+    escalones: dict[str, tuple[tuple[float, float | None, float], ...]]
+    origen: str = ""
+
+    def __getitem__(self, tarifa: str) -> dict:
+        return self.tarifas[tarifa]
+
+    def __contains__(self, tarifa: str) -> bool:
+        return tarifa in self.tarifas
+
+
+class TablaTarifas:
+    """Periodos tarifarios de una distribuidora ordenados por vigencia."""
+
+    def __init__(self, distribuidora: str, periodos: list[PeriodoTarifario]):
+        self.distribuidora = distribuidora
+        self.periodos = sorted(periodos, key=lambda p: p.desde)
+        self._por_clave = {p.clave: p for p in self.periodos}
+        self._desdes = np.array([p.desde for p in self.periodos], dtype="datetime64[D]")
+        for anterior, siguiente in zip(self.periodos, self.periodos[1:]):
+            if siguiente.desde <= anterior.hasta:
+                raise TarifaInvalida(
+                    f"{distribuidora}: los periodos {anterior.clave} y {siguiente.clave} se solapan"
+                )
+
+    def __iter__(self):
+        return iter(self._por_clave)
+
+    def __contains__(self, periodo) -> bool:
+        try:
+            self.periodo(periodo)
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, periodo) -> PeriodoTarifario:
+        return self.periodo(periodo)
+
+    def claves(self) -> list[str]:
+        return list(self._por_clave)
+
+    def por_fecha(self, fecha) -> PeriodoTarifario:
+        """Periodo vigente en `fecha` (date, datetime, Timestamp o 'AAAA-MM-DD')."""
+        dia = np.datetime64(pd.Timestamp(fecha).date(), "D")
+        i = int(np.searchsorted(self._desdes, dia, side="right")) - 1
+        if i < 0 or dia > np.datetime64(self.periodos[i].hasta, "D"):
+            raise KeyError(
+                f"No hay tarifas de {self.distribuidora} vigentes el {dia}; "
+                f"periodos: {self.claves()}"
+            )
+        return self.periodos[i]
+
+    def mas_cercano(self, fecha) -> PeriodoTarifario:
+        """
+        Periodo vigente en `fecha` o, si ninguno la cubre, el último que
+        empezó antes de ella (el primero si `fecha` es anterior a todos).
+        """
+        dia = np.datetime64(pd.Timestamp(fecha).date(), "D")
+        i = int(np.searchsorted(self._desdes, dia, side="right")) - 1
+        return self.periodos[max(i, 0)]
+
+    def periodo(self, periodo) -> PeriodoTarifario:
+        """Periodo por clave ('2025-JUL-DIC') o por fecha de facturación."""
+        if isinstance(periodo, PeriodoTarifario):
+            return periodo
+        if isinstance(periodo, str) and periodo in self._por_clave:
+            return self._por_clave[periodo]
+        try:
+            return self.por_fecha(periodo)
+        except (ValueError, TypeError):
+            raise KeyError(
+                f"Periodo '{periodo}' no disponible para {self.distribuidora}: {self.claves()}"
+            ) from None
+
+
+# ---- validación y compilación ----------------------------------------------
+
+
+def _numero(valor, donde: str) -> float:
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        raise TarifaInvalida(f"{donde}: se esperaba un número y hay {valor!r}")
+    if valor < 0:
+        raise TarifaInvalida(f"{donde}: valor negativo {valor}")
+    return float(valor)
+
+
+def _escalones(bloques: dict, donde: str) -> tuple[tuple[float, float | None, float], ...]:
+    """Tramos 'a-b' / 'a+' ordenados, contiguos y crecientes."""
+    tramos = []
+    for clave, precio in bloques.items():
+        try:
+            if clave.endswith("+"):
+                inicio, fin = float(clave[:-1]), None
+            else:
+                partes = clave.split("-")
+                if len(partes) != 2:
+                    raise ValueError
+                inicio, fin = float(partes[0]), float(partes[1])
+        except ValueError:
+            raise TarifaInvalida(
+                f"{donde}: tramo de consumo no válido {clave!r} (se esperaba 'a-b' o 'a+' en kWh, "
+                f"o los bloques horarios {list(_BLOQUES_HORARIOS)}, o 'general')"
+            ) from None
+        if inicio < 0 or (fin is not None and fin < inicio):
+            raise TarifaInvalida(f"{donde}: tramo {clave!r} con límites no válidos")
+        tramos.append((inicio, fin, _numero(precio, f"{donde}[{clave!r}]")))
+    if not tramos:
+        raise TarifaInvalida(f"{donde}: no hay tramos de consumo")
+    for (i0, f0, _), (i1, _, _) in zip(tramos, tramos[1:]):
+        if f0 is None or i1 <= i0 or i1 != f0 + 1:
+            raise TarifaInvalida(f"{donde}: los umbrales de los tramos no son crecientes y contiguos")
+    return tuple(tramos)
+
+
+def _compilar_periodo(datos: dict, origen: str) -> PeriodoTarifario:
+    for campo in ("periodo", "vigencia", "tarifas"):
+        if campo not in datos:
+            raise TarifaInvalida(f"{origen}: falta '{campo}'")
+    try:
+        desde = date.fromisoformat(datos["vigencia"]["desde"])
+        hasta = date.fromisoformat(datos["vigencia"]["hasta"])
+    except (KeyError, TypeError, ValueError):
+        raise TarifaInvalida(f"{origen}: 'vigencia' debe tener 'desde' y 'hasta' en formato AAAA-MM-DD") from None
+    if hasta < desde:
+        raise TarifaInvalida(f"{origen}: la vigencia termina antes de empezar")
+
+    tarifas, escalones = {}, {}
+    for nombre, t in datos["tarifas"].items():
+        donde = f"{origen}: {nombre}"
+        faltan = [c for c in _CAMPOS_COMUNES if c not in t]
+        if faltan:
+            raise TarifaInvalida(f"{donde}: faltan {faltan}")
+        t = dict(t)
+        if isinstance(t["cargo_fp"], list):
+            t["cargo_fp"] = round(sum(_numero(c, f"{donde}.cargo_fp") for c in t["cargo_fp"]), 5)
+        else:
+            t["cargo_fp"] = _numero(t["cargo_fp"], f"{donde}.cargo_fp")
+        for campo in ("cargo_fijo", "conexion"):
+            _numero(t[campo], f"{donde}.{campo}")
+
+        if not isinstance(t["bloques"], dict):
+            raise TarifaInvalida(f"{donde}: 'bloques' debe ser un objeto")
+        # La estructura de la tabla decide cómo se valora (`tariffs._cargos`):
+        # precios por bloque horario, precio 'general' o escalones de consumo.
+        horaria = nombre in _TARIFAS_HORARIAS or any(b in _BLOQUES_HORARIOS for b in t["bloques"])
+        if horaria:
+            faltan = [b for b in _BLOQUES_HORARIOS if b not in t["bloques"]]
+            if faltan:
+                raise TarifaInvalida(f"{donde}: faltan los bloques {faltan}")
+            for b, precio in t["bloques"].items():
+                _numero(precio, f"{donde}.bloques[{b!r}]")
+        elif "general" not in t["bloques"]:
+            escalones[nombre] = _escalones(t["bloques"], f"{donde}.bloques")
+        else:
+            _numero(t["bloques"]["general"], f"{donde}.bloques['general']")
+
+        if nombre in _TARIFAS_CON_DEMANDA and "cargo_demanda_maxima" not in t:
+            raise TarifaInvalida(f"{donde}: falta 'cargo_demanda_maxima'")
+        if "cargo_demanda_maxima" in t:
+            cargo = t["cargo_demanda_maxima"]
+            if isinstance(cargo, dict):
+                if not horaria:
+                    raise TarifaInvalida(f"{donde}: 'cargo_demanda_maxima' por bloque solo en tarifas horarias")
+                if any(b not in cargo for b in _BLOQUES_HORARIOS):
+                    raise TarifaInvalida(f"{donde}: 'cargo_demanda_maxima' debe tener todos los bloques")
+                for b, v in cargo.items():
+                    _numero(v, f"{donde}.cargo_demanda_maxima[{b!r}]")
+            else:
+                _numero(cargo, f"{donde}.cargo_demanda_maxima")
+        tarifas[nombre] = t
+
+    return PeriodoTarifario(datos["periodo"], desde, hasta, tarifas, escalones, origen)
+
+
+def _huella(ficheros: list[Path]) -> str:
+    h = hashlib.sha256(str(_VERSION_CACHE).encode())
+    for f in ficheros:
+        st = f.stat()
+        h.update(f"{f.name}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def directorio_tarifas(distribuidora: str | Path) -> Path:
+    """
+    Directorio de tarifas: `datos/tarifas/<distribuidora>` si existe; si no,
+    `distribuidora` como ruta a un directorio propio.
+    """
+    incluido = DIR_TARIFAS / distribuidora
+    if incluido.is_dir() or not Path(distribuidora).is_dir():
+        return incluido
+    return Path(distribuidora)
+
+
+def compilar_tarifas(distribuidora: str | Path) -> TablaTarifas:
+    """Lee y valida todos los periodos de una distribuidora (sin caché)."""
+    directorio = directorio_tarifas(distribuidora)
+    ficheros = sorted(directorio.glob("*.json"))
+    if not ficheros:
+        raise FileNotFoundError(f"No hay ficheros de tarifas en {directorio}")
+    periodos = []
+    for f in ficheros:
+        try:
+            datos = json.loads(f.read_text(encoding="utf-8"))
+        except json.JSONDecodeError as e:
+            raise TarifaInvalida(f"{f.name}: JSON no válido ({e})") from None
+        periodos.append(_compilar_periodo(datos, f.name))
+    claves = [p.clave for p in periodos]
+    if len(set(claves)) != len(claves):
+        raise TarifaInvalida(f"{distribuidora}: claves de periodo repetidas {claves}")
+    return TablaTarifas(directorio.name, periodos)
+
+
+def _dir_cache() -> Path | None:
+    """Directorio de la caché binaria de tarifas (None si no hay directorio de usuario)."""
+    base = os.environ.get("CIRCUTOR_CACHE")
+    if not base:
+        try:
+            base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "circutor"
+        except RuntimeError:
+            return None
+    return Path(base) / "tarifas"
+
+
+def _ruta_cache(directorio: Path) -> Path | None:
+    dir_cache = _dir_cache()
+    if dir_cache is None:
+        return None
+    clave = hashlib.sha256(str(directorio.resolve()).encode()).hexdigest()[:16]
+    return dir_cache / f"{directorio.name}-{clave}.pickle"
+
+
+_memoria: dict[str, tuple[str, TablaTarifas]] = {}
+
+
+def cargar_tarifas(distribuidora: str | Path, *, usar_cache: bool = True) -> TablaTarifas:
+    """
+    Tablas de tarifas de `distribuidora` (nombre del directorio en
+    `datos/tarifas` o ruta a un directorio propio). Se reutiliza la versión
+    en memoria o la caché binaria mientras los ficheros no cambien; si no,
+    se validan y compilan de nuevo.
+    """
+    directorio = directorio_tarifas(distribuidora)
+    clave = str(directorio)
+    ficheros = sorted(directorio.glob("*.json"))
+    huella = _huella(ficheros) if ficheros else ""
+    if usar_cache and clave in _memoria and _memoria[clave][0] == huella:
+        return _memoria[clave][1]
+
+    ruta_cache = _ruta_cache(directorio) if usar_cache else None
+    tabla = None
+    if ruta_cache is not None and ruta_cache.exists():
+        try:
+            with ruta_cache.open("rb") as fh:
+                huella_cache, tabla = pickle.load(fh)
+            if huella_cache != huella:
+                tabla = None
+        except Exception:
+            tabla = None
+
+    if tabla is None:
+        tabla = compilar_tarifas(directorio)
+        if ruta_cache is not None:
+            try:
+                ruta_cache.parent.mkdir(parents=True, exist_ok=True)
+                with ruta_cache.open("wb") as fh:
+                    pickle.dump((huella, tabla), fh, protocol=pickle.HIGHEST_PROTOCOL)
+            except OSError:
+                pass  # Sin permiso de escritura: se trabaja sin caché en disco.
+
+    _memoria[clave] = (huella, tabla)
+    return tabla
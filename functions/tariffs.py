@@ -1,114 +1,217 @@
 """
-Cálculo de cargos Edemet (2025).
+Cálculo de cargos por tarifa (Edemet por defecto).
 Se expone una función por tipo de tarifa: BTS, BTSH, BTH, BTD, MTD, MTH.
+Los cargos se valoran según la estructura de cada tabla (escalones de
+consumo compilados, precio 'general' o precios por bloque horario), sin
+umbrales fijos en el código.
+
+Las tablas y la regla de factor de potencia salen de la distribuidora
+activa (`functions.distribuidoras`) o de la indicada en `distribuidora`.
 """
 
 from __future__ import annotations
 
-from math import cos, atan
+import numpy as np
+import pandas as pd
 
-from TARIFAS_NATURGY import tarifas_edemet
+from .distribuidoras import Distribuidora, distribuidora_activa, resolver_distribuidora
+from .instrumentacion import instrumentar
+from .tablas_tarifas import PeriodoTarifario, cargar_tarifas
 
 # -----------------------------------------------------------------------
 
 
-def _calcular_fp(cargo_fp: float, consumo: float, fp_m: float) -> float:
-    """Penalización por factor de potencia < 0.9."""
-    if fp_m >= 0.9:
-        return 0.0
-    return round(2 * (0.9 - round(fp_m, 2)) * consumo * cargo_fp, 2)
+def _tarifa(distribuidora: Distribuidora, periodo, tarifa: str) -> tuple[dict, tuple | None]:
+    """
+    Tabla de `tarifa` en `periodo` (clave como '2025-JUL-DIC' o fecha de
+    facturación) y sus escalones de consumo (None si no es escalonada).
+    """
+    p = cargar_tarifas(distribuidora.tarifas).periodo(periodo)
+    if tarifa not in p:
+        raise KeyError(f"Tarifa '{tarifa}' no disponible en el periodo {p.clave}: {list(p.tarifas)}")
+    return p[tarifa], p.escalones.get(tarifa)
+
+
+def periodo_tarifario(fecha, distribuidora: str | Distribuidora | None = None) -> PeriodoTarifario:
+    """Periodo tarifario vigente en `fecha` para la distribuidora."""
+    return cargar_tarifas(resolver_distribuidora(distribuidora).tarifas).por_fecha(fecha)
+
+
+def periodo_por_defecto(fecha, distribuidora: str | Distribuidora | None = None) -> tuple[PeriodoTarifario, str | None]:
+    """
+    Periodo vigente en `fecha` o, si las tablas aún no lo cubren, el más
+    cercano junto con el aviso que debe mostrarse (None si no hace falta).
+    """
+    dist = resolver_distribuidora(distribuidora)
+    tabla = cargar_tarifas(dist.tarifas)
+    try:
+        return tabla.por_fecha(fecha), None
+    except KeyError:
+        periodo = tabla.mas_cercano(fecha)
+        aviso = (
+            f"No hay tarifas de {dist.nombre} vigentes el {pd.Timestamp(fecha):%Y-%m-%d}; "
+            f"se usa el periodo {periodo.clave} ({periodo.desde} a {periodo.hasta})."
+        )
+        return periodo, aviso
+
+
+def _calcular_fp(cargo_fp: float, consumo: float, fp_m: float, distribuidora: Distribuidora | None = None) -> float:
+    """Penalización por factor de potencia bajo (regla de la distribuidora)."""
+    return (distribuidora or distribuidora_activa()).regla_fp.penalizacion(cargo_fp, consumo, fp_m)
+
+
+def energia_escalonada(kwh, escalones) -> np.ndarray:
+    """
+    Cargo de energía de `kwh` (escalar o array) con los tramos de consumo
+    (desde, hasta | None, precio) de `PeriodoTarifario.escalones`. El tramo
+    'a-b' cubre el consumo entre a − 1 y b kWh; el consumo anterior al
+    primer tramo (los 10 kWh previos a '11-300') se cobra al precio del
+    último tramo alcanzado, como en los pliegos de Edemet.
+    """
+    kwh = np.asarray(kwh, dtype=np.float64)
+    bajo = np.array([max(desde - 1, 0.0) for desde, _, _ in escalones])
+    alto = np.array([np.inf if hasta is None else hasta for _, hasta, _ in escalones])
+    precio = np.array([p for _, _, p in escalones])
+    if np.isfinite(alto[-1]) and np.any(kwh > alto[-1]):
+        raise ValueError(f"El consumo supera el último tramo de la tarifa ({alto[-1]:g} kWh)")
+    # Tramos completos por debajo del alcanzado y el resto de `kwh` a su precio.
+    completos = np.concatenate([[0.0], np.cumsum((alto - bajo)[:-1] * precio[:-1])])
+    alcanzado = np.clip((kwh[..., None] > bajo).sum(axis=-1) - 1, 0, None)
+    return completos[alcanzado] + (kwh - (bajo[alcanzado] - bajo[0])) * precio[alcanzado]
+
+
+def _cargos(t: dict, escalones, consumo: dict[str, np.ndarray], dmax: dict[str, np.ndarray]):
+    """
+    Cargos de energía y demanda (sin redondear) y consumo total según la
+    estructura de la tabla `t`:
+      • energía: por escalones de consumo, precio 'general' o precio por
+        bloque horario;
+      • demanda: sin cargo, cargo único sobre la máxima de todos los bloques,
+        o cargo por bloque (la punta por su máxima; el resto, la mayor de sus
+        máximas al cargo del bloque donde se da).
+    """
+    kwh = sum(consumo.values())
+    precios = t["bloques"]
+    if escalones is not None:
+        energia = energia_escalonada(kwh, escalones)
+    elif "general" in precios:
+        energia = kwh * precios["general"]
+    else:
+        energia = sum(consumo[b] * precios[b] for b in consumo)
+
+    cargo = t.get("cargo_demanda_maxima")
+    if cargo is None or not dmax:
+        demanda = np.zeros_like(np.asarray(kwh, dtype=np.float64))
+    elif isinstance(cargo, dict):
+        punta = "punta" if "punta" in cargo else next(iter(cargo))
+        resto = [b for b in cargo if b != punta]
+        maximos = np.stack([np.asarray(dmax[b], dtype=np.float64) for b in resto])
+        cargo_resto = np.array([cargo[b] for b in resto])[np.argmax(maximos, axis=0)]
+        demanda = dmax[punta] * cargo[punta] + maximos.max(axis=0) * cargo_resto
+    else:
+        demanda = np.maximum.reduce([np.asarray(v, dtype=np.float64) for v in dmax.values()]) * cargo
+    return energia, demanda, kwh
 
 
-# -------------------- FUNCIONES PÚBLICAS POR TARIFA --------------------
+def _redondear(valor, dato) -> float:
+    """Redondeo a céntimos con el tipo de `dato` (np.float64 redondea con NumPy, como `round` sobre él)."""
+    tipo = type(dato) if isinstance(dato, np.floating) else float
+    return round(tipo(valor), 2)
 
 
-def calcular_BTS(consumo_por_bloque: dict[str, float], fp_m: float, _dmax, periodo):
-    t = tarifas_edemet[periodo]["BTS"]
-    kwh = sum(consumo_por_bloque.values())
-    if kwh <= 300:
-        energia = kwh * t["bloques"]["11-300"]
-    elif kwh <= 750:
-        energia = (290 * t["bloques"]["11-300"]) + ((kwh - 290) * t["bloques"]["301-750"])
-    else:
-        energia = (
-            290 * t["bloques"]["11-300"]
-            + 450 * t["bloques"]["301-750"]
-            + ((kwh - 740) * t["bloques"]["751+"])
-        )
-    fp = _calcular_fp(t["cargo_fp"], kwh, fp_m)
-    return round(energia, 2), 0.0, fp
-
-
-def calcular_BTSH(consumo_por_bloque, fp_m, _dmax, periodo):
-    t = tarifas_edemet[periodo]["BTSH"]
-    energia = sum(
-        consumo_por_bloque[b] * t["bloques"][b]
-        for b in ("punta", "fuera_punta_medio", "fuera_punta_bajo")
-    )
-    fp = _calcular_fp(t["cargo_fp"], sum(consumo_por_bloque.values()), fp_m)
-    return round(energia, 2), 0.0, fp
-
-
-def calcular_BTH(consumo_bloq, dmax_bloq, fp_m, periodo):
-    t = tarifas_edemet[periodo]["BTH"]
-    energia = sum(consumo_bloq[b] * t["bloques"][b] for b in consumo_bloq)
-    d_punta = dmax_bloq["punta"]
-    d_fuera = max(dmax_bloq["fuera_punta_medio"], dmax_bloq["fuera_punta_bajo"])
-    cargo_fuera = (
-        t["cargo_demanda_maxima"]["fuera_punta_medio"]
-        if dmax_bloq["fuera_punta_medio"] >= dmax_bloq["fuera_punta_bajo"]
-        else t["cargo_demanda_maxima"]["fuera_punta_bajo"]
-    )
-    demanda = d_punta * t["cargo_demanda_maxima"]["punta"] + d_fuera * cargo_fuera
-    fp = _calcular_fp(t["cargo_fp"], sum(consumo_bloq.values()), fp_m)
-    return round(energia, 2), round(demanda, 2), fp
-
-
-def calcular_BTD(consumo_bloq, fp_m, dmax_bloq, periodo):
-    t = tarifas_edemet[periodo]["BTD"]
-    kwh = sum(consumo_bloq.values())
-    if kwh <= 10000:
-        energia = kwh * t["bloques"]["0-10000"]
-    elif kwh <= 30000:
-        energia = 10000 * t["bloques"]["0-10000"] + (kwh - 10000) * t["bloques"]["10001-30000"]
-    elif kwh <= 50000:
-        energia = (
-            10000 * t["bloques"]["0-10000"]
-            + 20000 * t["bloques"]["10001-30000"]
-            + (kwh - 30000) * t["bloques"]["30001-50000"]
-        )
-    else:
-        energia = (
-            10000 * t["bloques"]["0-10000"]
-            + 20000 * t["bloques"]["10001-30000"]
-            + 20000 * t["bloques"]["30001-50000"]
-            + (kwh - 50000) * t["bloques"]["50001+"]
-        )
+def _calcular(tarifa: str, consumo_bloq, dmax_bloq, fp_m, periodo, distribuidora) -> tuple[float, float, float]:
+    dist = resolver_distribuidora(distribuidora)
+    t, escalones = _tarifa(dist, periodo, tarifa)
+    energia, demanda, kwh = _cargos(t, escalones, consumo_bloq, dmax_bloq)
+    fp = _calcular_fp(t["cargo_fp"], kwh, fp_m, dist)
+    return _redondear(energia, kwh), _redondear(demanda, next(iter(dmax_bloq.values()), kwh)), fp
+
+
+# -------------------- FUNCIONES PÚBLICAS POR TARIFA --------------------
+
 
-    demanda = max(dmax_bloq.values()) * t["cargo_demanda_maxima"]
-    fp = _calcular_fp(t["cargo_fp"], kwh, fp_m)
-    return round(energia, 2), round(demanda, 2), fp
-
-
-def calcular_MTD(consumo_bloq, fp_m, dmax_bloq, periodo):
-    t = tarifas_edemet[periodo]["MTD"]
-    kwh = sum(consumo_bloq.values())
-    energia = kwh * t["bloques"]["general"]
-    demanda = max(dmax_bloq.values()) * t["cargo_demanda_maxima"]
-    fp = _calcular_fp(t["cargo_fp"], kwh, fp_m)
-    return round(energia, 2), round(demanda, 2), fp
-
-
-def calcular_MTH(consumo_bloq, dmax_bloq, fp_m, periodo):
-    t = tarifas_edemet[periodo]["MTH"]
-    energia = sum(consumo_bloq[b] * t["bloques"][b] for b in consumo_bloq)
-    d_punta = dmax_bloq["punta"]
-    d_fuera = max(dmax_bloq["fuera_punta_medio"], dmax_bloq["fuera_punta_bajo"])
-    cargo_fuera = (
-        t["cargo_demanda_maxima"]["fuera_punta_medio"]
-        if dmax_bloq["fuera_punta_medio"] >= dmax_bloq["fuera_punta_bajo"]
-        else t["cargo_demanda_maxima"]["fuera_punta_bajo"]
-    )
-    demanda = d_punta * t["cargo_demanda_maxima"]["punta"] + d_fuera * cargo_fuera
-    fp = _calcular_fp(t["cargo_fp"], sum(consumo_bloq.values()), fp_m)
-    return round(energia, 2), round(demanda, 2), fp
+@instrumentar
+def calcular_BTS(consumo_por_bloque: dict[str, float], fp_m: float, _dmax, periodo, distribuidora=None):
+    return _calcular("BTS", consumo_por_bloque, {}, fp_m, periodo, distribuidora)
+
+
+@instrumentar
+def calcular_BTSH(consumo_por_bloque, fp_m, _dmax, periodo, distribuidora=None):
+    return _calcular("BTSH", consumo_por_bloque, {}, fp_m, periodo, distribuidora)
+
+
+@instrumentar
+def calcular_BTH(consumo_bloq, dmax_bloq, fp_m, periodo, distribuidora=None):
+    return _calcular("BTH", consumo_bloq, dmax_bloq, fp_m, periodo, distribuidora)
+
+
+@instrumentar
+def calcular_BTD(consumo_bloq, fp_m, dmax_bloq, periodo, distribuidora=None):
+    return _calcular("BTD", consumo_bloq, dmax_bloq, fp_m, periodo, distribuidora)
+
+
+@instrumentar
+def calcular_MTD(consumo_bloq, fp_m, dmax_bloq, periodo, distribuidora=None):
+    return _calcular("MTD", consumo_bloq, dmax_bloq, fp_m, periodo, distribuidora)
+
+
+@instrumentar
+def calcular_MTH(consumo_bloq, dmax_bloq, fp_m, periodo, distribuidora=None):
+    return _calcular("MTH", consumo_bloq, dmax_bloq, fp_m, periodo, distribuidora)
+
+
+# -------------------- DESPACHO POR NOMBRE DE TARIFA --------------------
+
+TARIFAS_SOPORTADAS = ("BTS", "BTSH", "BTD", "BTH", "MTD", "MTH")
+
+
+def calcular_tarifa(
+    tarifa: str,
+    consumo_bloq: dict[str, float],
+    dmax_bloq: dict[str, float],
+    fp_m: float,
+    periodo,
+    distribuidora=None,
+) -> dict:
+    """
+    Calcula los cargos de `tarifa` con una firma común para todas:
+    consumo y demanda máxima por bloque, FP mensual y periodo (clave o fecha).
+    Cualquier tarifa del periodo se valora según la estructura de su tabla
+    (escalones, precio general o por bloque, cargos de demanda).
+    """
+    energia, demanda, fp = _calcular(tarifa, consumo_bloq, dmax_bloq, fp_m, periodo, distribuidora)
+    return {
+        "cargo_energia": energia,
+        "cargo_demanda": demanda,
+        "cargo_fp": fp,
+        "total": energia + demanda + fp,
+    }
+
+
+def calcular_tarifa_lote(
+    tarifa: str,
+    consumo_bloq: dict[str, np.ndarray],
+    dmax_bloq: dict[str, np.ndarray],
+    fp_m: np.ndarray,
+    periodo,
+    distribuidora=None,
+) -> dict[str, np.ndarray]:
+    """
+    Versión vectorizada de `calcular_tarifa`: cada valor de `consumo_bloq`,
+    `dmax_bloq` y `fp_m` es un array con un elemento por escenario, y los
+    cargos se devuelven como arrays. Aplica las mismas fórmulas que las
+    funciones `calcular_*`.
+    """
+    dist = resolver_distribuidora(distribuidora)
+    t, escalones = _tarifa(dist, periodo, tarifa)
+    consumo = {b: np.asarray(v, dtype=np.float64) for b, v in consumo_bloq.items()}
+    dmax = {b: np.asarray(v, dtype=np.float64) for b, v in dmax_bloq.items()}
+    energia, demanda, kwh = _cargos(t, escalones, consumo, dmax)
+    energia, demanda = np.round(energia, 2), np.round(demanda, 2)
+    fp = dist.regla_fp.penalizacion_lote(t["cargo_fp"], kwh, fp_m)
+    return {
+        "cargo_energia": energia,
+        "cargo_demanda": demanda,
+        "cargo_fp": fp,
+        "total": energia + demanda + fp,
+    }
@@ -0,0 +1,283 @@
+"""
+Vigilancia de una carpeta de descargas: cada exportación `.txt`/`.csv`
+nueva o que ha crecido se procesa en cuanto deja de escribirse, sin volver a
+procesar las que no han cambiado (también entre reinicios).
+
+    python -m functions.vigilancia descargas --salida procesados --almacen resultados.sqlite
+
+Un fichero se da por terminado cuando lleva `espera_estable` segundos sin
+modificarse. Los listos pasan por una cola acotada (`max_pendientes`) a
+`max_en_curso` tareas que los procesan en un pool de procesos; si la cola
+está llena, el recorrido de la carpeta espera (contrapresión) en lugar de
+acumular trabajo. Las exportaciones de `descargas/<sitio>/` se asignan a
+ese sitio; las de la raíz, al nombre del fichero.
+
+Por defecto cada exportación genera su informe en
+`salida/<sitio>/<fichero>/` (`informe.txt`, `resultado.json` e `images/`)
+y, con `almacen`, se guarda en la base de resultados.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import fnmatch
+import json
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable
+
+from .almacen import AlmacenResultados
+from .distribuidoras import distribuidoras_disponibles
+from .servicio import ejecutar_en_directorio, preparar_proceso, resultado_json
+
+_ESTADO = "vigilancia.json"
+
+
+def procesar_exportacion(
+    ruta: str | Path,
+    sitio: str,
+    *,
+    salida: str | Path,
+    almacen: str | Path | None = None,
+    **parametros,
+) -> dict:
+    """
+    Informe de la exportación `ruta` en `salida/<sitio>/<fichero>/`
+    (parámetros de `ejecutar_informe`); con `almacen` lo guarda además en
+    esa base de resultados. Devuelve un resumen de la campaña.
+    """
+    ruta = Path(ruta)
+    directorio = Path(salida) / sitio / ruta.stem
+    directorio.mkdir(parents=True, exist_ok=True)
+    salidas, texto = ejecutar_en_directorio(ruta, directorio, sitio=sitio, **parametros)
+
+    (directorio / "informe.txt").write_text(texto, encoding="utf-8")
+    resultado = resultado_json(sitio, salidas, texto, directorio)
+    (directorio / "resultado.json").write_text(json.dumps(resultado, ensure_ascii=False, indent=1), encoding="utf-8")
+    if almacen is not None:
+        with AlmacenResultados(almacen) as base:
+            base.guardar_informe(sitio, salidas, archivo=str(ruta), distribuidora=parametros.get("distribuidora"))
+
+    medicion = resultado["metricas"]["medicion"]
+    return {"directorio": str(directorio), **medicion}
+
+
+class VigilanteCarpeta:
+    """
+    Vigila `directorio` y llama a `procesar(ruta, sitio)` en `executor`
+    (por defecto un pool de `max_en_curso` procesos precalentados) para cada
+    exportación nueva o modificada. Sin `procesar` se usa
+    `procesar_exportacion` con `salida`, `almacen` y `parametros`.
+
+    El estado (tamaño y fecha de modificación de lo ya procesado) se guarda
+    en `salida/vigilancia.json`. Un fichero que falla no se reintenta hasta
+    que cambia.
+    """
+
+    def __init__(
+        self,
+        directorio: str | Path,
+        procesar: Callable[[Path, str], Any] | None = None,
+        *,
+        salida: str | Path = "procesados",
+        almacen: str | Path | None = None,
+        patrones: tuple[str, ...] = ("*.txt", "*.csv"),
+        recursivo: bool = True,
+        intervalo: float = 2.0,
+        espera_estable: float = 5.0,
+        max_en_curso: int = 2,
+        max_pendientes: int = 8,
+        executor: Executor | None = None,
+        al_terminar: Callable[[dict], None] | None = None,
+        **parametros,
+    ):
+        self.directorio = Path(directorio).resolve()
+        if not self.directorio.is_dir():
+            raise FileNotFoundError(f"No existe la carpeta: {directorio}")
+        self.salida = Path(salida).resolve()
+        self.procesar = procesar or partial(procesar_exportacion, salida=self.salida, almacen=almacen, **parametros)
+        self.patrones = tuple(patrones)
+        self.recursivo = recursivo
+        self.intervalo = intervalo
+        self.espera_estable = espera_estable
+        self.max_en_curso = max_en_curso
+        self.max_pendientes = max_pendientes
+        self.executor = executor
+        self.al_terminar = al_terminar
+        self.registros: list[dict] = []
+        self._procesados: dict[str, list[int]] = self._leer_estado()
+        self._en_cola: set[str] = set()
+        self._detener: asyncio.Event | None = None
+
+    # ---- estado ----------------------------------------------------------
+
+    def _leer_estado(self) -> dict[str, list[int]]:
+        ruta = self.salida / _ESTADO
+        if not ruta.exists():
+            return {}
+        try:
+            return json.loads(ruta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _guardar_estado(self) -> None:
+        self.salida.mkdir(parents=True, exist_ok=True)
+        temporal = self.salida / f"{_ESTADO}.tmp"
+        temporal.write_text(json.dumps(self._procesados, indent=1, ensure_ascii=False), encoding="utf-8")
+        os.replace(temporal, self.salida / _ESTADO)
+
+    # ---- detección -------------------------------------------------------
+
+    def _exportaciones(self) -> dict[str, tuple[int, int]]:
+        """{ruta relativa: (tamaño, mtime_ns)} de las exportaciones de la carpeta."""
+        encontradas = {}
+        pendientes = [self.directorio]
+        while pendientes:
+            with os.scandir(pendientes.pop()) as entradas:
+                for e in entradas:
+                    if e.is_dir(follow_symlinks=False):
+                        # La salida puede estar dentro de la carpeta vigilada.
+                        if self.recursivo and not e.name.startswith(".") and Path(e.path) != self.salida:
+                            pendientes.append(Path(e.path))
+                    elif e.is_file() and any(fnmatch.fnmatch(e.name.lower(), p) for p in self.patrones):
+                        st = e.stat()
+                        encontradas[Path(e.path).relative_to(self.directorio).as_posix()] = (st.st_size, st.st_mtime_ns)
+        return encontradas
+
+    def listas(self, exportaciones: dict[str, tuple[int, int]] | None = None) -> list[tuple[str, tuple[int, int]]]:
+        """
+        Exportaciones por procesar: nuevas o cambiadas desde la última vez,
+        no vacías, sin modificar desde hace `espera_estable` segundos y que
+        no están ya en cola. Las más antiguas primero.
+        """
+        exportaciones = self._exportaciones() if exportaciones is None else exportaciones
+        limite = time.time_ns() - int(self.espera_estable * 1e9)
+        listas = [
+            (rel, firma)
+            for rel, firma in exportaciones.items()
+            if firma[0] > 0
+            and firma[1] <= limite
+            and rel not in self._en_cola
+            and self._procesados.get(rel) != list(firma)
+        ]
+        return sorted(listas, key=lambda x: x[1][1])
+
+    def sitio(self, relativa: str) -> str:
+        partes = Path(relativa).parts
+        return partes[0] if len(partes) > 1 else Path(relativa).stem
+
+    # ---- ejecución -------------------------------------------------------
+
+    async def _trabajador(self, cola: asyncio.Queue, executor: Executor) -> None:
+        bucle = asyncio.get_running_loop()
+        while True:
+            rel, firma = await cola.get()
+            registro = {"archivo": rel, "sitio": self.sitio(rel), "tamano": firma[0]}
+            inicio = time.perf_counter()
+            try:
+                resultado = await bucle.run_in_executor(
+                    executor, self.procesar, self.directorio / rel, registro["sitio"]
+                )
+                registro.update(estado="ok", resultado=resultado)
+            except Exception as e:
+                registro.update(estado="error", error=f"{type(e).__name__}: {e}")
+            registro["segundos"] = time.perf_counter() - inicio
+            try:
+                # Se guarda la firma con la que se encoló: si el fichero ha
+                # vuelto a crecer mientras tanto, se procesará de nuevo.
+                self._procesados[rel] = list(firma)
+                self._guardar_estado()
+                self.registros.append(registro)
+                if self.al_terminar is not None:
+                    self.al_terminar(registro)
+            finally:
+                self._en_cola.discard(rel)
+                cola.task_done()
+
+    def detener(self) -> None:
+        """Deja de recorrer la carpeta; `ejecutar` termina al acabar lo que hay en cola."""
+        if self._detener is not None:
+            self._detener.set()
+
+    async def ejecutar(self, *, una_vez: bool = False) -> list[dict]:
+        """
+        Vigila la carpeta hasta `detener()` (o, con `una_vez`, procesa lo que
+        ya está listo y termina). Devuelve los registros de lo procesado.
+        """
+        self._detener = asyncio.Event()
+        propio = self.executor is None
+        executor = self.executor or ProcessPoolExecutor(
+            max_workers=self.max_en_curso, initializer=preparar_proceso, initargs=(distribuidoras_disponibles(),)
+        )
+        cola: asyncio.Queue = asyncio.Queue(maxsize=self.max_pendientes)
+        trabajadores = [asyncio.create_task(self._trabajador(cola, executor)) for _ in range(self.max_en_curso)]
+        previos = len(self.registros)
+        try:
+            while not self._detener.is_set():
+                exportaciones = await asyncio.to_thread(self._exportaciones)
+                for rel, firma in self.listas(exportaciones):
+                    self._en_cola.add(rel)
+                    await cola.put((rel, firma))  # espera si la cola está llena
+                if una_vez:
+                    break
+                try:
+                    await asyncio.wait_for(self._detener.wait(), self.intervalo)
+                except asyncio.TimeoutError:
+                    pass
+            await cola.join()
+        finally:
+            for t in trabajadores:
+                t.cancel()
+            await asyncio.gather(*trabajadores, return_exceptions=True)
+            if propio:
+                executor.shutdown(wait=True, cancel_futures=True)
+        return self.registros[previos:]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("carpeta", type=Path)
+    parser.add_argument("--salida", type=Path, default=Path("procesados"))
+    parser.add_argument("--almacen", type=Path, help="Base SQLite de resultados")
+    parser.add_argument("--procesos", type=int, default=2)
+    parser.add_argument("--pendientes", type=int, default=8, help="Tamaño máximo de la cola")
+    parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre recorridos")
+    parser.add_argument("--espera", type=float, default=5.0, help="Segundos sin cambios para dar un fichero por terminado")
+    parser.add_argument("--distribuidora", default="edemet")
+    parser.add_argument("--volt-linea", type=float, default=480.0)
+    parser.add_argument("--una-vez", action="store_true", help="Procesar lo pendiente y terminar")
+    args = parser.parse_args(argv)
+
+    def informar(registro: dict) -> None:
+        if registro["estado"] == "ok":
+            print(f"{registro['archivo']}: informe en {registro['resultado']['directorio']} ({registro['segundos']:.1f} s)")
+        else:
+            print(f"{registro['archivo']}: ERROR {registro['error']}")
+
+    vigilante = VigilanteCarpeta(
+        args.carpeta,
+        salida=args.salida,
+        almacen=args.almacen,
+        intervalo=args.intervalo,
+        espera_estable=args.espera,
+        max_en_curso=args.procesos,
+        max_pendientes=args.pendientes,
+        al_terminar=informar,
+        distribuidora=args.distribuidora,
+        volt_linea=args.volt_linea,
+    )
+    print(f"Vigilando {vigilante.directorio} → {vigilante.salida}")
+    try:
+        asyncio.run(vigilante.ejecutar(una_vez=args.una_vez))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
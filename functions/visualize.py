@@ -9,6 +9,9 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+from .instrumentacion import instrumentar
+from .piramide import PiramideAgregados
+
 
 def _desempaquetar_item(item):
     if isinstance(item, str):
@@ -22,8 +25,9 @@ def _desempaquetar_item(item):
     raise ValueError(item)
 
 
+@instrumentar
 def graficar_parametros(
-    df: pd.DataFrame,
+    df: pd.DataFrame | PiramideAgregados,
     parametros: list,
     *,
     fecha_inicio: str | None = None,
@@ -37,39 +41,73 @@ def graficar_parametros(
     titulo: str = "Parámetros vs Tiempo",
     guardar: bool = False,
     ruta: str | None = None,
+    max_puntos: int = 2000,
 ):
+    """
+    Grafica `parametros` frente al tiempo. `df` puede ser una
+    `PiramideAgregados`: entonces se usa el nivel más grueso con hasta
+    `max_puntos` intervalos en el rango de fechas (y no más ancho que la
+    franja `hora_inicio`–`hora_fin`), con la media como línea y el
+    mínimo–máximo como banda si el nivel agrega varias muestras.
+    """
     if not parametros:
         raise ValueError("Se requiere al menos un parámetro")
 
     plt.figure(figsize=(14, 7))
 
-    # Preparar índice datetime
-    if "Fecha/hora" in df.columns:
-        df = df.copy()
-        df["FechaHora"] = pd.to_datetime(df["Fecha/hora"], dayfirst=True, errors="coerce")
-        df = df.dropna(subset=["FechaHora"]).set_index("FechaHora")
-    else:  # ya es índice
-        if not isinstance(df.index, pd.DatetimeIndex):
-            raise TypeError("Índice no es datetime")
-
-    is_promedio = (df.index.date == pd.Timestamp("1900-01-01").date()).all()
-
-    if is_promedio:
-        df = df.between_time(hora_inicio, hora_fin)
-        for it in parametros:
-            col, color, style = _desempaquetar_item(it)
-            plt.plot(df.index, df[col], linestyle=style, color=color, label=col)
-        plt.gca().xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
-    else:
-        df = df.between_time(hora_inicio, hora_fin)
-        if fecha_inicio:
-            df = df[df.index.date >= pd.to_datetime(fecha_inicio).date()]
-        if fecha_fin:
-            df = df[df.index.date <= pd.to_datetime(fecha_fin).date()]
+    if isinstance(df, PiramideAgregados):
+        columnas = list(dict.fromkeys(_desempaquetar_item(it)[0] for it in parametros))
+        ini = pd.Timestamp(fecha_inicio) if fecha_inicio else None
+        fin = pd.Timestamp(fecha_fin) + pd.Timedelta(days=1) - pd.Timedelta(1, "ns") if fecha_fin else None
+        nivel = df.nivel_para(ini, fin, max_puntos=max_puntos)
+        # Con franja horaria, un nivel no más ancho que la franja:
+        # `between_time` filtra los intervalos por su comienzo y con los de
+        # 1 día, p. ej., la serie quedaría vacía.
+        franja = (pd.Timestamp(f"2000-01-01 {hora_fin}") - pd.Timestamp(f"2000-01-01 {hora_inicio}")) % pd.Timedelta(days=1)
+        franja += pd.Timedelta(minutes=1)
+        if nivel.ancho > franja.value:
+            nivel = max((n for n in df.niveles if n.ancho <= franja.value), key=lambda n: n.ancho, default=df.niveles[0])
+        serie = df.serie(columnas, ini, fin, nivel=nivel.nombre).between_time(hora_inicio, hora_fin)
+        agregada = (serie[[(c, "conteo") for c in columnas]] > 1).any().any()
         for it in parametros:
             col, color, style = _desempaquetar_item(it)
-            plt.plot(df.index, df[col], linestyle=style, color=color, label=col)
+            linea, = plt.plot(serie.index, serie[(col, "media")], linestyle=style, color=color, label=col)
+            if agregada:
+                plt.fill_between(
+                    serie.index, serie[(col, "minimo")], serie[(col, "maximo")],
+                    color=linea.get_color(), alpha=0.2, linewidth=0,
+                )
         plt.gca().xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d\n%H:%M"))
+    else:
+        if "Fecha/hora" in df.columns:
+            # Solo se copian las columnas a graficar.
+            columnas = list(dict.fromkeys(_desempaquetar_item(it)[0] for it in parametros))
+            fechas = pd.to_datetime(df["Fecha/hora"], dayfirst=True, errors="coerce")
+            df = pd.DataFrame({col: df[col].to_numpy() for col in columnas})
+            df.index = pd.DatetimeIndex(fechas, name="FechaHora")
+            df = df[df.index.notna()]
+        else:  # ya es índice
+            if not isinstance(df.index, pd.DatetimeIndex):
+                raise TypeError("Índice no es datetime")
+
+        is_promedio = (df.index.date == pd.Timestamp("1900-01-01").date()).all()
+
+        if is_promedio:
+            df = df.between_time(hora_inicio, hora_fin)
+            for it in parametros:
+                col, color, style = _desempaquetar_item(it)
+                plt.plot(df.index, df[col], linestyle=style, color=color, label=col)
+            plt.gca().xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
+        else:
+            df = df.between_time(hora_inicio, hora_fin)
+            if fecha_inicio:
+                df = df[df.index.date >= pd.to_datetime(fecha_inicio).date()]
+            if fecha_fin:
+                df = df[df.index.date <= pd.to_datetime(fecha_fin).date()]
+            for it in parametros:
+                col, color, style = _desempaquetar_item(it)
+                plt.plot(df.index, df[col], linestyle=style, color=color, label=col)
+            plt.gca().xaxis.set_major_formatter(mdates.DateFormatter("%Y-%m-%d\n%H:%M"))
 
     if lineas_verticales:
         for lv in lineas_verticales:
@@ -97,6 +135,7 @@ def graficar_parametros(
 # --- Barras & anillo ----------------------------------------------------
 
 
+@instrumentar
 def graficar_consumo_por_bloque(
     data: dict[str, float],
     *,
@@ -118,6 +157,7 @@ def graficar_consumo_por_bloque(
     plt.show()
 
 
+@instrumentar
 def graficar_demanda_maxima_por_bloque(
     data: dict[str, float],
     *,
@@ -159,6 +199,7 @@ def _donut(data, titulo, ylabel, guardar=False, ruta=None):
     plt.show()
 
 
+@instrumentar
 def graficar_consumo_anillo(
     data, 
     *,
@@ -168,6 +209,7 @@ def graficar_consumo_anillo(
 ):
     _donut(data, titulo, "kWh", guardar=guardar, ruta=ruta)
 
+@instrumentar
 def graficar_demanda_maxima_anillo(
     data, *, titulo="Demanda Máx (Anillo)", guardar: bool = False, ruta: str | None = None
 ):
@@ -199,11 +241,13 @@ def _polar(data, titulo, ylabel, guardar=False, ruta=None):
     plt.show()
 
 
+@instrumentar
 def graficar_consumo_polar(
     data, *, titulo="Consumo (polar)", guardar: bool = False, ruta: str | None = None
 ):
     _polar(data, titulo, "kWh", guardar=guardar, ruta=ruta)
 
+@instrumentar
 def graficar_demanda_maxima_polar(
     data, *, titulo="Demanda Máx (polar)", guardar: bool = False, ruta: str | None = None
 ):
@@ -211,6 +255,7 @@ def graficar_demanda_maxima_polar(
 
 # --- Comparación de tarifas ---------------------------------------------
 
+@instrumentar
 def graficar_comparacion_tarifas(
     data: dict[str, dict[str, float]],
     *,
@@ -248,3 +293,57 @@ def graficar_comparacion_tarifas(
         plt.savefig(ruta)
 
     plt.show()
+
+
+# --- Curva ITIC ---------------------------------------------------------
+
+
+def _escalones(curva, desde=1e-3, hasta=1e3):
+    """Puntos (duración, tensión) de una curva por tramos para `plt.step`."""
+    x, y = [desde], [curva[0][1]]
+    for duracion, tension in curva:
+        x.append(min(duracion, hasta))
+        y.append(tension)
+    return x, y
+
+
+@instrumentar
+def graficar_itic(
+    eventos: pd.DataFrame,
+    curva_superior,
+    curva_inferior,
+    *,
+    titulo="Eventos de tensión sobre la curva ITIC",
+    guardar: bool = False,
+    ruta: str | None = None,
+):
+    """
+    Dispersión duración (s, escala log) – tensión (% de la nominal) de los
+    eventos sobre la curva ITIC, coloreados por tipo.
+    """
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for curva in (curva_superior, curva_inferior):
+        x, y = _escalones(curva)
+        ax.step(x, y, where="pre", color="black", linewidth=1.5)
+    colores = {"hueco": "tab:orange", "interrupcion": "tab:red", "sobretension": "tab:blue"}
+    for tipo, color in colores.items():
+        sel = eventos[eventos["tipo"] == tipo]
+        if not sel.empty:
+            ax.scatter(sel["duracion_s"], sel["tension_pct"], s=14, alpha=0.6, color=color, label=f"{tipo} ({len(sel)})")
+    ax.set_xscale("log")
+    ax.set_xlim(1e-3, 1e3)
+    ax.set_ylim(0, 210)
+    ax.set_xlabel("Duración (s)")
+    ax.set_ylabel("Tensión (% de la nominal)")
+    ax.set_title(titulo)
+    ax.grid(True, which="both", linestyle="--", alpha=0.4)
+    if len(eventos):
+        ax.legend()
+    plt.tight_layout()
+
+    if guardar:
+        if ruta is None:
+            raise ValueError("Se debe especificar una ruta para guardar la gráfica.")
+        plt.savefig(ruta)
+
+    plt.show()
@@ -0,0 +1,36 @@
+"""
+Campañas sintéticas compartidas por los tests, generadas con
+`benchmarks.sintetico` y cargadas como en el informe (carga → división →
+columnas derivadas).
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from benchmarks.sintetico import escribir_myebox
+from functions import cargar_datos, dividir_dataframe, sub_dividir_dataframe
+
+
+@pytest.fixture(scope="session")
+def campana(tmp_path_factory):
+    """
+    `campana(**kwargs)` → DataFrame de medidas de una exportación sintética
+    (`kwargs` de `escribir_myebox`), con las columnas derivadas. Cada
+    configuración se genera una sola vez por sesión; los tests reciben una
+    copia.
+    """
+    directorio = tmp_path_factory.mktemp("campanas")
+    generadas = {}
+
+    def _campana(**kwargs):
+        kwargs.setdefault("orden_max_armonico", 3)
+        clave = tuple(sorted(kwargs.items()))
+        if clave not in generadas:
+            ruta = escribir_myebox(directorio / f"campana_{len(generadas)}.txt", **kwargs)
+            df, _ = dividir_dataframe(cargar_datos(str(ruta)))
+            sub_dividir_dataframe(df)
+            generadas[clave] = df
+        return generadas[clave].copy()
+
+    return _campana
@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+from functions import AlmacenResultados
+
+
+@pytest.fixture
+def almacen():
+    metricas = {
+        "apagones": {
+            "detalle_de_apagones": [
+                {"inicio": pd.Timestamp("2025-07-24 22:10"), "fin": pd.Timestamp("2025-07-24 22:40"),
+                 "duracion": pd.Timedelta(minutes=30)},
+                {"inicio": pd.Timestamp("2025-07-25 14:00"), "fin": pd.Timestamp("2025-07-25 14:20"),
+                 "duracion": pd.Timedelta(minutes=20)},
+            ]
+        }
+    }
+    with AlmacenResultados(":memory:") as almacen:
+        almacen.guardar_campana(
+            "Sitio", archivo="sitio.txt", inicio="2025-07-21 00:00", fin="2025-07-25 23:59", metricas=metricas
+        )
+        yield almacen
+
+
+def test_hasta_sin_hora_incluye_el_dia(almacen):
+    assert len(almacen.eventos(desde="2025-07-25", hasta="2025-07-25")) == 1
+    assert len(almacen.eventos(desde="2025-07-24", hasta="2025-07-25")) == 2
+    assert len(almacen.eventos(hasta="2025-07-25 12:00")) == 1
+    assert len(almacen.eventos(hasta=pd.Timestamp("2025-07-25").date())) == 2
+    assert len(almacen.campanas(desde="2025-07-25", hasta="2025-07-25")) == 1
+    assert len(almacen.campanas(hasta="2025-07-20")) == 0
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+import functions
+from functions import demanda_15min, facturar_importacion, liquidacion_neta, procesar_demanda_maxima
+
+
+def test_demanda_15min_coincide_con_sdata(campana):
+    # 3 días + 7 min: el último grupo de 5 muestras queda incompleto.
+    df = campana(dias=3 + 7 / 1440, apagones=0)
+    esperada = procesar_demanda_maxima(df.copy())[0]["DMAX_15min"].to_numpy()
+    potencia = df["P.Activa III T"].to_numpy(dtype=float)
+    np.testing.assert_allclose(demanda_15min(potencia)[0], esperada, equal_nan=True, rtol=1e-9)
+    # Varias series a la vez.
+    lote = demanda_15min(np.vstack([potencia, 2 * potencia]))
+    np.testing.assert_allclose(lote[1], 2 * lote[0], equal_nan=True, rtol=1e-9)
+
+
+def test_demanda_15min_exportada_una_vez():
+    assert functions.__all__.count("demanda_15min") == 1
+    assert len(functions.__all__) == len(set(functions.__all__))
+
+
+def test_facturacion_por_ciclo_coincide_con_liquidacion_sin_medicion_neta(campana):
+    df = campana(dias=10, inicio="2025-06-25 00:00:00", apagones=0, carga_kw=60.0, solar_kwp=300.0)
+    tarifas = ("BTD", "BTH")
+    factura = facturar_importacion(df, tarifas, distribuidora="edemet")
+    neta = liquidacion_neta(df, tarifas, distribuidora="edemet")
+    assert (factura["cargos"]["total"] >= 0).all()
+    np.testing.assert_allclose(
+        factura["por_ciclo"]["total"].to_numpy(),
+        neta["por_ciclo"]["total_sin_medicion_neta"].to_numpy(),
+        atol=0.02,
+    )
+    assert neta["tramos"]["exportada"].sum() > 0
+    assert factura["tramos"]["consumo_punta"].sum() == pytest.approx(neta["tramos"]["importada_punta"].sum())
+
+
+def test_liquidacion_sin_periodo_tarifario(campana):
+    df = campana(dias=2, inicio="2030-01-10 00:00:00", apagones=0, carga_kw=60.0, solar_kwp=300.0)
+    neta = liquidacion_neta(df, ("BTD",), distribuidora="edemet")
+    assert neta["cargos"].empty
+    assert len(neta["sin_tarifa"]) == len(neta["tramos"]) == 1
+    assert neta["sin_tarifa"]["importada"].iloc[0] == pytest.approx(neta["tramos"]["importada"].iloc[0])
+    assert len(facturar_importacion(df, ("BTD",), distribuidora="edemet")["sin_tarifa"]) == 1
@@ -0,0 +1,106 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions import calcular_sumatoria_energia, cargar_distribuidora, clasificar_bloques
+from functions.calendario import calendario_desde_dict, domingo_de_pascua, feriados_panama
+
+
+@pytest.fixture(scope="module")
+def calendario():
+    return cargar_distribuidora("edemet").calendario
+
+
+@pytest.mark.parametrize(
+    "anio, pascua",
+    [(2022, date(2022, 4, 17)), (2024, date(2024, 3, 31)), (2025, date(2025, 4, 20)), (2026, date(2026, 4, 5))],
+)
+def test_domingo_de_pascua(anio, pascua):
+    assert domingo_de_pascua(anio) == pascua
+
+
+def test_feriados_moviles():
+    feriados = feriados_panama(2025)
+    # Lunes y martes de Carnaval y Viernes Santo.
+    assert {date(2025, 3, 3), date(2025, 3, 4), date(2025, 4, 18)} <= feriados
+    assert date(2025, 3, 5) not in feriados
+
+
+def test_feriado_en_domingo_se_traslada_al_lunes():
+    # 1 de enero de 2023 y 3 de noviembre de 2024 cayeron en domingo.
+    assert date(2023, 1, 2) in feriados_panama(2023)
+    assert date(2024, 11, 4) in feriados_panama(2024)
+    assert date(2023, 1, 2) not in feriados_panama(2023, trasladar_domingo=False)
+    # Un feriado en sábado no se traslada.
+    assert date(2026, 11, 30) not in feriados_panama(2026)
+
+
+def test_duelo_nacional_desde_2022():
+    assert date(2021, 12, 20) not in feriados_panama(2021)
+    assert date(2022, 12, 20) in feriados_panama(2022)
+
+
+@pytest.mark.parametrize(
+    "instante, bloque",
+    [
+        ("2025-07-21 08:59", "fuera_punta_bajo"),   # lunes laborable
+        ("2025-07-21 09:00", "punta"),
+        ("2025-07-21 17:00", "punta"),
+        ("2025-07-21 17:01", "fuera_punta_medio"),
+        ("2025-07-26 12:00", "fuera_punta_medio"),  # sábado
+        ("2025-07-27 12:00", "fuera_punta_bajo"),   # domingo
+        ("2025-11-03 12:00", "fuera_punta_bajo"),   # lunes feriado
+        ("2025-03-04 10:00", "fuera_punta_bajo"),   # martes de Carnaval
+        ("2024-11-04 10:00", "fuera_punta_bajo"),   # lunes trasladado
+    ],
+)
+def test_bloque_por_instante(calendario, instante, bloque):
+    assert calendario.clasificar_instante(instante) == bloque
+
+
+def test_codigos_vectorizados_coinciden_con_instantes(calendario):
+    fechas = pd.Series(pd.date_range("2024-12-28", "2025-01-03 23:59", freq="7min"))
+    fechas.iloc[5] = pd.NaT
+    codigos = calendario.codigos(fechas)
+    assert codigos[5] == -1
+    esperados = [
+        calendario.bloques.index(calendario.clasificar_instante(f)) if pd.notna(f) else -1 for f in fechas
+    ]
+    np.testing.assert_array_equal(codigos, esperados)
+
+
+def test_bloques_de_una_campana_con_fin_de_semana_y_feriado(campana, calendario):
+    # Sábado 1, domingo 2 y lunes 3 de noviembre de 2025 (feriado): sin punta.
+    df = campana(dias=4, inicio="2025-11-01 00:00:00", apagones=0)
+    bloques = clasificar_bloques(df["Fecha/hora"], calendario)
+    assert list(bloques) == [calendario.clasificar_instante(f) for f in df["Fecha/hora"]]
+    assert set(bloques[df["Fecha/hora"] < "2025-11-04"]) == {"fuera_punta_medio", "fuera_punta_bajo"}
+    assert (bloques[df["Fecha/hora"].between("2025-11-04 09:00", "2025-11-04 17:00")] == "punta").all()
+
+    total, por_bloque, _, _ = calcular_sumatoria_energia(df, "E.Activa III T")
+    assert sum(por_bloque.values()) == pytest.approx(total)
+    assert por_bloque["punta"] == pytest.approx(df.loc[(bloques == "punta").to_numpy(), "E.Activa III T"].sum())
+
+
+def test_feriados_extra_y_temporadas():
+    calendario = calendario_desde_dict(
+        {
+            "feriados": None,
+            "feriados_extra": ["2025-07-22"],
+            "temporadas": [
+                {"desde": None, "horarios": {"lunes-viernes": [["punta", "09:00", "17:00"]]}},
+                {"desde": "2025-08-01", "horarios": {"lunes-viernes": [["punta", "18:00", "21:00"]]}},
+            ],
+        }
+    )
+    assert calendario.clasificar_instante("2025-07-21 10:00") == "punta"
+    assert calendario.clasificar_instante("2025-07-22 10:00") == "fuera_punta_bajo"
+    assert calendario.clasificar_instante("2025-08-04 10:00") == "fuera_punta_bajo"
+    assert calendario.clasificar_instante("2025-08-04 19:00") == "punta"
+
+
+def test_tipo_de_dia_desconocido():
+    with pytest.raises(ValueError, match="Tipo de día desconocido"):
+        calendario_desde_dict({"temporadas": [{"horarios": {"lunez": []}}]})
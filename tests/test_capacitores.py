@@ -0,0 +1,28 @@
+import numpy as np
+
+from functions import cargar_tarifas, dimensionar_capacitores, simular_escenarios
+
+
+def test_sobrecompensacion_penaliza_como_el_simulador(campana):
+    df = campana(dias=3, apagones=0)
+    q_max = df["P.Inductiva III T"].max()
+    tamanos = np.array([0.0, 0.5, 1.0, 2.0, 4.0]) * q_max
+    res = dimensionar_capacitores(df, tamanos_kvar=tamanos, tarifas=("BTD",), distribuidora="edemet")
+    fijo = res["fijo"].set_index("kvar")
+
+    # Un banco del doble de la inductiva máxima inyecta reactiva todo el tiempo.
+    grande = fijo.loc[tamanos[3]]
+    assert grande["fp"] < 0.9
+    assert grande["penalizacion_BTD"] > 0
+    assert res["recomendado"]["fijo"]["kvar"] < q_max
+
+    simulado = simular_escenarios(df, capacitor_kvar=tamanos, tarifas=("BTD",), distribuidora="edemet")
+    np.testing.assert_allclose(fijo["fp"], simulado["fp"], rtol=1e-2)
+
+
+def test_periodo_mas_cercano_con_aviso(campana):
+    df = campana(dias=2, inicio="2030-01-10 00:00:00", apagones=0)
+    res = dimensionar_capacitores(df, tarifas=("BTD",), distribuidora="edemet")
+    assert res["periodo"] == cargar_tarifas("edemet").claves()[-1]
+    assert "No hay tarifas" in res["aviso_periodo"]
+    assert res["recomendado"]["fijo"] is not None
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from functions import facturar
+from functions.distribuidoras import ReglaFP
+
+DEMANDA = "P.Activa III T"
+
+
+def _facturar(df, **kwargs):
+    return facturar(df, ("BTD", "BTH"), tipo_demanda=DEMANDA, distribuidora="edemet", **kwargs)
+
+
+def test_tramos_por_ciclo_y_periodo(campana):
+    # Del 28 de junio al 3 de julio de 2025: cambio de ciclo y de periodo tarifario el 1 de julio.
+    df = campana(dias=5, inicio="2025-06-28 00:00:00", apagones=0)
+    tramos = _facturar(df)["tramos"]
+    assert list(tramos["periodo"]) == ["2025-ENE-JUN", "2025-JUL-DIC"]
+    assert list(tramos["ciclo"].astype(str)) == ["2025-06-01", "2025-07-01"]
+    np.testing.assert_allclose(tramos["fraccion_ciclo"], 1.0)
+
+    # Con corte el día 15 el 1 de julio parte el ciclo que empieza el 15 de junio.
+    tramos = _facturar(df, dia_corte=15)["tramos"]
+    assert list(tramos["ciclo"].astype(str)) == ["2025-06-15", "2025-06-15"]
+    assert list(tramos["periodo"]) == ["2025-ENE-JUN", "2025-JUL-DIC"]
+    np.testing.assert_allclose(tramos["dias"], [16, 14])
+    np.testing.assert_allclose(tramos["fraccion_ciclo"], [16 / 30, 14 / 30])
+
+
+def test_consumo_extrapolado_y_cargos_prorrateados(campana):
+    df = campana(dias=5, inicio="2025-06-28 00:00:00", apagones=0)
+    res = _facturar(df, dia_corte=15)
+    tramos = res["tramos"]
+    consumo = tramos.filter(like="consumo_")
+    medido = (consumo.to_numpy() * tramos["cobertura"].to_numpy()[:, None]).sum()
+    assert medido == pytest.approx(df["E.Activa III T"].sum())
+
+    cargos = res["cargos"]
+    assert len(cargos) == 4
+    assert res["por_ciclo"].loc[(tramos["ciclo"].iloc[0], "BTD"), "total"] == pytest.approx(
+        cargos.xs("BTD", level="tarifa")["total"].sum()
+    )
+
+
+def test_sin_periodo_tarifario(campana):
+    df = campana(dias=2, inicio="2030-01-10 00:00:00", apagones=0)
+    res = _facturar(df)
+    assert res["cargos"].empty
+    assert len(res["sin_tarifa"]) == 1
+
+
+def test_sitio_exportador_sin_cargos_negativos(campana):
+    df = campana(dias=3, inicio="2025-07-21 00:00:00", apagones=0, carga_kw=20.0, solar_kwp=300.0)
+    assert df["E.Activa III T"].sum() < 0
+    res = _facturar(df)
+    assert (res["cargos"][["cargo_energia", "cargo_demanda", "cargo_fp", "total"]] >= 0).all().all()
+
+
+def test_penalizacion_fp_no_negativa():
+    regla = ReglaFP()
+    assert regla.penalizacion(0.02, -500.0, 0.5) == 0.0
+    assert regla.penalizacion(0.02, 500.0, 0.85) == pytest.approx(round(2 * 0.05 * 500 * 0.02, 2))
+    lote = regla.penalizacion_lote(0.02, np.array([-500.0, 500.0]), np.array([0.5, 0.85]))
+    np.testing.assert_allclose(lote, [0.0, 1.0])
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions.histeresis import biestable, estado_histeresis, eventos_histeresis
+from functions.metrics import _detectar_eventos_con_estado, _fusionar_eventos
+
+
+def _estado_por_columna(v: pd.Series, activar, desactivar, sentido) -> pd.Series:
+    """Comparador de una columna como lo hacían `voltaje` y `frecuencia` antes del motor común."""
+    estado = pd.Series(pd.NA, index=v.index, dtype="boolean")
+    if sentido == "alto":
+        estado[v > activar] = True
+        estado[v < desactivar] = False
+    else:
+        estado[v < activar] = True
+        estado[v > desactivar] = False
+    return estado.ffill().fillna(False).astype(bool)
+
+
+def _eventos_por_columna(v, activar, desactivar, sentido, max_diff, valido=None):
+    estado = _estado_por_columna(v, activar, desactivar, sentido)
+    if valido is not None:
+        estado &= valido
+    return _fusionar_eventos(_detectar_eventos_con_estado(estado), max_diff, v, sentido)
+
+
+def _comparar(nuevos, viejos):
+    assert len(nuevos) == len(viejos)
+    for a, b in zip(nuevos, viejos):
+        assert a.keys() == b.keys()
+        for clave in a:
+            if isinstance(a[clave], float):
+                assert a[clave] == pytest.approx(b[clave], nan_ok=True)
+            else:
+                assert a[clave] == b[clave]
+
+
+def test_biestable():
+    enciende = np.array([0, 1, 0, 0, 1, 0, 0], dtype=bool)
+    apaga = np.array([1, 0, 0, 1, 0, 0, 1], dtype=bool)
+    np.testing.assert_array_equal(biestable(enciende, apaga), [0, 1, 1, 0, 1, 1, 0])
+
+
+def test_estado_con_nan_mantiene_el_ultimo():
+    v = np.array([0.0, 11.0, np.nan, 9.5, 8.0, np.nan, 12.0])
+    np.testing.assert_array_equal(estado_histeresis(v, 10, 9)[:, 0], [0, 1, 1, 1, 0, 0, 1])
+
+
+def test_sentido_no_valido():
+    with pytest.raises(ValueError, match="sentido"):
+        estado_histeresis(np.zeros((3, 1)), 1, 0, sentido="arriba")
+
+
+def test_coincide_con_los_bucles_por_columna_en_tension(campana):
+    df = campana(dias=3, excursiones=8, apagones=2).set_index("Fecha/hora")
+    columnas = ["Tensión L1", "Tensión L2", "Tensión L3", "Tensión L1L2L3"]
+    nominal = np.array([277.0, 277.0, 277.0, 480.0])
+    maximos, minimos, histeresis = nominal * 1.05, nominal * 0.95, nominal * 0.01
+    v = df[columnas].to_numpy(dtype=float)
+    max_diff = pd.Timedelta(minutes=10)
+
+    eventos = eventos_histeresis(
+        df.index,
+        np.hstack([v, v]),
+        activar=np.r_[maximos, minimos],
+        desactivar=np.r_[maximos - histeresis, minimos + histeresis],
+        sentido=["alto"] * 4 + ["bajo"] * 4,
+        max_diff=max_diff,
+        valido=np.hstack([np.ones_like(v, dtype=bool), v != 0]),
+    )
+    assert any(eventos)
+    for i, col in enumerate(columnas):
+        serie = df[col]
+        _comparar(eventos[i], _eventos_por_columna(serie, maximos[i], maximos[i] - histeresis[i], "alto", max_diff))
+        _comparar(
+            eventos[4 + i],
+            _eventos_por_columna(serie, minimos[i], minimos[i] + histeresis[i], "bajo", max_diff, serie != 0),
+        )
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_coincide_con_los_bucles_por_columna_aleatorio(semilla):
+    rng = np.random.default_rng(semilla)
+    n, k = 600, 3
+    indice = pd.date_range("2025-07-21", periods=n, freq="min")
+    v = np.cumsum(rng.normal(0, 1, (n, k)), axis=0)
+    v[rng.random((n, k)) < 0.02] = np.nan
+    activar, desactivar = np.array([5.0, -5.0, 0.0]), np.array([3.0, -3.0, -1.0])
+    sentidos = ["alto", "bajo", "alto"]
+    max_diff = pd.Timedelta(minutes=3)
+
+    eventos = eventos_histeresis(indice, v, activar, desactivar, sentido=sentidos, max_diff=max_diff)
+    for i in range(k):
+        serie = pd.Series(v[:, i], index=indice)
+        _comparar(eventos[i], _eventos_por_columna(serie, activar[i], desactivar[i], sentidos[i], max_diff))
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions.huecos import (
+    _DURACIONES_HUECO,
+    _ETIQUETAS_DURACION_HUECO,
+    _ETIQUETAS_RESIDUAL_HUECO,
+    _RESIDUALES_HUECO,
+    _tabla,
+    clasificar_itic,
+    eventos_de_tension,
+)
+
+NOMINAL = 277.0
+
+
+@pytest.mark.parametrize(
+    "tension, duracion, region",
+    [
+        # Tramos de la curva superior: 200 % hasta 1 ms, 140 % hasta 3 ms, 120 % hasta 0,5 s, 110 % después.
+        (190.0, 0.0008, "aceptable"),
+        (150.0, 0.002, "prohibida"),
+        (130.0, 0.004, "prohibida"),
+        (130.0, 0.01, "prohibida"),
+        (115.0, 0.3, "aceptable"),
+        (115.0, 1.0, "prohibida"),
+        (105.0, 100.0, "aceptable"),
+        # Tramos de la curva inferior: 0 % hasta 20 ms, 70 % hasta 0,5 s, 80 % hasta 10 s, 90 % después.
+        (0.0, 0.015, "aceptable"),
+        (60.0, 0.3, "sin_danos"),
+        (75.0, 0.3, "aceptable"),
+        (75.0, 5.0, "sin_danos"),
+        (85.0, 5.0, "aceptable"),
+        (85.0, 20.0, "sin_danos"),
+    ],
+)
+def test_regiones_itic(tension, duracion, region):
+    assert clasificar_itic([tension], [duracion])[0] == region
+
+
+def test_itic_vectorizado():
+    assert list(clasificar_itic([130, 130, 150], [0.01, 0.004, 0.002])) == ["prohibida"] * 3
+
+
+def _medicion(n: int = 300) -> pd.DataFrame:
+    df = pd.DataFrame({"Fecha/hora": pd.date_range("2025-07-21", periods=n, freq="min")})
+    for fase in ("L1", "L2", "L3"):
+        df[f"Tensión {fase}"] = NOMINAL
+        df[f"Tensión mín. {fase}"] = NOMINAL - 1
+        df[f"Tensión máx. {fase}"] = NOMINAL + 1
+    return df
+
+
+def test_eventos_y_tablas_en_50160():
+    df = _medicion()
+    # Sobretensión del 130 % en L2, hueco al 50 % en L1 e interrupción en las tres fases.
+    df.loc[50, "Tensión máx. L2"] = 1.3 * NOMINAL
+    df.loc[100, ["Tensión mín. L1", "Tensión L1"]] = [0.5 * NOMINAL, 0.99 * NOMINAL]
+    for fase in ("L1", "L2", "L3"):
+        df.loc[200, [f"Tensión mín. {fase}", f"Tensión {fase}"]] = [0.0, 0.9 * NOMINAL]
+
+    res = eventos_de_tension(df, NOMINAL)
+    eventos = res["eventos"]
+    assert list(eventos["tipo"]) == ["sobretension", "hueco", "interrupcion"]
+    np.testing.assert_allclose(eventos["tension_pct"], [130.0, 50.0, 0.0])
+    assert list(eventos["fase"][:2]) == ["L2", "L1"]
+    # Hueco: 60 s · (1 − 0,99²) / (1 − 0,5²) ≈ 1,6 s.
+    assert eventos["duracion_s"].iloc[1] == pytest.approx(60 * (1 - 0.99**2) / (1 - 0.25))
+    assert list(eventos["itic"]) == ["prohibida", "sin_danos", "sin_danos"]
+    assert res["resumen"]["itic"] == {"aceptable": 0, "sin_danos": 2, "prohibida": 1}
+
+    huecos = res["tabla_huecos"]
+    assert huecos.to_numpy().sum() == 2
+    assert huecos.loc["40–70 %", "1–5 s"] == 1
+    assert huecos.loc["< 5 %", "5–60 s"] == 1
+    assert list(huecos.index) == ["80–90 %", "70–80 %", "40–70 %", "5–40 %", "< 5 %"]
+    sobre = res["tabla_sobretensiones"]
+    assert sobre.to_numpy().sum() == 1
+    assert sobre.loc["≥ 120 %"].sum() == 1
+
+
+def test_tablas_en_50160_en_los_bordes():
+    eventos = pd.DataFrame({"tension_pct": [5.0, 40.0, 89.9, 4.9], "duracion_s": [0.2, 0.2001, 60.0, 61.0]})
+    tabla = _tabla(eventos, _RESIDUALES_HUECO, _ETIQUETAS_RESIDUAL_HUECO, _DURACIONES_HUECO, _ETIQUETAS_DURACION_HUECO)
+    assert tabla.loc["5–40 %", "10–200 ms"] == 1
+    assert tabla.loc["40–70 %", "200–500 ms"] == 1
+    assert tabla.loc["80–90 %", "5–60 s"] == 1
+    assert tabla.loc["< 5 %", "> 60 s"] == 1
+    assert tabla.to_numpy().sum() == 4
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions import analisis_de_apagones, calcular_sumatoria_energia, procesar_demanda_maxima
+from functions.lagunas import IndiceLagunas, indice_lagunas
+
+MINUTO = pd.Timedelta(minutes=1)
+
+
+@pytest.fixture
+def con_laguna(campana):
+    """Campaña de 2 días a 1 min sin apagones a la que se quitan 120 muestras (filas 1000 a 1119)."""
+    df = campana(dias=2, apagones=0, excursiones=0)
+    fechas = df["Fecha/hora"]
+    recortado = df.drop(index=range(1000, 1120)).reset_index(drop=True)
+    return df, recortado, fechas.iloc[1000], fechas.iloc[1120]
+
+
+def test_indice_de_lagunas(con_laguna):
+    _, df, desde, hasta = con_laguna
+    indice = indice_lagunas(df)
+    assert indice.paso == MINUTO.value
+    assert len(indice) == 1
+    laguna = indice.lagunas.iloc[0]
+    assert (laguna["inicio"], laguna["fin"]) == (desde, hasta)
+    assert laguna["duracion"] == pd.Timedelta(minutes=120)
+    assert laguna["muestras_faltantes"] == 120
+    assert indice.tiempo_sin_datos_total == pd.Timedelta(minutes=120)
+    # Se guarda en attrs y se reutiliza mientras corresponda a `df`.
+    assert indice_lagunas(df) is indice
+    assert len(indice_lagunas(df.iloc[:900].copy())) == 0
+
+
+def test_tiempo_sin_datos_en_intervalos(con_laguna):
+    _, df, desde, hasta = con_laguna
+    indice = indice_lagunas(df)
+    assert indice.tiempo_sin_datos(desde - 10 * MINUTO, hasta + 10 * MINUTO) == pd.Timedelta(minutes=120)
+    assert indice.tiempo_sin_datos(desde + 30 * MINUTO, hasta) == pd.Timedelta(minutes=90)
+    assert indice.tiempo_sin_datos(hasta, hasta + 60 * MINUTO) == pd.Timedelta(0)
+    vector = indice.tiempo_sin_datos([desde, desde + 60 * MINUTO], [desde + 60 * MINUTO, hasta])
+    assert list(vector) == [pd.Timedelta(minutes=60)] * 2
+
+    cobertura = indice.cobertura_diaria()
+    assert cobertura["sin_datos"].sum() == pd.Timedelta(minutes=120)
+    assert cobertura["esperado"].sum() == pd.Timedelta(days=2)
+
+
+def test_lagunas_de_la_campana_sintetica(campana):
+    df = campana(dias=3, apagones=0, huecos=3)
+    indice = indice_lagunas(df)
+    saltos = np.diff(df["Fecha/hora"].to_numpy()) > np.timedelta64(90, "s")
+    assert len(indice) == saltos.sum() > 0
+    faltan = 3 * 1440 - len(df)
+    assert indice.muestras_faltantes.sum() == faltan
+
+
+def test_apagon_por_laguna(con_laguna):
+    completo, df, desde, hasta = con_laguna
+    assert analisis_de_apagones(completo)["numero_total_de_apagones"] == 0
+    apagones = analisis_de_apagones(df)
+    assert apagones["numero_total_de_apagones"] == 1
+    apagon = apagones["detalle_de_apagones"][0]
+    assert (apagon["inicio"], apagon["fin"]) == (desde, hasta)
+    assert apagon["tiempo_sin_datos"] == pd.Timedelta(minutes=120)
+    assert apagones["tiempo_total_sin_suministro"] == pd.Timedelta(minutes=120)
+
+
+def test_laguna_corta_no_es_apagon(campana):
+    df = campana(dias=2, apagones=0, excursiones=0).drop(index=[500, 501]).reset_index(drop=True)
+    assert len(indice_lagunas(df)) == 1
+    assert analisis_de_apagones(df)["numero_total_de_apagones"] == 0
+
+
+def test_extrapolacion_sobre_el_tiempo_con_datos(con_laguna):
+    _, df, _, _ = con_laguna
+    total, por_bloque, total_30d, por_bloque_30d = calcular_sumatoria_energia(df, "E.Activa III T")
+    fechas = df["Fecha/hora"]
+    dias = (fechas.max() - fechas.min() - pd.Timedelta(minutes=120)) / pd.Timedelta(days=1)
+    assert total == pytest.approx(df["E.Activa III T"].sum())
+    assert total_30d == pytest.approx(total * 30 / dias)
+    assert sum(por_bloque_30d.values()) == pytest.approx(total_30d)
+
+    sin_lagunas = calcular_sumatoria_energia(df, "E.Activa III T", lagunas=IndiceLagunas.desde_fechas([]))
+    assert sin_lagunas[2] < total_30d
+
+
+def _ventanas_a_mano(fechas: np.ndarray, paso: np.timedelta64) -> np.ndarray:
+    n = len(fechas)
+    salto = np.r_[np.diff(fechas) > 1.5 * paso, False]
+    resultado = np.zeros(n, dtype=bool)
+    for i in range(n):
+        desde, hasta = max(5 * ((i - 14) // 5), 0), min(5 * (i // 5) + 4, n - 1)
+        resultado[i] = salto[desde:hasta].any()
+    return resultado
+
+
+def test_ventanas_de_demanda_que_cruzan_la_laguna(con_laguna):
+    _, df, _, _ = con_laguna
+    fechas = df["Fecha/hora"].to_numpy()
+    cruzan = indice_lagunas(df).ventanas_demanda(fechas)
+    np.testing.assert_array_equal(cruzan, _ventanas_a_mano(fechas, np.timedelta64(1, "m")))
+    assert cruzan[1000:1010].all() and not cruzan[:995].any() and not cruzan[1020:].any()
+
+    demanda = procesar_demanda_maxima(df.copy())[0]["DMAX_15min"].to_numpy()
+    assert np.isnan(demanda[cruzan]).all()
+    assert not np.isnan(demanda[14:][~cruzan[14:]]).any()
@@ -0,0 +1,24 @@
+import numpy as np
+
+from functions import bandas_extrapolacion, cargar_tarifas, procesar_demanda_maxima
+
+
+def _con_demanda(df):
+    return procesar_demanda_maxima(df)[0]
+
+
+def test_sitio_exportador_sin_consumo_negativo(campana):
+    df = _con_demanda(campana(dias=3, apagones=0, carga_kw=20.0, solar_kwp=300.0))
+    assert df["E.Activa III T"].sum() < 0
+    res = bandas_extrapolacion(df, n_meses=200, tarifas=("BTD",), distribuidora="edemet")
+    meses = res["meses"]
+    assert (meses.filter(like="consumo_") >= 0).all().all()
+    assert (meses["total_BTD"] >= 0).all()
+
+
+def test_periodo_mas_cercano_con_aviso(campana):
+    df = _con_demanda(campana(dias=3, inicio="2030-01-10 00:00:00", apagones=0))
+    res = bandas_extrapolacion(df, n_meses=200, tarifas=("BTD",), distribuidora="edemet")
+    assert res["periodo"] == cargar_tarifas("edemet").claves()[-1]
+    assert "No hay tarifas" in res["aviso_periodo"]
+    assert np.isfinite(res["meses"]["total_BTD"]).all()
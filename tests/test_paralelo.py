@@ -0,0 +1,28 @@
+import json
+from pathlib import Path
+
+import functions
+from functions import Tarea, ejecutar_tareas, usar_distribuidora
+from functions.distribuidoras import distribuidora_activa
+
+
+def _nombre_distribuidora(df):
+    return distribuidora_activa().nombre
+
+
+def _bloque_a_las_diez(df):
+    return distribuidora_activa().calendario.clasificar_instante("2025-07-21 10:00")
+
+
+def test_trabajadores_usan_la_distribuidora_activa(campana, tmp_path):
+    datos = json.loads((Path(functions.__file__).parent / "datos" / "distribuidoras" / "edemet.json").read_text("utf-8"))
+    datos["nombre"] = "Propia"
+    datos["calendario"]["temporadas"][0]["horarios"]["lunes-viernes"] = [["punta", "18:00", "21:00"]]
+    ruta = tmp_path / "propia.json"
+    ruta.write_text(json.dumps(datos), encoding="utf-8")
+
+    df = campana(dias=1, apagones=0)
+    tareas = [Tarea("nombre", _nombre_distribuidora), Tarea("bloque", _bloque_a_las_diez)]
+    with usar_distribuidora(ruta):
+        resultados = ejecutar_tareas(df, tareas, procesos=2)
+    assert resultados == {"nombre": "Propia", "bloque": "fuera_punta_bajo"}
@@ -0,0 +1,28 @@
+import json
+import os
+from pathlib import Path
+
+import functions
+from functions.informe import ETAPAS_INFORME
+from functions.pipeline import Pipeline
+
+
+def test_editar_la_distribuidora_cambia_las_claves(tmp_path):
+    edemet = json.loads((Path(functions.__file__).parent / "datos" / "distribuidoras" / "edemet.json").read_text("utf-8"))
+    ruta = tmp_path / "propia.json"
+    ruta.write_text(json.dumps(edemet), encoding="utf-8")
+    archivo = tmp_path / "medicion.txt"
+    archivo.write_text("")
+    parametros = {p: None for e in ETAPAS_INFORME for p in e.parametros}
+    parametros.update(archivo=str(archivo), distribuidora=str(ruta))
+    pipeline = Pipeline(ETAPAS_INFORME)
+    antes = pipeline.claves(parametros)
+
+    edemet["regla_fp"] = {**edemet.get("regla_fp", {}), "umbral": 0.85}
+    ruta.write_text(json.dumps(edemet), encoding="utf-8")
+    st = ruta.stat()
+    os.utime(ruta, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    despues = pipeline.claves(parametros)
+
+    cambian = {n for n in antes if antes[n] != despues[n]}
+    assert cambian == {"metricas", "tarifas", "graficos", "impresion"}
@@ -0,0 +1,67 @@
+import pickle
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+
+from functions import PiramideAgregados, calcular_sumatoria_energia, graficar_parametros
+
+ENERGIA = "E.Activa III T"
+
+
+@pytest.fixture
+def cada_10s(campana):
+    """Campaña de 2 días registrada cada 10 s y su pirámide, recién construida y tras serializarla."""
+    df = campana(dias=2, intervalo_s=10, apagones=0, excursiones=0)
+    piramide = PiramideAgregados.construir(df, [ENERGIA, "P.Activa III T"])
+    return df, piramide, pickle.loads(pickle.dumps(piramide))
+
+
+def _suma_por_minutos(df: pd.DataFrame, desde: str, hasta: str) -> float:
+    """Suma de las muestras de los minutos que empiezan en [desde, hasta]."""
+    minuto = df["Fecha/hora"].dt.floor("min")
+    return df.loc[(minuto >= desde) & (minuto <= hasta), ENERGIA].sum()
+
+
+def test_ventanas_exactas_con_muestras(cada_10s):
+    df, piramide, _ = cada_10s
+    desde, hasta = pd.Timestamp("2025-07-21 09:00:25"), pd.Timestamp("2025-07-21 17:30:05")
+    exacto = df.loc[df["Fecha/hora"].between(desde, hasta), ENERGIA].sum()
+    assert piramide.resumen([ENERGIA], desde, hasta).loc[ENERGIA, "suma"] == pytest.approx(exacto)
+
+
+def test_ventanas_sin_muestras_se_ajustan_al_minuto(cada_10s):
+    df, piramide, cargada = cada_10s
+    assert cargada._muestras is None
+
+    # El borde final (00:00 del día siguiente) parte el minuto 00:00, que se toma entero.
+    resumen = cargada.resumen([ENERGIA], "2025-07-21", "2025-07-22")
+    assert resumen.loc[ENERGIA, "suma"] == pytest.approx(_suma_por_minutos(df, "2025-07-21 00:00", "2025-07-22 00:00"))
+
+    # Un borde inicial a mitad de minuto descarta ese minuto.
+    resumen = cargada.resumen([ENERGIA], "2025-07-21 09:00:25", "2025-07-21 17:30:05")
+    assert resumen.loc[ENERGIA, "suma"] == pytest.approx(_suma_por_minutos(df, "2025-07-21 09:01", "2025-07-21 17:30"))
+
+    # Con hora_fin "23:59" por defecto se suma el día completo, como con las muestras.
+    total = calcular_sumatoria_energia(df, ENERGIA, piramide=cargada, fecha_inicio="2025-07-21", fecha_fin="2025-07-21")[0]
+    assert total == pytest.approx(_suma_por_minutos(df, "2025-07-21 00:00", "2025-07-21 23:59"))
+
+    # Si ningún borde parte un intervalo el resultado no cambia.
+    np.testing.assert_allclose(
+        cargada.resumen(None, "2025-07-21 06:00", "2025-07-21 18:00:50").to_numpy(dtype=float, na_value=np.nan),
+        piramide.resumen(None, "2025-07-21 06:00", "2025-07-21 18:00:50").to_numpy(dtype=float, na_value=np.nan),
+    )
+
+
+def test_grafico_con_franja_horaria_no_queda_vacio(campana, monkeypatch):
+    monkeypatch.setattr(plt, "show", lambda: None)
+    df = campana(dias=3, apagones=0, excursiones=0)
+    piramide = PiramideAgregados.construir(df, ["P.Activa III T"])
+    # Con 5 puntos el nivel elegido para los 3 días sería el de 1 día.
+    assert piramide.nivel_para(max_puntos=5).nombre == "1D"
+    graficar_parametros(piramide, ["P.Activa III T"], hora_inicio="09:00", hora_fin="17:00", max_puntos=5)
+    x = plt.gca().lines[0].get_xdata()
+    plt.close("all")
+    horas = pd.DatetimeIndex(x).hour
+    assert len(x) == 3 * 9 and horas.min() == 9 and horas.max() == 17
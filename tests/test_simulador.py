@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from functions import cargar_tarifas, simular_escenarios
+
+
+def test_periodo_mas_cercano_con_aviso(campana):
+    df = campana(dias=2, inicio="2030-01-10 00:00:00", apagones=0)
+    tabla = simular_escenarios(df, desplazar_kw=[0.0, 20.0], tarifas=("BTD",), distribuidora="edemet")
+    assert tabla.attrs["periodo"] == cargar_tarifas("edemet").claves()[-1]
+    assert "No hay tarifas" in tabla.attrs["aviso_periodo"]
+    assert np.isfinite(tabla["total_BTD"]).all()
+
+    vigente = simular_escenarios(campana(dias=2, apagones=0), tarifas=("BTD",), distribuidora="edemet")
+    assert vigente.attrs["aviso_periodo"] is None
+
+
+def test_sitio_exportador_sin_consumo_negativo(campana):
+    df = campana(dias=3, apagones=0, carga_kw=20.0, solar_kwp=300.0)
+    assert df["E.Activa III T"].sum() < 0
+    tabla = simular_escenarios(df, desplazar_kw=[0.0, 10.0], tarifas=("BTD", "BTH"), distribuidora="edemet")
+    consumo = tabla.filter(like="consumo_")
+    assert (consumo >= 0).all().all()
+    assert tabla["energia_total"].to_numpy() == pytest.approx(consumo.sum(axis=1).to_numpy())
+    assert (tabla[["total_BTD", "total_BTH"]] >= 0).all().all()
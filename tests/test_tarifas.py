@@ -0,0 +1,169 @@
+import copy
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import functions
+from functions import TarifaInvalida, calcular_tarifa, calcular_tarifa_lote, cargar_tarifas
+from functions.tablas_tarifas import _compilar_periodo
+from functions.tariffs import energia_escalonada
+
+PERIODO = {
+    "periodo": "PRUEBA",
+    "vigencia": {"desde": "2025-01-01", "hasta": "2025-12-31"},
+    "tarifas": {
+        "TRAMOS": {
+            "tipo": "Escalonada de prueba",
+            "cargo_fijo": 1.0,
+            "conexion": 1.0,
+            "cargo_fp": 0.01,
+            "bloques": {"0-100": 0.1, "101-500": 0.2, "501+": 0.5},
+        },
+        "PLANA": {
+            "tipo": "Precio único con demanda",
+            "cargo_fijo": 1.0,
+            "conexion": 1.0,
+            "cargo_fp": [0.005, 0.005],
+            "bloques": {"general": 0.15},
+            "cargo_demanda_maxima": 10.0,
+        },
+    },
+}
+
+
+def _invalido(**cambios):
+    datos = copy.deepcopy(PERIODO)
+    for tarifa, campos in cambios.items():
+        datos["tarifas"][tarifa].update(campos)
+    return datos
+
+
+def test_periodo_valido_compila_escalones():
+    p = _compilar_periodo(copy.deepcopy(PERIODO), "prueba.json")
+    assert p.escalones["TRAMOS"] == ((0.0, 100.0, 0.1), (101.0, 500.0, 0.2), (501.0, None, 0.5))
+    assert "PLANA" not in p.escalones
+    assert p["PLANA"]["cargo_fp"] == pytest.approx(0.01)
+
+
+@pytest.mark.parametrize(
+    "cambios, mensaje",
+    [
+        ({"TRAMOS": {"bloques": {"0-100": 0.1, "150-500": 0.2}}}, "contiguos"),
+        ({"TRAMOS": {"bloques": {"cien": 0.1}}}, "tramo de consumo no válido"),
+        ({"TRAMOS": {"bloques": {"500-100": 0.1}}}, "límites no válidos"),
+        ({"TRAMOS": {"bloques": {}}}, "no hay tramos"),
+        ({"TRAMOS": {"bloques": {"0-100": -0.1}}}, "negativo"),
+        ({"TRAMOS": {"bloques": {"punta": 0.3}}}, "faltan los bloques"),
+        ({"TRAMOS": {"cargo_fijo": "1"}}, "se esperaba un número"),
+        ({"PLANA": {"cargo_demanda_maxima": {"punta": 1.0}}}, "solo en tarifas horarias"),
+    ],
+)
+def test_tablas_no_validas(cambios, mensaje):
+    with pytest.raises(TarifaInvalida, match=mensaje):
+        _compilar_periodo(_invalido(**cambios), "prueba.json")
+
+
+def test_campos_obligatorios():
+    datos = copy.deepcopy(PERIODO)
+    del datos["tarifas"]["PLANA"]["cargo_fp"]
+    with pytest.raises(TarifaInvalida, match="faltan"):
+        _compilar_periodo(datos, "prueba.json")
+    datos = copy.deepcopy(PERIODO)
+    datos["vigencia"] = {"desde": "2025-12-31", "hasta": "2025-01-01"}
+    with pytest.raises(TarifaInvalida, match="vigencia"):
+        _compilar_periodo(datos, "prueba.json")
+    datos = json.loads(json.dumps(PERIODO))
+    datos["tarifas"]["BTD"] = datos["tarifas"].pop("TRAMOS")
+    with pytest.raises(TarifaInvalida, match="cargo_demanda_maxima"):
+        _compilar_periodo(datos, "prueba.json")
+
+
+def test_tarifa_con_tramos_propios():
+    periodo = _compilar_periodo(copy.deepcopy(PERIODO), "prueba.json")
+    # 100 × 0,1 + 400 × 0,2 + 100 × 0,5
+    r = calcular_tarifa("TRAMOS", {"fuera_punta_bajo": 300.0, "punta": 300.0}, {}, 1.0, periodo, "edemet")
+    assert r["cargo_energia"] == pytest.approx(140.0)
+    assert r["cargo_demanda"] == 0
+    r = calcular_tarifa("PLANA", {"punta": 40.0, "fuera_punta_bajo": 60.0}, {"punta": 3.0, "fuera_punta_bajo": 5.0},
+                        1.0, periodo, "edemet")
+    assert (r["cargo_energia"], r["cargo_demanda"]) == (pytest.approx(15.0), pytest.approx(50.0))
+
+
+def test_lote_coincide_con_escalar():
+    periodo = _compilar_periodo(copy.deepcopy(PERIODO), "prueba.json")
+    kwh = np.array([0.0, 50.0, 100.0, 101.0, 500.0, 750.0])
+    lote = calcular_tarifa_lote("TRAMOS", {"punta": kwh}, {}, np.ones_like(kwh), periodo, "edemet")
+    for i, v in enumerate(kwh):
+        r = calcular_tarifa("TRAMOS", {"punta": v}, {}, 1.0, periodo, "edemet")
+        assert lote["total"][i] == pytest.approx(r["total"])
+
+
+def test_ultimo_tramo_acotado():
+    with pytest.raises(ValueError, match="último tramo"):
+        energia_escalonada(400.0, ((0.0, 300.0, 0.2),))
+
+
+@pytest.mark.parametrize(
+    "kwh, esperado",
+    [
+        # Los 10 kWh previos a '11-300' se cobran al precio del último tramo alcanzado.
+        (300.0, round(300 * 0.1617, 2)),
+        (301.0, round(290 * 0.1617 + 11 * 0.23216, 2)),
+        (800.0, round(290 * 0.1617 + 450 * 0.23216 + 60 * 0.34471, 2)),
+    ],
+)
+def test_bts_edemet_en_los_umbrales(kwh, esperado):
+    r = calcular_tarifa("BTS", {"fuera_punta_bajo": kwh}, {}, 1.0, "2025-JUL-DIC", "edemet")
+    assert r["cargo_energia"] == pytest.approx(esperado)
+
+
+def test_bth_edemet_demanda_por_bloque():
+    consumo = {"punta": 100.0, "fuera_punta_medio": 200.0, "fuera_punta_bajo": 300.0}
+    dmax = {"punta": 10.0, "fuera_punta_medio": 12.0, "fuera_punta_bajo": 8.0}
+    r = calcular_tarifa("BTH", consumo, dmax, 1.0, "2025-JUL-DIC", "edemet")
+    assert r["cargo_energia"] == pytest.approx(round(100 * 0.30933 + 200 * 0.16917 + 300 * 0.09491, 2))
+    assert r["cargo_demanda"] == pytest.approx(round(10 * 19.37 + 12 * 2.55, 2))
+
+
+def test_periodo_mas_cercano():
+    tabla = cargar_tarifas("edemet")
+    assert tabla.mas_cercano("2025-08-15").clave == "2025-JUL-DIC"
+    assert tabla.mas_cercano("2027-03-01").clave == tabla.claves()[-1]
+    assert tabla.mas_cercano("2020-01-01").clave == tabla.claves()[0]
+    with pytest.raises(KeyError):
+        tabla.por_fecha("2027-03-01")
+
+
+def test_cache_fuera_del_paquete(tmp_path, monkeypatch):
+    from functions import tablas_tarifas
+
+    monkeypatch.setenv("CIRCUTOR_CACHE", str(tmp_path / "cache"))
+    monkeypatch.setattr(tablas_tarifas, "_memoria", {})
+    tabla = cargar_tarifas("edemet")
+    assert len(list((tmp_path / "cache" / "tarifas").glob("edemet-*.pickle"))) == 1
+    assert not (tablas_tarifas.DIR_TARIFAS / "__cache__").exists()
+
+    # Directorio de caché no escribible (es un fichero): se carga sin caché.
+    (tmp_path / "fichero").write_text("")
+    monkeypatch.setenv("CIRCUTOR_CACHE", str(tmp_path / "fichero"))
+    monkeypatch.setattr(tablas_tarifas, "_memoria", {})
+    assert cargar_tarifas("edemet").claves() == tabla.claves()
+
+
+def test_distribuidora_propia_con_su_directorio_de_tarifas(tmp_path):
+    from functions import cargar_distribuidora
+
+    edemet = json.loads((Path(functions.__file__).parent / "datos" / "distribuidoras" / "edemet.json").read_text("utf-8"))
+    edemet.update(nombre="Propia", tarifas="tarifas_propia")
+    (tmp_path / "propia.json").write_text(json.dumps(edemet), encoding="utf-8")
+    (tmp_path / "tarifas_propia").mkdir()
+    (tmp_path / "tarifas_propia" / "2025.json").write_text(json.dumps(PERIODO), encoding="utf-8")
+
+    dist = cargar_distribuidora(tmp_path / "propia.json")
+    assert Path(dist.tarifas) == (tmp_path / "tarifas_propia").resolve()
+    r = calcular_tarifa("TRAMOS", {"punta": 600.0}, {}, 1.0, "2025-06-01", dist)
+    assert r["cargo_energia"] == pytest.approx(140.0)
+    with pytest.raises(KeyError, match="BTD"):
+        calcular_tarifa("BTD", {"punta": 600.0}, {"punta": 1.0}, 1.0, "2025-06-01", dist)